@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Benchmark do Content Quality Validator
+Compara a extração de características em passada única com a implementação
+anterior (uma passada por verificação, listas de palavras com `in`)
+"""
+
+import sys
+import os
+import time
+import random
+
+# Adiciona o diretório src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.content_quality_validator import ContentQualityValidator
+
+class LegacyContentQualityValidator(ContentQualityValidator):
+    """Reproduz o custo da implementação anterior: cada verificação refaz lower/split"""
+
+    def _extract_features(self, content, context_terms):
+        error_lower = content.lower()
+        found_errors = [i for i in self.error_indicators if i in error_lower]
+
+        navigation_words = content.lower().split()
+        navigation_count = sum(1 for w in navigation_words if w in self.navigation_words)
+
+        quality_words = content.lower().split()
+        quality_count = sum(1 for w in quality_words if w in self.quality_indicators)
+
+        portuguese_words = content.lower().split()
+        portuguese_count = sum(1 for w in portuguese_words if w in self.portuguese_words)
+
+        paragraph_count = len([line.strip() for line in content.split('\n') if len(line.strip()) > 50])
+
+        relevance_lower = content.lower()
+        term_occurrences = [relevance_lower.count(term) for term in context_terms]
+
+        # _get_content_stats refazia split e parágrafos
+        words = content.split()
+        lines = content.split('\n')
+        [line.strip() for line in lines if len(line.strip()) > 50]
+        return {
+            'length': len(content),
+            'word_count': len(words),
+            'line_count': len(lines),
+            'paragraph_count': paragraph_count,
+            'found_errors': found_errors,
+            'navigation_count': navigation_count,
+            'quality_count': quality_count,
+            'portuguese_count': portuguese_count,
+            'term_occurrences': term_occurrences,
+            'number_count': len(self._number_pattern.findall(content)),
+            'money_value_count': len(self._money_pattern.findall(content))
+        }
+
+def build_corpus(documents: int, size: int):
+    """Gera páginas sintéticas de ~size caracteres com vocabulário realista"""
+    random.seed(42)
+    vocabulary = (
+        'o mercado de marketing digital no brasil cresceu com análise de dados e pesquisa de tendência '
+        'para empresa cliente consumidor vendas receita lucro investimento home menu contato login '
+        'que não uma para com mais como você entre depois R$ 1.500 30% 2024 estratégia inovação '
+        'produtos serviços blog news cookies privacy policy 500 internal server error'
+    ).split()
+    corpus = []
+    for i in range(documents):
+        lines = []
+        length = 0
+        while length < size:
+            line = ' '.join(random.choice(vocabulary) for _ in range(random.randint(5, 25)))
+            lines.append(line)
+            length += len(line) + 1
+        corpus.append({'url': f'https://exemplo.com.br/pagina-{i}', 'content': '\n'.join(lines)})
+    return corpus
+
+def run_benchmark(documents: int = 200, size: int = 50000, rounds: int = 3):
+    """Mede páginas/s das duas implementações e confere se os scores são iguais"""
+    context = {'segmento': 'marketing digital', 'produto': 'curso online', 'publico': 'empreendedores'}
+    corpus = build_corpus(documents, size)
+    legacy = LegacyContentQualityValidator()
+    current = ContentQualityValidator()
+
+    print(f"📊 Benchmark: {documents} páginas de ~{size // 1000}KB, {rounds} rodadas")
+
+    timings = {}
+    for name, validator, runner in (
+        ('anterior (validate_content)', legacy, lambda v: [v.validate_content(d['content'], d['url'], context) for d in corpus]),
+        ('passada única (validate_content)', current, lambda v: [v.validate_content(d['content'], d['url'], context) for d in corpus]),
+        ('passada única (validate_batch)', current, lambda v: v.validate_batch(corpus, context)['batch_results'])
+    ):
+        best = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            results = runner(validator)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = (best, [r['score'] for r in results])
+        print(f"   • {name}: {best:.3f}s ({documents / best:.1f} páginas/s)")
+
+    baseline_time, baseline_scores = timings['anterior (validate_content)']
+    for name, (elapsed, scores) in timings.items():
+        if scores != baseline_scores:
+            print(f"❌ Scores divergentes em {name}")
+            return False
+    fastest = min(elapsed for elapsed, _ in timings.values())
+    print(f"✅ Scores idênticos - ganho de {baseline_time / fastest:.1f}x")
+    return True
+
+if __name__ == "__main__":
+    success = run_benchmark()
+    sys.exit(0 if success else 1)
@@ -14,12 +14,22 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = "sync"
+# Threads por worker: streams SSE de progresso (/api/stream_progress) ficam
+# abertos por até PROGRESS_SSE_MAX_SECONDS e ocupariam um worker sync inteiro
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+# Cada worker tem seu próprio pool de extração (EXTRACTION_POOL_WORKERS, padrão
+# CPUs / workers arredondado para cima, mínimo 1): a memória cresce com
+# workers x processos. Exportado para o app (preload) dimensionar o pool
+os.environ.setdefault('GUNICORN_WORKERS', str(workers))
 worker_connections = 1000
 timeout = 60
 keepalive = 2
 
-# Restart workers after this many requests, to help prevent memory leaks
+# Restart workers after this many requests, to help prevent memory leaks.
+# Análises da fila (analysis_job_queue) rodam em threads do worker: a
+# reciclagem interrompe as que estiverem em andamento, e elas voltam para a
+# fila quando o lease expira (ANALYSIS_JOB_LEASE_SECONDS)
 max_requests = 1000
 max_requests_jitter = 100
 
@@ -9,7 +9,9 @@ import os
 import logging
 import time
 import json
+import contextvars
 from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
 from flask import Blueprint, request, jsonify, session
 from services.enhanced_analysis_engine import enhanced_analysis_engine
 from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine
@@ -20,8 +22,11 @@ from services.analysis_quality_controller import analysis_quality_controller
 from services.content_quality_validator import content_quality_validator
 from services.attachment_service import attachment_service
 from database import db_manager
-from routes.progress import get_progress_tracker, update_analysis_progress
+from routes.progress import get_progress_tracker, update_analysis_progress, remove_progress_tracker
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.analysis_job_queue import analysis_job_queue, QueueFullError
+from services.progress_bus import progress_bus
+from services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -30,31 +35,157 @@ analysis_bp = Blueprint('analysis', __name__)
 
 @analysis_bp.route('/analyze', methods=['POST'])
 def analyze_market():
-    """Endpoint principal para análise de mercado"""
+    """
+    Endpoint principal para análise de mercado.
+    
+    Enfileira a análise e retorna 202 com o job_id; acompanhe por
+    /analyze/jobs/<job_id> (status), /partial e /result. Com ?sync=true a
+    análise roda na própria requisição. Com ?incremental=true (ou
+    "incremental": true no corpo), componentes cujas entradas não mudaram
+    desde uma análise anterior reaproveitam a saída guardada.
+    """
+    
+    # Coleta dados da requisição
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({
+            'error': 'Dados não fornecidos',
+            'message': 'Envie os dados da análise no corpo da requisição'
+        }), 400
+    
+    # Validação básica
+    if not data.get('segmento'):
+        return jsonify({
+            'error': 'Segmento obrigatório',
+            'message': 'O campo "segmento" é obrigatório para análise'
+        }), 400
+    
+    # Adiciona session_id se não fornecido
+    if not data.get('session_id'):
+        data['session_id'] = f"session_{int(time.time())}_{os.urandom(4).hex()}"
+    session_id = data['session_id']
+    
+    # ?incremental=true reaproveita componentes de análises anteriores com as mesmas entradas
+    if request.args.get('incremental', '').lower() == 'true':
+        data['incremental'] = True
+    
+    request_info = {
+        "ip_address": request.remote_addr,
+        "user_agent": request.headers.get('User-Agent', '')
+    }
+    
+    if request.args.get('sync', '').lower() == 'true':
+        # Cópia do contexto: a sessão do auto save não fica na thread reaproveitada pelo gunicorn
+        result, status_code = contextvars.copy_context().run(_run_analysis_pipeline, data, request_info)
+        return jsonify(result), status_code
+    
+    try:
+        job = analysis_job_queue.submit({'data': data, 'request_info': request_info}, session_id=session_id)
+    except QueueFullError as e:
+        logger.warning(f"⚠️ Análise recusada: {e}")
+        response = jsonify({
+            'error': 'Fila de análises cheia',
+            'message': str(e),
+            'queue': analysis_job_queue.get_stats()
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    # Progresso disponível imediatamente para SSE/polling
+    get_progress_tracker(session_id).update_progress(0, "⏳ Análise na fila de processamento")
+    
+    job_id = job['job_id']
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'session_id': session_id,
+        'status': job['status'],
+        'queue_position': job['queue_position'],
+        'status_url': f"/api/analyze/jobs/{job_id}",
+        'partial_url': f"/api/analyze/jobs/{job_id}/partial",
+        'result_url': f"/api/analyze/jobs/{job_id}/result",
+        'progress_stream_url': f"/api/stream_progress/{session_id}"
+    }), 202
+
+@analysis_bp.route('/analyze/resume/<session_id>', methods=['POST'])
+def resume_analysis(session_id):
+    """
+    Retoma uma análise a partir do salvamento automático da sessão: saídas
+    de componentes concluídos são reaproveitadas e só os componentes que
+    falharam (ou não chegaram a rodar) são executados. Mesma resposta de
+    /analyze (202 com job_id, ou ?sync=true).
+    """
+    
+    checkpoint = ultra_detailed_analysis_engine.load_checkpoint(session_id)
+    if not checkpoint:
+        return jsonify({
+            'error': 'Sessão não encontrada',
+            'message': f'Nenhum dado de entrada salvo para a sessão {session_id}',
+            'session_id': session_id
+        }), 404
+    
+    data = checkpoint['input_data']
+    data['session_id'] = session_id
+    logger.info(
+        f"🔁 Retomando sessão {session_id}: {len(checkpoint['componentes'])} componentes salvos, "
+        f"pendentes: {', '.join(checkpoint['pendentes']) or 'nenhum'}"
+    )
+    
+    request_info = {
+        "ip_address": request.remote_addr,
+        "user_agent": request.headers.get('User-Agent', '')
+    }
+    
+    if request.args.get('sync', '').lower() == 'true':
+        result, status_code = contextvars.copy_context().run(
+            _run_analysis_pipeline, data, request_info, checkpoint=checkpoint['componentes']
+        )
+        return jsonify(result), status_code
+    
+    try:
+        # O checkpoint é recarregado pelo job (saídas grandes não passam pela fila)
+        job = analysis_job_queue.submit(
+            {'data': data, 'request_info': request_info, 'resume': True},
+            session_id=session_id
+        )
+    except QueueFullError as e:
+        logger.warning(f"⚠️ Retomada recusada: {e}")
+        response = jsonify({
+            'error': 'Fila de análises cheia',
+            'message': str(e),
+            'queue': analysis_job_queue.get_stats()
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    get_progress_tracker(session_id).update_progress(0, "⏳ Retomada na fila de processamento")
+    
+    job_id = job['job_id']
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'session_id': session_id,
+        'status': job['status'],
+        'queue_position': job['queue_position'],
+        'componentes_restaurados': sorted(checkpoint['componentes']),
+        'componentes_pendentes': checkpoint['pendentes'],
+        'status_url': f"/api/analyze/jobs/{job_id}",
+        'partial_url': f"/api/analyze/jobs/{job_id}/partial",
+        'result_url': f"/api/analyze/jobs/{job_id}/result",
+        'progress_stream_url': f"/api/stream_progress/{session_id}"
+    }), 202
+
+def _run_analysis_pipeline(
+    data: Dict[str, Any],
+    request_info: Dict[str, Any],
+    checkpoint: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], int]:
+    """Executa o pipeline completo de análise e retorna (resposta, status HTTP)"""
     
     try:
         start_time = time.time()
         logger.info("🚀 Iniciando análise de mercado ultra-detalhada")
         
-        # Coleta dados da requisição
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'error': 'Dados não fornecidos',
-                'message': 'Envie os dados da análise no corpo da requisição'
-            }), 400
-        
-        # Validação básica
-        if not data.get('segmento'):
-            return jsonify({
-                'error': 'Segmento obrigatório',
-                'message': 'O campo "segmento" é obrigatório para análise'
-            }), 400
-        
-        # Adiciona session_id se não fornecido
-        if not data.get('session_id'):
-            data['session_id'] = f"session_{int(time.time())}_{os.urandom(4).hex()}"
-        
         # Inicia sessão de salvamento automático
         session_id = data['session_id']
         auto_save_manager.iniciar_sessao(session_id)
@@ -63,9 +194,9 @@ def analyze_market():
         salvar_etapa("requisicao_analise", {
             "input_data": data,
             "timestamp": datetime.now().isoformat(),
-            "ip_address": request.remote_addr,
-            "user_agent": request.headers.get('User-Agent', '')
-        }, categoria="analise_completa")
+            "ip_address": request_info.get('ip_address'),
+            "user_agent": request_info.get('user_agent', '')
+        }, categoria="analise_completa", session_id=session_id)
         
         # Inicia rastreamento de progresso
         progress_tracker = get_progress_tracker(session_id)
@@ -78,7 +209,7 @@ def analyze_market():
                 "step": step,
                 "message": message,
                 "details": details
-            }, categoria="logs")
+            }, categoria="logs", session_id=session_id)
         
         # Log dos dados recebidos
         logger.info(f"📊 Dados recebidos: Segmento={data.get('segmento')}, Produto={data.get('produto')}")
@@ -95,7 +226,7 @@ def analyze_market():
         logger.info(f"🔍 Query de pesquisa: {data['query']}")
         
         # Salva query preparada
-        salvar_etapa("query_preparada", {"query": data['query']}, categoria="pesquisa_web")
+        salvar_etapa("query_preparada", {"query": data['query']}, categoria="pesquisa_web", session_id=session_id)
         
         # Executa análise GIGANTE ultra-detalhada
         logger.info("🚀 Executando análise GIGANTE ultra-detalhada...")
@@ -103,22 +234,23 @@ def analyze_market():
             analysis_result = ultra_detailed_analysis_engine.generate_gigantic_analysis(
                 data,
                 session_id=session_id,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                checkpoint=checkpoint
             )
             
             # Salva resultado da análise imediatamente
-            salvar_etapa("analise_resultado", analysis_result, categoria="analise_completa")
+            salvar_etapa("analise_resultado", analysis_result, categoria="analise_completa", session_id=session_id)
             
             # VALIDAÇÃO RIGOROSA DO RESULTADO
             logger.info("🔍 Validando qualidade da análise...")
             quality_validation = analysis_quality_controller.validate_complete_analysis(analysis_result)
             
             # Salva validação
-            salvar_etapa("validacao_qualidade", quality_validation, categoria="analise_completa")
+            salvar_etapa("validacao_qualidade", quality_validation, categoria="analise_completa", session_id=session_id)
             
             if not quality_validation['valid']:
                 logger.error(f"❌ Análise rejeitada por baixa qualidade: {quality_validation['errors']}")
-                salvar_erro("validacao_falha", Exception("Análise rejeitada por baixa qualidade"), contexto=quality_validation)
+                salvar_erro("validacao_falha", Exception("Análise rejeitada por baixa qualidade"), contexto=quality_validation, session_id=session_id)
                 
                 # Mesmo rejeitada, tenta salvar dados parciais
                 try:
@@ -127,7 +259,7 @@ def analyze_market():
                 except Exception as save_error:
                     logger.error(f"❌ Erro ao salvar dados parciais: {save_error}")
                 
-                return jsonify({
+                return {
                     'error': 'Análise de baixa qualidade rejeitada',
                     'message': 'A análise gerada não atende aos critérios de qualidade',
                     'quality_report': quality_validation,
@@ -135,26 +267,26 @@ def analyze_market():
                     'timestamp': datetime.now().isoformat(),
                     'dados_parciais_salvos': True,
                     'session_id': session_id
-                }), 422
+                }, 422
             
             # Limpa análise removendo componentes inválidos
             analysis_result = analysis_quality_controller.clean_analysis_for_output(analysis_result)
             
             # Salva análise limpa
-            salvar_etapa("analise_limpa", analysis_result, categoria="analise_completa")
+            salvar_etapa("analise_limpa", analysis_result, categoria="analise_completa", session_id=session_id)
             
             logger.info(f"✅ Análise validada com score {quality_validation['quality_score']:.1f}%")
             
         except Exception as e:
             logger.error(f"❌ Análise GIGANTE falhou: {str(e)}")
-            salvar_erro("analise_gigante", e, contexto=data)
+            salvar_erro("analise_gigante", e, contexto=data, session_id=session_id)
             
             # Tenta recuperar dados salvos automaticamente
             try:
                 dados_recuperados = auto_save_manager.consolidar_sessao(session_id)
                 logger.info(f"🔄 Dados recuperados automaticamente: {dados_recuperados}")
                 
-                return jsonify({
+                return {
                     'error': 'Falha na análise principal',
                     'message': str(e),
                     'dados_recuperados': True,
@@ -162,13 +294,13 @@ def analyze_market():
                     'relatorio_parcial': dados_recuperados,
                     'timestamp': datetime.now().isoformat(),
                     'recommendation': 'Dados intermediários foram preservados e podem ser acessados'
-                }), 206  # Partial Content
+                }, 206  # Partial Content
                 
             except Exception as recovery_error:
                 logger.error(f"❌ Falha na recuperação automática: {recovery_error}")
             
             # NÃO GERA FALLBACK - FALHA EXPLICITAMENTE
-            return jsonify({
+            return {
                 'error': 'Falha na análise',
                 'message': str(e),
                 'timestamp': datetime.now().isoformat(),
@@ -184,13 +316,13 @@ def analyze_market():
                     'ai_status': ai_manager.get_provider_status(),
                     'search_status': production_search_manager.get_provider_status()
                 }
-            }), 500
+            }, 500
         
         # Verifica se a análise foi bem-sucedida
         if not analysis_result or not isinstance(analysis_result, dict):
             logger.error("❌ Análise retornou resultado inválido ou vazio")
-            salvar_erro("resultado_invalido", Exception("Resultado inválido"), contexto={"result_type": type(analysis_result)})
-            return jsonify({
+            salvar_erro("resultado_invalido", Exception("Resultado inválido"), contexto={"result_type": type(analysis_result)}, session_id=session_id)
+            return {
                 'error': 'Análise retornou resultado inválido',
                 'message': 'Sistema não conseguiu gerar análise válida',
                 'timestamp': datetime.now().isoformat(),
@@ -201,7 +333,7 @@ def analyze_market():
                     'result_length': len(str(analysis_result)) if analysis_result else 0,
                     'ai_status': ai_manager.get_provider_status()
                 }
-            }), 500
+            }, 500
         
         # Marca progresso como completo
         progress_tracker.complete()
@@ -239,14 +371,14 @@ def analyze_market():
                 salvar_etapa("banco_salvo", {
                     "database_id": db_record.get('id'),
                     "local_files": db_record.get('local_files', {})
-                }, categoria="analise_completa")
+                }, categoria="analise_completa", session_id=session_id)
             else:
                 logger.warning("⚠️ Falha ao salvar análise")
-                salvar_erro("banco_falha", Exception("Falha ao salvar no banco"))
+                salvar_erro("banco_falha", Exception("Falha ao salvar no banco"), session_id=session_id)
                 
         except Exception as e:
             logger.error(f"❌ Erro ao salvar no banco: {str(e)}")
-            salvar_erro("banco_erro", e)
+            salvar_erro("banco_erro", e, session_id=session_id)
             # Não falha a análise por erro no banco
             analysis_result['database_warning'] = f"Falha ao salvar: {str(e)}"
         
@@ -284,23 +416,23 @@ def analyze_market():
         })
         
         # Salva resposta final
-        salvar_etapa("resposta_final", analysis_result, categoria="analise_completa")
+        salvar_etapa("resposta_final", analysis_result, categoria="analise_completa", session_id=session_id)
         
         logger.info(f"✅ Análise concluída em {processing_time:.2f} segundos")
         
-        return jsonify(analysis_result)
+        return analysis_result, 200
         
     except Exception as e:
         logger.error(f"❌ Erro crítico na análise: {str(e)}", exc_info=True)
         
         # Remove progresso em caso de erro
         try:
-            if 'session_id' in locals() and session_id in get_progress_tracker.__globals__.get('progress_sessions', {}):
-                del get_progress_tracker.__globals__['progress_sessions'][session_id]
+            if 'session_id' in locals():
+                remove_progress_tracker(session_id)
         except:
             pass  # Ignora erros de limpeza
         
-        return jsonify({
+        return {
             'error': 'Erro na análise',
             'message': str(e),
             'timestamp': datetime.now().isoformat(),
@@ -316,8 +448,115 @@ def analyze_market():
                 'ai_status': ai_manager.get_provider_status(),
                 'search_status': production_search_manager.get_provider_status()
             }
+        }, 500
+
+def _run_analysis_job(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Executor dos jobs da fila de análises"""
+    checkpoint = None
+    if payload.get('resume'):
+        saved = ultra_detailed_analysis_engine.load_checkpoint(payload['data']['session_id'])
+        checkpoint = saved['componentes'] if saved else None
+    return _run_analysis_pipeline(payload['data'], payload.get('request_info', {}), checkpoint=checkpoint)
+
+analysis_job_queue.set_runner(_run_analysis_job)
+
+@analysis_bp.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Status de uma análise enfileirada"""
+    
+    job = analysis_job_queue.get_job(job_id)
+    if not job:
+        return jsonify({
+            'error': 'Job não encontrado',
+            'job_id': job_id
+        }), 404
+    
+    job['progress'] = progress_bus.get_state(job['session_id']) if job['session_id'] else None
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+@analysis_bp.route('/analyze/jobs/<job_id>/partial', methods=['GET'])
+def get_analysis_job_partial(job_id):
+    """Resultados parciais: etapas já salvas da sessão do job"""
+    
+    job = analysis_job_queue.get_job(job_id)
+    if not job:
+        return jsonify({
+            'error': 'Job não encontrado',
+            'job_id': job_id
+        }), 404
+    
+    try:
+        etapas = auto_save_manager.listar_etapas_salvas(job['session_id'])
+        resumo = {
+            nome: max(registros, key=lambda r: r['timestamp'] or 0)
+            for nome, registros in etapas.items()
+        }
+        
+        dados = {}
+        if request.args.get('include_data', '').lower() == 'true':
+            for nome in resumo:
+                registro = auto_save_manager.recuperar_etapa(nome, job['session_id'])
+                if registro:
+                    dados[nome] = registro.get('dados')
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': job['status'],
+            'session_id': job['session_id'],
+            'etapas': {
+                nome: {
+                    'status': registro['status'],
+                    'timestamp': registro['timestamp'],
+                    'categoria': registro['categoria'],
+                    'tamanho': registro['tamanho']
+                }
+                for nome, registro in resumo.items()
+            },
+            'dados': dados
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter resultados parciais: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter resultados parciais',
+            'message': str(e)
         }), 500
 
+@analysis_bp.route('/analyze/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id):
+    """Resultado final da análise (202 enquanto ainda está na fila/executando)"""
+    
+    job = analysis_job_queue.get_job(job_id)
+    if not job:
+        return jsonify({
+            'error': 'Job não encontrado',
+            'job_id': job_id
+        }), 404
+    
+    result = analysis_job_queue.get_result(job_id)
+    if result is None:
+        return jsonify({
+            'success': False,
+            'job': job,
+            'message': 'Análise ainda em andamento'
+        }), 202
+    
+    payload, status_code = result
+    return jsonify(payload), status_code
+
+@analysis_bp.route('/analyze/queue', methods=['GET'])
+def get_analysis_queue():
+    """Métricas da fila de análises"""
+    
+    return jsonify({
+        'success': True,
+        'queue': analysis_job_queue.get_stats()
+    })
+
 @analysis_bp.route('/status', methods=['GET'])
 def get_analysis_status():
     """Retorna status dos sistemas de análise"""
@@ -361,7 +600,8 @@ def get_analysis_status():
                 'content_extraction': {
                     'status': 'healthy',
                     'available': True
-                }
+                },
+                'rate_limits': rate_limiter.get_stats()
             },
             'capabilities': {
                 'multi_ai_fallback': total_ai_available > 1,
@@ -624,7 +864,7 @@ def test_ai():
         logger.info("🧪 Testando sistema de IA...")
         
         # Testa IA
-        response = ai_manager.generate_analysis(prompt, max_tokens=500)
+        response = ai_manager.generate_analysis(prompt, max_tokens=500, use_cache=data.get('use_cache', True))
         
         return jsonify({
             'success': bool(response),
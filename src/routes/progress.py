@@ -3,6 +3,11 @@
 """
 ARQV30 Enhanced v2.0 - Progress Routes
 Endpoints para progresso em tempo real da análise
+
+O estado de cada sessão vive no Progress Bus (SQLite local ou Redis), então
+qualquer worker do gunicorn responde por qualquer sessão. Atualizações são
+entregues por Server-Sent Events em /stream_progress/<session_id>; o polling
+continua disponível como alternativa.
 """
 
 import os
@@ -10,31 +15,34 @@ import logging
 import time
 import json
 from datetime import datetime
-from flask import Blueprint, request, jsonify, session
-from flask_socketio import SocketIO, emit, join_room, leave_room
-import threading
-from queue import Queue
+from typing import Dict, Any, Optional
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
+import uuid
+from services.progress_bus import progress_bus
 
 logger = logging.getLogger(__name__)
 
 # Cria blueprint
 progress_bp = Blueprint('progress', __name__)
 
-# Sistema de progresso global
-progress_sessions = {}
-progress_queues = {}
+# Duração máxima de cada conexão SSE: abaixo do timeout dos workers síncronos
+# do gunicorn; o EventSource reconecta sozinho e continua do Last-Event-ID
+SSE_MAX_SECONDS = float(os.getenv('PROGRESS_SSE_MAX_SECONDS', '45'))
+SSE_KEEPALIVE_SECONDS = float(os.getenv('PROGRESS_SSE_KEEPALIVE_SECONDS', '15'))
 
 class ProgressTracker:
     """Rastreador de progresso em tempo real"""
-    
-    def __init__(self, session_id: str):
+
+    MAX_LOGS = 50
+
+    def __init__(self, session_id: str, state: Optional[Dict[str, Any]] = None):
         self.session_id = session_id
         self.current_step = 0
         self.total_steps = 13
         self.start_time = time.time()
         self.steps = [
             "🔍 Coletando dados do formulário",
-            "📊 Processando anexos inteligentes", 
+            "📊 Processando anexos inteligentes",
             "🌐 Realizando pesquisa profunda massiva",
             "🧠 Analisando com múltiplas IAs",
             "👤 Criando avatar arqueológico completo",
@@ -48,24 +56,52 @@ class ProgressTracker:
             "✨ Consolidando insights exclusivos"
         ]
         self.detailed_logs = []
-        
-        # Registra sessão global
-        progress_sessions[session_id] = self
-        progress_queues[session_id] = Queue()
-    
+        self.last_message = None
+
+        if state:
+            # Sessão existente (possivelmente criada por outro worker)
+            self.current_step = state.get('current_step', 0)
+            self.total_steps = state.get('total_steps', self.total_steps)
+            self.start_time = state.get('start_time', self.start_time)
+            self.detailed_logs = state.get('detailed_logs', [])
+            self.last_message = state.get('last_message')
+        else:
+            # Registra sessão no barramento compartilhado
+            self._save_state()
+
+    @classmethod
+    def load(cls, session_id: str) -> Optional['ProgressTracker']:
+        """Carrega o tracker de uma sessão existente"""
+        state = progress_bus.get_state(session_id)
+        if not state:
+            return None
+        return cls(session_id, state)
+
+    def _save_state(self):
+        """Persiste o estado no barramento"""
+        progress_bus.set_state(self.session_id, {
+            "session_id": self.session_id,
+            "current_step": self.current_step,
+            "total_steps": self.total_steps,
+            "start_time": self.start_time,
+            "detailed_logs": self.detailed_logs[-self.MAX_LOGS:],
+            "last_message": self.last_message,
+            "updated_at": time.time()
+        })
+
     def update_progress(self, step: int, message: str, details: str = None):
         """Atualiza progresso da análise"""
         self.current_step = step
         current_time = time.time()
         elapsed = current_time - self.start_time
-        
+
         # Calcula tempo estimado
         if step > 0:
             estimated_total = (elapsed / step) * self.total_steps
             remaining = max(0, estimated_total - elapsed)
         else:
             remaining = 0
-        
+
         progress_data = {
             "session_id": self.session_id,
             "current_step": step,
@@ -76,9 +112,10 @@ class ProgressTracker:
             "elapsed_time": elapsed,
             "estimated_remaining": remaining,
             "estimated_total": elapsed + remaining,
+            "is_complete": step >= self.total_steps,
             "timestamp": datetime.now().isoformat()
         }
-        
+
         # Log detalhado
         log_entry = {
             "step": step,
@@ -88,77 +125,75 @@ class ProgressTracker:
             "elapsed": elapsed
         }
         self.detailed_logs.append(log_entry)
-        
-        # Adiciona à queue para polling
-        if self.session_id in progress_queues:
-            try:
-                progress_queues[self.session_id].put(progress_data)
-            except:
-                pass
-        
+        self.detailed_logs = self.detailed_logs[-self.MAX_LOGS:]
+        self.last_message = message
+
+        # Publica para SSE/polling em qualquer worker
+        self._save_state()
+        progress_bus.publish(self.session_id, progress_data)
+
         logger.info(f"Progress {self.session_id}: Step {step}/{self.total_steps} - {message}")
-        
+
         return progress_data
-    
+
     def complete(self):
-        """Marca análise como completa"""
+        """Marca análise como completa (o barramento expira a sessão pelo TTL)"""
         self.update_progress(self.total_steps, "🎉 Análise concluída! Preparando resultados...")
-        
-        # Remove da sessão após 5 minutos
-        def cleanup():
-            time.sleep(300)  # 5 minutos
-            if self.session_id in progress_sessions:
-                del progress_sessions[self.session_id]
-            if self.session_id in progress_queues:
-                del progress_queues[self.session_id]
-        
-        threading.Thread(target=cleanup, daemon=True).start()
-    
+
     def get_current_status(self):
         """Retorna status atual"""
         elapsed = time.time() - self.start_time
-        
+
         if self.current_step > 0:
             estimated_total = (elapsed / self.current_step) * self.total_steps
             remaining = max(0, estimated_total - elapsed)
         else:
             remaining = 0
-        
+
         return {
             "session_id": self.session_id,
             "current_step": self.current_step,
             "total_steps": self.total_steps,
             "percentage": (self.current_step / self.total_steps) * 100,
-            "current_message": self.steps[min(self.current_step, len(self.steps) - 1)],
+            "current_message": self.last_message or self.steps[min(self.current_step, len(self.steps) - 1)],
             "elapsed_time": elapsed,
             "estimated_remaining": remaining,
             "detailed_logs": self.detailed_logs[-5:],  # Últimos 5 logs
             "is_complete": self.current_step >= self.total_steps
         }
 
+def _sse_message(data: Dict[str, Any], event: str, event_id: Optional[str] = None) -> str:
+    """Formata uma mensagem Server-Sent Events"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
 @progress_bp.route('/start_tracking', methods=['POST'])
 def start_tracking():
     """Inicia rastreamento de progresso"""
     try:
         data = request.get_json()
         session_id = data.get('session_id')
-        
+
         if not session_id:
             return jsonify({
                 'error': 'Session ID obrigatório'
             }), 400
-        
+
         # Cria novo tracker
         tracker = ProgressTracker(session_id)
         tracker.update_progress(0, "🚀 Iniciando análise ultra-detalhada...")
-        
+
         return jsonify({
             'success': True,
             'session_id': session_id,
             'message': 'Rastreamento iniciado',
             'status': tracker.get_current_status()
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao iniciar rastreamento: {str(e)}")
         return jsonify({
@@ -170,20 +205,20 @@ def start_tracking():
 def get_progress(session_id):
     """Obtém progresso atual da análise"""
     try:
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada',
                 'session_id': session_id
             }), 404
-        
-        tracker = progress_sessions[session_id]
+
         status = tracker.get_current_status()
-        
+
         return jsonify({
             'success': True,
             'progress': status
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao obter progresso: {str(e)}")
         return jsonify({
@@ -191,32 +226,70 @@ def get_progress(session_id):
             'message': str(e)
         }), 500
 
+@progress_bp.route('/stream_progress/<session_id>', methods=['GET'])
+def stream_progress(session_id):
+    """Stream de progresso via Server-Sent Events"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    def generate():
+        last_id = last_event_id
+        deadline = time.time() + SSE_MAX_SECONDS
+
+        yield "retry: 2000\n\n"
+
+        # Estado atual primeiro, para quem conecta no meio da análise
+        if not last_id:
+            tracker = ProgressTracker.load(session_id)
+            if tracker:
+                yield _sse_message(tracker.get_current_status(), 'status')
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+
+            events = progress_bus.read_events(session_id, last_id, timeout=min(SSE_KEEPALIVE_SECONDS, remaining))
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+
+            for event_id, data in events:
+                last_id = event_id
+                yield _sse_message(data, data.get('event', 'progress'), event_id)
+                if data.get('is_complete'):
+                    yield _sse_message({'session_id': session_id}, 'complete', event_id)
+                    return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @progress_bp.route('/poll_updates/<session_id>', methods=['GET'])
 def poll_updates(session_id):
-    """Polling para atualizações de progresso"""
+    """Polling para atualizações de progresso (use ?since=<last_event_id>)"""
     try:
-        if session_id not in progress_queues:
+        since = request.args.get('since')
+        events = progress_bus.read_events(session_id, since)
+
+        if not events and not since and not progress_bus.get_state(session_id):
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
-        
-        queue = progress_queues[session_id]
-        updates = []
-        
-        # Coleta todas as atualizações disponíveis
-        while not queue.empty():
-            try:
-                update = queue.get_nowait()
-                updates.append(update)
-            except:
-                break
-        
+
+        updates = [data for _, data in events]
+
         return jsonify({
             'success': True,
             'updates': updates,
-            'has_updates': len(updates) > 0
+            'has_updates': len(updates) > 0,
+            'last_event_id': events[-1][0] if events else since
         })
-        
+
     except Exception as e:
         logger.error(f"Erro no polling: {str(e)}")
         return jsonify({
@@ -233,20 +306,20 @@ def update_progress():
         step = data.get('step')
         message = data.get('message')
         details = data.get('details')
-        
-        if session_id not in progress_sessions:
+
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
-        
-        tracker = progress_sessions[session_id]
+
         progress_data = tracker.update_progress(step, message, details)
-        
+
         return jsonify({
             'success': True,
             'progress': progress_data
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao atualizar progresso: {str(e)}")
         return jsonify({
@@ -260,21 +333,21 @@ def complete_analysis():
     try:
         data = request.get_json()
         session_id = data.get('session_id')
-        
-        if session_id not in progress_sessions:
+
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
-        
-        tracker = progress_sessions[session_id]
+
         tracker.complete()
-        
+
         return jsonify({
             'success': True,
             'message': 'Análise marcada como completa',
             'final_status': tracker.get_current_status()
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao completar análise: {str(e)}")
         return jsonify({
@@ -286,13 +359,12 @@ def complete_analysis():
 def get_detailed_logs(session_id):
     """Obtém logs detalhados da análise"""
     try:
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
-        
-        tracker = progress_sessions[session_id]
-        
+
         return jsonify({
             'success': True,
             'session_id': session_id,
@@ -300,7 +372,7 @@ def get_detailed_logs(session_id):
             'total_logs': len(tracker.detailed_logs),
             'analysis_duration': time.time() - tracker.start_time
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao obter logs: {str(e)}")
         return jsonify({
@@ -314,23 +386,24 @@ def get_active_sessions():
     try:
         active = []
         current_time = time.time()
-        
-        for session_id, tracker in progress_sessions.items():
+
+        for state in progress_bus.list_states():
+            tracker = ProgressTracker(state['session_id'], state)
             active.append({
-                'session_id': session_id,
+                'session_id': tracker.session_id,
                 'current_step': tracker.current_step,
                 'total_steps': tracker.total_steps,
                 'elapsed_time': current_time - tracker.start_time,
                 'is_complete': tracker.current_step >= tracker.total_steps,
-                'last_message': tracker.steps[min(tracker.current_step, len(tracker.steps) - 1)]
+                'last_message': tracker.get_current_status()['current_message']
             })
-        
+
         return jsonify({
             'success': True,
             'active_sessions': active,
             'total_active': len(active)
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao listar sessões: {str(e)}")
         return jsonify({
@@ -338,73 +411,30 @@ def get_active_sessions():
             'message': str(e)
         }), 500
 
-# Função helper para usar em outros módulos
-def get_progress_tracker(session_id: str) -> ProgressTracker:
-    """Obtém tracker de progresso para uma sessão"""
-    if session_id not in progress_sessions:
-        return ProgressTracker(session_id)
-    return progress_sessions[session_id]
-
-def update_analysis_progress(session_id: str, step: int, message: str, details: str = None):
-    """Função helper para atualizar progresso de qualquer lugar"""
-    if session_id in progress_sessions:
-        tracker = progress_sessions[session_id]
-        return tracker.update_progress(step, message, details)
-    return None
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-ARQV30 Enhanced v2.0 - Rotas de Progresso
-Tracking de progresso das análises
-"""
-
-import logging
-from flask import Blueprint, request, jsonify, session
-from datetime import datetime
-import uuid
-
-logger = logging.getLogger(__name__)
-
-progress_bp = Blueprint('progress', __name__)
-
-# Armazenamento em memória para progresso (em produção usaria Redis/Database)
-progress_data = {}
+# Rotas /progress/* (formato simplificado, mesmo barramento)
 
 @progress_bp.route('/progress/start_tracking', methods=['POST'])
-def start_tracking():
+def start_simple_tracking():
     """Inicia tracking de progresso"""
     try:
         data = request.get_json() or {}
-        
+
         # Gerar ID de sessão se não existir
-        session_id = session.get('session_id')
+        session_id = data.get('session_id') or session.get('session_id')
         if not session_id:
             session_id = str(uuid.uuid4())
             session['session_id'] = session_id
-        
-        # Inicializar progresso
-        progress_data[session_id] = {
-            'status': 'iniciado',
-            'progress': 0,
-            'message': 'Preparando análise...',
-            'started_at': datetime.now().isoformat(),
-            'steps': [
-                {'name': 'Validação de dados', 'status': 'pending'},
-                {'name': 'Análise de mercado', 'status': 'pending'},
-                {'name': 'Geração de insights', 'status': 'pending'},
-                {'name': 'Criação de estratégias', 'status': 'pending'},
-                {'name': 'Finalização', 'status': 'pending'}
-            ]
-        }
-        
+
+        ProgressTracker(session_id).update_progress(0, 'Preparando análise...')
+
         logger.info(f"Tracking iniciado para sessão: {session_id}")
-        
+
         return jsonify({
             'success': True,
             'session_id': session_id,
             'message': 'Tracking iniciado'
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao iniciar tracking: {str(e)}")
         return jsonify({
@@ -413,35 +443,27 @@ def start_tracking():
         }), 500
 
 @progress_bp.route('/progress/update', methods=['POST'])
-def update_progress():
-    """Atualiza progresso"""
+def update_simple_progress():
+    """Atualiza progresso a partir de um percentual"""
     try:
         data = request.get_json()
         session_id = data.get('session_id') or session.get('session_id')
-        
-        if not session_id or session_id not in progress_data:
+
+        tracker = ProgressTracker.load(session_id) if session_id else None
+        if not tracker:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada'
             }), 404
-        
-        # Atualizar progresso
-        progress_data[session_id].update({
-            'progress': data.get('progress', 0),
-            'message': data.get('message', ''),
-            'updated_at': datetime.now().isoformat()
-        })
-        
-        # Atualizar step se fornecido
-        step_index = data.get('step_index')
-        if step_index is not None and 0 <= step_index < len(progress_data[session_id]['steps']):
-            progress_data[session_id]['steps'][step_index]['status'] = data.get('step_status', 'completed')
-        
+
+        step = round(float(data.get('progress', 0)) / 100 * tracker.total_steps)
+        tracker.update_progress(step, data.get('message', ''))
+
         return jsonify({
             'success': True,
             'message': 'Progresso atualizado'
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao atualizar progresso: {str(e)}")
         return jsonify({
@@ -450,20 +472,21 @@ def update_progress():
         }), 500
 
 @progress_bp.route('/progress/status/<session_id>', methods=['GET'])
-def get_progress(session_id):
+def get_simple_progress(session_id):
     """Obtém status do progresso"""
     try:
-        if session_id not in progress_data:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada'
             }), 404
-        
+
         return jsonify({
             'success': True,
-            'data': progress_data[session_id]
+            'data': tracker.get_current_status()
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao obter progresso: {str(e)}")
         return jsonify({
@@ -472,38 +495,48 @@ def get_progress(session_id):
         }), 500
 
 @progress_bp.route('/progress/complete', methods=['POST'])
-def complete_progress():
+def complete_simple_progress():
     """Completa progresso"""
     try:
         data = request.get_json()
         session_id = data.get('session_id') or session.get('session_id')
-        
-        if not session_id or session_id not in progress_data:
+
+        tracker = ProgressTracker.load(session_id) if session_id else None
+        if not tracker:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada'
             }), 404
-        
-        # Completar progresso
-        progress_data[session_id].update({
-            'status': 'concluido',
-            'progress': 100,
-            'message': 'Análise concluída com sucesso!',
-            'completed_at': datetime.now().isoformat()
-        })
-        
-        # Marcar todos os steps como concluídos
-        for step in progress_data[session_id]['steps']:
-            step['status'] = 'completed'
-        
+
+        tracker.complete()
+
         return jsonify({
             'success': True,
             'message': 'Progresso concluído'
         })
-        
+
     except Exception as e:
         logger.error(f"Erro ao completar progresso: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+
+# Função helper para usar em outros módulos
+def get_progress_tracker(session_id: str) -> ProgressTracker:
+    """Obtém tracker de progresso para uma sessão"""
+    tracker = ProgressTracker.load(session_id)
+    if not tracker:
+        return ProgressTracker(session_id)
+    return tracker
+
+def update_analysis_progress(session_id: str, step: int, message: str, details: str = None):
+    """Função helper para atualizar progresso de qualquer lugar"""
+    tracker = ProgressTracker.load(session_id)
+    if tracker:
+        return tracker.update_progress(step, message, details)
+    return None
+
+def remove_progress_tracker(session_id: str):
+    """Remove o progresso de uma sessão (ex.: análise abortada)"""
+    progress_bus.delete(session_id)
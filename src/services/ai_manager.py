@@ -9,8 +9,15 @@ import os
 import logging
 import time
 import json
-from typing import Dict, List, Optional, Any
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Any, Callable
 import requests
+from services.ai_response_cache import ai_response_cache
+from services.incremental_json_parser import IncrementalJSONParser, publish_section
+from services.rate_limiter import rate_limiter
 
 # Imports condicionais para os clientes de IA
 try:
@@ -33,6 +40,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+class HedgeCancelled(Exception):
+    """Provedor perdeu a corrida do hedge: o streaming é interrompido"""
+
 class AIManager:
     """Gerenciador de IAs com sistema de fallback automático"""
 
@@ -45,7 +55,9 @@ class AIManager:
                 'priority': 1,
                 'error_count': 0,
                 'model': 'gemini-1.5-flash',
+                'context_window': 1048576,
                 'max_errors': 2,
+                'cost_weight': 1.0,
                 'last_success': None,
                 'consecutive_failures': 0
             },
@@ -55,7 +67,9 @@ class AIManager:
                 'priority': 2,
                 'error_count': 0,
                 'model': 'llama3-70b-8192',
+                'context_window': 8192,
                 'max_errors': 2,
+                'cost_weight': 0.5,
                 'last_success': None,
                 'consecutive_failures': 0
             },
@@ -65,7 +79,9 @@ class AIManager:
                 'priority': 3,
                 'error_count': 0,
                 'model': 'gpt-3.5-turbo',
+                'context_window': 16385,
                 'max_errors': 2,
+                'cost_weight': 2.0,
                 'last_success': None,
                 'consecutive_failures': 0
             },
@@ -76,12 +92,52 @@ class AIManager:
                 'error_count': 0,
                 'models': ["HuggingFaceH4/zephyr-7b-beta", "google/flan-t5-base"],
                 'current_model_index': 0,
+                'context_window': 4096,
                 'max_errors': 3,
+                'cost_weight': 0.2,
                 'last_success': None,
                 'consecutive_failures': 0
             }
         }
 
+        # Orçamento de tokens do contexto de pesquisa enviado às IAs
+        self.context_max_tokens = int(os.getenv('AI_CONTEXT_MAX_TOKENS', '12000'))
+        self.context_min_tokens = int(os.getenv('AI_CONTEXT_MIN_TOKENS', '1500'))
+
+        # Streaming do Gemini quando há sessão/callback para receber as seções
+        self.gemini_streaming = os.getenv('GEMINI_STREAMING_ENABLED', 'true').lower() == 'true'
+
+        # Hedging: dispara o mesmo prompt no próximo provedor se o atual demorar
+        self.hedging_enabled = os.getenv('AI_HEDGING_ENABLED', 'false').lower() == 'true'
+        self.hedge_percentile = float(os.getenv('AI_HEDGE_PERCENTILE', '90'))
+        self.hedge_default_delay = float(os.getenv('AI_HEDGE_DEFAULT_DELAY', '15'))
+        self.hedge_min_delay = float(os.getenv('AI_HEDGE_MIN_DELAY', '2'))
+        self.hedge_min_samples = int(os.getenv('AI_HEDGE_MIN_SAMPLES', '10'))
+        self.hedge_budget = float(os.getenv('AI_HEDGE_BUDGET', '2.0'))
+        self.hedge_stats = {
+            'requests': 0,
+            'hedges_launched': 0,
+            'won_by_primary': 0,
+            'won_by_hedge': 0,
+            'won_by_fallback': 0,
+            'budget_exhausted': 0,
+            'streams_cancelled': 0,
+            'all_failed': 0
+        }
+
+        # Histogramas de latência por provedor (segundos)
+        self.latency_buckets = [1, 2, 5, 10, 20, 30, 60, 120]
+        self._latency_lock = threading.Lock()
+        self.latency_stats = {
+            name: {
+                'samples': deque(maxlen=500),
+                'histogram': [0] * (len(self.latency_buckets) + 1),
+                'count': 0,
+                'failures': 0
+            }
+            for name in self.providers
+        }
+
         self.initialize_providers()
         available_count = len([p for p in self.providers.values() if p['available']])
         logger.info(f"🤖 AI Manager inicializado com {available_count} provedores disponíveis.")
@@ -180,17 +236,52 @@ class AIManager:
 
         return None
 
-    def generate_analysis(self, prompt: str, max_tokens: int = 8192, provider: Optional[str] = None) -> Optional[str]:
-        """Gera análise usando um provedor específico ou o melhor disponível com fallback."""
+    def generate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        hedge_budget: Optional[float] = None,
+        session_id: Optional[str] = None,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Optional[str]:
+        """
+        Gera análise usando um provedor específico ou o melhor disponível com fallback.
+        
+        Respostas para o mesmo prompt normalizado/provedor/modelo/max_tokens vêm
+        do cache enquanto válidas; use_cache=False força uma nova geração e
+        não grava a resposta no cache.
+        
+        Com hedge=True (ou AI_HEDGING_ENABLED), se o provedor não responder até
+        o percentil AI_HEDGE_PERCENTILE da sua latência, o mesmo prompt é
+        enviado ao próximo provedor saudável e vence a primeira resposta válida.
+        hedge_budget limita a soma dos 'cost_weight' das chamadas disparadas.
+        
+        Com session_id ou on_section, o Gemini gera em streaming
+        (GEMINI_STREAMING_ENABLED): cada seção de topo do JSON é salva,
+        publicada no progresso da sessão e entregue a on_section assim que
+        fecha. O retorno continua sendo o texto completo.
+        """
         
         start_time = time.time()
+        section_sink = None
+        if session_id or on_section:
+            section_sink = lambda name, data: publish_section(name, data, session_id, on_section)
+        
+        if use_cache:
+            cached = self._get_cached_response(prompt, max_tokens, provider)
+            if cached:
+                logger.info(f"⚡ Resposta de IA servida do cache em {(time.time() - start_time) * 1000:.0f}ms")
+                return cached
         
         # Se um provedor específico for solicitado
         if provider:
             if self.providers.get(provider) and self.providers[provider]['available']:
                 logger.info(f"🤖 Usando provedor solicitado: {provider.upper()}")
                 try:
-                    result = self._call_provider(provider, prompt, max_tokens)
+                    result = self._call_provider(provider, prompt, max_tokens, use_cache, section_sink)
                     if result:
                         self._record_success(provider)
                         return result
@@ -204,13 +295,20 @@ class AIManager:
                 logger.error(f"❌ Provedor solicitado '{provider}' não está disponível.")
                 return None
 
+        if hedge if hedge is not None else self.hedging_enabled:
+            return self._generate_hedged(
+                prompt, max_tokens, use_cache,
+                hedge_budget if hedge_budget is not None else self.hedge_budget,
+                section_sink
+            )
+        
         # Lógica de fallback padrão
         provider_name = self.get_best_provider()
         if not provider_name:
             raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
 
         try:
-            result = self._call_provider(provider_name, prompt, max_tokens)
+            result = self._call_provider(provider_name, prompt, max_tokens, use_cache, section_sink)
             if result:
                 self._record_success(provider_name)
                 return result
@@ -219,8 +317,267 @@ class AIManager:
         except Exception as e:
             logger.error(f"❌ Erro no provedor {provider_name}: {e}")
             self._record_failure(provider_name, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude=[provider_name])
+            return self._try_fallback(prompt, max_tokens, exclude=[provider_name], use_cache=use_cache, on_section=section_sink)
     
+    def _get_healthy_providers(self) -> List[str]:
+        """Provedores saudáveis em ordem de prioridade"""
+        first = self.get_best_provider()
+        if not first:
+            return []
+        healthy = [
+            (name, provider) for name, provider in self.providers.items()
+            if (provider['available'] and name != first and
+                provider['consecutive_failures'] < provider.get('max_errors', 2))
+        ]
+        healthy.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
+        return [first] + [name for name, _ in healthy]
+
+    def _get_hedge_delay(self, provider_name: str) -> float:
+        """Tempo de espera antes de disparar o hedge: percentil da latência do provedor"""
+        with self._latency_lock:
+            samples = sorted(self.latency_stats[provider_name]['samples'])
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return max(self.hedge_min_delay, samples[index])
+
+    def _generate_hedged(
+        self,
+        prompt: str,
+        max_tokens: int,
+        use_cache: bool,
+        budget: float,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Optional[str]:
+        """
+        Corrida entre provedores: primeira resposta válida vence, as demais são ignoradas.
+
+        Só um provedor por vez entrega seções a on_section: o primeiro a
+        publicar uma seção fica com o streaming, os demais guardam as suas
+        (entregues se ele vencer ou assumir o streaming após uma falha). Depois
+        que há vencedor, a próxima seção de um perdedor interrompe o streaming
+        dele com HedgeCancelled; provedores sem streaming seguem até o fim.
+        """
+        candidates = self._get_healthy_providers()
+        if not candidates:
+            raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
+
+        self.hedge_stats['requests'] += 1
+        executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix='ai_hedge')
+        pending = {}
+        spent = 0.0
+        next_index = 0
+        budget_exhausted = False
+        stream_lock = threading.Lock()
+        stream = {'owner': None, 'winner': None}
+        buffered: Dict[str, List] = {}
+
+        def _section_sink(name: str) -> Optional[Callable[[str, Any], None]]:
+            if not on_section:
+                return None
+
+            def _sink(section_name: str, section_data: Any):
+                with stream_lock:
+                    if stream['winner'] not in (None, name):
+                        raise HedgeCancelled(f"{name} perdeu a corrida para {stream['winner']}")
+                    if stream['owner'] not in (None, name):
+                        buffered.setdefault(name, []).append((section_name, section_data))
+                        return
+                    stream['owner'] = name
+                    sections = buffered.pop(name, []) + [(section_name, section_data)]
+                for buffered_name, buffered_data in sections:
+                    on_section(buffered_name, buffered_data)
+            return _sink
+
+        def _run(name: str) -> Optional[str]:
+            result = self._call_provider(name, prompt, max_tokens, use_cache, _section_sink(name))
+            if not result:
+                raise Exception("Resposta vazia do provedor")
+            return result
+
+        def _launch() -> bool:
+            nonlocal spent, next_index, budget_exhausted
+            if next_index >= len(candidates):
+                return False
+            name = candidates[next_index]
+            cost = self.providers[name].get('cost_weight', 1.0)
+            # Sem nada em andamento é fallback comum: não depende do orçamento
+            if pending and spent + cost > budget:
+                if not budget_exhausted:
+                    budget_exhausted = True
+                    self.hedge_stats['budget_exhausted'] += 1
+                    logger.info(f"💰 Hedge: orçamento esgotado ({spent:.1f}/{budget:.1f}), aguardando provedores em andamento")
+                return False
+            next_index += 1
+            spent += cost
+            if pending:
+                self.hedge_stats['hedges_launched'] += 1
+                logger.info(f"🏁 Hedge: disparando {name.upper()} em paralelo (custo {spent:.1f}/{budget:.1f})")
+            pending[executor.submit(contextvars.copy_context().run, _run, name)] = name
+            return True
+
+        try:
+            _launch()
+            while pending:
+                # Espera o percentil do provedor mais recente antes de disparar o próximo
+                can_hedge = next_index < len(candidates) and not budget_exhausted
+                timeout = self._get_hedge_delay(candidates[next_index - 1]) if can_hedge else None
+                done, _ = wait(list(pending.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Erro no provedor {name}: {e}")
+                        self._record_failure(name, str(e))
+                        with stream_lock:
+                            if stream['owner'] == name:
+                                stream['owner'] = None
+                        continue
+
+                    self._record_success(name)
+                    with stream_lock:
+                        stream['winner'] = name
+                        sections = buffered.pop(name, [])
+                    if on_section:
+                        # Seções do vencedor retidas enquanto outro provedor publicava
+                        for section_name, section_data in sections:
+                            on_section(section_name, section_data)
+                    if name == candidates[0]:
+                        self.hedge_stats['won_by_primary'] += 1
+                    elif not any(pending_name == candidates[0] for pending_name in pending.values()):
+                        # Primário já tinha falhado: vitória de fallback, não de hedge
+                        self.hedge_stats['won_by_fallback'] += 1
+                    else:
+                        self.hedge_stats['won_by_hedge'] += 1
+                        logger.info(f"🏆 Hedge: {name.upper()} respondeu primeiro")
+                    return result
+
+                # Provedor lento (timeout) ou todos os em andamento falharam
+                if not done or not pending:
+                    _launch()
+
+            self.hedge_stats['all_failed'] += 1
+            logger.critical("❌ Todos os provedores falharam no modo hedge.")
+            return None
+        finally:
+            # Perdedores continuam em segundo plano e são ignorados (o streaming
+            # deles é interrompido na próxima seção)
+            executor.shutdown(wait=False)
+
+    def _record_latency(self, provider_name: str, elapsed: float, success: bool):
+        """Registra latência de uma chamada no histograma do provedor"""
+        if provider_name not in self.latency_stats:
+            return
+        with self._latency_lock:
+            stats = self.latency_stats[provider_name]
+            stats['count'] += 1
+            if not success:
+                stats['failures'] += 1
+            stats['samples'].append(elapsed)
+            bucket = len(self.latency_buckets)
+            for index, bound in enumerate(self.latency_buckets):
+                if elapsed <= bound:
+                    bucket = index
+                    break
+            stats['histogram'][bucket] += 1
+
+    def get_latency_stats(self, provider_name: str) -> Dict[str, Any]:
+        """Percentis e histograma de latência do provedor"""
+        with self._latency_lock:
+            stats = self.latency_stats[provider_name]
+            samples = sorted(stats['samples'])
+            histogram = list(stats['histogram'])
+            count, failures = stats['count'], stats['failures']
+
+        def _percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(len(samples) * p / 100))], 3)
+
+        labels = [f"<={bound}s" for bound in self.latency_buckets] + [f">{self.latency_buckets[-1]}s"]
+        return {
+            'count': count,
+            'failures': failures,
+            'p50': _percentile(50),
+            'p90': _percentile(90),
+            'p95': _percentile(95),
+            'p99': _percentile(99),
+            'histogram': dict(zip(labels, histogram))
+        }
+
+    def get_context_budget(
+        self,
+        max_output_tokens: int = 8192,
+        prompt_tokens: int = 0,
+        provider: Optional[str] = None
+    ) -> int:
+        """
+        Tokens disponíveis para contexto de pesquisa: janela do modelo menos saída
+        e prompt fixo, limitada a AI_CONTEXT_MAX_TOKENS. Sem provedor, usa a menor
+        janela entre os provedores saudáveis, pois fallback e hedge reenviam o
+        mesmo prompt a eles.
+        """
+        candidates = [provider] if provider else self._get_healthy_providers()
+        windows = [
+            self.providers[name].get('context_window', self.context_max_tokens)
+            for name in candidates if name in self.providers
+        ]
+        if not windows:
+            return self.context_max_tokens
+
+        window = min(windows)
+        available = window - min(max_output_tokens, window // 2) - prompt_tokens
+        return max(self.context_min_tokens, min(self.context_max_tokens, available))
+
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """Configuração e resultados do modo hedge"""
+        return {
+            **self.hedge_stats,
+            'enabled_by_default': self.hedging_enabled,
+            'percentile': self.hedge_percentile,
+            'default_delay': self.hedge_default_delay,
+            'budget': self.hedge_budget,
+            'current_delays': {
+                name: round(self._get_hedge_delay(name), 3)
+                for name, provider in self.providers.items() if provider['available']
+            }
+        }
+
+    def _get_model_name(self, provider_name: str) -> Optional[str]:
+        """Modelo (ou lista de modelos) do provedor, usado na chave do cache"""
+        provider = self.providers.get(provider_name, {})
+        return provider.get('model') or '|'.join(provider.get('models', []))
+
+    def _get_cached_response(self, prompt: str, max_tokens: int, provider: Optional[str] = None) -> Optional[str]:
+        """Procura resposta em cache do provedor pedido ou de qualquer provedor disponível"""
+        if provider:
+            return ai_response_cache.get(prompt, provider, self._get_model_name(provider), max_tokens)
+
+        candidates = sorted(
+            (name for name, config in self.providers.items() if config['available']),
+            key=lambda name: self.providers[name]['priority']
+        )
+        for name in candidates:
+            cached = ai_response_cache.get(prompt, name, self._get_model_name(name), max_tokens, count_miss=False)
+            if cached:
+                return cached
+
+        if candidates:
+            ai_response_cache.record_miss(candidates[0])
+        return None
+
+    def invalidate_cached_response(self, prompt: str, max_tokens: int = 8192):
+        """
+        Remove do cache as respostas deste prompt (de qualquer provedor). Usado
+        quando o chamador rejeita a resposta: sem isso, novas tentativas e
+        retomadas receberiam a mesma resposta inválida do cache.
+        """
+        providers = {name: self._get_model_name(name) for name in self.providers}
+        if providers and ai_response_cache.delete(prompt, providers, max_tokens):
+            logger.info("🧹 Resposta de IA rejeitada removida do cache")
+
     def generate_parallel_analysis(self, prompts: List[Dict[str, Any]], max_tokens: int = 8192) -> Dict[str, Any]:
         """Gera múltiplas análises em paralelo usando diferentes provedores"""
         
@@ -283,32 +640,86 @@ class AIManager:
             
             logger.error(f"❌ Falha registrada para {provider_name}: {error_msg}")
 
-    def _call_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
-        """Chama a função de geração do provedor especificado."""
-        if provider_name == 'gemini':
-            return self._generate_with_gemini(prompt, max_tokens)
-        elif provider_name == 'groq':
-            return self._generate_with_groq(prompt, max_tokens)
-        elif provider_name == 'openai':
-            return self._generate_with_openai(prompt, max_tokens)
-        elif provider_name == 'huggingface':
-            return self._generate_with_huggingface(prompt, max_tokens)
-        return None
+    def _call_provider(
+        self,
+        provider_name: str,
+        prompt: str,
+        max_tokens: int,
+        use_cache: bool = True,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Optional[str]:
+        """Chama a função de geração do provedor especificado (on_section: seções em streaming, só Gemini)."""
+        generators = {
+            'gemini': self._generate_with_gemini,
+            'groq': self._generate_with_groq,
+            'openai': self._generate_with_openai,
+            'huggingface': self._generate_with_huggingface
+        }
+        if provider_name not in generators:
+            return None
+
+        # Cota do provedor (RPM/TPM/concorrência); a espera não entra na latência
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        with rate_limiter.limit(provider_name, tokens=estimated_tokens):
+            start_time = time.time()
+            try:
+                if provider_name == 'gemini' and on_section and self.gemini_streaming:
+                    result = self._generate_with_gemini(prompt, max_tokens, on_section)
+                else:
+                    result = generators[provider_name](prompt, max_tokens)
+            except HedgeCancelled:
+                # Interrupção voluntária: não conta como latência do provedor
+                self.hedge_stats['streams_cancelled'] += 1
+                logger.info(f"🛑 Hedge: streaming de {provider_name.upper()} interrompido (outro provedor venceu)")
+                raise
+            except Exception:
+                self._record_latency(provider_name, time.time() - start_time, False)
+                raise
+            self._record_latency(provider_name, time.time() - start_time, bool(result))
 
-    def _generate_with_gemini(self, prompt: str, max_tokens: int) -> Optional[str]:
-        """Gera conteúdo usando Gemini."""
+        if result and use_cache:
+            ai_response_cache.put(prompt, provider_name, self._get_model_name(provider_name), max_tokens, result)
+        return result
+
+    def _generate_with_gemini(
+        self,
+        prompt: str,
+        max_tokens: int,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Optional[str]:
+        """Gera conteúdo usando Gemini (em streaming se on_section for informado)."""
         client = self.providers['gemini']['client']
         config = {"temperature": 0.7, "max_output_tokens": min(max_tokens, 8192)}
         safety = [
             {"category": c, "threshold": "BLOCK_NONE"} 
             for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]
         ]
+        if on_section:
+            return self._stream_with_gemini(client, prompt, config, safety, on_section)
         response = client.generate_content(prompt, generation_config=config, safety_settings=safety)
         if response.text:
             logger.info(f"✅ Gemini gerou {len(response.text)} caracteres")
             return response.text
         raise Exception("Resposta vazia do Gemini")
 
+    def _stream_with_gemini(
+        self,
+        client,
+        prompt: str,
+        config: Dict[str, Any],
+        safety: List[Dict[str, str]],
+        on_section: Callable[[str, Any], None]
+    ) -> Optional[str]:
+        """Streaming do Gemini: entrega cada seção de topo do JSON assim que ela fecha"""
+        parser = IncrementalJSONParser()
+        start_time = time.time()
+        response = client.generate_content(prompt, generation_config=config, safety_settings=safety, stream=True)
+        text = parser.consume(response, on_section, start_time)
+        if text:
+            logger.info(f"✅ Gemini gerou {len(text)} caracteres (streaming, {len(parser.sections)} seções)")
+            return text
+        raise Exception("Resposta vazia do Gemini")
+
     def _generate_with_groq(self, prompt: str, max_tokens: int) -> Optional[str]:
         """Gera conteúdo usando Groq."""
         client = self.providers['groq']['client']
@@ -383,7 +794,14 @@ class AIManager:
                     provider['available'] = True
             logger.info("🔄 Reset erros de todos os provedores")
 
-    def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str]) -> Optional[str]:
+    def _try_fallback(
+        self,
+        prompt: str,
+        max_tokens: int,
+        exclude: List[str],
+        use_cache: bool = True,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Optional[str]:
         """Tenta usar o próximo provedor disponível como fallback."""
         logger.info(f"🔄 Acionando fallback, excluindo: {', '.join(exclude)}")
         
@@ -406,7 +824,7 @@ class AIManager:
         logger.info(f"🔄 Tentando fallback para: {next_provider.upper()}")
         
         try:
-            result = self._call_provider(next_provider, prompt, max_tokens)
+            result = self._call_provider(next_provider, prompt, max_tokens, use_cache, on_section)
             if result:
                 self._record_success(next_provider)
                 return result
@@ -415,7 +833,7 @@ class AIManager:
         except Exception as e:
             logger.error(f"❌ Fallback para {next_provider} também falhou: {e}")
             self._record_failure(next_provider, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude + [next_provider])
+            return self._try_fallback(prompt, max_tokens, exclude + [next_provider], use_cache, on_section)
     
     def get_provider_status(self) -> Dict[str, Any]:
         """Retorna status detalhado dos provedores"""
@@ -429,7 +847,10 @@ class AIManager:
                 'consecutive_failures': provider['consecutive_failures'],
                 'last_success': provider.get('last_success'),
                 'max_errors': provider['max_errors'],
-                'model': provider.get('model', 'N/A')
+                'model': provider.get('model', 'N/A'),
+                'cost_weight': provider.get('cost_weight', 1.0),
+                'cache': ai_response_cache.get_provider_stats(name),
+                'latency': self.get_latency_stats(name)
             }
         
         return status
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - AI Response Cache
+Cache de respostas das IAs por prompt normalizado, provedor, modelo e max_tokens
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class AIResponseCache:
+    """Cache LRU persistente (SQLite) de respostas de IA, compartilhado entre workers"""
+
+    def __init__(self):
+        """Inicializa o cache de respostas"""
+        self.enabled = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+        self.db_path = Path(os.getenv('AI_CACHE_PATH', 'cache_ia/ai_responses.db'))
+        self.ttl_seconds = int(os.getenv('AI_CACHE_TTL', str(6 * 3600)))
+        self.max_entries = int(os.getenv('AI_CACHE_MAX_ENTRIES', '2000'))
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+        if self.enabled:
+            try:
+                self._db()
+                logger.info(f"💾 AI Response Cache inicializado em {self.db_path} (TTL {self.ttl_seconds}s)")
+            except Exception as e:
+                self.enabled = False
+                logger.error(f"❌ Cache de respostas de IA desabilitado: {e}")
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT,
+                    response BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Normaliza espaços em branco do prompt (conteúdo e caixa são preservados)"""
+        return ' '.join((prompt or '').split())
+
+    def make_key(self, prompt: str, provider: str, model: Optional[str], max_tokens: int) -> str:
+        """Chave do cache"""
+        material = json.dumps(
+            [self.normalize_prompt(prompt), provider, model or '', int(max_tokens)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _count(self, provider: str, metric: str):
+        provider_stats = self.stats.setdefault(provider, {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0})
+        provider_stats[metric] += 1
+
+    def get(self, prompt: str, provider: str, model: Optional[str], max_tokens: int, count_miss: bool = True) -> Optional[str]:
+        """Resposta em cache (dentro do TTL) ou None"""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(prompt, provider, model, max_tokens)
+        try:
+            with self._lock:
+                conn = self._db()
+                row = conn.execute(
+                    'SELECT response FROM responses WHERE key = ? AND created_at > ?',
+                    (key, time.time() - self.ttl_seconds)
+                ).fetchone()
+                if not row:
+                    if count_miss:
+                        self._count(provider, 'misses')
+                    return None
+
+                conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+                conn.commit()
+                self._count(provider, 'hits')
+
+            return zlib.decompress(row[0]).decode('utf-8')
+
+        except Exception as e:
+            self._count(provider, 'errors')
+            logger.error(f"❌ Erro ao ler cache de IA: {e}")
+            return None
+
+    def record_miss(self, provider: str):
+        """Registra um miss (consultas que verificaram vários provedores)"""
+        self._count(provider, 'misses')
+
+    def put(self, prompt: str, provider: str, model: Optional[str], max_tokens: int, response: str):
+        """Armazena uma resposta"""
+        if not self.enabled or not response:
+            return
+
+        key = self.make_key(prompt, provider, model, max_tokens)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, provider, model, response, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, provider, model, zlib.compress(response.encode('utf-8'), 6), now, now)
+                )
+                self._evict_if_needed(conn, provider)
+                conn.commit()
+                self._count(provider, 'stores')
+
+        except Exception as e:
+            self._count(provider, 'errors')
+            logger.error(f"❌ Erro ao salvar cache de IA: {e}")
+
+    def delete(self, prompt: str, providers: Dict[str, Optional[str]], max_tokens: int) -> int:
+        """Remove a resposta do prompt para cada provedor ({provedor: modelo}); retorna quantas existiam"""
+        if not self.enabled:
+            return 0
+
+        keys = [self.make_key(prompt, provider, model, max_tokens) for provider, model in providers.items()]
+        try:
+            with self._lock:
+                conn = self._db()
+                removed = conn.execute(
+                    f"DELETE FROM responses WHERE key IN ({','.join('?' * len(keys))})", keys
+                ).rowcount
+                conn.commit()
+            return removed
+        except Exception as e:
+            logger.error(f"❌ Erro ao remover resposta do cache de IA: {e}")
+            return 0
+
+    def _evict_if_needed(self, conn: sqlite3.Connection, provider: str):
+        """Remove expirados e as entradas menos usadas acima do limite"""
+        conn.execute('DELETE FROM responses WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+        total = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        excess = total - self.max_entries
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)',
+                (excess,)
+            )
+            for _ in range(excess):
+                self._count(provider, 'evictions')
+
+    def clear(self):
+        """Remove todas as respostas em cache"""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute('DELETE FROM responses')
+                conn.commit()
+            logger.info("🧹 Cache de respostas de IA limpo")
+        except Exception as e:
+            logger.error(f"❌ Erro ao limpar cache de IA: {e}")
+
+    def get_provider_stats(self, provider: str) -> Dict[str, Any]:
+        """Métricas do cache para um provedor"""
+        provider_stats = self.stats.get(provider, {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0})
+        lookups = provider_stats['hits'] + provider_stats['misses']
+        return {
+            **provider_stats,
+            'hit_rate': (provider_stats['hits'] / lookups) * 100 if lookups else 0.0
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas agregadas do cache"""
+        totals = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0}
+        for provider_stats in self.stats.values():
+            for metric, value in provider_stats.items():
+                totals[metric] += value
+
+        lookups = totals['hits'] + totals['misses']
+        stats = {
+            **totals,
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries,
+            'entries': 0,
+            'hit_rate': (totals['hits'] / lookups) * 100 if lookups else 0.0
+        }
+
+        if self.enabled:
+            try:
+                with self._lock:
+                    stats['entries'] = self._db().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            except Exception as e:
+                logger.error(f"❌ Erro ao obter estatísticas do cache de IA: {e}")
+
+        return stats
+
+# Instância global
+ai_response_cache = AIResponseCache()
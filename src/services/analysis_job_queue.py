@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Analysis Job Queue
+Fila de análises em segundo plano compartilhada entre os workers do gunicorn
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Fila de análises cheia - requisição deve ser repetida mais tarde"""
+    pass
+
+class AnalysisJobQueue:
+    """
+    Fila persistente (SQLite) de análises.
+
+    Qualquer worker aceita submissões e responde por status/resultados; a
+    execução acontece num pool limitado por processo, e o limite global de
+    análises simultâneas é garantido no momento em que o job é reivindicado.
+    Jobs cujo worker morreu (lease expirado) voltam para o fim da fila até
+    ANALYSIS_JOB_MAX_ATTEMPTS tentativas; a espera máxima na fila
+    (ANALYSIS_MAX_WAIT_SECONDS) conta a partir da última entrada na fila.
+
+    Os jobs rodam em threads dos próprios workers do gunicorn, sem processo
+    dedicado: a reciclagem do worker (max_requests) ou um restart interrompe
+    as análises em andamento, que são recuperadas pelo lease acima (após
+    ANALYSIS_JOB_LEASE_SECONDS) e reexecutadas desde o início.
+    """
+
+    def __init__(self):
+        """Inicializa a fila de análises"""
+        self.db_path = Path(os.getenv('ANALYSIS_JOB_DB', 'analysis_jobs.db'))
+        self.max_concurrent = int(os.getenv('ANALYSIS_MAX_CONCURRENT', '2'))
+        self.workers_per_process = int(os.getenv('ANALYSIS_WORKERS_PER_PROCESS', '1'))
+        self.max_queue_depth = int(os.getenv('ANALYSIS_MAX_QUEUE_DEPTH', '20'))
+        self.max_wait_seconds = int(os.getenv('ANALYSIS_MAX_WAIT_SECONDS', '900'))
+        self.lease_seconds = int(os.getenv('ANALYSIS_JOB_LEASE_SECONDS', '120'))
+        self.max_attempts = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', '2'))
+        self.result_ttl_seconds = int(os.getenv('ANALYSIS_RESULT_TTL', str(24 * 3600)))
+        self.dispatch_interval = 1.0
+
+        self._runner: Optional[Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]] = None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._dispatcher_pid: Optional[int] = None
+        self._wakeup = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local_jobs = set()
+        self._worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._db()
+        logger.info(
+            f"🧵 Analysis Job Queue inicializada (concorrência global={self.max_concurrent}, "
+            f"por processo={self.workers_per_process}, fila máx={self.max_queue_depth})"
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    session_id TEXT,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    http_status INTEGER,
+                    error TEXT,
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    submitted_at REAL NOT NULL,
+                    queued_at REAL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL
+                );
+            ''')
+            # Bancos criados antes de queued_at: a entrada na fila é a submissão
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+            if 'queued_at' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN queued_at REAL')
+                self._conn.execute('UPDATE jobs SET queued_at = submitted_at WHERE queued_at IS NULL')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, queued_at)')
+        return self._conn
+
+    def set_runner(self, runner: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]):
+        """Define a função que executa um job: runner(payload) -> (resposta, http_status)"""
+        self._runner = runner
+
+    def submit(self, payload: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Enfileira uma análise; levanta QueueFullError se a fila estiver cheia"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock:
+            conn = self._db()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if depth >= self.max_queue_depth:
+                    conn.execute('ROLLBACK')
+                    raise QueueFullError(f"Fila de análises cheia ({depth}/{self.max_queue_depth})")
+
+                conn.execute(
+                    "INSERT INTO jobs (job_id, session_id, status, payload, submitted_at, queued_at) "
+                    "VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (job_id, session_id, json.dumps(payload, ensure_ascii=False, default=str), now, now)
+                )
+                conn.execute('COMMIT')
+            except QueueFullError:
+                raise
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        self._ensure_dispatcher()
+        self._wakeup.set()
+
+        logger.info(f"📥 Análise {job_id} enfileirada (sessão {session_id}, posição {depth + 1})")
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status do job (sem o resultado)"""
+        self._ensure_dispatcher()
+        with self._lock:
+            conn = self._db()
+            row = conn.execute(
+                'SELECT job_id, session_id, status, http_status, error, attempts, '
+                'submitted_at, queued_at, started_at, finished_at FROM jobs WHERE job_id = ?',
+                (job_id,)
+            ).fetchone()
+            if not row:
+                return None
+            position = None
+            if row[2] == 'queued':
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND queued_at <= ?", (row[7],)
+                ).fetchone()[0]
+
+        (job_id, session_id, status, http_status, error, attempts,
+         submitted_at, queued_at, started_at, finished_at) = row
+        now = time.time()
+        return {
+            'job_id': job_id,
+            'session_id': session_id,
+            'status': status,
+            'http_status': http_status,
+            'error': error,
+            'attempts': attempts,
+            'queue_position': position,
+            'submitted_at': submitted_at,
+            'queued_at': queued_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'wait_seconds': round((started_at or now) - queued_at, 2),
+            'run_seconds': round((finished_at or now) - started_at, 2) if started_at else None
+        }
+
+    def get_result(self, job_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Resultado final do job (None se ainda não terminou)"""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT result, http_status FROM jobs WHERE job_id = ? AND status IN ('done', 'failed', 'expired')",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        result, http_status = row
+        return (json.loads(result) if result else {}), (http_status or 500)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profundidade da fila, execuções e tempos de espera"""
+        self._ensure_dispatcher()
+        with self._lock:
+            conn = self._db()
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            oldest = conn.execute("SELECT MIN(queued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            avg_wait = conn.execute(
+                'SELECT AVG(started_at - queued_at), AVG(finished_at - started_at) FROM jobs '
+                'WHERE started_at IS NOT NULL AND submitted_at > ?',
+                (time.time() - 3600,)
+            ).fetchone()
+
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'expired': counts.get('expired', 0),
+            'oldest_wait_seconds': round(time.time() - oldest, 2) if oldest else 0,
+            'avg_wait_seconds_1h': round(avg_wait[0] or 0, 2),
+            'avg_run_seconds_1h': round(avg_wait[1] or 0, 2),
+            'running_in_this_process': len(self._local_jobs),
+            'limits': {
+                'max_concurrent': self.max_concurrent,
+                'workers_per_process': self.workers_per_process,
+                'max_queue_depth': self.max_queue_depth,
+                'max_wait_seconds': self.max_wait_seconds
+            }
+        }
+
+    def _ensure_dispatcher(self):
+        """Inicia o despachante deste processo (também após fork)"""
+        if self._dispatcher and self._dispatcher.is_alive() and self._dispatcher_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._dispatcher and self._dispatcher.is_alive() and self._dispatcher_pid == os.getpid():
+                return
+            self._dispatcher_pid = os.getpid()
+            self._worker_id = f"{socket.gethostname()}:{os.getpid()}"
+            self._local_jobs = set()
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.workers_per_process),
+                thread_name_prefix='analysis_job'
+            )
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='AnalysisJobDispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        """Reivindica jobs enquanto houver capacidade local e global"""
+        while True:
+            try:
+                self._maintain()
+                while len(self._local_jobs) < self.workers_per_process:
+                    job = self._claim_next()
+                    if not job:
+                        break
+                    self._local_jobs.add(job['job_id'])
+                    # Contexto novo por job: sessão do auto save e estado da análise não vazam entre jobs
+                    self._executor.submit(contextvars.Context().run, self._run_job, job)
+            except Exception as e:
+                logger.error(f"❌ Erro no despachante de análises: {e}")
+
+            self._wakeup.wait(self.dispatch_interval)
+            self._wakeup.clear()
+
+    def _maintain(self):
+        """Heartbeat dos jobs locais, expiração da fila e recuperação de leases"""
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            if self._local_jobs:
+                conn.executemany(
+                    'UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?',
+                    [(now, job_id) for job_id in list(self._local_jobs)]
+                )
+
+            expired = conn.execute(
+                "UPDATE jobs SET status = 'expired', finished_at = ?, http_status = 503, "
+                "error = 'Tempo máximo de espera na fila excedido', result = ? "
+                "WHERE status = 'queued' AND queued_at < ?",
+                (now, json.dumps({'error': 'Tempo máximo de espera na fila excedido'}), now - self.max_wait_seconds)
+            ).rowcount
+            if expired:
+                logger.warning(f"⏰ {expired} análises expiradas na fila")
+
+            # Worker que executava o job morreu: volta para o fim da fila ou falha de vez
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', queued_at = ?, started_at = NULL, heartbeat_at = NULL, "
+                "worker = NULL, error = 'Worker interrompido durante a execução' "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts < ?",
+                (now, now - self.lease_seconds, self.max_attempts)
+            ).rowcount
+            if requeued:
+                logger.warning(f"🔁 {requeued} análises interrompidas voltaram para a fila")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, http_status = 500, finished_at = ?, "
+                "error = 'Worker interrompido durante a execução', result = ? "
+                "WHERE status = 'running' AND heartbeat_at < ?",
+                (now, json.dumps({'error': 'Worker interrompido durante a execução'}), now - self.lease_seconds)
+            )
+
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'expired') AND finished_at < ?",
+                (now - self.result_ttl_seconds,)
+            )
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Reivindica o job mais antigo se o limite global permitir"""
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+                if running >= self.max_concurrent:
+                    conn.execute('ROLLBACK')
+                    return None
+
+                row = conn.execute(
+                    "SELECT job_id, session_id, payload, queued_at FROM jobs "
+                    "WHERE status = 'queued' ORDER BY queued_at LIMIT 1"
+                ).fetchone()
+                if not row:
+                    conn.execute('ROLLBACK')
+                    return None
+
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+                    "attempts = attempts + 1 WHERE job_id = ?",
+                    (self._worker_id, now, now, row[0])
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        job_id, session_id, payload, queued_at = row
+        logger.info(f"▶️ Análise {job_id} iniciada após {now - queued_at:.1f}s na fila")
+        return {'job_id': job_id, 'session_id': session_id, 'payload': json.loads(payload)}
+
+    def _run_job(self, job: Dict[str, Any]):
+        """Executa um job e grava o resultado"""
+        job_id = job['job_id']
+        try:
+            if not self._runner:
+                raise RuntimeError('Nenhum executor de análises registrado')
+            result, http_status = self._runner(job['payload'])
+            status = 'done' if http_status < 400 else 'failed'
+            error = None if status == 'done' else (result or {}).get('error')
+        except Exception as e:
+            logger.error(f"❌ Análise {job_id} falhou: {e}", exc_info=True)
+            result, http_status, status, error = {'error': 'Erro na análise', 'message': str(e)}, 500, 'failed', str(e)
+
+        try:
+            with self._lock:
+                self._db().execute(
+                    'UPDATE jobs SET status = ?, result = ?, http_status = ?, error = ?, finished_at = ? WHERE job_id = ?',
+                    (status, json.dumps(result, ensure_ascii=False, default=str), http_status, error, time.time(), job_id)
+                )
+            logger.info(f"🏁 Análise {job_id} finalizada ({status}, HTTP {http_status})")
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar resultado da análise {job_id}: {e}")
+        finally:
+            self._local_jobs.discard(job_id)
+            self._wakeup.set()
+
+# Instância global
+analysis_job_queue = AnalysisJobQueue()
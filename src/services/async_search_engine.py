@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Async Search Engine
+Motor de busca assíncrono compartilhado com conexões persistentes
+"""
+
+import os
+import time
+import json
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Union, Tuple
+from urllib.parse import quote_plus
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.rate_limiter import rate_limiter
+from services.url_resolver import url_resolver
+
+try:
+    from bs4 import BeautifulSoup
+    HAS_BEAUTIFULSOUP = True
+except ImportError:
+    HAS_BEAUTIFULSOUP = False
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+class SearchProviderError(Exception):
+    """Erro de um provedor de busca específico"""
+
+class AsyncSearchEngine:
+    """Consulta todos os provedores de busca em paralelo num event loop dedicado"""
+
+    PROVIDERS = ['google', 'serper', 'bing', 'duckduckgo', 'yahoo']
+
+    def __init__(self):
+        """Inicializa o motor de busca"""
+        self.google_search_key = os.getenv('GOOGLE_SEARCH_KEY')
+        self.google_cse_id = os.getenv('GOOGLE_CSE_ID')
+        self.serper_api_key = os.getenv('SERPER_API_KEY')
+
+        self.request_timeout = 15
+        self.max_connections = int(os.getenv('SEARCH_MAX_CONNECTIONS', '20'))
+
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+            'Accept-Encoding': 'gzip, deflate',
+            'DNT': '1',
+            'Connection': 'keep-alive'
+        }
+
+        self.stats = {
+            name: {'requests': 0, 'errors': 0, 'results': 0, 'total_time': 0.0}
+            for name in self.PROVIDERS
+        }
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_pid: Optional[int] = None
+        self._loop_lock = threading.Lock()
+        self._aio_session = None
+        self._sync_session: Optional[requests.Session] = None
+
+        backend = 'aiohttp' if HAS_AIOHTTP else 'requests (pool de threads)'
+        logger.info(f"🔍 Async Search Engine inicializado - backend HTTP: {backend}")
+
+    # ------------------------------------------------------------------
+    # Fachada síncrona
+    # ------------------------------------------------------------------
+
+    def is_provider_available(self, provider: str) -> bool:
+        """Verifica se o provedor tem as credenciais necessárias"""
+        if provider == 'google':
+            return bool(self.google_search_key and self.google_cse_id)
+        if provider == 'serper':
+            return bool(self.serper_api_key)
+        return provider in self.PROVIDERS and HAS_BEAUTIFULSOUP
+
+    def search(
+        self,
+        query: str,
+        providers: Optional[List[str]] = None,
+        max_results_per_provider: Union[int, Dict[str, int]] = 5,
+        timeout: float = 20.0,
+        provider_queries: Optional[Dict[str, str]] = None,
+        date_sorted: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Busca em todos os provedores em paralelo e retorna resultados únicos"""
+        results, _ = self.search_with_report(
+            query, providers, max_results_per_provider, timeout, provider_queries, date_sorted
+        )
+        return results
+
+    def search_with_report(
+        self,
+        query: str,
+        providers: Optional[List[str]] = None,
+        max_results_per_provider: Union[int, Dict[str, int]] = 5,
+        timeout: float = 20.0,
+        provider_queries: Optional[Dict[str, str]] = None,
+        date_sorted: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Igual a `search`, mas também retorna um relatório por provedor
+        ({provider: {'results', 'error', 'elapsed'}}).
+
+        O tempo total é limitado por `timeout`: provedores que não responderem
+        a tempo são descartados e os resultados já recebidos são mantidos.
+        """
+        providers = [p for p in (providers or self.PROVIDERS) if self.is_provider_available(p)]
+        if not providers:
+            logger.warning("⚠️ Nenhum provedor de busca disponível")
+            return [], {}
+
+        coro = self._search_all(query, providers, max_results_per_provider, timeout, provider_queries or {}, date_sorted)
+        return self._run(coro, timeout + 5)
+
+    def search_provider(self, provider: str, query: str, max_results: int = 10, date_sorted: bool = False) -> List[Dict[str, Any]]:
+        """Busca em um único provedor; levanta SearchProviderError em caso de falha"""
+        if not self.is_provider_available(provider):
+            raise SearchProviderError(f"Provedor {provider} não disponível")
+
+        return self._run(self._query_provider(provider, query, max_results, date_sorted), self.request_timeout + 5)
+
+    # ------------------------------------------------------------------
+    # Event loop dedicado
+    # ------------------------------------------------------------------
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Retorna o event loop de fundo (recriado após fork do worker)"""
+        with self._loop_lock:
+            if self._loop is None or self._loop_pid != os.getpid() or not self._loop_thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._loop_pid = os.getpid()
+                self._aio_session = None
+                self._sync_session = None
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='async-search-engine',
+                    daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def _run(self, coro, timeout: float):
+        """Executa a corrotina no loop de fundo e aguarda o resultado"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    # ------------------------------------------------------------------
+    # Busca concorrente
+    # ------------------------------------------------------------------
+
+    async def _search_all(
+        self,
+        query: str,
+        providers: List[str],
+        max_results_per_provider: Union[int, Dict[str, int]],
+        timeout: float,
+        provider_queries: Dict[str, str],
+        date_sorted: bool
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Dispara todos os provedores e mescla resultados conforme chegam"""
+
+        def _limit(provider: str) -> int:
+            if isinstance(max_results_per_provider, dict):
+                return max_results_per_provider.get(provider, 5)
+            return max_results_per_provider
+
+        async def _timed(provider: str):
+            start = time.time()
+            try:
+                results = await self._query_provider(
+                    provider, provider_queries.get(provider, query), _limit(provider), date_sorted
+                )
+                return provider, results, None, time.time() - start
+            except Exception as e:
+                return provider, [], str(e), time.time() - start
+
+        providers = [p for p in providers if _limit(p) > 0]
+        tasks = [asyncio.ensure_future(_timed(p)) for p in providers]
+        report = {p: {'results': 0, 'error': 'timeout', 'elapsed': timeout} for p in providers}
+        unique_results = []
+        seen_urls = set()
+        total = 0
+
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=timeout):
+                provider, results, error, elapsed = await next_done
+                report[provider] = {'results': len(results), 'error': error, 'elapsed': round(elapsed, 2)}
+
+                if error:
+                    logger.warning(f"⚠️ Erro em {provider}: {error}")
+                    continue
+
+                total += len(results)
+                for result in results:
+                    url_key = url_resolver.canonical_key(result['url'])
+                    if url_key not in seen_urls:
+                        seen_urls.add(url_key)
+                        unique_results.append(result)
+
+        except asyncio.TimeoutError:
+            pending = [p for p, info in report.items() if info['error'] == 'timeout']
+            logger.warning(f"⏰ Busca encerrada por prazo ({timeout:.0f}s) - sem resposta de: {', '.join(pending)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        logger.info(f"✅ Busca paralela: {len(unique_results)} resultados únicos de {total} totais ({len(providers)} provedores)")
+        return unique_results, report
+
+    async def _query_provider(self, provider: str, query: str, max_results: int, date_sorted: bool) -> List[Dict[str, Any]]:
+        """Executa a requisição do provedor e converte a resposta"""
+        self.stats[provider]['requests'] += 1
+        start = time.time()
+
+        try:
+            method, url, kwargs = self._build_request(provider, query, max_results, date_sorted)
+            async with rate_limiter.limit_async(provider):
+                status, body = await self._fetch(method, url, **kwargs)
+
+            if status == 429:
+                rate_limiter.penalize(provider, 30)
+
+            if provider == 'duckduckgo' and status == 202:
+                logger.warning("⚠️ DuckDuckGo retornou status 202")
+                return []
+            if status != 200:
+                raise SearchProviderError(f"{provider} retornou status {status}")
+
+            results = self._parse_response(provider, body, max_results)
+            self.stats[provider]['results'] += len(results)
+            logger.info(f"✅ {provider}: {len(results)} resultados")
+            return results
+
+        except Exception:
+            self.stats[provider]['errors'] += 1
+            raise
+        finally:
+            self.stats[provider]['total_time'] += time.time() - start
+
+    async def _fetch(self, method: str, url: str, params: Dict[str, Any] = None, json_body: Dict[str, Any] = None, headers: Dict[str, str] = None) -> Tuple[int, str]:
+        """Requisição HTTP reutilizando conexões (aiohttp ou requests em thread)"""
+        headers = {**self.headers, **(headers or {})}
+
+        if HAS_AIOHTTP:
+            session = await self._get_aio_session()
+            async with session.request(method, url, params=params, json=json_body, headers=headers) as response:
+                return response.status, await response.text(errors='replace')
+
+        session = self._get_sync_session()
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None,
+            lambda: session.request(method, url, params=params, json=json_body, headers=headers, timeout=self.request_timeout)
+        )
+        return response.status_code, response.text
+
+    async def _get_aio_session(self):
+        """Sessão aiohttp única por loop, com pool de conexões keep-alive"""
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._aio_session
+
+    def _get_sync_session(self) -> requests.Session:
+        """Sessão requests com pool de conexões (fallback sem aiohttp)"""
+        if self._sync_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=len(self.PROVIDERS), pool_maxsize=self.max_connections)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._sync_session = session
+        return self._sync_session
+
+    # ------------------------------------------------------------------
+    # Provedores
+    # ------------------------------------------------------------------
+
+    def _build_request(self, provider: str, query: str, max_results: int, date_sorted: bool) -> Tuple[str, str, Dict[str, Any]]:
+        """Monta método, URL e parâmetros da requisição de cada provedor"""
+        if provider == 'google':
+            params = {
+                'key': self.google_search_key,
+                'cx': self.google_cse_id,
+                'q': query,
+                'num': min(max_results, 10),
+                'lr': 'lang_pt',
+                'gl': 'br',
+                'safe': 'off',
+                'dateRestrict': 'm6'  # Últimos 6 meses
+            }
+            if date_sorted:
+                params['sort'] = 'date'
+            return 'GET', 'https://www.googleapis.com/customsearch/v1', {'params': params}
+
+        if provider == 'serper':
+            return 'POST', 'https://google.serper.dev/search', {
+                'json_body': {'q': query, 'gl': 'br', 'hl': 'pt', 'num': max_results},
+                'headers': {'X-API-KEY': self.serper_api_key, 'Content-Type': 'application/json'}
+            }
+
+        if provider == 'bing':
+            return 'GET', f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}", {}
+
+        if provider == 'duckduckgo':
+            return 'GET', f"https://html.duckduckgo.com/html/?q={quote_plus(query)}", {}
+
+        if provider == 'yahoo':
+            return 'GET', f"https://br.search.yahoo.com/search?p={quote_plus(query)}", {}
+
+        raise SearchProviderError(f"Provedor desconhecido: {provider}")
+
+    def _parse_response(self, provider: str, body: str, max_results: int) -> List[Dict[str, Any]]:
+        """Converte a resposta do provedor em resultados padronizados"""
+        if provider in ('google', 'serper'):
+            data = json.loads(body)
+            items = data.get('items', []) if provider == 'google' else data.get('organic', [])
+            return [
+                {
+                    'title': item.get('title', ''),
+                    'url': item.get('link', ''),
+                    'snippet': item.get('snippet', ''),
+                    'source': provider
+                }
+                for item in items[:max_results] if item.get('link')
+            ]
+
+        soup = BeautifulSoup(body, 'html.parser')
+        results = []
+
+        if provider == 'bing':
+            for item in soup.find_all('li', class_='b_algo')[:max_results]:
+                title_elem = item.find('h2')
+                link_elem = title_elem.find('a') if title_elem else None
+                if link_elem:
+                    snippet_elem = item.find('p')
+                    results.append(self._make_result(
+                        title_elem.get_text(strip=True), link_elem.get('href', ''),
+                        snippet_elem.get_text(strip=True) if snippet_elem else '', provider
+                    ))
+
+        elif provider == 'duckduckgo':
+            for div in soup.find_all('div', class_='result')[:max_results]:
+                title_elem = div.find('a', class_='result__a')
+                if title_elem:
+                    snippet_elem = div.find('a', class_='result__snippet')
+                    results.append(self._make_result(
+                        title_elem.get_text(strip=True), title_elem.get('href', ''),
+                        snippet_elem.get_text(strip=True) if snippet_elem else '', provider
+                    ))
+
+        elif provider == 'yahoo':
+            for item in soup.find_all('div', class_='Sr')[:max_results]:
+                title_elem = item.find('h3')
+                link_elem = title_elem.find('a') if title_elem else None
+                if link_elem:
+                    snippet_elem = item.find('span', class_='fz-ms')
+                    results.append(self._make_result(
+                        title_elem.get_text(strip=True), link_elem.get('href', ''),
+                        snippet_elem.get_text(strip=True) if snippet_elem else '', provider
+                    ))
+
+        return [r for r in results if r]
+
+    def _make_result(self, title: str, url: str, snippet: str, provider: str) -> Optional[Dict[str, Any]]:
+        """Cria resultado padronizado, descartando links inválidos"""
+        if not (url and title and url.startswith('http')):
+            return None
+        return {'title': title, 'url': url, 'snippet': snippet, 'source': provider}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas por provedor"""
+        stats = {}
+        for name, data in self.stats.items():
+            stats[name] = {
+                **data,
+                'available': self.is_provider_available(name),
+                'avg_response_time': data['total_time'] / data['requests'] if data['requests'] else 0
+            }
+        return stats
+
+# Instância global
+async_search_engine = AsyncSearchEngine()
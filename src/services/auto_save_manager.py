@@ -3,19 +3,49 @@
 """
 ARQV30 Enhanced v2.0 - Auto Save Manager
 Sistema de salvamento automático e imediato de todos os resultados
+
+Modo journal (padrão, AUTOSAVE_MODE=journal): cada etapa vira uma linha JSON
+num log append-only por sessão (relatorios_intermediarios/<sessão>/etapas_<sessão>.jsonl),
+gravado por uma thread de fundo em lotes. A thread da requisição só serializa
+o registro e o coloca na fila.
+
+Garantias em caso de falha:
+- Queda do processo: perdem-se apenas os registros ainda na fila (que não
+  chegaram a ser escritos); o que já foi escrito está no cache do SO.
+- Queda do SO/energia: perde-se também o que foi escrito desde o último fsync
+  (no máximo AUTOSAVE_FSYNC_INTERVAL segundos; 0 = fsync a cada lote).
+- Uma última linha truncada é ignorada na leitura; as demais continuam válidas.
+- flush() é uma barreira: ao retornar, tudo o que foi salvo antes está escrito
+  e sincronizado em disco. Leituras e consolidar_sessao() chamam flush().
+
+Modo arquivos (AUTOSAVE_MODE=arquivos): comportamento antigo, um JSON por etapa.
+
+Sessão atual: iniciar_sessao() define a sessão no contexto (contextvars) de
+quem a chamou, não no gerenciador. Análises simultâneas (jobs da fila em
+threads do mesmo processo) gravam cada uma na sua sessão; pools de threads
+que executam etapas da análise propagam o contexto (copy_context). Todas as
+funções de gravação e leitura também aceitam session_id explícito.
 """
 
 import os
 import json
 import time
+import queue
+import atexit
 import logging
+import threading
+import contextvars
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import uuid
 from pathlib import Path
+from services.session_index import session_index
 
 logger = logging.getLogger(__name__)
 
+# (session_id, analysis_id) da análise em execução no contexto atual
+_sessao_atual: contextvars.ContextVar = contextvars.ContextVar('autosave_sessao', default=None)
+
 class AutoSaveManager:
     """Gerenciador de salvamento automático ultra-robusto"""
     
@@ -41,30 +71,72 @@ class AutoSaveManager:
         for subdir in self.subdirs.values():
             subdir.mkdir(exist_ok=True)
         
-        self.session_id = None
-        self.analysis_id = None
+        # Sessão fora de qualquer contexto de análise (scripts e compatibilidade)
+        self._session_id_padrao = None
+        self._analysis_id_padrao = None
+        
+        # Journal com escrita em segundo plano
+        self.modo = os.getenv('AUTOSAVE_MODE', 'journal').lower()
+        self.fsync_interval = float(os.getenv('AUTOSAVE_FSYNC_INTERVAL', '1.0'))
+        self.batch_size = int(os.getenv('AUTOSAVE_BATCH_SIZE', '200'))
+        self._fila = queue.Queue()
+        self._writer_thread = None
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+        self._journal_stats = {'registros_enfileirados': 0, 'registros_gravados': 0, 'lotes': 0, 'fsyncs': 0, 'erros': 0}
         
-        logger.info(f"✅ Auto Save Manager inicializado: {self.base_dir}")
+        if self.modo == 'journal':
+            atexit.register(self.flush)
+        
+        logger.info(f"✅ Auto Save Manager inicializado: {self.base_dir} (modo {self.modo})")
+    
+    @property
+    def session_id(self) -> Optional[str]:
+        """Sessão do contexto atual (ou a padrão, fora de uma análise)"""
+        sessao = _sessao_atual.get()
+        return sessao[0] if sessao else self._session_id_padrao
+    
+    @session_id.setter
+    def session_id(self, value: Optional[str]):
+        self._session_id_padrao = value
+    
+    @property
+    def analysis_id(self) -> Optional[str]:
+        """Análise do contexto atual (ou a padrão, fora de uma análise)"""
+        sessao = _sessao_atual.get()
+        return sessao[1] if sessao else self._analysis_id_padrao
+    
+    @analysis_id.setter
+    def analysis_id(self, value: Optional[str]):
+        self._analysis_id_padrao = value
+    
+    def _analysis_id_de(self, session_id: Optional[str]) -> Optional[str]:
+        """analysis_id correspondente à sessão (apenas se for a sessão do contexto)"""
+        return self.analysis_id if session_id == self.session_id else None
     
     def iniciar_sessao(self, session_id: str = None) -> str:
-        """Inicia nova sessão de salvamento"""
-        self.session_id = session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-        self.analysis_id = f"analysis_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        """
+        Inicia nova sessão de salvamento no contexto atual (thread/job); as
+        gravações sem session_id explícito feitas neste contexto vão para ela
+        """
+        session_id = session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        analysis_id = f"analysis_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        _sessao_atual.set((session_id, analysis_id))
         
         # Cria diretório da sessão
-        session_dir = self.base_dir / self.session_id
+        session_dir = self.base_dir / session_id
         session_dir.mkdir(exist_ok=True)
         
         # Salva metadados da sessão
         self.salvar_etapa("session_metadata", {
-            "session_id": self.session_id,
-            "analysis_id": self.analysis_id,
+            "session_id": session_id,
+            "analysis_id": analysis_id,
             "iniciado_em": datetime.now().isoformat(),
             "status": "iniciado"
-        })
+        }, session_id=session_id)
         
-        logger.info(f"🚀 Sessão iniciada: {self.session_id}")
-        return self.session_id
+        logger.info(f"🚀 Sessão iniciada: {session_id}")
+        return session_id
     
     def salvar_etapa(
         self, 
@@ -72,12 +144,17 @@ class AutoSaveManager:
         dados: Any, 
         status: str = "sucesso", 
         timestamp: Optional[float] = None,
-        categoria: str = "geral"
+        categoria: str = "geral",
+        session_id: Optional[str] = None
     ) -> str:
-        """Salva etapa imediatamente com timestamp único"""
+        """Salva etapa imediatamente com timestamp único (na sessão do contexto, se session_id não for informado)"""
         
         timestamp = timestamp or time.time()
         timestamp_str = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        session_id = session_id or self.session_id
+        
+        if self.modo == 'journal':
+            return self._enfileirar_etapa(nome_etapa, dados, status, timestamp, timestamp_str, categoria, session_id)
         
         # Determina diretório baseado na categoria
         if categoria in self.subdirs:
@@ -86,8 +163,8 @@ class AutoSaveManager:
             save_dir = self.base_dir
         
         # Se há sessão ativa, cria subdiretório
-        if self.session_id:
-            save_dir = save_dir / self.session_id
+        if session_id:
+            save_dir = save_dir / session_id
             save_dir.mkdir(exist_ok=True)
         
         # Nome do arquivo com timestamp único
@@ -96,17 +173,7 @@ class AutoSaveManager:
         
         try:
             # Prepara dados para salvamento
-            save_data = {
-                "etapa": nome_etapa,
-                "status": status,
-                "dados": dados,
-                "timestamp": timestamp,
-                "timestamp_iso": datetime.fromtimestamp(timestamp).isoformat(),
-                "session_id": self.session_id,
-                "analysis_id": self.analysis_id,
-                "categoria": categoria,
-                "tamanho_dados": len(str(dados)) if dados else 0
-            }
+            save_data = self._montar_registro(nome_etapa, dados, status, timestamp, categoria, session_id)
             
             # Salva arquivo JSON
             with open(filepath, "w", encoding="utf-8") as f:
@@ -116,30 +183,400 @@ class AutoSaveManager:
             logger.info(f"💾 Etapa '{nome_etapa}' salva: {filepath}")
             
             # Salva também um backup compactado se dados grandes
-            if len(str(dados)) > 50000:  # > 50KB
+            if save_data["tamanho_dados"] > 50000:  # > 50KB
                 self._salvar_backup_compactado(filepath, save_data)
             
+            if session_id:
+                self._indexar_arquivo(session_id, filepath, save_data)
+            
             return str(filepath)
             
         except Exception as e:
-            # Salvamento de emergência em caso de erro
-            emergency_path = self.base_dir / f"EMERGENCY_{nome_etapa}_{timestamp_str}.txt"
-            try:
-                with open(emergency_path, "w", encoding="utf-8") as f:
-                    f.write(f"ERRO AO SALVAR: {str(e)}\n")
-                    f.write(f"DADOS: {str(dados)[:1000]}...\n")
-                    f.write(f"STATUS: {status}\n")
-                    f.write(f"TIMESTAMP: {timestamp}\n")
-                
-                logger.error(f"❌ Erro ao salvar '{nome_etapa}': {e}")
-                logger.info(f"🆘 Backup de emergência salvo: {emergency_path}")
-                
-            except Exception as emergency_error:
-                logger.critical(f"🚨 FALHA CRÍTICA no salvamento de emergência: {emergency_error}")
-            
-            return str(emergency_path)
+            return self._salvar_emergencia(nome_etapa, dados, status, timestamp, timestamp_str, e)
+    
+    def _montar_registro(
+        self,
+        nome_etapa: str,
+        dados: Any,
+        status: str,
+        timestamp: float,
+        categoria: str,
+        session_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Monta o registro de uma etapa"""
+        return {
+            "etapa": nome_etapa,
+            "status": status,
+            "dados": dados,
+            "timestamp": timestamp,
+            "timestamp_iso": datetime.fromtimestamp(timestamp).isoformat(),
+            "session_id": session_id,
+            "analysis_id": self._analysis_id_de(session_id),
+            "categoria": categoria,
+            "tamanho_dados": len(str(dados)) if dados else 0
+        }
+
+    @staticmethod
+    def _montar_linha(envelope: Dict[str, Any], dados_json: str, tamanho_dados: int) -> str:
+        """
+        Linha do journal a partir do envelope e dos dados já serializados
+        (executada pela thread escritora, sem serializar os dados de novo)
+        """
+        linha = json.dumps({**envelope, "tamanho_dados": tamanho_dados}, ensure_ascii=False, default=str)
+        return f'{linha[:-1]}, "dados": {dados_json}}}'
     
-    def salvar_erro(self, etapa: str, erro: Exception, contexto: Dict[str, Any] = None) -> str:
+    def _salvar_emergencia(self, nome_etapa: str, dados: Any, status: str, timestamp: float, timestamp_str: str, e: Exception) -> str:
+        """Salvamento de emergência em caso de erro"""
+        emergency_path = self.base_dir / f"EMERGENCY_{nome_etapa}_{timestamp_str}.txt"
+        try:
+            with open(emergency_path, "w", encoding="utf-8") as f:
+                f.write(f"ERRO AO SALVAR: {str(e)}\n")
+                f.write(f"DADOS: {str(dados)[:1000]}...\n")
+                f.write(f"STATUS: {status}\n")
+                f.write(f"TIMESTAMP: {timestamp}\n")
+            
+            logger.error(f"❌ Erro ao salvar '{nome_etapa}': {e}")
+            logger.info(f"🆘 Backup de emergência salvo: {emergency_path}")
+            
+        except Exception as emergency_error:
+            logger.critical(f"🚨 FALHA CRÍTICA no salvamento de emergência: {emergency_error}")
+        
+        return str(emergency_path)
+
+    def _journal_path(self, session_id: Optional[str]) -> Path:
+        """Caminho do journal append-only da sessão"""
+        session_key = session_id or "sem_sessao"
+        return self.base_dir / session_key / f"etapas_{session_key}.jsonl"
+
+    def _enfileirar_etapa(
+        self,
+        nome_etapa: str,
+        dados: Any,
+        status: str,
+        timestamp: float,
+        timestamp_str: str,
+        categoria: str,
+        session_id: Optional[str]
+    ) -> str:
+        """
+        Serializa o registro na thread chamadora e o entrega ao escritor de fundo.
+
+        A serialização acontece aqui para congelar o estado de `dados` no momento
+        da chamada (o chamador pode continuar alterando o objeto); apenas a
+        escrita em disco é adiada.
+        """
+        journal_path = self._journal_path(session_id)
+        try:
+            # Uma única serialização dos dados; o tamanho é calculado pela thread escritora
+            dados_json = json.dumps(dados, ensure_ascii=False, default=str)
+            tem_dados = bool(dados)
+        except Exception as e:
+            return self._salvar_emergencia(nome_etapa, dados, status, timestamp, timestamp_str, e)
+
+        envelope = self._montar_registro(nome_etapa, None, status, timestamp, categoria, session_id)
+        del envelope["dados"]
+
+        meta = {
+            "etapa": nome_etapa,
+            "status": status,
+            "timestamp": timestamp,
+            "categoria": categoria
+        }
+
+        self._garantir_escritor()
+        self._fila.put((journal_path, session_id or "sem_sessao", (envelope, dados_json, tem_dados), meta))
+        self._journal_stats['registros_enfileirados'] += 1
+        logger.debug(f"💾 Etapa '{nome_etapa}' enfileirada para {journal_path}")
+        return str(journal_path)
+
+    def _garantir_escritor(self):
+        """Inicia a thread escritora (também após fork do processo)"""
+        if self._writer_thread and self._writer_thread.is_alive() and self._writer_pid == os.getpid():
+            return
+
+        with self._writer_lock:
+            if self._writer_thread and self._writer_thread.is_alive() and self._writer_pid == os.getpid():
+                return
+            if self._writer_pid is not None and self._writer_pid != os.getpid():
+                # Fila herdada do processo pai pode estar com locks inconsistentes
+                self._fila = queue.Queue()
+            self._writer_pid = os.getpid()
+            self._writer_thread = threading.Thread(
+                target=self._loop_escritor,
+                name="AutoSaveJournalWriter",
+                daemon=True
+            )
+            self._writer_thread.start()
+
+    def _loop_escritor(self):
+        """Consome a fila em lotes e grava os registros nos journals"""
+        arquivos_abertos: Dict[Path, Any] = {}
+        pendentes_fsync = set()
+        ultimo_fsync = time.time()
+        fila = self._fila
+
+        while True:
+            try:
+                item = fila.get(timeout=max(0.05, self.fsync_interval or 0.05))
+            except queue.Empty:
+                item = None
+
+            lote = []
+            barreiras = []
+            if item is not None:
+                lote.append(item)
+                while len(lote) < self.batch_size:
+                    try:
+                        lote.append(fila.get_nowait())
+                    except queue.Empty:
+                        break
+
+            # Agrupa por journal para uma única escrita por arquivo
+            por_arquivo: Dict[Path, Any] = {}
+            for entrada in lote:
+                if isinstance(entrada, threading.Event):
+                    barreiras.append(entrada)
+                    continue
+                journal_path, session_key, linha, meta = entrada
+                por_arquivo.setdefault(journal_path, (session_key, []))[1].append((linha, meta))
+
+            for journal_path, (session_key, linhas) in por_arquivo.items():
+                try:
+                    handle = arquivos_abertos.get(journal_path)
+                    if handle is None:
+                        journal_path.parent.mkdir(parents=True, exist_ok=True)
+                        handle = open(journal_path, "ab")
+                        arquivos_abertos[journal_path] = handle
+                        session_index.registrar_arquivo(session_key, str(journal_path), "journal")
+
+                    # Offsets em bytes de cada registro, para o índice da sessão
+                    posicao = os.fstat(handle.fileno()).st_size
+                    blocos = []
+                    registros = []
+                    for (envelope, dados_json, tem_dados), meta in linhas:
+                        # Tamanho dos dados (JSON) calculado aqui, fora da thread da requisição
+                        tamanho_dados = len(dados_json) if tem_dados else 0
+                        bloco = self._montar_linha(envelope, dados_json, tamanho_dados).encode("utf-8") + b"\n"
+                        blocos.append(bloco)
+                        registros.append({
+                            **meta,
+                            "tamanho_dados": tamanho_dados,
+                            "offset": posicao,
+                            "comprimento": len(bloco) - 1
+                        })
+                        posicao += len(bloco)
+
+                    handle.write(b"".join(blocos))
+                    handle.flush()
+                    pendentes_fsync.add(journal_path)
+                    self._journal_stats['registros_gravados'] += len(linhas)
+
+                    session_index.registrar_registros(session_key, str(journal_path), registros, indexado_ate=posicao)
+                except Exception as e:
+                    self._journal_stats['erros'] += 1
+                    logger.error(f"❌ Erro ao gravar journal {journal_path}: {e}")
+
+            if por_arquivo:
+                self._journal_stats['lotes'] += 1
+
+            # fsync na cadência configurada, ou imediatamente se há barreira
+            if pendentes_fsync and (barreiras or time.time() - ultimo_fsync >= self.fsync_interval):
+                for journal_path in pendentes_fsync:
+                    handle = arquivos_abertos.get(journal_path)
+                    if handle is None:
+                        continue
+                    try:
+                        os.fsync(handle.fileno())
+                        self._journal_stats['fsyncs'] += 1
+                    except Exception as e:
+                        self._journal_stats['erros'] += 1
+                        logger.error(f"❌ Erro no fsync de {journal_path}: {e}")
+                pendentes_fsync.clear()
+                ultimo_fsync = time.time()
+
+            # Sessões ociosas: fecha os arquivos já sincronizados
+            if item is None and not pendentes_fsync:
+                for handle in arquivos_abertos.values():
+                    try:
+                        handle.close()
+                    except Exception:
+                        pass
+                arquivos_abertos.clear()
+
+            for barreira in barreiras:
+                barreira.set()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """
+        Barreira de escrita: aguarda até que todos os registros salvos antes
+        desta chamada estejam gravados e sincronizados (fsync) em disco.
+        """
+        if self.modo != 'journal':
+            return True
+        if not self._writer_thread or not self._writer_thread.is_alive() or self._writer_pid != os.getpid():
+            if self._fila.empty():
+                return True
+            self._garantir_escritor()
+
+        barreira = threading.Event()
+        self._fila.put(barreira)
+        concluido = barreira.wait(timeout)
+        if not concluido:
+            logger.warning(f"⚠️ Flush do journal não concluído em {timeout}s")
+        return concluido
+
+    def _sincronizar_indice(self, session_id: str):
+        """
+        Garante que o índice cobre tudo o que está em disco para a sessão.
+
+        Indexa o final do journal que ficou sem índice (queda entre a escrita e a
+        atualização do índice), descarta entradas além do fim real do arquivo
+        (perdidas antes do fsync) e, uma única vez por sessão, indexa os arquivos
+        do formato antigo (um JSON por etapa) dos diretórios dessa sessão.
+        """
+        journal_path = self._journal_path(session_id)
+        arquivo = str(journal_path)
+
+        try:
+            inicio = session_index.indexado_ate(arquivo)
+            tamanho = journal_path.stat().st_size if journal_path.exists() else 0
+
+            if tamanho < inicio:
+                logger.warning(f"⚠️ Journal {arquivo} menor que o índice - descartando entradas perdidas")
+                session_index.truncar_journal(arquivo, tamanho)
+            elif tamanho > inicio:
+                with open(journal_path, "rb") as f:
+                    f.seek(inicio)
+                    bloco = f.read(tamanho - inicio)
+
+                registros = []
+                posicao = inicio
+                # O último pedaço é vazio ou uma linha ainda incompleta
+                for linha in bloco.split(b"\n")[:-1]:
+                    if linha.strip():
+                        try:
+                            registro = json.loads(linha)
+                            registros.append({
+                                "etapa": registro.get("etapa", "unknown"),
+                                "status": registro.get("status"),
+                                "timestamp": registro.get("timestamp"),
+                                "categoria": registro.get("categoria"),
+                                "tamanho_dados": registro.get("tamanho_dados", 0),
+                                "offset": posicao,
+                                "comprimento": len(linha)
+                            })
+                        except ValueError:
+                            logger.warning(f"⚠️ Registro inválido ignorado em {arquivo} (byte {posicao})")
+                    posicao += len(linha) + 1
+
+                session_index.registrar_registros(session_id, arquivo, registros, indexado_ate=posicao)
+                if registros:
+                    session_index.registrar_arquivo(session_id, arquivo, "journal")
+                    logger.info(f"🗂️ {len(registros)} registros do journal {arquivo} reindexados")
+        except Exception as e:
+            logger.error(f"❌ Erro ao sincronizar índice do journal {arquivo}: {e}")
+
+        if not session_index.legado_verificado(session_id):
+            self._indexar_sessao_legada(session_id)
+
+    def _indexar_sessao_legada(self, session_id: str):
+        """Indexa os arquivos JSON por etapa da sessão (formato anterior ao journal)"""
+        try:
+            for categoria, subdir in self.subdirs.items():
+                session_dir = subdir / session_id
+                if not session_dir.exists():
+                    continue
+                for filepath in session_dir.iterdir():
+                    if filepath.suffix == ".json":
+                        try:
+                            with open(filepath, "r", encoding="utf-8") as f:
+                                data = json.load(f)
+                            data["categoria"] = categoria
+                            self._indexar_arquivo(session_id, filepath, data)
+                        except Exception as e:
+                            logger.error(f"❌ Erro ao indexar {filepath}: {e}")
+                    elif filepath.is_file():
+                        session_index.registrar_arquivo(session_id, str(filepath), categoria)
+
+            session_index.marcar_legado_verificado(session_id)
+        except Exception as e:
+            logger.error(f"❌ Erro ao indexar sessão legada {session_id}: {e}")
+
+    def _indexar_arquivo(self, session_id: str, filepath: Path, save_data: Dict[str, Any]):
+        """Registra no índice uma etapa salva como arquivo JSON próprio"""
+        try:
+            session_index.registrar_registros(session_id, str(filepath), [{
+                "etapa": save_data.get("etapa", "unknown"),
+                "status": save_data.get("status"),
+                "timestamp": save_data.get("timestamp"),
+                "categoria": save_data.get("categoria"),
+                "tamanho_dados": save_data.get("tamanho_dados", 0),
+                "offset": -1,
+                "comprimento": 0
+            }])
+            session_index.registrar_arquivo(session_id, str(filepath), save_data.get("categoria"))
+        except Exception as e:
+            logger.error(f"❌ Erro ao indexar {filepath}: {e}")
+
+    def _carregar_registro(self, entrada: Dict[str, Any]) -> Dict[str, Any]:
+        """Lê um registro apontado pelo índice (linha do journal ou arquivo JSON)"""
+        if entrada["offset"] < 0:
+            with open(entrada["arquivo"], "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        with open(entrada["arquivo"], "rb") as f:
+            f.seek(entrada["offset"])
+            return json.loads(f.read(entrada["comprimento"]))
+
+    def registrar_arquivo(self, session_id: str, caminho: str, categoria: Optional[str] = None):
+        """Associa um arquivo gerado fora do Auto Save (ex.: relatórios finais) à sessão"""
+        try:
+            session_index.registrar_arquivo(session_id, str(caminho), categoria)
+        except Exception as e:
+            logger.error(f"❌ Erro ao registrar arquivo {caminho}: {e}")
+
+    def listar_arquivos_sessao(self, session_id: str = None) -> List[Dict[str, Any]]:
+        """Lista os arquivos da sessão a partir do índice (sem varrer diretórios)"""
+        session_id = session_id or self.session_id
+        if not session_id:
+            return []
+
+        self.flush()
+        self._sincronizar_indice(session_id)
+
+        arquivos = []
+        for entrada in session_index.listar_arquivos(session_id):
+            caminho = Path(entrada["caminho"])
+            try:
+                stat = caminho.stat()
+            except OSError:
+                continue
+            arquivos.append({
+                "nome": caminho.name,
+                "caminho": str(caminho),
+                "tamanho": stat.st_size,
+                "categoria": entrada["categoria"],
+                "modificado": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+        return arquivos
+
+    def get_journal_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do escritor de fundo"""
+        return {
+            **self._journal_stats,
+            'modo': self.modo,
+            'fila_pendente': self._fila.qsize(),
+            'fsync_interval': self.fsync_interval,
+            'batch_size': self.batch_size
+        }
+
+    def salvar_erro(
+        self,
+        etapa: str,
+        erro: Exception,
+        contexto: Dict[str, Any] = None,
+        session_id: Optional[str] = None
+    ) -> str:
         """Salva erro com contexto completo"""
         
         erro_data = {
@@ -151,7 +588,7 @@ class AutoSaveManager:
             "timestamp_erro": time.time()
         }
         
-        return self.salvar_etapa(f"ERRO_{etapa}", erro_data, status="erro", categoria="erros")
+        return self.salvar_etapa(f"ERRO_{etapa}", erro_data, status="erro", categoria="erros", session_id=session_id)
     
     def salvar_progresso(self, etapa_atual: str, progresso: float, detalhes: str = "") -> str:
         """Salva progresso atual"""
@@ -171,26 +608,21 @@ class AutoSaveManager:
         session_id = session_id or self.session_id
         if not session_id:
             return None
-        
-        # Busca em todos os subdiretórios
-        for categoria, subdir in self.subdirs.items():
-            session_dir = subdir / session_id
-            if session_dir.exists():
-                # Busca arquivos que começam com o nome da etapa
-                for filepath in session_dir.glob(f"{nome_etapa}_*.json"):
-                    try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        
-                        if data.get("status") == "sucesso":
-                            logger.info(f"📂 Etapa '{nome_etapa}' recuperada: {filepath}")
-                            return data
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao recuperar {filepath}: {e}")
-                        continue
-        
-        return None
+
+        self.flush()
+        self._sincronizar_indice(session_id)
+
+        entrada = session_index.ultimo_registro(session_id, nome_etapa, status="sucesso")
+        if not entrada:
+            return None
+
+        try:
+            data = self._carregar_registro(entrada)
+            logger.info(f"📂 Etapa '{nome_etapa}' recuperada: {entrada['arquivo']}")
+            return data
+        except Exception as e:
+            logger.error(f"❌ Erro ao recuperar {entrada['arquivo']}: {e}")
+            return None
     
     def listar_etapas_salvas(self, session_id: str = None) -> Dict[str, Any]:
         """Lista todas as etapas salvas de uma sessão"""
@@ -201,29 +633,19 @@ class AutoSaveManager:
         
         etapas_encontradas = {}
         
-        for categoria, subdir in self.subdirs.items():
-            session_dir = subdir / session_id
-            if session_dir.exists():
-                for filepath in session_dir.glob("*.json"):
-                    try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
-                        
-                        etapa = data.get("etapa", "unknown")
-                        if etapa not in etapas_encontradas:
-                            etapas_encontradas[etapa] = []
-                        
-                        etapas_encontradas[etapa].append({
-                            "arquivo": str(filepath),
-                            "status": data.get("status"),
-                            "timestamp": data.get("timestamp"),
-                            "categoria": categoria,
-                            "tamanho": data.get("tamanho_dados", 0)
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao ler {filepath}: {e}")
-                        continue
+        self.flush()
+        self._sincronizar_indice(session_id)
+        
+        for entrada in session_index.listar_registros(session_id):
+            etapas_encontradas.setdefault(entrada["etapa"], []).append({
+                "arquivo": entrada["arquivo"],
+                "offset": entrada["offset"],
+                "comprimento": entrada["comprimento"],
+                "status": entrada["status"],
+                "timestamp": entrada["timestamp"],
+                "categoria": entrada["categoria"],
+                "tamanho": entrada["tamanho_dados"] or 0
+            })
         
         return etapas_encontradas
     
@@ -231,12 +653,15 @@ class AutoSaveManager:
         """Consolida todas as etapas de uma sessão em um relatório final"""
         
         session_id = session_id or self.session_id
+        
+        # Barreira: tudo que foi salvo até aqui precisa estar em disco
+        self.flush()
         etapas = self.listar_etapas_salvas(session_id)
         
         # Recupera dados de cada etapa
         relatorio_consolidado = {
             "session_id": session_id,
-            "analysis_id": self.analysis_id,
+            "analysis_id": self._analysis_id_de(session_id),
             "consolidado_em": datetime.now().isoformat(),
             "etapas_processadas": {},
             "estatisticas": {
@@ -249,11 +674,10 @@ class AutoSaveManager:
         
         for etapa_nome, arquivos in etapas.items():
             # Pega o arquivo mais recente de cada etapa
-            arquivo_mais_recente = max(arquivos, key=lambda x: x["timestamp"])
+            arquivo_mais_recente = max(arquivos, key=lambda x: x["timestamp"] or 0)
             
             try:
-                with open(arquivo_mais_recente["arquivo"], "r", encoding="utf-8") as f:
-                    dados_etapa = json.load(f)
+                dados_etapa = self._carregar_registro(arquivo_mais_recente)
                 
                 relatorio_consolidado["etapas_processadas"][etapa_nome] = dados_etapa
                 
@@ -277,6 +701,9 @@ class AutoSaveManager:
         with open(relatorio_path, "w", encoding="utf-8") as f:
             json.dump(relatorio_consolidado, f, ensure_ascii=False, indent=2, default=str)
         
+        if session_id:
+            self.registrar_arquivo(session_id, str(relatorio_path), "analise_completa")
+        
         logger.info(f"📋 Relatório consolidado salvo: {relatorio_path}")
         return str(relatorio_path)
     
@@ -289,6 +716,9 @@ class AutoSaveManager:
             with gzip.open(backup_path, 'wt', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2, default=str)
             
+            if data.get("session_id"):
+                self.registrar_arquivo(data["session_id"], str(backup_path), data.get("categoria"))
+            
             logger.info(f"🗜️ Backup compactado salvo: {backup_path}")
             
         except Exception as e:
@@ -314,9 +744,20 @@ class AutoSaveManager:
                         # Verifica se é mais antiga que o cutoff
                         if session_dir.stat().st_mtime < cutoff_time:
                             shutil.rmtree(session_dir)
+                            session_index.remover_sessao(session_dir.name)
                             removidas += 1
                             logger.info(f"🗑️ Sessão antiga removida: {session_dir}")
             
+            # Journals por sessão (diretórios na raiz que não são categorias)
+            categorias = set(self.subdirs.values())
+            for session_dir in self.base_dir.iterdir():
+                if session_dir.is_dir() and session_dir not in categorias:
+                    if session_dir.stat().st_mtime < cutoff_time:
+                        shutil.rmtree(session_dir)
+                        session_index.remover_sessao(session_dir.name)
+                        removidas += 1
+                        logger.info(f"🗑️ Sessão antiga removida: {session_dir}")
+            
             logger.info(f"🧹 Limpeza concluída: {removidas} sessões antigas removidas")
             
         except Exception as e:
@@ -326,10 +767,16 @@ class AutoSaveManager:
 auto_save_manager = AutoSaveManager()
 
 # Função de conveniência
-def salvar_etapa(nome_etapa: str, dados: Any, status: str = "sucesso", categoria: str = "geral") -> str:
+def salvar_etapa(
+    nome_etapa: str,
+    dados: Any,
+    status: str = "sucesso",
+    categoria: str = "geral",
+    session_id: Optional[str] = None
+) -> str:
     """Função de conveniência para salvamento rápido"""
-    return auto_save_manager.salvar_etapa(nome_etapa, dados, status, categoria=categoria)
+    return auto_save_manager.salvar_etapa(nome_etapa, dados, status, categoria=categoria, session_id=session_id)
 
-def salvar_erro(etapa: str, erro: Exception, contexto: Dict[str, Any] = None) -> str:
+def salvar_erro(etapa: str, erro: Exception, contexto: Dict[str, Any] = None, session_id: Optional[str] = None) -> str:
     """Função de conveniência para salvamento de erros"""
-    return auto_save_manager.salvar_erro(etapa, erro, contexto)
\ No newline at end of file
+    return auto_save_manager.salvar_erro(etapa, erro, contexto, session_id=session_id)
\ No newline at end of file
@@ -5,9 +5,12 @@ ARQV30 Enhanced v2.0 - Component Orchestrator
 Orquestrador seguro de componentes com validação rigorosa
 """
 
+import os
 import logging
 import time
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 
@@ -20,13 +23,14 @@ class ComponentValidationError(Exception):
 class ComponentOrchestrator:
     """Orquestrador seguro de componentes da análise"""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
         """Inicializa o orquestrador"""
         self.component_registry = {}
         self.execution_order = []
         self.validation_rules = {}
         self.component_results = {}
         self.execution_stats = {}
+        self.max_workers = max_workers or int(os.getenv('COMPONENT_MAX_WORKERS', '4'))
         
         logger.info("Component Orchestrator inicializado")
     
@@ -36,7 +40,9 @@ class ComponentOrchestrator:
         executor: Callable,
         dependencies: List[str] = None,
         validation_rules: Dict[str, Any] = None,
-        required: bool = True
+        required: bool = True,
+        timeout: Optional[float] = None,
+        fallback: Optional[Callable] = None
     ):
         """Registra um componente no orquestrador"""
         
@@ -45,6 +51,8 @@ class ComponentOrchestrator:
             'dependencies': dependencies or [],
             'validation_rules': validation_rules or {},
             'required': required,
+            'timeout': timeout,
+            'fallback': fallback,
             'status': 'pending'
         }
         
@@ -56,59 +64,144 @@ class ComponentOrchestrator:
     def execute_components(
         self, 
         input_data: Dict[str, Any],
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        result_callback: Optional[Callable[[str, Any, bool], None]] = None
     ) -> Dict[str, Any]:
-        """Executa todos os componentes registrados em ordem"""
+        """
+        Executa os componentes respeitando o grafo de dependências.
+        
+        Componentes sem dependências pendentes rodam em paralelo (até
+        `max_workers`). Timeout, erro ou resultado inválido acionam o fallback
+        do componente, se houver; dependentes de um componente falho também
+        recorrem ao próprio fallback. Um componente que estoura o timeout não
+        é interrompido: sua thread termina em segundo plano e o resultado é
+        descartado.
+        
+        `result_callback(nome, resultado, usou_fallback)` é chamado na thread
+        do chamador a cada componente concluído.
+        """
         
         logger.info(f"🚀 Iniciando execução de {len(self.component_registry)} componentes")
+        self._check_dependency_graph()
         start_time = time.time()
         
         successful_components = {}
         failed_components = {}
+        timings = {}
+        remaining = list(self.execution_order)
+        running = {}
+        started_count = 0
         
-        for i, component_name in enumerate(self.execution_order):
-            if progress_callback:
-                progress_callback(i + 1, f"Executando {component_name}...")
+        def _finish(component_name: str, result: Any, error: Optional[str], used_fallback: bool = False, timed_out: bool = False):
+            timing = timings.setdefault(component_name, {'start': time.time() - start_time})
+            timing['end'] = time.time() - start_time
+            timing['duration'] = timing['end'] - timing['start']
+            timing['used_fallback'] = used_fallback
+            timing['timed_out'] = timed_out
             
-            try:
-                # Verifica dependências
-                if not self._check_dependencies(component_name):
-                    error_msg = f"Dependências não atendidas para {component_name}"
-                    logger.error(f"❌ {error_msg}")
-                    failed_components[component_name] = error_msg
-                    self._mark_component_failed(component_name, error_msg)
-                    continue
-                
-                # Executa componente
-                result = self._execute_single_component(component_name, input_data, successful_components)
-                
-                if result is not None:
-                    # Valida resultado
-                    if self._validate_component_result(component_name, result):
-                        successful_components[component_name] = result
-                        self._mark_component_successful(component_name, result)
-                        logger.info(f"✅ Componente {component_name} executado com sucesso")
-                    else:
-                        error_msg = f"Resultado inválido para {component_name}"
-                        logger.error(f"❌ {error_msg}")
-                        failed_components[component_name] = error_msg
-                        self._mark_component_failed(component_name, error_msg)
-                else:
-                    error_msg = f"Componente {component_name} retornou None"
-                    logger.error(f"❌ {error_msg}")
-                    failed_components[component_name] = error_msg
-                    self._mark_component_failed(component_name, error_msg)
-                
-            except Exception as e:
-                error_msg = f"Erro na execução de {component_name}: {str(e)}"
-                logger.error(f"❌ {error_msg}")
-                failed_components[component_name] = error_msg
-                self._mark_component_failed(component_name, error_msg)
+            if error is None:
+                successful_components[component_name] = result
+                self._mark_component_successful(component_name, result)
+                logger.info(f"✅ Componente {component_name} executado com sucesso{' (fallback)' if used_fallback else ''}")
+                if result_callback:
+                    try:
+                        result_callback(component_name, result, used_fallback)
+                    except Exception as e:
+                        logger.error(f"❌ Erro no callback de resultado de {component_name}: {e}")
+            else:
+                logger.error(f"❌ {error}")
+                failed_components[component_name] = error
+                self._mark_component_failed(component_name, error)
                 
                 # Se é componente obrigatório, pode interromper
                 if self.component_registry[component_name]['required']:
                     logger.error(f"🚨 Componente obrigatório {component_name} falhou - análise comprometida")
         
+        def _fail_or_fallback(component_name: str, error_msg: str, execution_data: Dict[str, Any], timed_out: bool = False):
+            fallback = self.component_registry[component_name]['fallback']
+            if fallback:
+                logger.warning(f"🔄 {error_msg} - usando fallback")
+                try:
+                    result = fallback(execution_data)
+                    if result is not None:
+                        _finish(component_name, result, None, used_fallback=True, timed_out=timed_out)
+                        return
+                except Exception as e:
+                    error_msg = f"{error_msg}; fallback falhou: {str(e)}"
+            _finish(component_name, None, error_msg, timed_out=timed_out)
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_workers))
+        try:
+            while remaining or running:
+                # Agenda todos os componentes cujas dependências já foram resolvidas
+                for component_name in list(remaining):
+                    dependencies = self.component_registry[component_name]['dependencies']
+                    if any(dep not in successful_components and dep not in failed_components for dep in dependencies):
+                        continue
+                
+                    remaining.remove(component_name)
+                    execution_data = self._build_execution_data(component_name, input_data, successful_components)
+                    timings[component_name] = {'start': time.time() - start_time}
+                
+                    if not self._check_dependencies(component_name):
+                        _fail_or_fallback(component_name, f"Dependências não atendidas para {component_name}", execution_data)
+                        continue
+                
+                    started_count += 1
+                    if progress_callback:
+                        progress_callback(started_count, f"Executando {component_name}...")
+                
+                    timeout = self.component_registry[component_name]['timeout']
+                    # Contexto da análise (sessão do auto save) propagado para a thread do componente
+                    future = executor.submit(
+                        contextvars.copy_context().run, self._execute_single_component, component_name, execution_data
+                    )
+                    running[future] = {
+                        'name': component_name,
+                        'data': execution_data,
+                        'deadline': time.time() + timeout if timeout else None
+                    }
+            
+                if not running:
+                    continue
+            
+                deadlines = [info['deadline'] for info in running.values() if info['deadline']]
+                wait_timeout = max(0.0, min(deadlines) - time.time()) if deadlines else None
+                done, _ = wait(list(running.keys()), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            
+                for future in done:
+                    info = running.pop(future)
+                    component_name = info['name']
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        _fail_or_fallback(component_name, f"Erro na execução de {component_name}: {str(e)}", info['data'])
+                        continue
+                
+                    if result is None:
+                        _fail_or_fallback(component_name, f"Componente {component_name} retornou None", info['data'])
+                    elif not self._validate_component_result(component_name, result):
+                        _fail_or_fallback(component_name, f"Resultado inválido para {component_name}", info['data'])
+                    else:
+                        _finish(component_name, result, None)
+            
+                # Componentes que estouraram o timeout
+                now = time.time()
+                for future, info in list(running.items()):
+                    if info['deadline'] and now >= info['deadline']:
+                        running.pop(future)
+                        future.cancel()
+                        component_name = info['name']
+                        timeout = self.component_registry[component_name]['timeout']
+                        self.execution_stats[component_name] = {
+                            'execution_time': timeout,
+                            'status': 'timeout'
+                        }
+                        _fail_or_fallback(component_name, f"Timeout de {timeout}s em {component_name}", info['data'], timed_out=True)
+        finally:
+            # Não aguarda threads de componentes que estouraram o timeout
+            executor.shutdown(wait=False)
+        
         execution_time = time.time() - start_time
         
         # Gera relatório final
@@ -119,17 +212,57 @@ class ComponentOrchestrator:
                 'total_components': len(self.component_registry),
                 'successful_count': len(successful_components),
                 'failed_count': len(failed_components),
-                'success_rate': (len(successful_components) / len(self.component_registry)) * 100,
+                'success_rate': (len(successful_components) / len(self.component_registry)) * 100 if self.component_registry else 0,
                 'execution_time': execution_time,
                 'timestamp': datetime.now().isoformat()
             },
-            'component_details': self.execution_stats
+            'component_details': self.execution_stats,
+            'critical_path': self._build_critical_path_report(timings, execution_time)
         }
         
+        critical = execution_report['critical_path']
         logger.info(f"📊 Execução concluída: {len(successful_components)}/{len(self.component_registry)} componentes bem-sucedidos")
+        logger.info(f"⏱️ Caminho crítico ({critical['duration']:.1f}s): {' -> '.join(critical['path'])}")
         
         return execution_report
     
+    def _check_dependency_graph(self):
+        """Valida dependências declaradas (inexistentes ou cíclicas)"""
+        
+        for name, component in self.component_registry.items():
+            for dependency in component['dependencies']:
+                if dependency not in self.component_registry:
+                    raise ComponentValidationError(f"Dependência desconhecida '{dependency}' em {name}")
+        
+        visiting, visited = set(), set()
+        
+        def _visit(name: str, path: List[str]):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ComponentValidationError(f"Dependência cíclica: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.component_registry[name]['dependencies']:
+                _visit(dependency, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+        
+        for name in self.execution_order:
+            _visit(name, [])
+    
+    def dependents_of(self, names) -> set:
+        """Componentes que dependem (direta ou indiretamente) de algum de `names`"""
+        
+        affected = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, component in self.component_registry.items():
+                if name not in affected and affected.intersection(component['dependencies']):
+                    affected.add(name)
+                    changed = True
+        return affected - set(names)
+    
     def _check_dependencies(self, component_name: str) -> bool:
         """Verifica se as dependências de um componente foram atendidas"""
         
@@ -143,11 +276,25 @@ class ComponentOrchestrator:
         
         return True
     
+    def _build_execution_data(
+        self,
+        component_name: str,
+        input_data: Dict[str, Any],
+        previous_results: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Prepara dados de entrada incluindo resultados das dependências"""
+        
+        dependencies = self.component_registry[component_name]['dependencies']
+        return {
+            **input_data,
+            **{dep: previous_results[dep] for dep in dependencies if dep in previous_results},
+            'previous_results': dict(previous_results)
+        }
+    
     def _execute_single_component(
         self, 
         component_name: str, 
-        input_data: Dict[str, Any],
-        previous_results: Dict[str, Any]
+        execution_data: Dict[str, Any]
     ) -> Any:
         """Executa um único componente"""
         
@@ -157,17 +304,15 @@ class ComponentOrchestrator:
         start_time = time.time()
         
         try:
-            # Prepara dados de entrada incluindo resultados anteriores
-            execution_data = {
-                **input_data,
-                'previous_results': previous_results
-            }
-            
             # Executa o componente
             result = executor(execution_data)
             
             execution_time = time.time() - start_time
             
+            # Componente já descartado por timeout: mantém o registro do timeout
+            if self.execution_stats.get(component_name, {}).get('status') == 'timeout':
+                return result
+            
             # Registra estatísticas
             self.execution_stats[component_name] = {
                 'execution_time': execution_time,
@@ -188,6 +333,42 @@ class ComponentOrchestrator:
             
             raise e
     
+    def _build_critical_path_report(self, timings: Dict[str, Dict[str, Any]], execution_time: float) -> Dict[str, Any]:
+        """Calcula o caminho crítico (cadeia de dependências que define o tempo total)"""
+        
+        finished = {name: t for name, t in timings.items() if 'end' in t}
+        if not finished:
+            return {'path': [], 'duration': 0.0, 'components': {}, 'parallelism': 0.0}
+        
+        # Parte do último componente a terminar e segue a dependência que terminou por último
+        path = []
+        current = max(finished, key=lambda name: finished[name]['end'])
+        while current:
+            path.append(current)
+            dependencies = [dep for dep in self.component_registry[current]['dependencies'] if dep in finished]
+            current = max(dependencies, key=lambda name: finished[name]['end']) if dependencies else None
+        path.reverse()
+        
+        busy_time = sum(t['duration'] for t in finished.values())
+        
+        return {
+            'path': path,
+            'duration': round(sum(finished[name]['duration'] for name in path), 2),
+            'wall_time': round(execution_time, 2),
+            'parallelism': round(busy_time / execution_time, 2) if execution_time > 0 else 0.0,
+            'components': {
+                name: {
+                    'start': round(t['start'], 2),
+                    'end': round(t['end'], 2),
+                    'duration': round(t['duration'], 2),
+                    'used_fallback': t.get('used_fallback', False),
+                    'timed_out': t.get('timed_out', False),
+                    'on_critical_path': name in path
+                }
+                for name, t in sorted(finished.items(), key=lambda item: item[1]['start'])
+            }
+        }
+    
     def _validate_component_result(self, component_name: str, result: Any) -> bool:
         """Valida o resultado de um componente"""
         
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Concurrent Research Stage
+Estágio concorrente de busca + extração com limites por domínio e prazo global
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable
+from urllib.parse import urlparse
+
+from services.url_resolver import url_resolver
+from services.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+class ConcurrentResearchStage:
+    """Executa buscas e extrações em paralelo de forma limitada"""
+
+    def __init__(self):
+        """Inicializa o estágio concorrente"""
+        self.max_in_flight = int(os.getenv('RESEARCH_MAX_IN_FLIGHT', '8'))
+        self.max_concurrent_searches = int(os.getenv('RESEARCH_MAX_CONCURRENT_SEARCHES', '3'))
+        self.per_domain_limit = int(os.getenv('RESEARCH_PER_DOMAIN_LIMIT', '2'))
+        self.deadline_seconds = float(os.getenv('RESEARCH_DEADLINE_SECONDS', '240'))
+        self.max_urls_per_query = 8
+
+        logger.info(
+            f"⚡ Concurrent Research Stage inicializado "
+            f"(in-flight={self.max_in_flight}, por domínio={self.per_domain_limit}, prazo={self.deadline_seconds:.0f}s)"
+        )
+
+    def run(
+        self,
+        queries: List[str],
+        search_fn: Callable[[str], List[Dict[str, Any]]],
+        extract_fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        deadline_seconds: Optional[float] = None,
+        on_extracted: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+        dedup: Optional[Any] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa todas as queries e extrai as URLs encontradas em paralelo.
+
+        `search_fn(query)` retorna a lista de resultados de busca e
+        `extract_fn(result)` retorna o item extraído (ou None se rejeitado).
+        Ao atingir o prazo, retorna o que já foi concluído e descarta o restante.
+        Com `dedup` (DedupRun do content_dedup), URLs repetidas ou já conhecidas
+        como cópia de conteúdo desta execução não são extraídas. `deadline`
+        (prazo do chamador) limita o prazo do estágio; o chamador deve passá-lo
+        também às extrações para que elas parem junto com o estágio.
+
+        As buscas rodam em um executor próprio (RESEARCH_MAX_CONCURRENT_SEARCHES)
+        e não ocupam as vagas de extração (RESEARCH_MAX_IN_FLIGHT).
+        """
+
+        budget = deadline_seconds if deadline_seconds is not None else self.deadline_seconds
+        start_time = time.time()
+        stage_deadline = Deadline.within(budget, parent=deadline)
+        stop_event = threading.Event()
+
+        all_results: List[Dict[str, Any]] = []
+        extracted: List[Dict[str, Any]] = []
+        seen_urls = set()
+        stats = {
+            'searches_ok': 0,
+            'searches_failed': 0,
+            'extractions_submitted': 0,
+            'extractions_ok': 0,
+            'extractions_rejected': 0,
+            'extractions_failed': 0,
+            'cancelled': 0,
+            'skipped_duplicates': 0,
+            'deadline_hit': False
+        }
+
+        def _remaining() -> float:
+            return stage_deadline.remaining()
+
+        def _run_search(query: str) -> List[Dict[str, Any]]:
+            if stop_event.is_set():
+                return []
+            return search_fn(query) or []
+
+        def _run_extraction(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if stop_event.is_set():
+                return None
+            return extract_fn(result)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_in_flight))
+        search_executor = ThreadPoolExecutor(max_workers=max(1, self.max_concurrent_searches))
+        pending = {}
+        domain_active: Dict[str, int] = {}
+        deferred = deque()
+
+        def _submit_extraction(result: Dict[str, Any], domain: str):
+            domain_active[domain] = domain_active.get(domain, 0) + 1
+            pending[executor.submit(contextvars.copy_context().run, _run_extraction, result)] = ('extract', result, domain)
+
+        def _schedule_extraction(result: Dict[str, Any]):
+            domain = self._get_domain(result.get('url', ''))
+            if domain_active.get(domain, 0) < self.per_domain_limit:
+                _submit_extraction(result, domain)
+            else:
+                deferred.append((result, domain))
+
+        def _release_domain(domain: str):
+            domain_active[domain] = max(0, domain_active.get(domain, 1) - 1)
+            # Libera a próxima URL adiada do mesmo domínio (ordem preservada)
+            for idx, (queued_result, queued_domain) in enumerate(deferred):
+                if queued_domain == domain:
+                    del deferred[idx]
+                    _submit_extraction(queued_result, queued_domain)
+                    break
+
+        try:
+            for query in queries:
+                pending[search_executor.submit(contextvars.copy_context().run, _run_search, query)] = ('search', query, None)
+
+            while pending:
+                remaining = _remaining()
+                if remaining <= 0:
+                    stats['deadline_hit'] = True
+                    break
+
+                done, _ = wait(list(pending.keys()), timeout=remaining, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    kind, payload, domain = pending.pop(future)
+
+                    if kind == 'search':
+                        try:
+                            search_results = future.result()
+                        except Exception as e:
+                            stats['searches_failed'] += 1
+                            logger.error(f"❌ Erro na query '{payload}': {str(e)}")
+                            continue
+
+                        if not search_results:
+                            logger.warning(f"⚠️ Query '{payload}' retornou 0 resultados")
+                            continue
+
+                        stats['searches_ok'] += 1
+                        all_results.extend(search_results)
+
+                        for result in search_results[:self.max_urls_per_query]:
+                            url = result.get('url')
+                            if not url:
+                                continue
+                            if dedup is not None:
+                                if dedup.check_url(url):
+                                    stats['skipped_duplicates'] += 1
+                                    continue
+                            else:
+                                # Compara URLs canônicas (sem rastreamento, redirecionadores decodificados)
+                                url_key = url_resolver.canonical_key(url)
+                                if url_key in seen_urls:
+                                    continue
+                                seen_urls.add(url_key)
+                            stats['extractions_submitted'] += 1
+                            _schedule_extraction(result)
+                    else:
+                        _release_domain(domain)
+                        try:
+                            item = future.result()
+                        except Exception as e:
+                            stats['extractions_failed'] += 1
+                            logger.error(f"❌ Erro ao extrair {payload.get('url')}: {str(e)}")
+                            continue
+
+                        if not item:
+                            stats['extractions_rejected'] += 1
+                            continue
+
+                        stats['extractions_ok'] += 1
+                        extracted.append(item)
+                        if on_extracted:
+                            on_extracted(len(extracted), item)
+
+        finally:
+            # Encerra o estágio: tarefas ainda não iniciadas saem imediatamente
+            stop_event.set()
+            for future in pending:
+                if future.cancel():
+                    stats['cancelled'] += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+            search_executor.shutdown(wait=False, cancel_futures=True)
+
+        if stats['deadline_hit']:
+            logger.warning(
+                f"⏰ Prazo de {budget:.0f}s atingido na pesquisa - retornando resultados parciais "
+                f"({len(extracted)} extrações, {len(pending) + len(deferred)} tarefas descartadas)"
+            )
+
+        stats['discarded'] = len(pending) + len(deferred)
+        stats['elapsed_seconds'] = round(time.time() - start_time, 2)
+        stats['deadline_seconds'] = budget
+        stats['partial'] = stats['deadline_hit']
+
+        return {
+            'search_results': all_results,
+            'extracted_content': extracted,
+            'stats': stats
+        }
+
+    def _get_domain(self, url: str) -> str:
+        """Extrai o domínio usado para o limite de concorrência"""
+        try:
+            return urlparse(url).netloc.lower().replace('www.', '')
+        except Exception:
+            return ''
+
+# Instância global
+concurrent_research_stage = ConcurrentResearchStage()
@@ -116,11 +116,11 @@ class ConsolidacaoFinal:
         }
         
         try:
-            # Coleta etapas salvas
+            # Coleta etapas salvas (índice da sessão)
             etapas_salvas = auto_save_manager.listar_etapas_salvas(session_id)
             dados_coletados['etapas_salvas'] = etapas_salvas
             
-            # Recupera dados de cada etapa
+            # Recupera dados de cada etapa (leitura direta pelo índice)
             for etapa_nome in etapas_salvas.keys():
                 try:
                     dados_etapa = auto_save_manager.recuperar_etapa(etapa_nome, session_id)
@@ -136,6 +136,8 @@ class ConsolidacaoFinal:
             
             logger.info(f"📊 Dados coletados: {len(dados_coletados['componentes_disponiveis'])} componentes, {len(dados_coletados['arquivos_encontrados'])} arquivos")
             
+            return dados_coletados
+            
         except Exception as e:
             logger.error(f"❌ Erro ao coletar dados: {e}")
             salvar_erro("coleta_dados", e)
@@ -433,21 +435,10 @@ class ConsolidacaoFinal:
         """Lista todos os arquivos intermediários salvos"""
         
         arquivos = []
-        base_dir = Path("relatorios_intermediarios")
         
         try:
-            # Busca em todos os subdiretórios
-            for subdir in base_dir.iterdir():
-                if subdir.is_dir():
-                    for arquivo in subdir.rglob("*"):
-                        if arquivo.is_file() and session_id in arquivo.name:
-                            arquivos.append({
-                                'nome': arquivo.name,
-                                'caminho': str(arquivo),
-                                'tamanho': arquivo.stat().st_size,
-                                'categoria': subdir.name,
-                                'modificado': datetime.fromtimestamp(arquivo.stat().st_mtime).isoformat()
-                            })
+            # Arquivos registrados no índice da sessão
+            arquivos = auto_save_manager.listar_arquivos_sessao(session_id)
         
         except Exception as e:
             logger.error(f"❌ Erro ao listar arquivos intermediários: {e}")
@@ -646,6 +637,8 @@ GARANTIA:
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(conteudo)
             
+            auto_save_manager.registrar_arquivo(session_id, str(filepath), 'analise_completa')
+            
             return str(filepath)
             
         except Exception as e:
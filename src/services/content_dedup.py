@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Content Dedup
+Deduplicação de URLs e conteúdo entre execuções: filtro de Bloom de URLs
+canônicas e impressões digitais SimHash do texto extraído, por segmento
+"""
+
+import os
+import re
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.url_resolver import url_resolver
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+SIMHASH_BITS = 64
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def simhash(text: str, shingle_size: int = 3, max_words: int = 3000) -> Optional[int]:
+    """SimHash de 64 bits sobre shingles de palavras (None para textos curtos demais)"""
+    words = WORD_PATTERN.findall((text or '').lower())[:max_words]
+    if len(words) < shingle_size * 10:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    for shingle in shingles:
+        h = _hash64(shingle)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def _to_signed(value: int) -> int:
+    """SQLite guarda inteiros de 64 bits com sinal"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+class BloomFilter:
+    """Filtro de Bloom (bytearray + hashing duplo): sem falsos negativos"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class DedupRun:
+    """
+    Estado de deduplicação de uma execução (pesquisa de uma análise).
+
+    check_url é chamado antes da extração: rejeita URLs canônicas repetidas e
+    URLs que, em execuções recentes do segmento, tinham texto quase idêntico a
+    algo já extraído nesta execução. check_content é chamado depois da
+    extração (antes do empacotamento de contexto): rejeita cópias sindicadas
+    sob outra URL e registra a impressão digital para as próximas execuções.
+    """
+
+    def __init__(self, service: 'ContentDedup', segment: str):
+        self.service = service
+        self.segment = segment
+        self._lock = threading.Lock()
+        self._url_keys = set()
+        self._fingerprints: List[Tuple[int, str]] = []
+        self.stats = {
+            'urls_checked': 0,
+            'duplicate_urls': 0,
+            'skipped_before_extraction': 0,
+            'contents_checked': 0,
+            'near_duplicates': 0
+        }
+
+    def _near_duplicate(self, fingerprint: int) -> Optional[str]:
+        for other, url in self._fingerprints:
+            if hamming_distance(fingerprint, other) <= self.service.max_distance:
+                return url
+        return None
+
+    def check_url(self, url: str) -> Optional[str]:
+        """Motivo para não extrair a URL ('url' ou 'near_duplicate'), ou None"""
+        url_key = url_resolver.canonical_key(url)
+        with self._lock:
+            self.stats['urls_checked'] += 1
+            if url_key in self._url_keys:
+                self.stats['duplicate_urls'] += 1
+                return 'url'
+            self._url_keys.add(url_key)
+
+        known = self.service.known_fingerprint(self.segment, url_key)
+        if known is not None:
+            with self._lock:
+                duplicate_of = self._near_duplicate(known)
+                if duplicate_of:
+                    self.stats['skipped_before_extraction'] += 1
+                    logger.info(f"♻️ Extração evitada: {url} repetia {duplicate_of} em execuções anteriores")
+                    return 'near_duplicate'
+        return None
+
+    def check_content(self, url: str, text: str) -> Optional[str]:
+        """URL já aceita nesta execução com texto quase idêntico, ou None (conteúdo novo)"""
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return None
+        url_key = url_resolver.canonical_key(url)
+        with self._lock:
+            self.stats['contents_checked'] += 1
+            duplicate_of = self._near_duplicate(fingerprint)
+            if duplicate_of:
+                self.stats['near_duplicates'] += 1
+            else:
+                self._fingerprints.append((fingerprint, url))
+
+        # Duplicatas também são registradas: na próxima execução são evitadas antes do download
+        self.service.record(self.segment, url_key, fingerprint, duplicate_of)
+        if duplicate_of:
+            logger.info(f"♻️ Conteúdo quase idêntico descartado: {url} ~ {duplicate_of}")
+        return duplicate_of
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'segment': self.segment, 'unique_contents': len(self._fingerprints)}
+
+class ContentDedup:
+    """Impressões digitais persistidas (SQLite) + filtro de Bloom das URLs conhecidas"""
+
+    def __init__(self):
+        """Inicializa o serviço de deduplicação"""
+        self.enabled = os.getenv('CONTENT_DEDUP_ENABLED', 'true').lower() == 'true'
+        self.db_path = Path(os.getenv(
+            'CONTENT_DEDUP_PATH',
+            os.path.join(os.getenv('EXTRACTION_CACHE_DIR', 'cache_extracao'), 'content_dedup.db')
+        ))
+        self.window_seconds = float(os.getenv('CONTENT_DEDUP_WINDOW_DAYS', '14')) * 86400
+        self.max_distance = int(os.getenv('CONTENT_DEDUP_SIMHASH_DISTANCE', '3'))
+        self.bloom_capacity = int(os.getenv('CONTENT_DEDUP_BLOOM_CAPACITY', '200000'))
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._bloom: Optional[BloomFilter] = None
+        self._bloom_rowid = 0
+
+        self.stats = {
+            'runs': 0,
+            'lookups': 0,
+            'bloom_negatives': 0,
+            'records': 0,
+            'errors': 0
+        }
+
+        if self.enabled:
+            try:
+                self._db()
+                logger.info(f"♻️ Content Dedup inicializado em {self.db_path}")
+            except Exception as e:
+                self.enabled = False
+                logger.error(f"❌ Deduplicação entre execuções desabilitada: {e}")
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS seen_content (
+                    segment TEXT NOT NULL,
+                    url_key TEXT NOT NULL,
+                    simhash INTEGER NOT NULL,
+                    duplicate_of TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (segment, url_key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_seen_content_created ON seen_content(created_at);
+            ''')
+            self._conn.commit()
+            # Filtro reconstruído a partir do banco (inclui gravações de outros workers)
+            self._bloom = None
+            self._bloom_rowid = 0
+        return self._conn
+
+    @staticmethod
+    def normalize_segment(segment: Optional[str]) -> str:
+        return ' '.join((segment or '').lower().split())
+
+    def _refresh_bloom(self, conn: sqlite3.Connection):
+        """Adiciona ao filtro as URLs gravadas desde a última atualização"""
+        if self._bloom is None:
+            self._bloom = BloomFilter(self.bloom_capacity)
+            self._bloom_rowid = 0
+        rows = conn.execute(
+            'SELECT rowid, segment, url_key FROM seen_content WHERE rowid > ? AND created_at >= ? ORDER BY rowid',
+            (self._bloom_rowid, time.time() - self.window_seconds)
+        ).fetchall()
+        for rowid, segment, url_key in rows:
+            self._bloom.add(f"{segment}|{url_key}")
+            self._bloom_rowid = rowid
+
+    def start_run(self, segment: Optional[str]) -> DedupRun:
+        """Nova execução para o segmento (remove registros fora da janela)"""
+        segment = self.normalize_segment(segment)
+        self.stats['runs'] += 1
+        if self.enabled:
+            try:
+                with self._lock:
+                    conn = self._db()
+                    conn.execute('DELETE FROM seen_content WHERE created_at < ?', (time.time() - self.window_seconds,))
+                    conn.commit()
+                    if self._bloom is not None and self._bloom.count > self.bloom_capacity:
+                        self._bloom = None  # Filtro saturado: reconstrói só com a janela atual
+                    self._refresh_bloom(conn)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"❌ Erro ao preparar deduplicação: {e}")
+        return DedupRun(self, segment)
+
+    def known_fingerprint(self, segment: str, url_key: str) -> Optional[int]:
+        """Impressão digital da URL em execuções recentes do segmento"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                if self._bloom is None or f"{segment}|{url_key}" not in self._bloom:
+                    self.stats['bloom_negatives'] += 1
+                    return None
+                self.stats['lookups'] += 1
+                row = self._db().execute(
+                    'SELECT simhash FROM seen_content WHERE segment = ? AND url_key = ? AND created_at >= ?',
+                    (segment, url_key, time.time() - self.window_seconds)
+                ).fetchone()
+            return _to_unsigned(row[0]) if row else None
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao consultar deduplicação: {e}")
+            return None
+
+    def record(self, segment: str, url_key: str, fingerprint: int, duplicate_of: Optional[str] = None):
+        """Grava a impressão digital do conteúdo extraído"""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    'INSERT OR REPLACE INTO seen_content (segment, url_key, simhash, duplicate_of, created_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (segment, url_key, _to_signed(fingerprint), duplicate_of, time.time())
+                )
+                conn.commit()
+                if self._bloom is not None:
+                    self._bloom.add(f"{segment}|{url_key}")
+                self.stats['records'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao registrar deduplicação: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores do serviço e ocupação do filtro de Bloom"""
+        return {
+            **self.stats,
+            'enabled': self.enabled,
+            'bloom_entries': self._bloom.count if self._bloom is not None else 0,
+            'window_days': self.window_seconds / 86400,
+            'max_distance': self.max_distance
+        }
+
+# Instância global
+content_dedup = ContentDedup()
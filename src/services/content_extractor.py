@@ -12,6 +12,7 @@ import requests
 from typing import Optional, Dict, Any
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
+from services.parsed_document import ParsedDocument
 import re
 
 logger = logging.getLogger(__name__)
@@ -264,60 +265,12 @@ class ContentExtractor:
         
         return cleaned_text.strip()
     
-    def extract_metadata(self, url: str) -> Dict[str, Any]:
-        """Extrai metadados da página"""
+    def extract_metadata(self, url: str, document: Optional[ParsedDocument] = None) -> Dict[str, Any]:
+        """Extrai metadados da página (reaproveita `document` se já analisado)"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=15,
-                allow_redirects=True
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, "html.parser")
-                
-                metadata = {
-                    'title': '',
-                    'description': '',
-                    'keywords': '',
-                    'author': '',
-                    'published_date': '',
-                    'language': '',
-                    'canonical_url': url
-                }
-                
-                # Título
-                title_tag = soup.find('title')
-                if title_tag:
-                    metadata['title'] = title_tag.get_text().strip()
-                
-                # Meta tags
-                meta_tags = soup.find_all('meta')
-                for tag in meta_tags:
-                    name = tag.get('name', '').lower()
-                    property_attr = tag.get('property', '').lower()
-                    content = tag.get('content', '')
-                    
-                    if name == 'description' or property_attr == 'og:description':
-                        metadata['description'] = content
-                    elif name == 'keywords':
-                        metadata['keywords'] = content
-                    elif name == 'author':
-                        metadata['author'] = content
-                    elif name == 'language' or name == 'lang':
-                        metadata['language'] = content
-                    elif property_attr == 'article:published_time':
-                        metadata['published_date'] = content
-                
-                # URL canônica
-                canonical = soup.find('link', rel='canonical')
-                if canonical:
-                    metadata['canonical_url'] = canonical.get('href', url)
-                
-                return metadata
-            else:
-                return {'error': f'HTTP {response.status_code}'}
+            if document is None:
+                document = self._fetch_document(url)
+            return document.metadata()
                 
         except Exception as e:
             return {'error': str(e)}
@@ -339,48 +292,29 @@ class ContentExtractor:
         relevance_threshold = len(keywords) * 0.3
         return matches >= relevance_threshold
     
-    def extract_links(self, url: str, internal_only: bool = True) -> list:
-        """Extrai links da página"""
+    def extract_links(self, url: str, internal_only: bool = True, document: Optional[ParsedDocument] = None) -> list:
+        """Extrai links da página (reaproveita `document` se já analisado)"""
         try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=15,
-                allow_redirects=True
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, "html.parser")
-                base_domain = urlparse(url).netloc
-                
-                links = []
-                for a_tag in soup.find_all('a', href=True):
-                    href = a_tag['href']
-                    full_url = urljoin(url, href)
-                    
-                    # Filtra apenas links internos se solicitado
-                    if internal_only:
-                        link_domain = urlparse(full_url).netloc
-                        if link_domain != base_domain:
-                            continue
-                    
-                    # Filtra links válidos
-                    if (full_url.startswith('http') and 
-                        '#' not in full_url and 
-                        not any(ext in full_url.lower() for ext in ['.pdf', '.jpg', '.png', '.gif', '.zip'])):
-                        links.append({
-                            'url': full_url,
-                            'text': a_tag.get_text().strip()[:100],
-                            'title': a_tag.get('title', '')
-                        })
-                
-                return links[:20]  # Máximo 20 links
-            else:
-                return []
+            if document is None:
+                document = self._fetch_document(url)
+            return document.links(internal_only, limit=20)  # Máximo 20 links
                 
         except Exception as e:
             logger.error(f"Erro ao extrair links de {url}: {str(e)}")
             return []
+    
+    def _fetch_document(self, url: str) -> ParsedDocument:
+        """Baixa e analisa a página uma única vez (metadados e links saem da mesma árvore)"""
+        response = requests.get(
+            url,
+            headers=self.headers,
+            timeout=15,
+            allow_redirects=True
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        return ParsedDocument(response.content, url)
 
 # Instância global
 content_extractor = ContentExtractor()
@@ -7,6 +7,7 @@ Validador de qualidade de conteúdo extraído
 
 import logging
 import re
+from collections import Counter
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
@@ -56,11 +57,94 @@ class ContentQualityValidator:
             'empresa', 'negócio', 'investimento', 'receita', 'lucro'
         ]
         
+        # Palavras comuns em português
+        self.portuguese_words = [
+            'que', 'não', 'uma', 'para', 'com', 'mais', 'como',
+            'mas', 'foi', 'pelo', 'pela', 'até', 'isso', 'ela',
+            'entre', 'depois', 'sem', 'mesmo', 'aos', 'seus',
+            'quem', 'nas', 'me', 'esse', 'eles', 'você', 'tinha',
+            'foram', 'essa', 'num', 'nem', 'suas', 'meu', 'às',
+            'minha', 'numa', 'pelos', 'elas', 'qual', 'nós', 'deles'
+        ]
+        
+        self._compile_matchers()
+        
         logger.info("Content Quality Validator inicializado")
     
+    def _compile_matchers(self):
+        """Pré-compila os matchers das listas de palavras (chame de novo se alterar as listas)"""
+        # Uma única alternância para os indicadores de erro; o lookahead encontra
+        # também indicadores sobrepostos ("500 internal server error")
+        alternation = '|'.join(re.escape(i) for i in sorted(self.error_indicators, key=len, reverse=True))
+        self._error_pattern = re.compile(f'(?=({alternation}))')
+        self._error_order = {indicator: i for i, indicator in enumerate(self.error_indicators)}
+        
+        # Palavra -> categorias (as listas são comparadas com palavras inteiras)
+        self._word_categories: Dict[str, tuple] = {}
+        for category, words in (
+            ('navigation', self.navigation_words),
+            ('quality', self.quality_indicators),
+            ('portuguese', self.portuguese_words)
+        ):
+            for word in set(words):
+                self._word_categories[word] = self._word_categories.get(word, ()) + (category,)
+        
+        self._number_pattern = re.compile(r'\d+(?:\.\d+)?%?')
+        self._money_pattern = re.compile(r'R\$\s*[\d,\.]+')
+    
+    def _extract_features(self, content: str, context_terms: List[str]) -> Dict[str, Any]:
+        """Extrai de uma vez todas as características usadas pelas verificações"""
+        content_lower = content.lower()
+        words = content_lower.split()
+        
+        # Contagem das palavras (em C) e depois só das palavras distintas
+        category_counts = {'navigation': 0, 'quality': 0, 'portuguese': 0}
+        word_categories = self._word_categories
+        for word, count in Counter(words).items():
+            categories = word_categories.get(word)
+            if categories:
+                for category in categories:
+                    category_counts[category] += count
+        
+        found_errors = sorted(set(self._error_pattern.findall(content_lower)), key=self._error_order.get)
+        
+        lines = content.split('\n')
+        paragraph_count = sum(1 for line in lines if len(line.strip()) > 50)
+        
+        return {
+            'length': len(content),
+            'word_count': len(words),
+            'line_count': len(lines),
+            'paragraph_count': paragraph_count,
+            'found_errors': found_errors,
+            'navigation_count': category_counts['navigation'],
+            'quality_count': category_counts['quality'],
+            'portuguese_count': category_counts['portuguese'],
+            'term_occurrences': [content_lower.count(term) for term in context_terms],
+            'number_count': len(self._number_pattern.findall(content)),
+            'money_value_count': len(self._money_pattern.findall(content))
+        }
+    
+    @staticmethod
+    def _context_terms(context: Dict[str, Any]) -> List[str]:
+        """Termos do contexto usados na verificação de relevância"""
+        terms = []
+        for field in ('segmento', 'produto', 'publico'):
+            if context.get(field):
+                term = str(context[field]).lower()
+                if len(term) > 2:
+                    terms.append(term)
+        return terms
+    
     def validate_content(self, content: str, url: str = "", context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Valida qualidade do conteúdo extraído"""
         
+        context = context or {}
+        return self._score(content, url, context, self._context_terms(context))
+    
+    def _score(self, content: str, url: str, context: Dict[str, Any], context_terms: List[str]) -> Dict[str, Any]:
+        """Calcula o resultado da validação a partir das características extraídas"""
+        
         if not content:
             return {
                 'valid': False,
@@ -69,15 +153,17 @@ class ContentQualityValidator:
                 'details': {}
             }
         
+        features = self._extract_features(content, context_terms)
+        
         # Executa todas as validações
         validations = {
-            'length_check': self._check_content_length(content),
-            'error_page_check': self._check_error_page(content),
-            'navigation_ratio_check': self._check_navigation_ratio(content),
-            'information_density_check': self._check_information_density(content),
-            'language_check': self._check_language(content),
-            'structure_check': self._check_content_structure(content),
-            'relevance_check': self._check_relevance(content, context or {})
+            'length_check': self._check_content_length(features),
+            'error_page_check': self._check_error_page(features),
+            'navigation_ratio_check': self._check_navigation_ratio(features),
+            'information_density_check': self._check_information_density(features),
+            'language_check': self._check_language(features),
+            'structure_check': self._check_content_structure(features),
+            'relevance_check': self._check_relevance(features, context)
         }
         
         # Calcula score geral
@@ -105,14 +191,14 @@ class ContentQualityValidator:
             'score': round(final_score, 2),
             'reason': main_reason,
             'details': validations,
-            'content_stats': self._get_content_stats(content),
+            'content_stats': self._get_content_stats(features),
             'url': url,
             'validated_at': datetime.now().isoformat()
         }
     
-    def _check_content_length(self, content: str) -> Dict[str, Any]:
+    def _check_content_length(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica comprimento do conteúdo"""
-        length = len(content)
+        length = features['length']
         
         if length >= self.min_content_length:
             score = min(100, (length / 2000) * 100)  # Score baseado em 2000 chars como ideal
@@ -133,14 +219,9 @@ class ContentQualityValidator:
                 'value': length
             }
     
-    def _check_error_page(self, content: str) -> Dict[str, Any]:
+    def _check_error_page(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica se é página de erro"""
-        content_lower = content.lower()
-        
-        found_errors = []
-        for indicator in self.error_indicators:
-            if indicator in content_lower:
-                found_errors.append(indicator)
+        found_errors = features['found_errors']
         
         if found_errors:
             return {
@@ -159,11 +240,11 @@ class ContentQualityValidator:
                 'value': []
             }
     
-    def _check_navigation_ratio(self, content: str) -> Dict[str, Any]:
+    def _check_navigation_ratio(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica proporção de palavras de navegação"""
-        words = content.lower().split()
+        word_count = features['word_count']
         
-        if len(words) == 0:
+        if word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -172,8 +253,7 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        navigation_count = sum(1 for word in words if word in self.navigation_words)
-        navigation_ratio = navigation_count / len(words)
+        navigation_ratio = features['navigation_count'] / word_count
         
         if navigation_ratio <= self.max_navigation_ratio:
             score = (1 - navigation_ratio) * 100
@@ -194,11 +274,11 @@ class ContentQualityValidator:
                 'value': navigation_ratio
             }
     
-    def _check_information_density(self, content: str) -> Dict[str, Any]:
+    def _check_information_density(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica densidade de informação"""
-        words = content.lower().split()
+        word_count = features['word_count']
         
-        if len(words) == 0:
+        if word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -207,9 +287,8 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        # Conta palavras informativas
-        info_count = sum(1 for word in words if word in self.quality_indicators)
-        info_density = info_count / len(words)
+        # Proporção de palavras informativas
+        info_density = features['quality_count'] / word_count
         
         if info_density >= self.min_information_density:
             score = min(100, info_density * 1000)  # Amplifica score
@@ -230,21 +309,11 @@ class ContentQualityValidator:
                 'value': info_density
             }
     
-    def _check_language(self, content: str) -> Dict[str, Any]:
+    def _check_language(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica se o conteúdo está em português"""
-        # Palavras comuns em português
-        portuguese_words = [
-            'que', 'não', 'uma', 'para', 'com', 'mais', 'como',
-            'mas', 'foi', 'pelo', 'pela', 'até', 'isso', 'ela',
-            'entre', 'depois', 'sem', 'mesmo', 'aos', 'seus',
-            'quem', 'nas', 'me', 'esse', 'eles', 'você', 'tinha',
-            'foram', 'essa', 'num', 'nem', 'suas', 'meu', 'às',
-            'minha', 'numa', 'pelos', 'elas', 'qual', 'nós', 'deles'
-        ]
-        
-        words = content.lower().split()
+        word_count = features['word_count']
         
-        if len(words) == 0:
+        if word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -253,8 +322,7 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        portuguese_count = sum(1 for word in words if word in portuguese_words)
-        portuguese_ratio = portuguese_count / len(words)
+        portuguese_ratio = features['portuguese_count'] / word_count
         
         if portuguese_ratio >= 0.05:  # Pelo menos 5% de palavras em português
             score = min(100, portuguese_ratio * 500)
@@ -274,32 +342,31 @@ class ContentQualityValidator:
                 'value': portuguese_ratio
             }
     
-    def _check_content_structure(self, content: str) -> Dict[str, Any]:
+    def _check_content_structure(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica estrutura do conteúdo"""
-        lines = content.split('\n')
-        paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
+        paragraph_count = features['paragraph_count']
         
         # Verifica se tem parágrafos substanciais
-        if len(paragraphs) >= 3:
-            score = min(100, len(paragraphs) * 10)
+        if paragraph_count >= 3:
+            score = min(100, paragraph_count * 10)
             return {
                 'passed': True,
                 'score': score,
                 'weight': 10,
-                'message': f'Boa estrutura: {len(paragraphs)} parágrafos',
-                'value': len(paragraphs)
+                'message': f'Boa estrutura: {paragraph_count} parágrafos',
+                'value': paragraph_count
             }
         else:
-            score = len(paragraphs) * 33
+            score = paragraph_count * 33
             return {
                 'passed': False,
                 'score': score,
                 'weight': 10,
-                'message': f'Estrutura pobre: {len(paragraphs)} parágrafos',
-                'value': len(paragraphs)
+                'message': f'Estrutura pobre: {paragraph_count} parágrafos',
+                'value': paragraph_count
             }
     
-    def _check_relevance(self, content: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _check_relevance(self, features: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica relevância do conteúdo para o contexto"""
         if not context:
             return {
@@ -310,26 +377,8 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        content_lower = content.lower()
-        relevance_score = 0
-        
-        # Verifica termos do contexto
-        context_terms = []
-        
-        if context.get('segmento'):
-            context_terms.append(str(context['segmento']).lower())
-        
-        if context.get('produto'):
-            context_terms.append(str(context['produto']).lower())
-        
-        if context.get('publico'):
-            context_terms.append(str(context['publico']).lower())
-        
-        # Conta ocorrências dos termos
-        for term in context_terms:
-            if term and len(term) > 2:
-                occurrences = content_lower.count(term)
-                relevance_score += occurrences * 10
+        # Ocorrências dos termos do contexto
+        relevance_score = sum(occurrences * 10 for occurrences in features['term_occurrences'])
         
         # Normaliza score
         normalized_score = min(100, relevance_score)
@@ -351,38 +400,33 @@ class ContentQualityValidator:
                 'value': relevance_score
             }
     
-    def _get_content_stats(self, content: str) -> Dict[str, Any]:
+    def _get_content_stats(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Obtém estatísticas do conteúdo"""
-        words = content.split()
-        lines = content.split('\n')
-        paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
-        
-        # Conta números e percentuais
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        
-        # Conta valores monetários
-        money_values = re.findall(r'R\$\s*[\d,\.]+', content)
+        word_count = features['word_count']
+        paragraph_count = features['paragraph_count']
         
         return {
-            'character_count': len(content),
-            'word_count': len(words),
-            'line_count': len(lines),
-            'paragraph_count': len(paragraphs),
-            'number_count': len(numbers),
-            'money_value_count': len(money_values),
-            'avg_words_per_paragraph': len(words) / max(len(paragraphs), 1),
-            'avg_chars_per_word': len(content) / max(len(words), 1)
+            'character_count': features['length'],
+            'word_count': word_count,
+            'line_count': features['line_count'],
+            'paragraph_count': paragraph_count,
+            'number_count': features['number_count'],
+            'money_value_count': features['money_value_count'],
+            'avg_words_per_paragraph': word_count / max(paragraph_count, 1),
+            'avg_chars_per_word': features['length'] / max(word_count, 1)
         }
     
     def validate_batch(self, content_list: List[Dict[str, Any]], context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Valida múltiplos conteúdos em lote"""
+        """Valida múltiplos conteúdos em lote (matchers e termos do contexto preparados uma vez)"""
+        context = context or {}
+        context_terms = self._context_terms(context)
         results = []
         
         for i, content_item in enumerate(content_list):
             content = content_item.get('content', '')
             url = content_item.get('url', f'item_{i}')
             
-            validation = self.validate_content(content, url, context)
+            validation = self._score(content, url, context, context_terms)
             validation['item_index'] = i
             results.append(validation)
         
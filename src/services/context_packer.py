@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Context Packer
+Monta o contexto de pesquisa para a IA dentro de um orçamento de tokens:
+trechos ranqueados por relevância, sem duplicatas entre fontes
+"""
+
+import os
+import re
+import math
+import hashlib
+import logging
+from typing import Dict, List, Any, Tuple
+
+from services.relevance_engine import relevance_engine, TOKEN_PATTERN
+
+logger = logging.getLogger(__name__)
+
+class ContextPacker:
+    """Seleciona os melhores trechos das páginas extraídas até o orçamento de tokens"""
+
+    def __init__(self):
+        """Inicializa o empacotador de contexto"""
+        self.chars_per_token = float(os.getenv('CONTEXT_CHARS_PER_TOKEN', '3.5'))
+        self.passage_chars = int(os.getenv('CONTEXT_PASSAGE_CHARS', '600'))
+        self.min_passage_chars = int(os.getenv('CONTEXT_MIN_PASSAGE_CHARS', '80'))
+        self.dedup_threshold = float(os.getenv('CONTEXT_DEDUP_THRESHOLD', '0.7'))
+        self.max_sources = int(os.getenv('CONTEXT_MAX_SOURCES', '20'))
+
+        logger.info("📦 Context Packer inicializado")
+
+    def estimate_tokens(self, text: str) -> int:
+        """Estimativa de tokens (caracteres / CONTEXT_CHARS_PER_TOKEN)"""
+        return int(math.ceil(len(text) / self.chars_per_token)) if text else 0
+
+    def _split_passages(self, content: str) -> List[str]:
+        """Divide o conteúdo em trechos de até CONTEXT_PASSAGE_CHARS, respeitando frases"""
+        passages = []
+        current = ''
+        for paragraph in re.split(r'\n\s*\n|\n', content or ''):
+            paragraph = ' '.join(paragraph.split())
+            if not paragraph:
+                continue
+            sentences = re.split(r'(?<=[.!?])\s+', paragraph) if len(paragraph) > self.passage_chars else [paragraph]
+            for sentence in sentences:
+                if len(sentence) > self.passage_chars:
+                    # Frase gigante (tabelas, listas coladas): corta em pedaços
+                    if current:
+                        passages.append(current)
+                        current = ''
+                    for start in range(0, len(sentence), self.passage_chars):
+                        passages.append(sentence[start:start + self.passage_chars])
+                    continue
+                if current and len(current) + len(sentence) + 1 > self.passage_chars:
+                    passages.append(current)
+                    current = sentence
+                else:
+                    current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+        return [p for p in passages if len(p) >= self.min_passage_chars]
+
+    @staticmethod
+    def _shingles(terms: List[str]) -> set:
+        """Shingles de 3 termos (hash curto); Jaccard entre eles detecta trechos quase idênticos"""
+        if len(terms) < 3:
+            return {' '.join(terms)}
+        return {
+            hashlib.md5(' '.join(terms[i:i + 3]).encode('utf-8')).hexdigest()[:12]
+            for i in range(len(terms) - 2)
+        }
+
+    def pack(
+        self,
+        sources: List[Dict[str, Any]],
+        query: str,
+        token_budget: int
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Escolhe trechos das fontes para caber em token_budget.
+
+        sources: itens com 'title', 'url', 'content' e 'quality_score'.
+        Retorna as fontes selecionadas (na ordem de relevância, cada uma com
+        seus trechos na ordem original) e estatísticas do empacotamento.
+        """
+        # Tokenização e pontuação BM25 do Relevance Engine; idf calculado entre os trechos
+        query_terms = {term for term in TOKEN_PATTERN.findall((query or '').lower()) if len(term) > 2}
+        ranked_sources = sorted(sources, key=lambda x: x.get('quality_score', 0), reverse=True)[:self.max_sources]
+
+        # Trechos de todas as fontes
+        passages = []
+        for source_index, source in enumerate(ranked_sources):
+            for position, text in enumerate(self._split_passages(source.get('content', ''))):
+                document = relevance_engine.analyze(text)
+                passages.append({
+                    'source': source_index,
+                    'position': position,
+                    'text': text,
+                    'document': document,
+                    'terms': document.tokens,
+                    'tokens': self.estimate_tokens(text) + 1
+                })
+
+        # IDF dos termos da consulta entre os trechos
+        document_frequency = {term: 0 for term in query_terms}
+        for passage in passages:
+            for term in query_terms:
+                if passage['document'].tf.get(term):
+                    document_frequency[term] += 1
+        weighted_terms = [
+            (term, math.log(1 + (len(passages) - df + 0.5) / (df + 0.5)))
+            for term, df in document_frequency.items()
+        ]
+        avg_length = sum(p['document'].length for p in passages) / len(passages) if passages else 1.0
+
+        for passage in passages:
+            relevance = relevance_engine.bm25(passage['document'], weighted_terms, avg_length=avg_length)
+            quality = ranked_sources[passage['source']].get('quality_score', 0) / 100
+            # Relevância domina; qualidade da fonte e posição desempatam
+            passage['score'] = relevance + 0.5 * quality + 0.2 / (1 + passage['position'])
+
+        passages.sort(key=lambda p: p['score'], reverse=True)
+
+        selected: List[Dict[str, Any]] = []
+        selected_shingles: List[set] = []
+        seen_hashes = set()
+        header_tokens: Dict[int, int] = {}
+        used_tokens = 0
+        duplicates = 0
+
+        for passage in passages:
+            exact = hashlib.md5(' '.join(passage['terms']).encode('utf-8')).hexdigest()
+            if exact in seen_hashes:
+                duplicates += 1
+                continue
+            shingles = self._shingles(passage['terms'])
+            if any(
+                len(shingles & other) / max(1, len(shingles | other)) >= self.dedup_threshold
+                for other in selected_shingles
+            ):
+                duplicates += 1
+                continue
+
+            cost = passage['tokens']
+            if passage['source'] not in header_tokens:
+                source = ranked_sources[passage['source']]
+                cost += self.estimate_tokens(f"--- FONTE REAL 00: {source.get('title', '')} ---\nURL: {source.get('url', '')}\nQualidade: 000.0%\nConteúdo:\n")
+            if used_tokens + cost > token_budget:
+                continue
+
+            used_tokens += cost
+            header_tokens.setdefault(passage['source'], cost - passage['tokens'])
+            seen_hashes.add(exact)
+            selected_shingles.append(shingles)
+            selected.append(passage)
+
+        # Agrupa por fonte, fontes na ordem do melhor trecho
+        packed: Dict[int, Dict[str, Any]] = {}
+        for passage in selected:
+            if passage['source'] not in packed:
+                source = ranked_sources[passage['source']]
+                packed[passage['source']] = {
+                    'title': source.get('title', ''),
+                    'url': source.get('url', ''),
+                    'quality_score': source.get('quality_score', 0),
+                    'passages': []
+                }
+            packed[passage['source']]['passages'].append(passage)
+
+        result = []
+        for source in packed.values():
+            source['passages'] = [p['text'] for p in sorted(source['passages'], key=lambda p: p['position'])]
+            result.append(source)
+
+        stats = {
+            'token_budget': token_budget,
+            'tokens_used': used_tokens,
+            'sources_considered': len(ranked_sources),
+            'sources_used': len(result),
+            'passages_considered': len(passages),
+            'passages_used': len(selected),
+            'duplicates_removed': duplicates
+        }
+        return result, stats
+
+    def build_context(
+        self,
+        sources: List[Dict[str, Any]],
+        query: str,
+        token_budget: int,
+        header: str = '',
+        footer: str = ''
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Monta o texto do contexto (cabeçalho + fontes + rodapé) dentro do orçamento"""
+        fixed_tokens = self.estimate_tokens(header) + self.estimate_tokens(footer)
+        packed, stats = self.pack(sources, query, max(0, token_budget - fixed_tokens))
+
+        context = header
+        for i, source in enumerate(packed, 1):
+            context += f"--- FONTE REAL {i}: {source['title']} ---\n"
+            context += f"URL: {source['url']}\n"
+            context += f"Qualidade: {source['quality_score']:.1f}%\n"
+            context += "Conteúdo:\n" + '\n'.join(source['passages']) + "\n\n"
+        context += footer
+
+        stats['tokens_used'] += fixed_tokens
+        logger.info(
+            f"📦 Contexto: {stats['tokens_used']}/{token_budget} tokens, "
+            f"{stats['passages_used']}/{stats['passages_considered']} trechos de {stats['sources_used']} fontes, "
+            f"{stats['duplicates_removed']} duplicatas removidas"
+        )
+        return context, stats
+
+# Instância global
+context_packer = ContextPacker()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Deadline
+Prazo absoluto propagado pelas etapas da extração (resolução, download e
+processamento), com prazos filhos por URL dentro do prazo de um lote
+"""
+
+import time
+from typing import Optional
+
+class DeadlineExceeded(TimeoutError):
+    """Prazo esgotado; `stage` indica a etapa (resolve, fetch, parse, batch)"""
+
+    def __init__(self, stage: str = 'unknown', message: Optional[str] = None):
+        self.stage = stage
+        super().__init__(message or f"Prazo esgotado na etapa '{stage}'")
+
+class Deadline:
+    """Instante limite (time.monotonic); sem prazo quando criado com seconds=None"""
+
+    def __init__(self, seconds: Optional[float] = None, parent: Optional['Deadline'] = None):
+        expires_at = time.monotonic() + seconds if seconds is not None else None
+        if parent is not None and parent.expires_at is not None:
+            expires_at = parent.expires_at if expires_at is None else min(expires_at, parent.expires_at)
+        self.expires_at = expires_at
+
+    @classmethod
+    def within(cls, seconds: Optional[float] = None, parent: Optional['Deadline'] = None) -> 'Deadline':
+        """Prazo de `seconds` limitado pelo prazo pai (ex.: URL dentro do lote)"""
+        return cls(seconds, parent)
+
+    def remaining(self) -> Optional[float]:
+        """Segundos restantes (None = sem prazo)"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Indica se o prazo já passou"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: Optional[float] = None, minimum: float = 0.1) -> Optional[float]:
+        """Timeout para uma operação: o menor entre `cap` e o tempo restante"""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        remaining = max(minimum, remaining)
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self, stage: str):
+        """Levanta DeadlineExceeded se o prazo acabou antes de `stage`"""
+        if self.expired():
+            raise DeadlineExceeded(stage)
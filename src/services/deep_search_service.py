@@ -10,11 +10,13 @@ import logging
 import time
 import requests
 from typing import Dict, List, Optional, Any
-from urllib.parse import quote_plus
 import json
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
+from services.async_search_engine import async_search_engine
+from services.rate_limiter import rate_limiter
+from services.relevance_engine import relevance_engine
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +25,9 @@ class DeepSearchService:
     
     def __init__(self):
         """Inicializa serviço de busca REAL"""
-        self.google_search_key = os.getenv('GOOGLE_SEARCH_KEY')
         self.jina_api_key = os.getenv('JINA_API_KEY')
-        self.google_cse_id = os.getenv('GOOGLE_CSE_ID')
         
         # URLs das APIs REAIS
-        self.google_search_url = "https://www.googleapis.com/customsearch/v1"
         self.jina_reader_url = "https://r.jina.ai/"
         
         # Headers REAIS para requisições
@@ -58,24 +57,21 @@ class DeepSearchService:
             # Resultados consolidados REAIS
             search_results = []
             
-            # 1. BUSCA REAL COM GOOGLE CUSTOM SEARCH
-            if self.google_search_key and self.google_cse_id:
-                logger.info("🌐 Executando Google Custom Search REAL...")
-                google_results = self._google_search_real(query, max_results // 2)
-                search_results.extend(google_results)
-                time.sleep(1)  # Rate limiting
-            
-            # 2. BUSCA REAL COM BING
-            logger.info("🔍 Executando Bing Search REAL...")
-            bing_results = self._bing_search_real(query, max_results // 3)
-            search_results.extend(bing_results)
-            time.sleep(1)
-            
-            # 3. BUSCA REAL COM DUCKDUCKGO
-            logger.info("🦆 Executando DuckDuckGo Search REAL...")
-            ddg_results = self._duckduckgo_search_real(query, max_results // 3)
-            search_results.extend(ddg_results)
-            time.sleep(1)
+            # 1-3. BUSCA REAL PARALELA (Google CSE, Bing e DuckDuckGo ao mesmo tempo)
+            logger.info("🌐 Executando Google, Bing e DuckDuckGo em paralelo...")
+            search_results = async_search_engine.search(
+                query,
+                providers=['google', 'bing', 'duckduckgo'],
+                max_results_per_provider={
+                    'google': max_results // 2,
+                    'bing': max_results // 3,
+                    'duckduckgo': max_results // 3
+                },
+                provider_queries={'google': self._enhance_query_real(query)},
+                date_sorted=True
+            )
+            for result in search_results:
+                result['source'] = f"{result['source']}_real"
             
             # 4. EXTRAI CONTEÚDO REAL DAS PÁGINAS ENCONTRADAS
             content_results = []
@@ -83,7 +79,8 @@ class DeepSearchService:
             
             for i, result in enumerate(search_results[:15]):  # Top 15 páginas
                 logger.info(f"📖 Extraindo página {i+1}/15: {result.get('title', 'Sem título')}")
-                content = self._extract_real_page_content(result.get('url', ''))
+                with rate_limiter.limit('web'):
+                    content = self._extract_real_page_content(result.get('url', ''))
                 if content and len(content) > 200:  # Só conteúdo substancial
                     content_results.append({
                         'title': result.get('title', ''),
@@ -92,7 +89,6 @@ class DeepSearchService:
                         'relevance_score': self._calculate_real_relevance(content, query, context_data),
                         'source_engine': result.get('source', 'unknown')
                     })
-                    time.sleep(0.5)  # Rate limiting
             
             # 5. PROCESSA COM ANÁLISE REAL
             processed_content = self._process_real_content(query, context_data, content_results)
@@ -107,140 +103,6 @@ class DeepSearchService:
             logger.error(f"❌ ERRO CRÍTICO na busca profunda REAL: {str(e)}", exc_info=True)
             return self._generate_real_emergency_search(query, context_data)
     
-    def _google_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando Google Custom Search API"""
-        
-        try:
-            enhanced_query = self._enhance_query_real(query)
-            
-            params = {
-                'key': self.google_search_key,
-                'cx': self.google_cse_id,
-                'q': enhanced_query,
-                'num': min(max_results, 10),
-                'lr': 'lang_pt',
-                'gl': 'br',
-                'safe': 'off',
-                'dateRestrict': 'm6',  # Últimos 6 meses
-                'sort': 'date'
-            }
-            
-            response = requests.get(
-                self.google_search_url, 
-                params=params, 
-                headers=self.headers,
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                
-                for item in data.get('items', []):
-                    results.append({
-                        'title': item.get('title', ''),
-                        'url': item.get('link', ''),
-                        'snippet': item.get('snippet', ''),
-                        'source': 'google_real'
-                    })
-                
-                logger.info(f"✅ Google Search REAL: {len(results)} resultados")
-                return results
-            else:
-                logger.warning(f"⚠️ Google Search falhou: {response.status_code}")
-                return []
-                
-        except Exception as e:
-            logger.error(f"❌ Erro no Google Search REAL: {str(e)}")
-            return []
-    
-    def _bing_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando Bing"""
-        
-        try:
-            search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
-            
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                # Extrai resultados REAIS do Bing
-                result_items = soup.find_all('li', class_='b_algo')
-                
-                for item in result_items[:max_results]:
-                    title_elem = item.find('h2')
-                    if title_elem:
-                        link_elem = title_elem.find('a')
-                        if link_elem:
-                            title = title_elem.get_text(strip=True)
-                            url = link_elem.get('href', '')
-                            
-                            snippet_elem = item.find('p')
-                            snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                            
-                            if url and title and url.startswith('http'):
-                                results.append({
-                                    'title': title,
-                                    'url': url,
-                                    'snippet': snippet,
-                                    'source': 'bing_real'
-                                })
-                
-                logger.info(f"✅ Bing Search REAL: {len(results)} resultados")
-                return results
-                
-        except Exception as e:
-            logger.error(f"❌ Erro no Bing Search REAL: {str(e)}")
-            return []
-    
-    def _duckduckgo_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando DuckDuckGo"""
-        
-        try:
-            search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
-            
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_divs = soup.find_all('div', class_='result')
-                
-                for div in result_divs[:max_results]:
-                    title_elem = div.find('a', class_='result__a')
-                    snippet_elem = div.find('a', class_='result__snippet')
-                    
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        url = title_elem.get('href', '')
-                        snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                        
-                        if url and title and url.startswith('http'):
-                            results.append({
-                                'title': title,
-                                'url': url,
-                                'snippet': snippet,
-                                'source': 'duckduckgo_real'
-                            })
-                
-                logger.info(f"✅ DuckDuckGo Search REAL: {len(results)} resultados")
-                return results
-                
-        except Exception as e:
-            logger.error(f"❌ Erro no DuckDuckGo Search REAL: {str(e)}")
-            return []
-    
     def _extract_real_page_content(self, url: str) -> Optional[str]:
         """Extrai conteúdo REAL de uma página web"""
         
@@ -355,68 +217,7 @@ class DeepSearchService:
     ) -> float:
         """Calcula score de relevância REAL do conteúdo"""
         
-        if not content or len(content) < 100:
-            return 0.0
-        
-        content_lower = content.lower()
-        query_lower = query.lower()
-        
-        score = 0.0
-        
-        # Score baseado na query (peso alto)
-        query_words = [w for w in query_lower.split() if len(w) > 2]
-        for word in query_words:
-            occurrences = content_lower.count(word)
-            score += occurrences * 3.0  # Peso aumentado
-        
-        # Score baseado no contexto
-        context_terms = []
-        
-        if context.get("segmento"):
-            context_terms.append(str(context["segmento"]).lower())
-        
-        if context.get("produto"):
-            context_terms.append(str(context["produto"]).lower())
-        
-        if context.get("publico"):
-            context_terms.append(str(context["publico"]).lower())
-        
-        for term in context_terms:
-            if term and len(term) > 2:
-                occurrences = content_lower.count(term)
-                score += occurrences * 2.0
-        
-        # Bonus para termos de mercado específicos REAIS
-        market_terms = [
-            "mercado brasileiro", "brasil", "dados", "estatística", "pesquisa", 
-            "relatório", "análise", "tendência", "oportunidade", "crescimento", 
-            "demanda", "inovação", "tecnologia", "2024", "2025", "investimento",
-            "startup", "empresa", "negócio", "consumidor", "cliente", "vendas"
-        ]
-        
-        for term in market_terms:
-            occurrences = content_lower.count(term)
-            score += occurrences * 1.0
-        
-        # Bonus por densidade de informação REAL
-        word_count = len(content.split())
-        if word_count > 1000:
-            score += 5.0
-        elif word_count > 500:
-            score += 3.0
-        
-        # Bonus por presença de números/percentuais REAIS
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        score += len(numbers) * 0.5
-        
-        # Bonus por presença de valores monetários REAIS
-        money_values = re.findall(r'R\$\s*[\d,\.]+', content)
-        score += len(money_values) * 1.0
-        
-        # Normaliza score baseado no tamanho do conteúdo
-        normalized_score = score / (len(content) / 1000 + 1)
-        
-        return min(normalized_score, 100.0)
+        return relevance_engine.score_content(content, query, context, profile='deep_search')
     
     def _enhance_query_real(self, query: str) -> str:
         """Melhora a query de busca para pesquisa REAL de mercado"""
@@ -13,6 +13,8 @@ import random
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import json
+from services.rate_limiter import rate_limiter
+from services.relevance_engine import relevance_engine
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +58,13 @@ class EnhancedTrendsService:
             }
         }
         
+        # Todas as fontes consultam a busca do Google: um único balde com o menor limite
+        rate_limiter.configure(
+            'google_web',
+            rpm=min(source['rate_limit'] for source in self.trend_sources.values()),
+            concurrency=1
+        )
+        
         logger.info("Enhanced Trends Service inicializado com múltiplas fontes")
     
     def get_market_trends(self, segmento: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -94,9 +103,6 @@ class EnhancedTrendsService:
                     trends_data['fontes_consultadas'].append(source_name)
                     logger.info(f"✅ {source_name}: {len(source_trends)} tendências encontradas")
                 
-                # Delay entre fontes
-                time.sleep(random.uniform(1.0, 3.0))
-                
             except Exception as e:
                 logger.error(f"❌ Erro em {source_name}: {str(e)}")
                 self._handle_source_error(source_name, e)
@@ -126,12 +132,10 @@ class EnhancedTrendsService:
             
             for query in search_queries:
                 try:
-                    # Delay para evitar rate limiting
-                    time.sleep(random.uniform(2.0, 4.0))
-                    
                     search_url = f"https://www.google.com/search?q={query}&tbm=nws&tbs=qdr:m3"
                     
-                    response = self.session.get(search_url, timeout=15)
+                    with rate_limiter.limit('google_web'):
+                        response = self.session.get(search_url, timeout=15)
                     
                     if response.status_code == 200:
                         # Extrai tendências dos títulos das notícias
@@ -152,7 +156,7 @@ class EnhancedTrendsService:
                     
                     elif response.status_code == 429:
                         logger.warning(f"⚠️ Rate limit detectado para Google Trends, aguardando...")
-                        time.sleep(random.uniform(10.0, 20.0))
+                        rate_limiter.penalize('google_web', random.uniform(10.0, 20.0))
                         continue
                     
                 except Exception as e:
@@ -180,12 +184,11 @@ class EnhancedTrendsService:
             
             for term in search_terms:
                 try:
-                    time.sleep(random.uniform(1.5, 3.0))
-                    
                     # Busca geral para identificar tendências
                     search_url = f"https://www.google.com/search?q={term}+2024"
                     
-                    response = self.session.get(search_url, timeout=12)
+                    with rate_limiter.limit('google_web'):
+                        response = self.session.get(search_url, timeout=12)
                     
                     if response.status_code == 200:
                         # Extrai palavras-chave relacionadas
@@ -232,12 +235,11 @@ class EnhancedTrendsService:
             
             for query in social_queries:
                 try:
-                    time.sleep(random.uniform(1.0, 2.5))
-                    
                     # Busca social trends
                     search_url = f"https://www.google.com/search?q={query}&tbm=nws"
                     
-                    response = self.session.get(search_url, timeout=10)
+                    with rate_limiter.limit('google_web'):
+                        response = self.session.get(search_url, timeout=10)
                     
                     if response.status_code == 200:
                         trends.append({
@@ -260,28 +262,14 @@ class EnhancedTrendsService:
     def _calculate_trend_relevance(self, title: str, segmento: str) -> float:
         """Calcula relevância da tendência"""
         
-        title_lower = title.lower()
-        segmento_lower = segmento.lower()
-        
-        relevance = 0.0
+        weighted_terms = [(segmento, 0.5)]
         
-        # Score por menção do segmento
-        if segmento_lower in title_lower:
-            relevance += 0.5
-        
-        # Score por palavras-chave de tendência
+        # Palavras-chave de tendência e temporais
         trend_words = ['crescimento', 'inovação', 'futuro', 'nova', 'emergente', 'disruptivo']
-        for word in trend_words:
-            if word in title_lower:
-                relevance += 0.1
-        
-        # Score por palavras-chave temporais
         time_words = ['2024', '2025', 'agora', 'atual', 'recente']
-        for word in time_words:
-            if word in title_lower:
-                relevance += 0.1
+        weighted_terms += [(word, 0.1) for word in trend_words + time_words]
         
-        return min(relevance, 1.0)
+        return relevance_engine.score_presence(title, weighted_terms, cap=1.0)
     
     def _process_trends_data(self, trends_data: Dict[str, Any], segmento: str) -> Dict[str, Any]:
         """Processa e consolida dados de tendências"""
@@ -411,6 +399,7 @@ class EnhancedTrendsService:
                 60.0
             )
             logger.warning(f"⚠️ Rate limit para {source_name}, delay aumentado para {self.request_delays[source_name]:.1f}s")
+            rate_limiter.penalize('google_web', self.request_delays[source_name])
         
         # Desabilita temporariamente se muitos erros
         if self.error_counts[source_name] >= 3:
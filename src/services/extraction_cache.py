@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Extraction Cache
+Cache persistente em disco para extrações de conteúdo (endereçado por conteúdo)
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from services.url_resolver import url_resolver
+
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    """Cache LRU em disco: URL resolvida (forma canônica) -> HTML bruto + texto limpo"""
+
+    def __init__(self):
+        """Inicializa o cache de extração"""
+        self.enabled = os.getenv('EXTRACTION_CACHE_ENABLED', 'true').lower() == 'true'
+        self.cache_dir = Path(os.getenv('EXTRACTION_CACHE_DIR', 'cache_extracao'))
+        self.ttl_seconds = int(os.getenv('EXTRACTION_CACHE_TTL', str(24 * 3600)))
+        self.max_size_bytes = int(os.getenv('EXTRACTION_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        # Tamanho dos blobs (estimativa do processo; recalculada antes de despejar)
+        self._size_bytes = 0
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'revalidated': 0,
+            'unchanged_html': 0,
+            'stores': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+
+        if self.enabled:
+            try:
+                self._db()
+                logger.info(f"💾 Extraction Cache inicializado em {self.cache_dir} (TTL {self.ttl_seconds}s)")
+            except Exception as e:
+                self.enabled = False
+                logger.error(f"❌ Cache de extração desabilitado: {e}")
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is not None and self._conn_pid == os.getpid():
+            return self._conn
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.cache_dir / 'extraction_cache.db'),
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn_pid = os.getpid()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                html_hash TEXT,
+                text_hash TEXT,
+                extractor TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+            CREATE INDEX IF NOT EXISTS idx_entries_text_hash ON entries(text_hash);
+            CREATE INDEX IF NOT EXISTS idx_entries_html_hash ON entries(html_hash);
+        ''')
+        self._conn.commit()
+        self._size_bytes = self._total_size()
+        return self._conn
+
+    @staticmethod
+    def _key(url: str) -> str:
+        """Chave da entrada: URL canônica (sem rastreamento, host normalizado)"""
+        return url_resolver.canonicalize(url)
+
+    @staticmethod
+    def content_hash(data: str) -> str:
+        """Hash SHA-256 usado como endereço do conteúdo"""
+        return hashlib.sha256(data.encode('utf-8', errors='ignore')).hexdigest()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a entrada do cache para a URL (ou None).
+
+        A entrada traz 'fresh' indicando se ainda está dentro do TTL; entradas
+        expiradas são devolvidas para revalidação via ETag/Last-Modified.
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._db()
+                row = conn.execute(
+                    'SELECT html_hash, text_hash, extractor, etag, last_modified, fetched_at '
+                    'FROM entries WHERE url = ?', (self._key(url),)
+                ).fetchone()
+
+                if not row:
+                    self.stats['misses'] += 1
+                    return None
+
+                html_hash, text_hash, extractor, etag, last_modified, fetched_at = row
+                text = self._read_blob(text_hash)
+                if text is None:
+                    self.stats['misses'] += 1
+                    return None
+
+                fresh = (time.time() - fetched_at) < self.ttl_seconds
+                if fresh:
+                    self.stats['hits'] += 1
+                    conn.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), self._key(url)))
+                    conn.commit()
+                else:
+                    self.stats['stale'] += 1
+
+            return {
+                'url': url,
+                'text': text,
+                'html_hash': html_hash,
+                'extractor': extractor,
+                'etag': etag,
+                'last_modified': last_modified,
+                'fetched_at': fetched_at,
+                'fresh': fresh
+            }
+
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao ler cache de extração para {url}: {e}")
+            return None
+
+    def get_html(self, html_hash: str) -> Optional[str]:
+        """Retorna o HTML bruto armazenado para o hash"""
+        if not self.enabled or not html_hash:
+            return None
+
+        try:
+            with self._lock:
+                return self._read_blob(html_hash)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao ler HTML do cache: {e}")
+            return None
+
+    def refresh(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None, unchanged_html: bool = False):
+        """Renova o TTL de uma entrada revalidada (304 ou HTML idêntico)"""
+        if not self.enabled:
+            return
+
+        try:
+            now = time.time()
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    'UPDATE entries SET fetched_at = ?, last_access = ?, '
+                    'etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?',
+                    (now, now, etag, last_modified, self._key(url))
+                )
+                conn.commit()
+                if unchanged_html:
+                    self.stats['unchanged_html'] += 1
+                else:
+                    self.stats['revalidated'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao revalidar cache para {url}: {e}")
+
+    def put(
+        self,
+        url: str,
+        text: str,
+        html: Optional[str] = None,
+        extractor: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        """Armazena HTML bruto e texto extraído da URL"""
+        if not self.enabled or not text:
+            return
+
+        try:
+            now = time.time()
+            text_hash = self.content_hash(text)
+            html_hash = self.content_hash(html) if html else None
+
+            with self._lock:
+                conn = self._db()
+                previous = conn.execute(
+                    'SELECT text_hash, html_hash FROM entries WHERE url = ?', (self._key(url),)
+                ).fetchone()
+
+                self._write_blob(text_hash, text)
+                if html:
+                    self._write_blob(html_hash, html)
+
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries '
+                    '(url, html_hash, text_hash, extractor, etag, last_modified, fetched_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (self._key(url), html_hash, text_hash, extractor, etag, last_modified, now, now)
+                )
+                if previous:
+                    self._release_blobs(previous)
+                self._evict_if_needed()
+                conn.commit()
+                self.stats['stores'] += 1
+
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao salvar cache de extração para {url}: {e}")
+
+    def _read_blob(self, blob_hash: Optional[str]) -> Optional[str]:
+        """Lê e descompacta um blob"""
+        if not blob_hash:
+            return None
+
+        row = self._db().execute('SELECT data FROM blobs WHERE hash = ?', (blob_hash,)).fetchone()
+        if not row:
+            return None
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def _write_blob(self, blob_hash: str, data: str):
+        """Grava blob compactado (conteúdo idêntico é armazenado uma única vez)"""
+        compressed = zlib.compress(data.encode('utf-8', errors='ignore'), 6)
+        inserted = self._db().execute(
+            'INSERT OR IGNORE INTO blobs (hash, data, size) VALUES (?, ?, ?)',
+            (blob_hash, compressed, len(compressed))
+        ).rowcount
+        if inserted:
+            self._size_bytes += len(compressed)
+
+    def _release_blobs(self, blob_hashes) -> int:
+        """Remove blobs que deixaram de ser referenciados; retorna os bytes liberados"""
+        conn = self._db()
+        freed = 0
+        for blob_hash in set(h for h in blob_hashes if h):
+            referenced = conn.execute(
+                'SELECT 1 FROM entries WHERE text_hash = ? OR html_hash = ? LIMIT 1',
+                (blob_hash, blob_hash)
+            ).fetchone()
+            if not referenced:
+                row = conn.execute('SELECT size FROM blobs WHERE hash = ?', (blob_hash,)).fetchone()
+                if row:
+                    conn.execute('DELETE FROM blobs WHERE hash = ?', (blob_hash,))
+                    freed += row[0]
+        self._size_bytes = max(0, self._size_bytes - freed)
+        return freed
+
+    def _total_size(self) -> int:
+        """Tamanho total dos blobs armazenados"""
+        return self._db().execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def _evict_if_needed(self):
+        """
+        Remove entradas menos usadas (LRU) até caber no limite. A soma completa
+        só roda quando a estimativa do processo passa do limite (outros
+        workers também gravam); durante o despejo o total é descontado.
+        """
+        if self._size_bytes <= self.max_size_bytes:
+            return
+        total_size = self._size_bytes = self._total_size()
+        if total_size <= self.max_size_bytes:
+            return
+
+        conn = self._db()
+        rows = conn.execute(
+            'SELECT url, text_hash, html_hash FROM entries ORDER BY last_access ASC'
+        ).fetchall()
+        for url, text_hash, html_hash in rows:
+            conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+            total_size -= self._release_blobs((text_hash, html_hash))
+            self.stats['evictions'] += 1
+
+            if total_size <= self.max_size_bytes:
+                break
+
+        self._size_bytes = total_size
+        logger.info(f"🧹 Cache de extração reduzido para {total_size / (1024 * 1024):.1f} MB")
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        if not self.enabled:
+            return
+
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute('DELETE FROM entries')
+                conn.execute('DELETE FROM blobs')
+                conn.commit()
+                conn.execute('VACUUM')
+                self._size_bytes = 0
+            logger.info("🧹 Cache de extração em disco limpo")
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao limpar cache de extração: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores e ocupação do cache"""
+        stats = {
+            **self.stats,
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl_seconds,
+            'max_size_bytes': self.max_size_bytes,
+            'entries': 0,
+            'size_bytes': 0,
+            'hit_rate': 0.0
+        }
+
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['stale']
+        served = self.stats['hits'] + self.stats['revalidated'] + self.stats['unchanged_html']
+        if lookups > 0:
+            stats['hit_rate'] = (served / lookups) * 100
+
+        if self.enabled:
+            try:
+                with self._lock:
+                    stats['entries'] = self._db().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+                    stats['size_bytes'] = self._total_size()
+            except Exception as e:
+                logger.error(f"❌ Erro ao obter estatísticas do cache: {e}")
+
+        return stats
+
+    def reset_stats(self):
+        """Reset contadores do cache"""
+        for key in self.stats:
+            self.stats[key] = 0
+
+# Instância global
+extraction_cache = ExtractionCache()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Extraction Pool
+Pool de processos para o trabalho de CPU da extração (parse de HTML e PDF,
+extratores e limpeza de texto), fora do GIL e com timeout real por tarefa
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Optional
+
+from services.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+class ExtractionTimeout(DeadlineExceeded):
+    """Tarefa de extração excedeu o tempo limite"""
+
+    def __init__(self, message: Optional[str] = None):
+        super().__init__('parse', message)
+
+def _default_workers() -> int:
+    """
+    Processos por worker do gunicorn: CPUs da máquina divididas pelos workers
+    (GUNICORN_WORKERS, exportado pelo gunicorn.conf.py), arredondado para
+    cima e no mínimo 1. Fora do gunicorn (um único processo) usa todas as CPUs.
+    """
+    cpus = os.cpu_count() or 1
+    gunicorn_workers = max(1, int(os.getenv('GUNICORN_WORKERS', '1')))
+    return max(1, -(-cpus // gunicorn_workers))
+
+# Fila (no processo filho) onde cada tarefa avisa quando começa a rodar
+_started_queue = None
+
+def _warm_worker(started_queue=None):
+    """Pré-carrega as bibliotecas de extração (trafilatura, readability, newspaper, lxml, PDF)"""
+    global _started_queue
+    _started_queue = started_queue
+    import services.robust_content_extractor  # noqa: F401
+
+def _tracked_job(job_id: int, fn, *args):
+    """Executa a tarefa registrando o início (o timeout conta a partir daqui, não da fila)"""
+    if _started_queue is not None:
+        _started_queue.put((job_id, time.time()))
+    return fn(*args)
+
+def process_html_job(
+    html: str,
+    url: str,
+    candidates: List[str],
+    check_dynamic: bool,
+    fallback: bool,
+    time_budget: Optional[float] = None
+) -> Dict[str, Any]:
+    """Tarefa do pool: extração de uma página HTML (ver RobustContentExtractor.process_html)"""
+    from services.robust_content_extractor import robust_content_extractor
+    from services.parsed_document import ParsedDocument
+
+    document = ParsedDocument(html, url)
+    return robust_content_extractor.process_html(
+        document, url, candidates, check_dynamic, fallback, time_budget, include_scan=True
+    )
+
+def extract_pdf_job(pdf_path: str, url: str, time_budget: Optional[float] = None) -> Dict[str, Any]:
+    """Tarefa do pool: extração de texto de um PDF salvo em disco"""
+    from services.robust_content_extractor import robust_content_extractor
+    return robust_content_extractor.extract_pdf_text(pdf_path, url, time_budget)
+
+class ExtractionPool:
+    """
+    ProcessPoolExecutor aquecido, criado sob demanda em cada worker do gunicorn.
+
+    O tamanho padrão acompanha as CPUs disponíveis por worker (ver
+    _default_workers); EXTRACTION_POOL_WORKERS ajusta para a memória da
+    máquina (cada processo carrega as bibliotecas de extração, ~100-200 MB),
+    lembrando que o total é workers do gunicorn x processos do pool.
+
+    O timeout de uma tarefa conta a partir do momento em que um processo a
+    começa a executar; o tempo na fila do pool não conta. Uma tarefa que
+    ainda não começou quando o prazo acaba é apenas cancelada. Uma tarefa
+    em execução acima do prazo não pode ser interrompida em um processo
+    filho, e o ProcessPoolExecutor não sobrevive à morte de um único
+    processo: o pool é encerrado (processos terminados) e recriado na próxima
+    tarefa. Tarefas de outras threads que estavam no mesmo pool falham com
+    BrokenProcessPool e são repetidas uma vez pelo chamador (run() e a
+    corrida de extratores).
+    """
+
+    def __init__(self):
+        """Inicializa a configuração do pool (os processos só sobem no primeiro uso)"""
+        self.enabled = os.getenv('EXTRACTION_POOL_ENABLED', 'true').lower() == 'true'
+        self.workers = int(os.getenv('EXTRACTION_POOL_WORKERS', str(_default_workers())))
+        self.max_tasks_per_child = int(os.getenv('EXTRACTION_POOL_MAX_TASKS', '200'))
+        self.job_timeout = float(os.getenv('EXTRACTION_JOB_TIMEOUT', '30'))
+
+        methods = multiprocessing.get_all_start_methods()
+        # fork a partir de processos com threads pode herdar locks travados
+        default_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        self.start_method = os.getenv('EXTRACTION_POOL_START_METHOD', default_method)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._started_queue = None
+        self._lock = threading.Lock()
+        # job_id -> início da execução (None enquanto está na fila do pool)
+        self._jobs: Dict[int, Optional[float]] = {}
+        self._jobs_lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self.poll_interval = 0.1
+
+        self.stats = {
+            'jobs': 0,
+            'completed': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'failures': 0,
+            'restarts': 0,
+            'total_time': 0.0
+        }
+
+        if self.enabled:
+            logger.info(f"⚙️ Extraction Pool configurado ({self.workers} processos, {self.start_method})")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool do processo atual (recriado após fork ou após timeout)"""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                kwargs = {}
+                # Reciclagem de processos (limita vazamento de memória das bibliotecas) - Python 3.11+
+                if self.max_tasks_per_child > 0 and self.start_method != 'fork' and sys.version_info >= (3, 11):
+                    kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+                context = multiprocessing.get_context(self.start_method)
+                self._started_queue = context.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, self.workers),
+                    mp_context=context,
+                    initializer=_warm_worker,
+                    initargs=(self._started_queue,),
+                    **kwargs
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        """Envia fn(*args) para o pool"""
+        executor = self._get_executor()
+        job_id = next(self._job_ids)
+        with self._jobs_lock:
+            self._jobs[job_id] = None
+        future = executor.submit(_tracked_job, job_id, fn, *args)
+        future.pool_executor = executor
+        future.started_queue = self._started_queue
+        future.job_id = job_id
+        future.submitted_at = time.time()
+        future.add_done_callback(self._forget)
+        self.stats['jobs'] += 1
+        return future
+
+    def _forget(self, future: Future):
+        with self._jobs_lock:
+            self._jobs.pop(future.job_id, None)
+
+    def started_at(self, future: Future) -> Optional[float]:
+        """Momento em que um processo começou a tarefa (None se ainda está na fila)"""
+        with self._jobs_lock:
+            started_queue = getattr(future, 'started_queue', None)
+            while started_queue is not None:
+                try:
+                    job_id, started = started_queue.get_nowait()
+                except (queue.Empty, OSError, ValueError):
+                    break
+                if job_id in self._jobs:
+                    self._jobs[job_id] = started
+            return self._jobs.get(future.job_id)
+
+    def wait(self, future: Future, timeout: Optional[float] = None) -> Any:
+        """
+        Resultado da tarefa. O prazo vale para a execução (a partir do início
+        no processo) e, separadamente, para a espera na fila do pool: tarefa
+        que não começou é cancelada; tarefa em execução acima do prazo
+        reinicia o pool. Ambos levantam ExtractionTimeout.
+        """
+        timeout = self.job_timeout if timeout is None else timeout
+        try:
+            while True:
+                try:
+                    result = future.result(timeout=self.poll_interval)
+                    break
+                except FutureTimeoutError:
+                    pass
+                now = time.time()
+                started = self.started_at(future)
+                if started is None and now - future.submitted_at >= timeout:
+                    self.abandon(future, f"tarefa aguardou {timeout:.1f}s na fila", timeout)
+                    raise ExtractionTimeout(f"Extração não começou dentro do prazo ({timeout:.1f}s)")
+                if started is not None and now - started >= timeout:
+                    self.stats['timeouts'] += 1
+                    self.terminate(future.pool_executor, f"tarefa excedeu {timeout:.1f}s")
+                    raise ExtractionTimeout(f"Extração excedeu o tempo limite ({timeout:.1f}s)")
+            self.stats['completed'] += 1
+            self.stats['total_time'] += time.time() - (self.started_at(future) or future.submitted_at)
+            return result
+        except BrokenProcessPool:
+            self.stats['failures'] += 1
+            self.terminate(future.pool_executor, "processo do pool encerrado")
+            raise
+
+    def run(self, fn, *args, timeout: Optional[float] = None) -> Any:
+        """Executa fn(*args) em um processo do pool (uma nova tentativa se o pool quebrar)"""
+        try:
+            return self.wait(self.submit(fn, *args), timeout)
+        except BrokenProcessPool:
+            logger.warning("⚠️ Pool de extração reiniciado - repetindo tarefa")
+            return self.wait(self.submit(fn, *args), timeout)
+
+    def abandon(self, future: Future, reason: str, budget: Optional[float] = None):
+        """
+        Desiste da tarefa: cancela se ainda não começou; reinicia o pool só se
+        ela roda há mais de `budget` (padrão EXTRACTION_JOB_TIMEOUT). Abaixo
+        disso a tarefa termina sozinha (ela recebe o próprio time_budget) e o
+        resultado é descartado.
+        """
+        if future.done():
+            return
+        started = self.started_at(future)
+        if started is None:
+            if future.cancel():
+                self.stats['cancelled'] += 1
+                logger.warning(f"⚠️ Tarefa de extração cancelada: {reason}")
+            return
+        budget = self.job_timeout if budget is None else budget
+        if time.time() - started >= budget:
+            self.stats['timeouts'] += 1
+            self.terminate(getattr(future, 'pool_executor', None), reason)
+
+    def terminate(self, executor: Optional[ProcessPoolExecutor], reason: str):
+        """Encerra um pool travado; o próximo submit cria outro"""
+        with self._lock:
+            if executor is None or executor is not self._executor:
+                return
+            self._executor = None
+            self.stats['restarts'] += 1
+
+        logger.warning(f"⚠️ Reiniciando pool de extração: {reason}")
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Encerra o pool do processo atual"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._executor_pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuração e contadores do pool"""
+        return {
+            **self.stats,
+            'enabled': self.enabled,
+            'workers': self.workers,
+            'start_method': self.start_method,
+            'job_timeout': self.job_timeout,
+            'avg_job_time': self.stats['total_time'] / self.stats['completed'] if self.stats['completed'] else 0.0,
+            'running': self._executor is not None and self._executor_pid == os.getpid()
+        }
+
+# Instância global
+extraction_pool = ExtractionPool()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Extractor Learning
+Aprende, por domínio, qual extrator de conteúdo funciona e quão rápido,
+para ordenar a cascata de extração (persistido entre reinícios)
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from urllib.parse import urlparse
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ordem e custo (segundos) de referência usados enquanto o domínio tem poucas amostras
+DEFAULT_ORDER = ['trafilatura', 'readability', 'newspaper', 'beautifulsoup']
+DEFAULT_TIMES = {'trafilatura': 0.3, 'readability': 0.4, 'newspaper': 0.6, 'beautifulsoup': 0.5}
+
+class ExtractorLearning:
+    """Estatísticas de sucesso/latência por domínio e extrator (SQLite + memória)"""
+
+    def __init__(self):
+        """Inicializa o aprendizado por domínio"""
+        self.enabled = os.getenv('EXTRACTOR_LEARNING_ENABLED', 'true').lower() == 'true'
+        self.db_path = Path(os.getenv(
+            'EXTRACTOR_LEARNING_PATH',
+            os.path.join(os.getenv('EXTRACTION_CACHE_DIR', 'cache_extracao'), 'extractor_learning.db')
+        ))
+        # Peso (em amostras) da ordem padrão na estimativa de cada domínio
+        self.prior_strength = float(os.getenv('EXTRACTOR_LEARNING_PRIOR', '2'))
+        # Outros workers gravam no mesmo banco: o domínio é relido após este intervalo
+        self.reload_seconds = float(os.getenv('EXTRACTOR_LEARNING_RELOAD_SECONDS', '300'))
+        self.max_domains = int(os.getenv('EXTRACTOR_LEARNING_MAX_DOMAINS', '2000'))
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        # domínio -> (carregado em, estatísticas), em ordem LRU
+        self._domains: 'OrderedDict[str, Tuple[float, Dict[str, Dict[str, float]]]]' = OrderedDict()
+
+        if self.enabled:
+            try:
+                self._db()
+                logger.info(f"🧠 Extractor Learning inicializado em {self.db_path}")
+            except Exception as e:
+                self.enabled = False
+                logger.error(f"❌ Aprendizado de extratores desabilitado: {e}")
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS domain_extractors (
+                    domain TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    success INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    total_time REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (domain, extractor)
+                )
+            ''')
+            self._conn.commit()
+            # Outros workers também gravam: recarrega do banco após fork
+            self._domains = OrderedDict()
+        return self._conn
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        """Domínio normalizado (sem www.)"""
+        netloc = urlparse(url).netloc.lower().split(':')[0]
+        return netloc[4:] if netloc.startswith('www.') else netloc
+
+    def _load(self, domain: str) -> Dict[str, Dict[str, float]]:
+        """
+        Estatísticas do domínio, lidas do banco na primeira consulta e novamente
+        após EXTRACTOR_LEARNING_RELOAD_SECONDS (inclui o que outros workers
+        gravaram). Mantém no máximo EXTRACTOR_LEARNING_MAX_DOMAINS em memória.
+        """
+        now = time.time()
+        cached = self._domains.get(domain)
+        if cached and now - cached[0] < self.reload_seconds:
+            self._domains.move_to_end(domain)
+            return cached[1]
+
+        rows = self._db().execute(
+            'SELECT extractor, success, failed, total_time FROM domain_extractors WHERE domain = ?',
+            (domain,)
+        ).fetchall()
+        stats = {
+            extractor: {'success': success, 'failed': failed, 'total_time': total_time}
+            for extractor, success, failed, total_time in rows
+        }
+        self._domains[domain] = (now, stats)
+        self._domains.move_to_end(domain)
+        while len(self._domains) > self.max_domains:
+            self._domains.popitem(last=False)
+        return stats
+
+    def record(self, url: str, extractor: str, success: bool, elapsed: float):
+        """Registra o resultado de um extrator para o domínio da URL"""
+        if not self.enabled:
+            return
+        domain = self.domain_of(url)
+        try:
+            with self._lock:
+                stats = self._load(domain).setdefault(extractor, {'success': 0, 'failed': 0, 'total_time': 0.0})
+                stats['success' if success else 'failed'] += 1
+                stats['total_time'] += elapsed
+
+                conn = self._db()
+                conn.execute(
+                    'INSERT INTO domain_extractors (domain, extractor, success, failed, total_time, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(domain, extractor) DO UPDATE SET '
+                    'success = success + excluded.success, failed = failed + excluded.failed, '
+                    'total_time = total_time + excluded.total_time, updated_at = excluded.updated_at',
+                    (domain, extractor, int(success), int(not success), elapsed, time.time())
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Erro ao registrar aprendizado de extrator ({domain}/{extractor}): {e}")
+
+    def expected_cost(self, domain_stats: Dict[str, Dict[str, float]], extractor: str, position: int) -> float:
+        """Tempo esperado até um sucesso: latência média / probabilidade de sucesso"""
+        stats = domain_stats.get(extractor, {'success': 0, 'failed': 0, 'total_time': 0.0})
+        attempts = stats['success'] + stats['failed']
+        m = self.prior_strength
+
+        # A ordem padrão entra como prior: primeiros extratores começam mais prováveis
+        prior_success = max(0.2, 0.8 - 0.15 * position)
+        prior_time = DEFAULT_TIMES.get(extractor, 0.5)
+
+        success_rate = (stats['success'] + prior_success * m) / (attempts + m)
+        avg_time = (stats['total_time'] + prior_time * m) / (attempts + m)
+        return avg_time / max(success_rate, 0.01)
+
+    def order(self, url: str, extractors: List[str]) -> List[str]:
+        """Extratores ordenados para o domínio (menor custo esperado primeiro)"""
+        default_order = sorted(extractors, key=lambda e: DEFAULT_ORDER.index(e) if e in DEFAULT_ORDER else len(DEFAULT_ORDER))
+        if not self.enabled:
+            return default_order
+        try:
+            with self._lock:
+                domain_stats = dict(self._load(self.domain_of(url)))
+        except Exception as e:
+            logger.error(f"❌ Erro ao consultar aprendizado de extratores: {e}")
+            return default_order
+
+        return sorted(
+            default_order,
+            key=lambda e: self.expected_cost(domain_stats, e, default_order.index(e))
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumo do aprendizado (domínios conhecidos e extrator preferido de cada um)"""
+        if not self.enabled:
+            return {'enabled': False}
+        try:
+            with self._lock:
+                rows = self._db().execute(
+                    'SELECT domain, extractor, success, failed FROM domain_extractors'
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter estatísticas de aprendizado: {e}")
+            return {'enabled': True, 'domains': 0}
+
+        best: Dict[str, Any] = {}
+        for domain, extractor, success, failed in rows:
+            rate = success / max(success + failed, 1)
+            if domain not in best or rate > best[domain][1]:
+                best[domain] = (extractor, rate)
+
+        preferred: Dict[str, int] = {}
+        for extractor, _ in best.values():
+            preferred[extractor] = preferred.get(extractor, 0) + 1
+
+        return {
+            'enabled': True,
+            'domains': len(best),
+            'preferred_extractor_counts': preferred
+        }
+
+# Instância global
+extractor_learning = ExtractorLearning()
@@ -9,9 +9,10 @@ import os
 import logging
 import json
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable
 import google.generativeai as genai
 from datetime import datetime
+from services.incremental_json_parser import IncrementalJSONParser, publish_section
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +60,9 @@ class UltraRobustGeminiClient:
             }
         ]
         
+        # Streaming: seções do JSON ficam disponíveis assim que fecham
+        self.streaming_enabled = os.getenv('GEMINI_STREAMING_ENABLED', 'true').lower() == 'true'
+        
         logger.info("✅ Cliente Gemini REAL inicializado com configurações máximas")
     
     def test_connection(self) -> bool:
@@ -78,9 +82,18 @@ class UltraRobustGeminiClient:
         self, 
         analysis_data: Dict[str, Any],
         search_context: Optional[str] = None,
-        attachments_context: Optional[str] = None
+        attachments_context: Optional[str] = None,
+        stream: Optional[bool] = None,
+        session_id: Optional[str] = None,
+        on_section: Optional[Callable[[str, Any], None]] = None
     ) -> Dict[str, Any]:
-        """Gera análise ULTRA-DETALHADA REAL implementando TODOS os sistemas"""
+        """
+        Gera análise ULTRA-DETALHADA REAL implementando TODOS os sistemas
+        
+        Em modo streaming (padrão: GEMINI_STREAMING_ENABLED) cada seção de topo
+        é salva, publicada no progresso da sessão e entregue a on_section assim
+        que fecha; se a resposta for truncada, as seções concluídas são mantidas.
+        """
         
         try:
             # Constrói prompt ULTRA-COMPLETO REAL
@@ -89,6 +102,9 @@ class UltraRobustGeminiClient:
             logger.info("🚀 INICIANDO ANÁLISE ULTRA-DETALHADA REAL com Gemini Pro...")
             start_time = time.time()
             
+            if stream if stream is not None else self.streaming_enabled:
+                return self._generate_streaming(prompt, analysis_data, start_time, session_id, on_section)
+            
             # Gera análise REAL com configurações máximas
             response = self.model.generate_content(
                 prompt,
@@ -110,6 +126,59 @@ class UltraRobustGeminiClient:
             # Em caso de erro, gera análise básica REAL (não simulada)
             return self._generate_real_fallback(analysis_data, str(e))
     
+    def _generate_streaming(
+        self,
+        prompt: str,
+        analysis_data: Dict[str, Any],
+        start_time: float,
+        session_id: Optional[str] = None,
+        on_section: Optional[Callable[[str, Any], None]] = None
+    ) -> Dict[str, Any]:
+        """Gera análise em streaming, liberando cada seção do JSON quando ela fecha"""
+        
+        parser = IncrementalJSONParser()
+        stream_error = None
+        
+        try:
+            response = self.model.generate_content(
+                prompt,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                stream=True
+            )
+            parser.consume(
+                response,
+                lambda section_name, section_data: publish_section(section_name, section_data, session_id, on_section),
+                start_time
+            )
+        
+        except Exception as e:
+            stream_error = e
+            logger.error(f"❌ Streaming do Gemini interrompido: {str(e)}")
+        
+        end_time = time.time()
+        response_text = parser.text
+        sections = parser.result()
+        
+        if parser.complete and not parser.errors:
+            logger.info(f"✅ ANÁLISE ULTRA-DETALHADA REAL concluída em {end_time - start_time:.2f} segundos (streaming, {len(sections)} seções)")
+            return self._finalize_real_analysis(sections, analysis_data)
+        
+        if sections:
+            # Resposta truncada: mantém as seções que fecharam
+            logger.warning(f"⚠️ Resposta do Gemini incompleta - aproveitando {len(sections)} seções concluídas")
+            sections['metadata_streaming'] = {
+                'partial': True,
+                'sections_completed': list(sections.keys()),
+                'error': str(stream_error) if stream_error else 'JSON incompleto'
+            }
+            return self._finalize_real_analysis(sections, analysis_data)
+        
+        if response_text:
+            return self._parse_real_response(response_text, analysis_data)
+        
+        raise stream_error or Exception("❌ Resposta vazia do Gemini - Erro crítico!")
+    
     def _build_ultra_real_prompt(
         self, 
         data: Dict[str, Any], 
@@ -306,25 +375,7 @@ Estrutura OBRIGATÓRIA:
             
             # Tenta parsear JSON REAL
             analysis = json.loads(clean_text)
-            
-            # Valida se é uma análise REAL (não simulada)
-            if self._validate_real_analysis(analysis):
-                # Adiciona metadados REAIS
-                analysis['metadata_gemini'] = {
-                    'generated_at': datetime.now().isoformat(),
-                    'model': 'gemini-1.5-pro',
-                    'version': '2.0.0',
-                    'analysis_type': 'ultra_detailed_real',
-                    'data_source': 'real_market_data',
-                    'simulation_free': True,
-                    'quality_guarantee': 'premium'
-                }
-                
-                logger.info("✅ Análise REAL validada e processada com sucesso")
-                return analysis
-            else:
-                logger.warning("⚠️ Análise contém dados simulados - gerando versão REAL")
-                return self._enhance_to_real_analysis(analysis, original_data)
+            return self._finalize_real_analysis(analysis, original_data)
             
         except json.JSONDecodeError as e:
             logger.error(f"❌ Erro ao parsear JSON REAL: {str(e)}")
@@ -332,6 +383,28 @@ Estrutura OBRIGATÓRIA:
             # Tenta extrair informações mesmo sem JSON válido
             return self._extract_real_structured_analysis(response_text, original_data)
     
+    def _finalize_real_analysis(self, analysis: Dict[str, Any], original_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Valida a análise decodificada e adiciona metadados"""
+        
+        # Valida se é uma análise REAL (não simulada)
+        if self._validate_real_analysis(analysis):
+            # Adiciona metadados REAIS
+            analysis['metadata_gemini'] = {
+                'generated_at': datetime.now().isoformat(),
+                'model': 'gemini-1.5-pro',
+                'version': '2.0.0',
+                'analysis_type': 'ultra_detailed_real',
+                'data_source': 'real_market_data',
+                'simulation_free': True,
+                'quality_guarantee': 'premium'
+            }
+            
+            logger.info("✅ Análise REAL validada e processada com sucesso")
+            return analysis
+        else:
+            logger.warning("⚠️ Análise contém dados simulados - gerando versão REAL")
+            return self._enhance_to_real_analysis(analysis, original_data)
+    
     def _validate_real_analysis(self, analysis: Dict[str, Any]) -> bool:
         """Valida se a análise contém dados REAIS (não simulados)"""
         
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Incremental Analysis
+Reaproveita saídas de componentes de análises anteriores: cada componente tem
+uma impressão digital das suas entradas (campos do formulário que lê, fontes
+da pesquisa e saídas dos componentes de que depende)
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando a lógica dos componentes mudar (invalida as saídas guardadas)
+FINGERPRINT_VERSION = 1
+
+# Chaves com horário/estatísticas de execução: não fazem parte do conteúdo da saída
+VOLATILE_KEYS = {
+    'timestamp', 'generated_at', 'research_timestamp', 'execution_stats',
+    'processing_time', 'processing_time_seconds', 'metadata'
+}
+
+def _stable_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+def _sha256(value: Any) -> str:
+    return hashlib.sha256(_stable_json(value).encode('utf-8')).hexdigest()
+
+class IncrementalRun:
+    """Impressões digitais e reaproveitamentos de uma análise"""
+
+    def __init__(self, store: 'IncrementalAnalysisStore', reuse: bool, input_fields: Dict[str, List[str]]):
+        self.store = store
+        self.reuse = reuse
+        self.input_fields = input_fields
+        self.fingerprints: Dict[str, str] = {}
+        self.reused: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, component_name: str, executor: Callable, dependencies: List[str]) -> Callable:
+        """Executor que devolve a saída guardada quando a impressão digital é conhecida"""
+
+        def _incremental_executor(execution_data: Dict[str, Any]) -> Any:
+            fingerprint = self.store.fingerprint(
+                component_name,
+                execution_data,
+                self.input_fields.get(component_name),
+                {dep: execution_data.get(dep) for dep in dependencies}
+            )
+            with self._lock:
+                self.fingerprints[component_name] = fingerprint
+
+            if self.reuse:
+                cached = self.store.get(fingerprint)
+                if cached is not None:
+                    output, session_id = cached
+                    with self._lock:
+                        self.reused[component_name] = session_id
+                    logger.info(f"♻️ Componente {component_name} reaproveitado da sessão {session_id}")
+                    return output
+
+            return executor(execution_data)
+
+        return _incremental_executor
+
+    def record_results(self, execution_report: Dict[str, Any], session_id: str):
+        """Guarda as saídas recalculadas (fallbacks não são reaproveitados)"""
+        components = execution_report.get('critical_path', {}).get('components', {})
+        for component_name, output in execution_report.get('successful_components', {}).items():
+            fingerprint = self.fingerprints.get(component_name)
+            if not fingerprint or component_name in self.reused:
+                continue
+            if components.get(component_name, {}).get('used_fallback'):
+                continue
+            if isinstance(output, dict) and output.get('fallback_mode'):
+                continue
+            self.store.put(fingerprint, component_name, output, session_id)
+
+    def get_report(self) -> Dict[str, Any]:
+        """Resumo para os metadados da análise"""
+        with self._lock:
+            return {
+                'modo_incremental': self.reuse,
+                'componentes_reaproveitados': dict(self.reused),
+                'componentes_recalculados': [name for name in self.fingerprints if name not in self.reused],
+                'impressoes_digitais': dict(self.fingerprints)
+            }
+
+class IncrementalAnalysisStore:
+    """Saídas de componentes por impressão digital das entradas (SQLite, compactadas)"""
+
+    def __init__(self):
+        """Inicializa o armazenamento incremental"""
+        self.enabled = os.getenv('INCREMENTAL_ANALYSIS_ENABLED', 'true').lower() == 'true'
+        self.default_reuse = os.getenv('INCREMENTAL_ANALYSIS_DEFAULT', 'false').lower() == 'true'
+        self.db_path = Path(os.getenv('INCREMENTAL_ANALYSIS_PATH', 'relatorios_intermediarios/componentes_incrementais.db'))
+        self.ttl_seconds = float(os.getenv('INCREMENTAL_ANALYSIS_TTL_HOURS', '72')) * 3600
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+        self.stats = {
+            'runs': 0,
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'errors': 0
+        }
+
+        if self.enabled:
+            try:
+                self._db()
+                logger.info(f"♻️ Incremental Analysis inicializado em {self.db_path} (TTL {self.ttl_seconds / 3600:.0f}h)")
+            except Exception as e:
+                self.enabled = False
+                logger.error(f"❌ Análise incremental desabilitada: {e}")
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS component_outputs (
+                    fingerprint TEXT PRIMARY KEY,
+                    component TEXT NOT NULL,
+                    session_id TEXT,
+                    output BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_component_outputs_created ON component_outputs(created_at);
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def output_fingerprint(component_name: str, output: Any) -> str:
+        """Impressão digital de uma saída (pesquisa: conjunto de fontes)"""
+        if component_name == 'pesquisa_web_massiva' and isinstance(output, dict):
+            sources = sorted(
+                item.get('url', '') for item in output.get('extracted_content', []) if isinstance(item, dict)
+            )
+            return _sha256({'fontes': sources, 'fallback': bool(output.get('fallback_mode'))})
+        if isinstance(output, dict):
+            output = {key: value for key, value in output.items() if key not in VOLATILE_KEYS}
+        return _sha256(output)
+
+    def fingerprint(
+        self,
+        component_name: str,
+        data: Dict[str, Any],
+        fields: Optional[List[str]],
+        upstream: Dict[str, Any]
+    ) -> str:
+        """
+        Impressão digital das entradas de um componente. Sem lista de campos
+        declarada, todos os campos simples do formulário entram.
+        """
+        if fields is None:
+            fields = sorted(
+                key for key, value in data.items()
+                if key not in upstream and key not in ('previous_results', 'session_id', 'incremental')
+                and isinstance(value, (str, int, float, bool, type(None)))
+            )
+        values = {}
+        for field in fields:
+            value = data.get(field)
+            values[field] = value.strip() if isinstance(value, str) else value
+        return _sha256({
+            'versao': FINGERPRINT_VERSION,
+            'componente': component_name,
+            'campos': values,
+            'dependencias': {
+                dep: self.output_fingerprint(dep, output) for dep, output in sorted(upstream.items())
+            }
+        })
+
+    def start_run(self, reuse: Optional[bool] = None, input_fields: Optional[Dict[str, List[str]]] = None) -> IncrementalRun:
+        """Nova análise; `reuse` (padrão INCREMENTAL_ANALYSIS_DEFAULT) liga o reaproveitamento"""
+        self.stats['runs'] += 1
+        reuse = self.default_reuse if reuse is None else reuse
+        return IncrementalRun(self, reuse and self.enabled, input_fields or {})
+
+    def get(self, fingerprint: str) -> Optional[tuple]:
+        """(saída, sessão de origem) guardada para a impressão digital"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._db().execute(
+                    'SELECT output, session_id FROM component_outputs WHERE fingerprint = ? AND created_at >= ?',
+                    (fingerprint, time.time() - self.ttl_seconds)
+                ).fetchone()
+            if not row:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return json.loads(zlib.decompress(row[0]).decode('utf-8')), row[1]
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao consultar saída incremental: {e}")
+            return None
+
+    def put(self, fingerprint: str, component_name: str, output: Any, session_id: Optional[str]):
+        """Guarda a saída de um componente (e remove as expiradas)"""
+        if not self.enabled:
+            return
+        try:
+            blob = zlib.compress(_stable_json(output).encode('utf-8'))
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    'INSERT OR REPLACE INTO component_outputs (fingerprint, component, session_id, output, created_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (fingerprint, component_name, session_id, blob, time.time())
+                )
+                conn.execute('DELETE FROM component_outputs WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+                conn.commit()
+            self.stats['stores'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erro ao guardar saída incremental de {component_name}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores e configuração"""
+        return {
+            **self.stats,
+            'enabled': self.enabled,
+            'default_reuse': self.default_reuse,
+            'ttl_hours': self.ttl_seconds / 3600
+        }
+
+# Instância global
+incremental_analysis = IncrementalAnalysisStore()
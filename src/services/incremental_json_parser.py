@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Incremental JSON Parser
+Parser incremental que libera as seções de topo de um objeto JSON assim que fecham
+"""
+
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Tuple, Optional, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+class IncrementalJSONParser:
+    """
+    Recebe a resposta da IA em pedaços (streaming) e devolve cada seção de topo
+    ("avatar_ultra_detalhado": {...}, "drivers_mentais_customizados": [...], ...)
+    assim que ela termina. Texto antes do primeiro '{' (cercas ```json, preâmbulo)
+    é ignorado. Cada caractere é examinado uma única vez.
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, Any] = {}
+        self.started = False
+        self.finished = False
+        self.errors = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+        self._chunks: List[str] = []
+
+    def consume(
+        self,
+        response: Iterable[Any],
+        on_section: Callable[[str, Any], None],
+        start_time: Optional[float] = None
+    ) -> str:
+        """
+        Lê um generate_content(stream=True) do Gemini, entregando cada seção a
+        on_section assim que fecha, e retorna o texto completo. Se o streaming
+        for interrompido, a exceção sobe e o texto/seções recebidos até ali
+        continuam em `text` e `sections`.
+        """
+        start_time = start_time or time.time()
+        for chunk in response:
+            try:
+                chunk_text = chunk.text
+            except ValueError:
+                # Chunk sem partes de texto (ex.: apenas finish_reason)
+                continue
+            if not chunk_text:
+                continue
+            self._chunks.append(chunk_text)
+            for section_name, section_data in self.feed(chunk_text):
+                if len(self.sections) == 1:
+                    logger.info(f"⚡ Primeira seção ({section_name}) pronta em {time.time() - start_time:.2f}s")
+                on_section(section_name, section_data)
+        return self.text
+
+    @property
+    def text(self) -> str:
+        """Texto bruto recebido via consume()"""
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Processa um pedaço de texto e retorna as seções concluídas nele"""
+        completed = []
+        if self.finished or not chunk:
+            return completed
+
+        for char in chunk:
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    # Fim do objeto de topo
+                    self._close_member(completed)
+                    self.finished = True
+                    break
+            elif char == ',' and self._depth == 1:
+                self._close_member(completed)
+                continue
+
+            self._member.append(char)
+
+        return completed
+
+    def _close_member(self, completed: List[Tuple[str, Any]]):
+        """Decodifica o par "chave": valor acumulado no nível 1"""
+        text = ''.join(self._member).strip()
+        self._member = []
+        if not text:
+            return
+        try:
+            member = json.loads('{' + text + '}')
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Seção JSON inválida descartada no streaming: {e}")
+            return
+        for key, value in member.items():
+            self.sections[key] = value
+            completed.append((key, value))
+
+    @property
+    def complete(self) -> bool:
+        """Indica se o objeto de topo foi fechado"""
+        return self.finished
+
+    def result(self) -> Dict[str, Any]:
+        """Seções concluídas até agora (parciais se a resposta foi truncada)"""
+        return dict(self.sections)
+
+def publish_section(
+    section_name: str,
+    section_data: Any,
+    session_id: Optional[str] = None,
+    on_section: Optional[Callable[[str, Any], None]] = None
+):
+    """Salva uma seção concluída, publica no progresso da sessão e entrega a on_section"""
+    from services.auto_save_manager import salvar_etapa
+    from services.progress_bus import progress_bus
+
+    salvar_etapa(f"gemini_secao_{section_name}", section_data, categoria="analise_gemini", session_id=session_id)
+
+    if session_id:
+        progress_bus.publish(session_id, {
+            'event': 'section',
+            'session_id': session_id,
+            'section': section_name,
+            'current_message': f"✅ Seção concluída: {section_name}",
+            'timestamp': datetime.now().isoformat()
+        })
+
+    if on_section:
+        try:
+            on_section(section_name, section_data)
+        except Exception as e:
+            logger.error(f"❌ Erro no callback da seção {section_name}: {str(e)}")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Parsed Document
+HTML analisado uma única vez (lxml) e compartilhado por todos os extratores,
+incluindo links e metadados, obtidos na mesma passada sobre a árvore
+"""
+
+import re
+import copy
+import logging
+import threading
+from urllib.parse import urljoin, urlparse
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Union
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+# Declaração XML com encoding não é aceita pelo lxml em strings unicode
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>', re.IGNORECASE)
+
+# Extensões ignoradas na coleta de links
+SKIPPED_LINK_EXTENSIONS = ('.pdf', '.jpg', '.png', '.gif', '.zip')
+
+_xpath_cache: Dict[str, Any] = {}
+
+def _selector_xpath(selector: str):
+    """Converte seletores simples (tag, .classe, #id, [atributo]) em XPath compilado"""
+    if selector not in _xpath_cache:
+        if selector.startswith('.'):
+            expression = f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {selector[1:]} ')]"
+        elif selector.startswith('#'):
+            expression = f"//*[@id='{selector[1:]}']"
+        elif selector.startswith('[') and selector.endswith(']'):
+            expression = f"//*[@{selector[1:-1]}]"
+        else:
+            expression = f"//{selector}"
+        _xpath_cache[selector] = etree.XPath(expression)
+    return _xpath_cache[selector]
+
+class ParsedDocument:
+    """
+    Árvore lxml de uma página, criada na primeira consulta e reutilizada.
+
+    Os extratores não alteram a árvore: remoção de script/style/nav etc. é
+    feita ignorando essas subárvores na leitura (parâmetro `skip`). Bibliotecas
+    que modificam a árvore recebem uma cópia (copy_tree), bem mais barata que
+    um novo parse.
+    """
+
+    def __init__(self, html: Union[str, bytes], url: str = ''):
+        self.html = html or ''
+        self.url = url
+        self._tree = None
+        self._parsed = False
+        self._texts: Dict[Tuple[str, ...], str] = {}
+        self._scan: Optional[Dict[str, Any]] = None
+        self._lock = threading.RLock()
+
+    @property
+    def tree(self):
+        """Elemento raiz (None se o lxml não estiver disponível ou o HTML for inválido)"""
+        if not self._parsed:
+            with self._lock:
+                if not self._parsed:
+                    self._tree = self._parse()
+                    self._parsed = True
+        return self._tree
+
+    def _parse(self):
+        if not HAS_LXML or not self.html:
+            return None
+        html = self.html
+        if isinstance(html, str):
+            html = XML_DECLARATION.sub('', html, count=1)
+        try:
+            return lxml.html.document_fromstring(html)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao analisar HTML de {self.url}: {e}")
+            return None
+
+    @property
+    def available(self) -> bool:
+        """Indica se há árvore utilizável"""
+        return self.tree is not None
+
+    def copy_tree(self):
+        """Cópia da árvore para bibliotecas que a modificam (trafilatura, readability)"""
+        tree = self.tree
+        return copy.deepcopy(tree) if tree is not None else None
+
+    def _walk(self, element, skip: Iterable[str], tags: Optional[Iterable[str]] = None):
+        """
+        Percorre a subárvore em ordem de documento ignorando as tags de `skip`.
+        Gera strings (texto visível) ou, se `tags` for informado, os elementos dessas tags.
+        """
+        skip = set(skip)
+        wanted = set(tags) if tags is not None else None
+        stack = [element]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                if wanted is None:
+                    yield item
+                continue
+            # Comentários e instruções de processamento não têm tag textual
+            if not isinstance(item.tag, str) or item.tag in skip:
+                continue
+            if wanted is None:
+                if item.text:
+                    yield item.text
+            elif item.tag in wanted:
+                yield item
+            for child in reversed(item):
+                if wanted is None and child.tail:
+                    stack.append(child.tail)
+                stack.append(child)
+
+    def text(self, element=None, skip: Iterable[str] = ('script', 'style'), strip: bool = False) -> str:
+        """
+        Texto visível do elemento (ou do documento), sem as subárvores de `skip`.
+        Com strip=True cada trecho é aparado antes da junção (como get_text(strip=True)).
+        """
+        if strip:
+            root = element if element is not None else self.tree
+            return ''.join(part.strip() for part in self._walk(root, skip)) if root is not None else ''
+        if element is None:
+            key = tuple(sorted(skip))
+            if key not in self._texts:
+                tree = self.tree
+                self._texts[key] = ''.join(self._walk(tree, skip)) if tree is not None else ''
+            return self._texts[key]
+        return ''.join(self._walk(element, skip))
+
+    def find_all(self, tags: Iterable[str], skip: Iterable[str] = ()) -> List[Any]:
+        """Elementos das tags informadas fora das subárvores de `skip`"""
+        tree = self.tree
+        return list(self._walk(tree, skip, tags)) if tree is not None else []
+
+    def select(self, selector: str, skip: Iterable[str] = ()) -> List[Any]:
+        """Elementos do seletor simples (tag, .classe, #id, [atributo]) fora de `skip`"""
+        tree = self.tree
+        if tree is None:
+            return []
+        skip = set(skip)
+        elements = _selector_xpath(selector)(tree)
+        if not skip:
+            return elements
+        return [
+            element for element in elements
+            if element.tag not in skip and not any(a.tag in skip for a in element.iterancestors())
+        ]
+
+    def body(self):
+        """Elemento <body> (ou a raiz)"""
+        tree = self.tree
+        if tree is None:
+            return None
+        body = tree.find('body')
+        return body if body is not None else tree
+
+    def _scan_document(self) -> Dict[str, Any]:
+        """Uma única passada coleta título, metatags, URL canônica e links"""
+        if self._scan is not None:
+            return self._scan
+
+        metadata = {
+            'title': '',
+            'description': '',
+            'keywords': '',
+            'author': '',
+            'published_date': '',
+            'language': '',
+            'canonical_url': self.url
+        }
+        anchors = []
+        tree = self.tree
+        if tree is not None:
+            for element in tree.iter('title', 'meta', 'link', 'a'):
+                tag = element.tag
+                if tag == 'a':
+                    href = element.get('href')
+                    if href is not None:
+                        anchors.append((href, element.text_content().strip()[:100], element.get('title', '')))
+                elif tag == 'meta':
+                    name = (element.get('name') or '').lower()
+                    property_attr = (element.get('property') or '').lower()
+                    content = element.get('content', '')
+
+                    if name == 'description' or property_attr == 'og:description':
+                        metadata['description'] = content
+                    elif name == 'keywords':
+                        metadata['keywords'] = content
+                    elif name == 'author':
+                        metadata['author'] = content
+                    elif name == 'language' or name == 'lang':
+                        metadata['language'] = content
+                    elif property_attr == 'article:published_time':
+                        metadata['published_date'] = content
+                elif tag == 'title':
+                    if not metadata['title']:
+                        metadata['title'] = element.text_content().strip()
+                elif tag == 'link' and 'canonical' in (element.get('rel') or '').lower().split():
+                    metadata['canonical_url'] = element.get('href', self.url)
+
+        self._scan = {'metadata': metadata, 'anchors': anchors}
+        return self._scan
+
+    def export_scan(self) -> Dict[str, Any]:
+        """Resultado da passada de links/metadados (serializável, para outro processo)"""
+        return self._scan_document()
+
+    def adopt_scan(self, scan: Dict[str, Any]):
+        """Usa a passada feita em outro processo (links/metadados sem novo parse)"""
+        if self._scan is None:
+            self._scan = scan
+
+    def metadata(self) -> Dict[str, Any]:
+        """Metadados da página (título, descrição, autor, data, idioma, URL canônica)"""
+        return dict(self._scan_document()['metadata'])
+
+    def links(self, internal_only: bool = True, limit: Optional[int] = 20) -> List[Dict[str, str]]:
+        """Links da página (absolutos, sem âncoras nem arquivos binários)"""
+        base_domain = urlparse(self.url).netloc
+        links = []
+        for href, text, title in self._scan_document()['anchors']:
+            full_url = urljoin(self.url, href)
+
+            # Filtra apenas links internos se solicitado
+            if internal_only and urlparse(full_url).netloc != base_domain:
+                continue
+
+            if (full_url.startswith('http') and
+                '#' not in full_url and
+                not any(ext in full_url.lower() for ext in SKIPPED_LINK_EXTENSIONS)):
+                links.append({'url': full_url, 'text': text, 'title': title})
+                if limit and len(links) >= limit:
+                    break
+        return links
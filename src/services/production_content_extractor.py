@@ -28,22 +28,7 @@ class ProductionContentExtractor:
 
     def extract_metadata(self, url: str) -> Dict[str, Any]:
         """Redireciona para RobustContentExtractor"""
-        # RobustContentExtractor não tem extract_metadata, então mantém funcionalidade básica
-        try:
-            import requests
-            from bs4 import BeautifulSoup
-
-            response = requests.get(url, timeout=15)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, "html.parser")
-                title_tag = soup.find('title')
-                return {
-                    'title': title_tag.get_text().strip() if title_tag else '',
-                    'url': url
-                }
-            return {'error': f'HTTP {response.status_code}'}
-        except Exception as e:
-            return {'error': str(e)}
+        return self.extractor.extract_metadata(url)
 
     def batch_extract(self, urls: List[str], max_workers: int = 5) -> Dict[str, Optional[str]]:
         """Redireciona para RobustContentExtractor"""
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Progress Bus
+Barramento de progresso compartilhado entre workers (SQLite local ou Redis)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+class SQLiteProgressBackend:
+    """Backend local: estado e eventos em SQLite (compartilhado pelos workers da máquina)"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: str, ttl_seconds: int):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = float(os.getenv('PROGRESS_POLL_INTERVAL', '0.25'))
+        self._lock = threading.Lock()
+        self._new_event = threading.Condition()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._last_cleanup = 0.0
+        self._db()
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS progress_state (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS progress_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_progress_events_session ON progress_events(session_id, id);
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def set_state(self, session_id: str, state: Dict[str, Any]):
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                'INSERT OR REPLACE INTO progress_state (session_id, state, updated_at) VALUES (?, ?, ?)',
+                (session_id, json.dumps(state, ensure_ascii=False, default=str), time.time())
+            )
+            conn.commit()
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute(
+                'SELECT state FROM progress_state WHERE session_id = ? AND updated_at > ?',
+                (session_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_states(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db().execute(
+                'SELECT state FROM progress_state WHERE updated_at > ? ORDER BY updated_at DESC',
+                (time.time() - self.ttl_seconds,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def publish(self, session_id: str, event: Dict[str, Any]) -> str:
+        with self._lock:
+            conn = self._db()
+            cursor = conn.execute(
+                'INSERT INTO progress_events (session_id, data, created_at) VALUES (?, ?, ?)',
+                (session_id, json.dumps(event, ensure_ascii=False, default=str), time.time())
+            )
+            conn.commit()
+            event_id = str(cursor.lastrowid)
+            self._cleanup_if_needed(conn)
+
+        # Acorda leitores do mesmo processo; outros workers percebem no próximo poll
+        with self._new_event:
+            self._new_event.notify_all()
+        return event_id
+
+    def read_events(self, session_id: str, last_id: Optional[str] = None, timeout: float = 0) -> List[Tuple[str, Dict[str, Any]]]:
+        try:
+            after = int(last_id) if last_id else 0
+        except ValueError:
+            after = 0
+
+        deadline = time.time() + max(0.0, timeout)
+        while True:
+            with self._lock:
+                rows = self._db().execute(
+                    'SELECT id, data FROM progress_events WHERE session_id = ? AND id > ? ORDER BY id LIMIT 500',
+                    (session_id, after)
+                ).fetchall()
+            if rows:
+                return [(str(event_id), json.loads(data)) for event_id, data in rows]
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return []
+            with self._new_event:
+                self._new_event.wait(min(self.poll_interval, remaining))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            conn = self._db()
+            conn.execute('DELETE FROM progress_state WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM progress_events WHERE session_id = ?', (session_id,))
+            conn.commit()
+
+    def _cleanup_if_needed(self, conn: sqlite3.Connection):
+        """Remove sessões expiradas (no máximo uma vez por minuto)"""
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        cutoff = now - self.ttl_seconds
+        conn.execute('DELETE FROM progress_state WHERE updated_at < ?', (cutoff,))
+        conn.execute('DELETE FROM progress_events WHERE created_at < ?', (cutoff,))
+        conn.commit()
+
+class RedisProgressBackend:
+    """Backend distribuído: estado em chaves com TTL e eventos em Redis Streams"""
+
+    name = 'redis'
+
+    def __init__(self, url: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_events = int(os.getenv('PROGRESS_MAX_EVENTS', '1000'))
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.client.ping()
+
+    def _state_key(self, session_id: str) -> str:
+        return f"progress:state:{session_id}"
+
+    def _events_key(self, session_id: str) -> str:
+        return f"progress:events:{session_id}"
+
+    def set_state(self, session_id: str, state: Dict[str, Any]):
+        self.client.set(self._state_key(session_id), json.dumps(state, ensure_ascii=False, default=str), ex=self.ttl_seconds)
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data = self.client.get(self._state_key(session_id))
+        return json.loads(data) if data else None
+
+    def list_states(self) -> List[Dict[str, Any]]:
+        states = []
+        for key in self.client.scan_iter(match=self._state_key('*'), count=100):
+            data = self.client.get(key)
+            if data:
+                states.append(json.loads(data))
+        return states
+
+    def publish(self, session_id: str, event: Dict[str, Any]) -> str:
+        key = self._events_key(session_id)
+        pipe = self.client.pipeline()
+        pipe.xadd(key, {'data': json.dumps(event, ensure_ascii=False, default=str)}, maxlen=self.max_events, approximate=True)
+        pipe.expire(key, self.ttl_seconds)
+        event_id, _ = pipe.execute()
+        return event_id
+
+    def read_events(self, session_id: str, last_id: Optional[str] = None, timeout: float = 0) -> List[Tuple[str, Dict[str, Any]]]:
+        block_ms = int(timeout * 1000) if timeout > 0 else None
+        response = self.client.xread({self._events_key(session_id): last_id or '0-0'}, count=500, block=block_ms)
+        events = []
+        for _, entries in response or []:
+            for event_id, fields in entries:
+                events.append((event_id, json.loads(fields['data'])))
+        return events
+
+    def delete(self, session_id: str):
+        self.client.delete(self._state_key(session_id), self._events_key(session_id))
+
+class ProgressBus:
+    """Fachada do barramento de progresso usada pelas rotas e pelo ProgressTracker"""
+
+    def __init__(self):
+        """Seleciona o backend configurado"""
+        self.ttl_seconds = int(os.getenv('PROGRESS_TTL_SECONDS', '3600'))
+        backend_name = os.getenv('PROGRESS_BACKEND', 'sqlite').lower()
+        self.backend = None
+
+        if backend_name == 'redis':
+            if HAS_REDIS:
+                try:
+                    self.backend = RedisProgressBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'), self.ttl_seconds)
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis indisponível para progresso ({e}) - usando SQLite")
+            else:
+                logger.warning("⚠️ Biblioteca redis não instalada - usando SQLite para progresso")
+
+        if self.backend is None:
+            self.backend = SQLiteProgressBackend(os.getenv('PROGRESS_DB_PATH', 'progress_bus.db'), self.ttl_seconds)
+
+        logger.info(f"📡 Progress Bus inicializado (backend: {self.backend.name})")
+
+    def set_state(self, session_id: str, state: Dict[str, Any]):
+        """Grava o estado atual da sessão"""
+        try:
+            self.backend.set_state(session_id, state)
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar estado de progresso {session_id}: {e}")
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Estado atual da sessão (ou None se não existir/expirou)"""
+        try:
+            return self.backend.get_state(session_id)
+        except Exception as e:
+            logger.error(f"❌ Erro ao ler estado de progresso {session_id}: {e}")
+            return None
+
+    def list_states(self) -> List[Dict[str, Any]]:
+        """Estados de todas as sessões ativas"""
+        try:
+            return self.backend.list_states()
+        except Exception as e:
+            logger.error(f"❌ Erro ao listar sessões de progresso: {e}")
+            return []
+
+    def publish(self, session_id: str, event: Dict[str, Any]) -> Optional[str]:
+        """Publica um evento de progresso e retorna seu ID"""
+        try:
+            return self.backend.publish(session_id, event)
+        except Exception as e:
+            logger.error(f"❌ Erro ao publicar progresso {session_id}: {e}")
+            return None
+
+    def read_events(self, session_id: str, last_id: Optional[str] = None, timeout: float = 0) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Eventos publicados depois de `last_id`.
+
+        Com `timeout` > 0, bloqueia até chegar algum evento ou o tempo acabar.
+        """
+        try:
+            return self.backend.read_events(session_id, last_id, timeout)
+        except Exception as e:
+            logger.error(f"❌ Erro ao ler eventos de progresso {session_id}: {e}")
+            if timeout > 0:
+                time.sleep(min(timeout, 1.0))
+            return []
+
+    def delete(self, session_id: str):
+        """Remove estado e eventos da sessão"""
+        try:
+            self.backend.delete(session_id)
+        except Exception as e:
+            logger.error(f"❌ Erro ao remover progresso {session_id}: {e}")
+
+# Instância global
+progress_bus = ProgressBus()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Rate Limiter
+Limitador central por provedor (requisições/min, tokens/min e concorrência)
+para as APIs de IA, buscadores e scraping
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão (sobrescritos por RATE_LIMIT_<NOME>_RPM / _TPM / _CONCURRENCY)
+DEFAULT_LIMITS = {
+    # IA
+    'gemini': {'rpm': 60, 'tpm': 1000000, 'concurrency': 4},
+    'groq': {'rpm': 30, 'tpm': 30000, 'concurrency': 2},
+    'openai': {'rpm': 60, 'tpm': 90000, 'concurrency': 4},
+    'huggingface': {'rpm': 30, 'tpm': 0, 'concurrency': 2},
+    # Buscadores
+    'google': {'rpm': 100, 'tpm': 0, 'concurrency': 4},
+    'serper': {'rpm': 300, 'tpm': 0, 'concurrency': 5},
+    'bing': {'rpm': 30, 'tpm': 0, 'concurrency': 3},
+    'duckduckgo': {'rpm': 20, 'tpm': 0, 'concurrency': 2},
+    'yahoo': {'rpm': 20, 'tpm': 0, 'concurrency': 2},
+    # Scraping
+    'google_web': {'rpm': 10, 'tpm': 0, 'concurrency': 1},
+    'web': {'rpm': 120, 'tpm': 0, 'concurrency': 8}
+}
+
+class LocalBucketStore:
+    """Estado dos baldes em memória (por processo)"""
+
+    name = 'local'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def reserve(self, key: str, amount: float, capacity: float, rate: float) -> float:
+        """Debita `amount` do balde e retorna quantos segundos esperar pela reserva"""
+        with self._lock:
+            now = time.time()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate) - amount
+            self._buckets[key] = (tokens, now)
+        return max(0.0, -tokens / rate)
+
+    def drain(self, key: str, seconds: float, rate: float):
+        """Esvazia o balde para que todos aguardem `seconds` (após um 429)"""
+        with self._lock:
+            self._buckets[key] = (-seconds * rate, time.time())
+
+class SQLiteBucketStore:
+    """Estado dos baldes em SQLite, compartilhado pelos workers da máquina"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._db()
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn_pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+        return self._conn
+
+    def reserve(self, key: str, amount: float, capacity: float, rate: float) -> float:
+        with self._lock:
+            conn = self._db()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + (now - updated) * rate) - amount
+                conn.execute(
+                    'INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                    (key, tokens, now)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return max(0.0, -tokens / rate)
+
+    def drain(self, key: str, seconds: float, rate: float):
+        with self._lock:
+            self._db().execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                (key, -seconds * rate, time.time())
+            )
+
+class ConcurrencySlots:
+    """Semáforo redimensionável: vagas de concorrência de um provedor no processo"""
+
+    def __init__(self, capacity: int):
+        self._cond = threading.Condition()
+        self.capacity = max(1, capacity)
+        self.active = 0
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.capacity:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self):
+        with self._cond:
+            self.active = max(0, self.active - 1)
+            self._cond.notify()
+
+    def resize(self, capacity: int):
+        """Novo limite; quem já ocupa uma vaga continua até liberar"""
+        with self._cond:
+            self.capacity = max(1, capacity)
+            self._cond.notify_all()
+
+class RateLimiter:
+    """
+    Token bucket por provedor: um balde de requisições (RPM) e, quando
+    configurado, um de tokens (TPM). Cada chamada reserva sua cota e dorme
+    apenas o necessário; sem fila, não há espera nenhuma. A concorrência
+    máxima é controlada por vagas (ConcurrencySlots) em cada processo e vale apenas para
+    limit()/limit_async(), que envolvem a requisição inteira.
+    """
+
+    def __init__(self):
+        """Inicializa o limitador"""
+        self.burst_seconds = float(os.getenv('RATE_LIMIT_BURST_SECONDS', '10'))
+        self.max_wait = float(os.getenv('RATE_LIMIT_MAX_WAIT', '120'))
+        self.limits: Dict[str, Dict[str, int]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._slots: Dict[str, ConcurrencySlots] = {}
+        self._lock = threading.Lock()
+        # Provedores cuja vaga de concorrência a thread já ocupa (limit aninhado)
+        self._held = threading.local()
+
+        self.store = LocalBucketStore()
+        if os.getenv('RATE_LIMIT_SHARED', 'false').lower() == 'true':
+            try:
+                self.store = SQLiteBucketStore(os.getenv('RATE_LIMIT_DB_PATH', 'rate_limits.db'))
+            except Exception as e:
+                logger.warning(f"⚠️ Estado compartilhado do rate limiter indisponível ({e}) - usando memória local")
+
+        for name, limits in DEFAULT_LIMITS.items():
+            self.configure(name, **limits)
+
+        logger.info(f"🚦 Rate Limiter inicializado ({len(self.limits)} provedores, estado: {self.store.name})")
+
+    def configure(self, name: str, rpm: Optional[int] = None, tpm: Optional[int] = None, concurrency: Optional[int] = None):
+        """
+        Registra/atualiza os limites de um provedor (variáveis de ambiente têm
+        precedência). Limites iguais aos atuais não mudam nada; uma nova
+        concorrência redimensiona as vagas sem perder as que estão ocupadas.
+        """
+        env_prefix = f"RATE_LIMIT_{name.upper()}"
+        with self._lock:
+            current = self.limits.get(name, {'rpm': 60, 'tpm': 0, 'concurrency': 4})
+            limits = {
+                'rpm': int(os.getenv(f'{env_prefix}_RPM', rpm if rpm is not None else current['rpm'])),
+                'tpm': int(os.getenv(f'{env_prefix}_TPM', tpm if tpm is not None else current['tpm'])),
+                'concurrency': int(os.getenv(f'{env_prefix}_CONCURRENCY', concurrency if concurrency is not None else current['concurrency']))
+            }
+            if self.limits.get(name) == limits:
+                return
+            self.limits[name] = limits
+            if name in self._slots:
+                self._slots[name].resize(limits['concurrency'])
+            else:
+                self._slots[name] = ConcurrencySlots(limits['concurrency'])
+            self.stats.setdefault(name, {
+                'acquisitions': 0,
+                'throttled': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0,
+                'in_flight': 0,
+                'penalties': 0
+            })
+
+    def _limits(self, name: str) -> Dict[str, int]:
+        if name not in self.limits:
+            self.configure(name)
+        return self.limits[name]
+
+    def _reserve(self, name: str, tokens: int = 0) -> float:
+        """Reserva cota de requisição (e de tokens) e retorna a espera necessária"""
+        limits = self._limits(name)
+        wait = 0.0
+
+        if limits['rpm'] > 0:
+            rate = limits['rpm'] / 60.0
+            capacity = max(1.0, rate * self.burst_seconds)
+            wait = self.store.reserve(f"{name}:rpm", 1, capacity, rate)
+
+        if limits['tpm'] > 0 and tokens > 0:
+            rate = limits['tpm'] / 60.0
+            wait = max(wait, self.store.reserve(f"{name}:tpm", min(tokens, limits['tpm']), float(limits['tpm']), rate))
+
+        wait = min(wait, self.max_wait)
+        stats = self.stats[name]
+        stats['acquisitions'] += 1
+        if wait > 0:
+            stats['throttled'] += 1
+            stats['total_wait'] += wait
+            stats['max_wait'] = max(stats['max_wait'], wait)
+        return wait
+
+    def acquire(self, name: str, tokens: int = 0) -> float:
+        """Aguarda cota para uma requisição; retorna o tempo esperado (segundos)"""
+        wait = self._reserve(name, tokens)
+        if wait > 0:
+            logger.debug(f"🚦 {name}: aguardando {wait:.2f}s de cota")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, name: str, tokens: int = 0) -> float:
+        """Versão assíncrona de acquire (reserva no executor; não bloqueia o event loop)"""
+        loop = asyncio.get_running_loop()
+        wait = await loop.run_in_executor(None, self._reserve, name, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    @contextmanager
+    def limit(self, name: str, tokens: int = 0):
+        """Limita concorrência e taxa: `with rate_limiter.limit('groq', tokens=...) as wait:`"""
+        self._limits(name)
+        held = self._held.__dict__.setdefault('names', set())
+        if name in held:
+            # A thread já ocupa uma vaga deste provedor: só debita a taxa
+            yield self.acquire(name, tokens)
+            return
+
+        start = time.time()
+        slots = self._slots[name]
+        slots.acquire()
+        held.add(name)
+        try:
+            with self._in_flight(name, time.time() - start) as concurrency_wait:
+                yield self.acquire(name, tokens) + concurrency_wait
+        finally:
+            held.discard(name)
+            slots.release()
+
+    @asynccontextmanager
+    async def limit_async(self, name: str, tokens: int = 0):
+        """Versão assíncrona de limit: `async with rate_limiter.limit_async('serper') as wait:`"""
+        self._limits(name)
+        start = time.time()
+        slots = self._slots[name]
+        # Mesmas vagas das threads: a espera roda no executor, sem bloquear o event loop
+        loop = asyncio.get_running_loop()
+        acquiring = loop.run_in_executor(None, slots.acquire)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # Cancelado durante a espera: a vaga obtida depois é devolvida
+            acquiring.add_done_callback(lambda f: f.cancelled() or f.exception() or slots.release())
+            raise
+        try:
+            with self._in_flight(name, time.time() - start) as concurrency_wait:
+                yield await self.acquire_async(name, tokens) + concurrency_wait
+        finally:
+            slots.release()
+
+    @contextmanager
+    def _in_flight(self, name: str, concurrency_wait: float):
+        """Contabiliza a requisição em andamento e a espera por vaga"""
+        stats = self.stats[name]
+        stats['in_flight'] += 1
+        if concurrency_wait > 0.01:
+            stats['total_wait'] += concurrency_wait
+        try:
+            yield concurrency_wait
+        finally:
+            stats['in_flight'] -= 1
+
+    def penalize(self, name: str, seconds: float):
+        """Provedor respondeu 429: bloqueia novas requisições por `seconds`"""
+        limits = self._limits(name)
+        if limits['rpm'] > 0:
+            self.store.drain(f"{name}:rpm", seconds, limits['rpm'] / 60.0)
+        self.stats[name]['penalties'] += 1
+        logger.warning(f"⚠️ Rate limit em {name}: novas requisições aguardam {seconds:.0f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Limites e esperas acumuladas por provedor"""
+        return {
+            name: {
+                **self.limits[name],
+                **stats,
+                'avg_wait': stats['total_wait'] / stats['acquisitions'] if stats['acquisitions'] else 0.0
+            }
+            for name, stats in self.stats.items()
+        }
+
+# Instância global
+rate_limiter = RateLimiter()
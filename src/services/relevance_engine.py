@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Relevance Engine
+Motor de relevância compartilhado: tokeniza o conteúdo uma vez em uma tabela
+de frequências e pontua todos os conjuntos de termos com saturação BM25
+"""
+
+import os
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Números (com % opcional), o marcador "r$" e palavras; tudo sobre o texto em minúsculas
+TOKEN_PATTERN = re.compile(r'r\$|\d+(?:[.,]\d+)*%?|\w+')
+
+NUMBER_TOKEN = '<numero>'
+MONEY_TOKEN = '<valor_monetario>'
+
+# Pesos por serviço (equivalentes aos antigos _calculate_real_relevance)
+PROFILES = {
+    'deep_search': {
+        'min_length': 100,
+        'query_weight': 3.0,
+        'context_weight': 2.0,
+        'market_weight': 1.0,
+        'number_weight': 0.5,
+        'money_weight': 1.0,
+        'length_bonus': [(1000, 5.0), (500, 3.0)],
+        'market_terms': [
+            "mercado brasileiro", "brasil", "dados", "estatística", "pesquisa",
+            "relatório", "análise", "tendência", "oportunidade", "crescimento",
+            "demanda", "inovação", "tecnologia", "2024", "2025", "investimento",
+            "startup", "empresa", "negócio", "consumidor", "cliente", "vendas"
+        ]
+    },
+    'websailor': {
+        'min_length': 50,
+        'query_weight': 2.0,
+        'context_weight': 1.5,
+        'market_weight': 0.5,
+        'number_weight': 0.3,
+        'money_weight': 0.0,
+        'length_bonus': [(500, 2.0)],
+        'market_terms': [
+            "mercado", "análise", "tendência", "oportunidade", "estratégia",
+            "marketing", "concorrência", "público", "crescimento", "demanda",
+            "inovação", "tecnologia", "brasil", "brasileiro", "2024", "2025",
+            "dados", "estatística", "pesquisa", "relatório", "estudo"
+        ]
+    }
+}
+
+class RelevanceDocument:
+    """Tabela de frequências de um texto (tokenizado uma única vez)"""
+
+    MAX_PHRASE_TOKENS = 6
+
+    def __init__(self, text: str):
+        tokens = TOKEN_PATTERN.findall((text or '').lower())
+        self.tokens = tokens
+        self.length = len(tokens)
+        self.tf = Counter(tokens)
+        self._ngrams: Dict[int, Counter] = {}
+
+        # Números e valores monetários viram pseudo-termos da tabela
+        numbers = sum(count for token, count in self.tf.items() if token[0].isdigit())
+        money = sum(
+            1 for i, token in enumerate(tokens[:-1])
+            if token == 'r$' and tokens[i + 1][0].isdigit()
+        )
+        self.tf[NUMBER_TOKEN] = numbers
+        self.tf[MONEY_TOKEN] = money
+
+    def frequency(self, term: str) -> int:
+        """Ocorrências do termo (palavra ou expressão de várias palavras)"""
+        if term in (NUMBER_TOKEN, MONEY_TOKEN):
+            return self.tf[term]
+        term_tokens = tuple(TOKEN_PATTERN.findall(term.lower()))
+        if not term_tokens:
+            return 0
+        if len(term_tokens) == 1:
+            return self.tf.get(term_tokens[0], 0)
+        if len(term_tokens) > self.MAX_PHRASE_TOKENS or any(t not in self.tf for t in term_tokens):
+            # Expressão longa: aproxima pela palavra menos frequente
+            return min(self.tf.get(t, 0) for t in term_tokens)
+
+        n = len(term_tokens)
+        if n not in self._ngrams:
+            self._ngrams[n] = Counter(zip(*(self.tokens[i:] for i in range(n))))
+        return self._ngrams[n].get(term_tokens, 0)
+
+    def contains(self, term: str) -> bool:
+        """Indica se o termo aparece no texto"""
+        return self.frequency(term) > 0
+
+class RelevanceEngine:
+    """Pontuação de relevância BM25 reutilizada por DeepSearch, WebSailor e tendências"""
+
+    def __init__(self):
+        """Inicializa o motor de relevância"""
+        self.k1 = float(os.getenv('RELEVANCE_BM25_K1', '1.2'))
+        self.b = float(os.getenv('RELEVANCE_BM25_B', '0.75'))
+        # Tamanho médio de página (tokens) usado na normalização por comprimento
+        self.avg_length = float(os.getenv('RELEVANCE_AVG_DOC_TOKENS', '800'))
+
+        logger.info("🎯 Relevance Engine inicializado")
+
+    def analyze(self, text: str) -> RelevanceDocument:
+        """Tokeniza o texto uma vez para pontuar vários conjuntos de termos"""
+        return RelevanceDocument(text)
+
+    def bm25(
+        self,
+        document: RelevanceDocument,
+        weighted_terms: List[Tuple[str, float]],
+        avg_length: Optional[float] = None
+    ) -> float:
+        """
+        Soma BM25 dos termos ponderados (o peso faz o papel do idf). avg_length
+        substitui RELEVANCE_AVG_DOC_TOKENS para coleções de outro tamanho (trechos).
+        """
+        if not document.length:
+            return 0.0
+        norm = self.k1 * (1 - self.b + self.b * document.length / (avg_length or self.avg_length))
+        score = 0.0
+        for term, weight in weighted_terms:
+            tf = document.frequency(term)
+            if tf:
+                score += weight * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+    @staticmethod
+    def context_terms(context: Optional[Dict[str, Any]]) -> List[str]:
+        """Termos de segmento, produto e público do contexto"""
+        context = context or {}
+        terms = []
+        for field in ('segmento', 'produto', 'publico'):
+            if context.get(field):
+                term = str(context[field]).lower()
+                if len(term) > 2:
+                    terms.append(term)
+        return terms
+
+    def score_content(
+        self,
+        content: str,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        profile: str = 'deep_search'
+    ) -> float:
+        """Relevância (0-100) de uma página para a query e o contexto da análise"""
+        settings = PROFILES[profile]
+        if not content or len(content) < settings['min_length']:
+            return 0.0
+
+        document = self.analyze(content)
+
+        weighted_terms = [(w, settings['query_weight']) for w in query.lower().split() if len(w) > 2]
+        weighted_terms += [(t, settings['context_weight']) for t in self.context_terms(context)]
+        weighted_terms += [(t, settings['market_weight']) for t in settings['market_terms']]
+        weighted_terms.append((NUMBER_TOKEN, settings['number_weight']))
+        if settings['money_weight']:
+            weighted_terms.append((MONEY_TOKEN, settings['money_weight']))
+
+        score = self.bm25(document, weighted_terms)
+
+        # Bonus por volume de informação
+        for min_words, bonus in settings['length_bonus']:
+            if document.length > min_words:
+                score += bonus
+                break
+
+        return min(score, 100.0)
+
+    def score_presence(self, text: str, weighted_terms: List[Tuple[str, float]], cap: float = 1.0) -> float:
+        """Soma os pesos dos termos presentes (textos curtos, como títulos)"""
+        document = self.analyze(text)
+        return min(sum(weight for term, weight in weighted_terms if document.contains(term)), cap)
+
+# Instância global
+relevance_engine = RelevanceEngine()
@@ -6,7 +6,6 @@ Extrator multicamadas aprimorado com suporte a PDF e fallback robusto
 """
 
 import time
-import random
 import os
 import logging
 import requests
@@ -14,8 +13,15 @@ import json
 from typing import Dict, List, Optional, Any, Tuple
 from urllib.parse import urljoin, urlparse
 import re
+import io
+import itertools
 import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import contextvars
+from collections import OrderedDict
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from services.auto_save_manager import salvar_etapa, salvar_erro
 
 # Imports condicionais para não quebrar se não estiver instalado
@@ -38,12 +44,6 @@ try:
 except ImportError:
     HAS_NEWSPAPER = False
 
-try:
-    from bs4 import BeautifulSoup
-    HAS_BEAUTIFULSOUP = True
-except ImportError:
-    HAS_BEAUTIFULSOUP = False
-
 try:
     import PyPDF2
     HAS_PYPDF2 = True
@@ -57,9 +57,20 @@ except ImportError:
     HAS_PDFPLUMBER = False
 
 from services.url_resolver import url_resolver
+from services.extraction_cache import extraction_cache
+from services.extractor_learning import extractor_learning
+from services.parsed_document import ParsedDocument, HAS_LXML
+from services.extraction_pool import extraction_pool, process_html_job, extract_pdf_job, ExtractionTimeout
+from services.deadline import Deadline, DeadlineExceeded
+from services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Subárvores ignoradas por cada estratégia (equivalente ao antigo decompose do BeautifulSoup)
+DEFAULT_SKIP = ('script', 'style')
+DYNAMIC_SKIP = ('script', 'style', 'noscript', 'iframe')
+LAYOUT_SKIP = ('script', 'style', 'nav', 'header', 'footer', 'aside', 'form')
+
 class RobustContentExtractor:
     """Extrator de conteúdo multicamadas e robusto com suporte aprimorado a PDF"""
     
@@ -78,12 +89,30 @@ class RobustContentExtractor:
         self.min_content_length = 200  # Reduzido de 500 para 200
         self.max_content_length = 50000  # 50K chars max
         
+        # Download em streaming com limite de bytes (conteúdo além do limite seria truncado)
+        self.download_chunk_size = 64 * 1024
+        self.max_html_bytes = int(os.getenv('EXTRACTOR_MAX_HTML_BYTES', str(2 * 1024 * 1024)))
+        self.max_pdf_bytes = int(os.getenv('EXTRACTOR_MAX_PDF_BYTES', str(15 * 1024 * 1024)))
+        self.max_pdf_pages = int(os.getenv('EXTRACTOR_MAX_PDF_PAGES', '30'))
+        self.download_stats = {'truncated': 0, 'aborted_non_html': 0, 'aborted_oversized_pdf': 0, 'sniffed_pdf': 0}
+        
+        # Corrida entre os dois melhores extratores do domínio (opcional)
+        self.race_mode = os.getenv('EXTRACTOR_RACE_MODE', 'false').lower() == 'true'
+        self.race_stats = {'races': 0, 'wins': {}}
+        self._race_executor: Optional[ThreadPoolExecutor] = None
+        self._race_executor_pid: Optional[int] = None
+        
+        # Últimos documentos analisados: links e metadados saem da mesma árvore
+        self.document_cache_size = int(os.getenv('EXTRACTOR_DOCUMENT_CACHE', '4'))
+        self._documents: 'OrderedDict[str, ParsedDocument]' = OrderedDict()
+        self._documents_lock = threading.Lock()
+        
         # Estatísticas dos extratores
         self.stats = {
             'trafilatura': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_TRAFILATURA},
             'readability': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_READABILITY},
             'newspaper': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_NEWSPAPER},
-            'beautifulsoup': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_BEAUTIFULSOUP},
+            'beautifulsoup': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_LXML},
             'pdf_pypdf2': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PYPDF2},
             'pdf_pdfplumber': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PDFPLUMBER},
             'global': {
@@ -97,15 +126,29 @@ class RobustContentExtractor:
         logger.info("🔧 Robust Content Extractor inicializado")
         logger.info(f"📚 Extratores disponíveis: {self._get_available_extractors()}")
     
-    def extract_content(self, url: str) -> Optional[str]:
+    def extract_content(
+        self,
+        url: str,
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+        raise_on_timeout: bool = False
+    ) -> Optional[str]:
         """
         Extrai conteúdo usando múltiplos extratores em ordem de prioridade
         Agora com suporte aprimorado a PDF e melhor fallback
+        
+        `timeout` (segundos) e/ou `deadline` (prazo do chamador, ex.: do lote)
+        valem para toda a extração: resolução, download e processamento. Com o
+        extraction_pool habilitado, o processamento que estoura o prazo é
+        encerrado. Prazo esgotado retorna None, ou levanta DeadlineExceeded
+        (com a etapa) se raise_on_timeout=True.
         """
         if not url or not url.startswith('http'):
             logger.error(f"❌ URL inválida: {url}")
             return None
             
+        deadline = Deadline.within(timeout, parent=deadline)
+        
         try:
             start_time = time.time()
             self.stats['global']['total_extractions'] += 1
@@ -113,15 +156,16 @@ class RobustContentExtractor:
             logger.info(f"🔍 Iniciando extração de: {url}")
             
             # 1. Resolve URL de redirecionamento
-            resolved_url = url_resolver.resolve_redirect_url(url)
-            if resolved_url != url:
+            resolved_url = url_resolver.resolve_redirect_url(url, timeout=deadline.timeout(cap=url_resolver.timeout))
+            deadline.check('resolve')
+            if resolved_url != url.strip():
                 logger.info(f"🔄 URL resolvida: {url} -> {resolved_url}")
-                # Salva resolução de URL
+                # Salva resolução de URL (wrappers e redirects; a URL canônica é só chave de cache)
                 salvar_etapa("url_resolvida", {
                     "original": url,
                     "resolved": resolved_url
                 }, categoria="pesquisa_web")
-                url = resolved_url
+            url = resolved_url
             
             # Valida URL resolvida
             if not url.startswith('http'):
@@ -131,23 +175,45 @@ class RobustContentExtractor:
                 self._update_global_stats()
                 return None
             
+            # Consulta cache persistente (entradas válidas dispensam a rede)
+            cached = extraction_cache.get(url)
+            if cached and cached['fresh']:
+                logger.info(f"💾 Conteúdo servido do cache: {url} ({len(cached['text'])} caracteres)")
+                self.stats['global']['total_successes'] += 1
+                self._update_global_stats()
+                return cached['text']
+            
             # 2. Verifica se é PDF
             if self._is_pdf_url(url):
                 logger.info("📄 Detectado PDF - usando extratores especializados")
-                content = self._extract_pdf_content(url)
+                content = self._extract_pdf_content(url, deadline)
                 if content and self._validate_content(content, url):
-                    # Salva extração de PDF bem-sucedida
-                    salvar_etapa("extracao_pdf", {
-                        "url": url,
-                        "content_length": len(content),
-                        "extractor": "pdf_specialized"
-                    }, categoria="pesquisa_web")
-                    self.stats['global']['total_successes'] += 1
-                    self._update_global_stats()
-                    return content
-            
-            # 3. Baixa conteúdo HTML
-            html_content = self._fetch_html(url)
+                    return self._finish_pdf_extraction(url, content)
+            
+            # 3. Baixa conteúdo HTML (condicional se houver entrada expirada no cache)
+            page = self._fetch_page(url, self._get_conditional_headers(cached), deadline)
+            
+            # PDF identificado pelo conteúdo (URL sem extensão .pdf)
+            if page and page.get('pdf'):
+                content = self._extract_pdf_from_file(url, page['pdf'], deadline)
+                if content and self._validate_content(content, url):
+                    return self._finish_pdf_extraction(url, content)
+                page = None
+            
+            if page and page.get('not_modified') and cached:
+                logger.info(f"💾 Cache revalidado (304 Not Modified): {url}")
+                extraction_cache.refresh(url)
+                self.stats['global']['total_successes'] += 1
+                self._update_global_stats()
+                return cached['text']
+            
+            html_content = page.get('html') if page else None
+            if not html_content and cached:
+                logger.warning(f"⚠️ Falha ao baixar {url} - usando versão expirada do cache")
+                self.stats['global']['total_successes'] += 1
+                self._update_global_stats()
+                return cached['text']
+            
             if not html_content:
                 logger.error(f"❌ Falha ao baixar HTML para {url}")
                 salvar_erro("download_html", Exception(f"Falha no download: {url}"))
@@ -162,81 +228,21 @@ class RobustContentExtractor:
             
             logger.info(f"📥 HTML baixado: {len(html_content)} caracteres")
             
-            # 4. Verifica se é página dinâmica (JavaScript-heavy)
-            if self._is_dynamic_page(html_content):
-                logger.warning(f"⚠️ Página dinâmica detectada: {url}")
-                # Tenta extração mais agressiva
-                content = self._extract_dynamic_content(html_content, url)
-                if content and self._validate_content(content, url):
-                    # Salva extração dinâmica bem-sucedida
-                    salvar_etapa("extracao_dinamica", {
-                        "url": url,
-                        "content_length": len(content),
-                        "extractor": "dynamic_specialized"
-                    }, categoria="pesquisa_web")
-                    self.stats['global']['total_successes'] += 1
-                    self._update_global_stats()
-                    return content
-            
-            # 5. Tenta extratores em ordem de prioridade
-            extractors = [
-                ('trafilatura', self._extract_with_trafilatura),
-                ('readability', self._extract_with_readability),
-                ('newspaper', self._extract_with_newspaper),
-                ('beautifulsoup', self._extract_with_beautifulsoup)
-            ]
-            
-            for extractor_name, extractor_func in extractors:
-                if not self._is_extractor_available(extractor_name):
-                    continue
-                
-                try:
-                    logger.info(f"🔍 Tentando extração com {extractor_name}...")
-                    extractor_start = time.time()
-                    self.stats[extractor_name]['usage_count'] += 1
-                    
-                    content = extractor_func(html_content, url)
-                    extractor_time = time.time() - extractor_start
-                    
-                    if self._validate_content(content, url):
-                        self.stats[extractor_name]['success'] += 1
-                        self.stats[extractor_name]['total_time'] += extractor_time
-                        self.stats['global']['total_successes'] += 1
-                        self._update_global_stats()
-                        
-                        # Salva extração bem-sucedida
-                        salvar_etapa("extracao_sucesso", {
-                            "url": url,
-                            "extractor": extractor_name,
-                            "content_length": len(content),
-                            "extraction_time": extractor_time
-                        }, categoria="pesquisa_web")
-                        
-                        logger.info(f"✅ Extração bem-sucedida com {extractor_name}: {len(content)} caracteres em {extractor_time:.2f}s")
-                        return content
-                    else:
-                        self.stats[extractor_name]['failed'] += 1
-                        logger.warning(f"⚠️ Conteúdo insuficiente com {extractor_name}: {len(content) if content else 0} caracteres")
-                        
-                except Exception as e:
-                    self.stats[extractor_name]['failed'] += 1
-                    logger.error(f"❌ Erro com {extractor_name}: {str(e)}")
-                    salvar_erro(f"extrator_{extractor_name}", e, contexto={"url": url})
-                    continue
-            
-            # 6. Fallback final - extração agressiva
-            logger.warning(f"⚠️ Todos os extratores padrão falharam, tentando extração agressiva...")
-            content = self._aggressive_fallback_extraction(html_content, url)
-            if content and len(content) >= 100:  # Critério mais flexível para fallback
-                logger.info(f"✅ Extração agressiva bem-sucedida: {len(content)} caracteres")
-                # Salva fallback bem-sucedido
-                salvar_etapa("extracao_fallback", {
-                    "url": url,
-                    "content_length": len(content),
-                    "extractor": "aggressive_fallback"
-                }, categoria="pesquisa_web")
+            # HTML idêntico ao armazenado: reaproveita o texto já extraído
+            if cached and cached.get('html_hash') == extraction_cache.content_hash(html_content):
+                logger.info(f"💾 HTML inalterado, reutilizando extração do cache: {url}")
+                extraction_cache.refresh(url, page.get('etag'), page.get('last_modified'), unchanged_html=True)
                 self.stats['global']['total_successes'] += 1
                 self._update_global_stats()
+                return cached['text']
+            
+            # Árvore única compartilhada por todos os extratores desta página
+            document = ParsedDocument(html_content, url)
+            self._remember_document(url, document)
+            
+            # 4-6. Página dinâmica, extratores na ordem aprendida e extração agressiva
+            content = self._extract_from_document(document, url, page, deadline)
+            if content:
                 return content
             
             # Todos os extratores falharam
@@ -246,6 +252,13 @@ class RobustContentExtractor:
             self._update_global_stats()
             return None
             
+        except DeadlineExceeded as e:
+            logger.error(f"⏰ Timeout na extração de {url} (etapa {e.stage}): {str(e)}")
+            self.stats['global']['total_failures'] += 1
+            self._update_global_stats()
+            if raise_on_timeout:
+                raise
+            return None
         except Exception as e:
             logger.error(f"❌ Erro crítico na extração de {url}: {str(e)}")
             salvar_erro("extracao_critica", e, contexto={"url": url})
@@ -253,71 +266,471 @@ class RobustContentExtractor:
             self._update_global_stats()
             return None
     
+    def _extractor_functions(self) -> Dict[str, Any]:
+        """Extratores de HTML por nome"""
+        return {
+            'trafilatura': self._extract_with_trafilatura,
+            'readability': self._extract_with_readability,
+            'newspaper': self._extract_with_newspaper,
+            'beautifulsoup': self._extract_with_beautifulsoup
+        }
+    
+    def _extract_from_document(
+        self,
+        document: ParsedDocument,
+        url: str,
+        page: Optional[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> Optional[str]:
+        """
+        Executa os extratores na ordem de menor custo esperado para o domínio
+        (sucesso e latência observados) e para no primeiro conteúdo válido.
+        
+        No modo corrida (EXTRACTOR_RACE_MODE) os dois melhores candidatos rodam
+        em paralelo; o primeiro válido vence. Com o extraction_pool o trabalho
+        roda em processos (paralelismo real); sem ele, em threads sobre o
+        documento já analisado.
+        """
+        candidates = extractor_learning.order(
+            url, [name for name in self._extractor_functions() if self._is_extractor_available(name)]
+        )
+        logger.info(f"🧭 Ordem de extratores para {extractor_learning.domain_of(url)}: {', '.join(candidates)}")
+        
+        result = None
+        if self.race_mode and len(candidates) >= 2:
+            # Primeiro candidato junto com a detecção de página dinâmica; segundo em paralelo
+            result = self._race_jobs(document, url, [
+                (candidates[:1], True, False),
+                (candidates[1:2], False, False)
+            ], deadline)
+            if not result:
+                result = self._run_job(document, url, candidates[2:], False, True, deadline)
+        else:
+            result = self._run_job(document, url, candidates, True, True, deadline)
+        
+        if result and result['content']:
+            return self._finish_extraction(url, result, document.html, page)
+        if result and result.get('timed_out'):
+            raise ExtractionTimeout("Prazo esgotado durante os extratores")
+        return None
+    
+    def _run_job(
+        self,
+        document: ParsedDocument,
+        url: str,
+        candidates: List[str],
+        check_dynamic: bool,
+        fallback: bool,
+        deadline: Optional[Deadline]
+    ) -> Dict[str, Any]:
+        """Processa a página no pool de processos (se habilitado) ou na thread atual"""
+        deadline = deadline or Deadline()
+        deadline.check('parse')
+        if extraction_pool.enabled:
+            result = extraction_pool.run(
+                process_html_job, document.html, url, candidates, check_dynamic, fallback, deadline.remaining(),
+                timeout=deadline.timeout()
+            )
+            if result.get('scan'):
+                document.adopt_scan(result.pop('scan'))
+        else:
+            result = self.process_html(document, url, candidates, check_dynamic, fallback, time_budget=deadline.remaining())
+        
+        self._record_attempts(result, url)
+        return result
+    
+    def _race_jobs(
+        self,
+        document: ParsedDocument,
+        url: str,
+        jobs: List[Tuple[List[str], bool, bool]],
+        deadline: Optional[Deadline]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Executa as tarefas em paralelo e retorna o primeiro resultado com conteúdo
+        válido. Se o pool for reiniciado por outra thread (timeout), repete uma vez.
+        """
+        deadline = deadline or Deadline()
+        try:
+            return self._race_once(document, url, jobs, deadline)
+        except BrokenProcessPool:
+            logger.warning("⚠️ Pool de extração reiniciado durante a corrida - repetindo")
+            return self._race_once(document, url, jobs, deadline)
+    
+    def _race_once(
+        self,
+        document: ParsedDocument,
+        url: str,
+        jobs: List[Tuple[List[str], bool, bool]],
+        deadline: Deadline
+    ) -> Optional[Dict[str, Any]]:
+        """Uma rodada da corrida de extratores"""
+        deadline.check('parse')
+        if extraction_pool.enabled:
+            futures = [
+                extraction_pool.submit(process_html_job, document.html, url, *job, deadline.remaining())
+                for job in jobs
+            ]
+        else:
+            executor = self._get_race_executor()
+            futures = [
+                executor.submit(self.process_html, document, url, *job, time_budget=deadline.remaining())
+                for job in jobs
+            ]
+        self.race_stats['races'] += 1
+        
+        # Resultados (inclusive do perdedor) alimentam estatísticas e aprendizado ao terminar
+        for future in futures:
+            future.add_done_callback(lambda f: self._record_race_result(f, document, url))
+        
+        try:
+            for future in as_completed(futures, timeout=deadline.timeout(
+                cap=extraction_pool.job_timeout if extraction_pool.enabled else None
+            )):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    extraction_pool.terminate(getattr(future, 'pool_executor', None), "processo do pool encerrado")
+                    raise
+                if result['content']:
+                    self.race_stats['wins'][result['extractor']] = self.race_stats['wins'].get(result['extractor'], 0) + 1
+                    return result
+        except FuturesTimeoutError:
+            if extraction_pool.enabled:
+                for future in futures:
+                    extraction_pool.abandon(future, "corrida de extratores excedeu o tempo")
+            raise ExtractionTimeout("Corrida de extratores excedeu o tempo limite")
+        return None
+    
+    def _record_race_result(self, future, document: ParsedDocument, url: str):
+        """Registra tentativas de uma tarefa da corrida quando ela termina"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if result.get('scan'):
+            document.adopt_scan(result.pop('scan'))
+        self._record_attempts(result, url)
+    
+    def process_html(
+        self,
+        document: ParsedDocument,
+        url: str,
+        candidates: List[str],
+        check_dynamic: bool = True,
+        fallback: bool = True,
+        time_budget: Optional[float] = None,
+        include_scan: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Trabalho de CPU de uma página, sem estatísticas, cache ou rede: página
+        dinâmica, cascata de extratores até o primeiro válido e extração
+        agressiva. Roda na thread da requisição ou em um processo do pool.
+        
+        Com `time_budget` (segundos), para entre extratores quando o prazo
+        acaba e marca 'timed_out' no resultado.
+        """
+        start = time.time()
+        deadline = Deadline(time_budget)
+        result = {'content': None, 'extractor': None, 'attempts': [], 'dynamic': False, 'timed_out': False}
+        
+        # 4. Verifica se é página dinâmica (JavaScript-heavy)
+        if check_dynamic and self._is_dynamic_page(document):
+            logger.warning(f"⚠️ Página dinâmica detectada: {url}")
+            result['dynamic'] = True
+            # Tenta extração mais agressiva
+            content = self._extract_dynamic_content(document, url)
+            if content and self._validate_content(content, url):
+                result.update(content=content, extractor='dynamic_specialized')
+        
+        # 5. Extratores na ordem recebida
+        if not result['content']:
+            for extractor_name in candidates:
+                if deadline.expired():
+                    result['timed_out'] = True
+                    break
+                attempt = self._attempt_extractor(extractor_name, document, url)
+                content = attempt.pop('content')
+                result['attempts'].append(attempt)
+                if attempt['valid']:
+                    result.update(content=content, extractor=extractor_name)
+                    break
+        
+        # 6. Fallback final - extração agressiva
+        if not result['content'] and fallback and not deadline.expired():
+            logger.warning(f"⚠️ Todos os extratores padrão falharam, tentando extração agressiva...")
+            content = self._aggressive_fallback_extraction(document, url)
+            if content and len(content) >= 100:  # Critério mais flexível para fallback
+                result.update(content=content, extractor='aggressive_fallback')
+        
+        if include_scan and document.available:
+            result['scan'] = document.export_scan()
+        result['elapsed'] = time.time() - start
+        return result
+    
+    def _attempt_extractor(self, extractor_name: str, document: ParsedDocument, url: str) -> Dict[str, Any]:
+        """Executa um extrator e valida o conteúdo (sem efeitos colaterais)"""
+        extractor_start = time.time()
+        attempt = {'extractor': extractor_name, 'content': None, 'valid': False, 'error': None}
+        try:
+            logger.info(f"🔍 Tentando extração com {extractor_name}...")
+            content = self._extractor_functions()[extractor_name](document, url)
+            attempt['content'] = content
+            attempt['valid'] = self._validate_content(content, url)
+            attempt['length'] = len(content) if content else 0
+        except Exception as e:
+            attempt['error'] = str(e)
+        attempt['elapsed'] = time.time() - extractor_start
+        return attempt
+    
+    def _record_attempts(self, result: Dict[str, Any], url: str):
+        """Atualiza estatísticas e aprendizado por domínio com as tentativas de uma tarefa"""
+        for attempt in result.get('attempts', []):
+            extractor_name = attempt['extractor']
+            stats = self.stats[extractor_name]
+            stats['usage_count'] += 1
+            
+            if attempt['valid']:
+                stats['success'] += 1
+                stats['total_time'] += attempt['elapsed']
+            else:
+                stats['failed'] += 1
+                if attempt.get('error'):
+                    logger.error(f"❌ Erro com {extractor_name}: {attempt['error']}")
+                    salvar_erro(f"extrator_{extractor_name}", Exception(attempt['error']), contexto={"url": url})
+                else:
+                    logger.warning(f"⚠️ Conteúdo insuficiente com {extractor_name}: {attempt.get('length', 0)} caracteres")
+            
+            if not extractor_name.startswith('pdf_'):
+                extractor_learning.record(url, extractor_name, attempt['valid'], attempt['elapsed'])
+    
+    def _finish_extraction(
+        self,
+        url: str,
+        result: Dict[str, Any],
+        html_content: str,
+        page: Optional[Dict[str, Any]]
+    ) -> str:
+        """Registra e armazena a extração vencedora"""
+        content = result['content']
+        extractor_name = result['extractor']
+        self.stats['global']['total_successes'] += 1
+        self._update_global_stats()
+        self._store_in_cache(url, content, html_content, extractor_name, page)
+        
+        # Salva extração bem-sucedida
+        etapa = {
+            'dynamic_specialized': "extracao_dinamica",
+            'aggressive_fallback': "extracao_fallback"
+        }.get(extractor_name, "extracao_sucesso")
+        salvar_etapa(etapa, {
+            "url": url,
+            "extractor": extractor_name,
+            "content_length": len(content),
+            "extraction_time": result.get('elapsed', 0.0)
+        }, categoria="pesquisa_web")
+        
+        logger.info(f"✅ Extração bem-sucedida com {extractor_name}: {len(content)} caracteres em {result.get('elapsed', 0.0):.2f}s")
+        return content
+    
+    def _get_race_executor(self) -> ThreadPoolExecutor:
+        """Pool compartilhado do modo corrida (recriado após fork)"""
+        if self._race_executor is None or self._race_executor_pid != os.getpid():
+            self._race_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('EXTRACTOR_RACE_WORKERS', '4')),
+                thread_name_prefix='extractor_race'
+            )
+            self._race_executor_pid = os.getpid()
+        return self._race_executor
+    
+    def _remember_document(self, url: str, document: ParsedDocument):
+        """Guarda o documento para extract_links/extract_metadata da mesma página"""
+        if self.document_cache_size <= 0:
+            return
+        with self._documents_lock:
+            self._documents[url] = document
+            self._documents.move_to_end(url)
+            while len(self._documents) > self.document_cache_size:
+                self._documents.popitem(last=False)
+    
+    def get_document(self, url: str) -> Optional[ParsedDocument]:
+        """Documento analisado da URL (reaproveitado da última extração ou baixado agora)"""
+        with self._documents_lock:
+            document = self._documents.get(url)
+        if document is not None:
+            return document
+        
+        page = self._fetch_page(url)
+        if page and page.get('pdf'):
+            page['pdf'].close()
+        if not page or not page.get('html'):
+            return None
+        document = ParsedDocument(page['html'], url)
+        self._remember_document(url, document)
+        return document
+    
+    def extract_metadata(self, url: str) -> Dict[str, Any]:
+        """Extrai metadados da página (título, descrição, autor, data, idioma, URL canônica)"""
+        try:
+            document = self.get_document(url)
+            if document is None:
+                return {'error': f'Falha no download: {url}'}
+            return document.metadata()
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def extract_links(self, url: str, internal_only: bool = True) -> List[Dict[str, str]]:
+        """Extrai links da página"""
+        try:
+            document = self.get_document(url)
+            return document.links(internal_only) if document is not None else []
+        except Exception as e:
+            logger.error(f"Erro ao extrair links de {url}: {str(e)}")
+            return []
+    
     def _is_pdf_url(self, url: str) -> bool:
         """Verifica se a URL aponta para um PDF"""
         return (url.lower().endswith('.pdf') or 
                 'pdf' in url.lower() or 
                 'application/pdf' in url.lower())
     
-    def _extract_pdf_content(self, url: str) -> Optional[str]:
-        """Extrai conteúdo de PDF usando múltiplas estratégias"""
+    def _extract_pdf_content(self, url: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Baixa o PDF em streaming (com limite de bytes) e extrai o texto"""
+        try:
+            page = self._fetch_page(url, deadline=deadline)
+            if not page or not page.get('pdf'):
+                logger.warning(f"⚠️ PDF não obtido ou conteúdo não é PDF: {url}")
+                return None
+            return self._extract_pdf_from_file(url, page['pdf'], deadline)
         
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar PDF {url}: {str(e)}")
+            return None
+    
+    def _extract_pdf_from_file(self, url: str, pdf_file, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Extrai texto de um PDF já baixado (no pool de processos, se habilitado)"""
+        deadline = deadline or Deadline()
+        temp_path = None
         try:
-            # Baixa o PDF
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            deadline.check('parse')
+            if extraction_pool.enabled:
+                # O processo do pool lê o PDF do disco
+                pdf_file.seek(0)
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+                    shutil.copyfileobj(pdf_file, temp_file)
+                    temp_path = temp_file.name
+                result = extraction_pool.run(extract_pdf_job, temp_path, url, deadline.remaining(), timeout=deadline.timeout())
+            else:
+                result = self.extract_pdf_text(pdf_file, url, deadline.remaining())
             
-            # Salva temporariamente
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_path = temp_file.name
+            for attempt in result['attempts']:
+                stats = self.stats[attempt['extractor']]
+                stats['usage_count'] += 1
+                if attempt['valid']:
+                    stats['success'] += 1
+                    stats['total_time'] += attempt['elapsed']
+                else:
+                    stats['failed'] += 1
             
-            try:
-                # Tenta PDFPlumber primeiro (melhor para PDFs complexos)
-                if HAS_PDFPLUMBER:
-                    content = self._extract_pdf_with_pdfplumber(temp_path)
-                    if content and len(content) > 100:
-                        self.stats['pdf_pdfplumber']['success'] += 1
-                        logger.info(f"✅ PDF extraído com PDFPlumber: {len(content)} caracteres")
-                        return content
-                    else:
-                        self.stats['pdf_pdfplumber']['failed'] += 1
-                
-                # Fallback para PyPDF2
-                if HAS_PYPDF2:
-                    content = self._extract_pdf_with_pypdf2(temp_path)
-                    if content and len(content) > 100:
-                        self.stats['pdf_pypdf2']['success'] += 1
-                        logger.info(f"✅ PDF extraído com PyPDF2: {len(content)} caracteres")
-                        return content
-                    else:
-                        self.stats['pdf_pypdf2']['failed'] += 1
-                
-                logger.error(f"❌ Falha na extração de PDF: {url}")
-                return None
-                
-            finally:
-                # Remove arquivo temporário
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
-                    
+            if result['content']:
+                logger.info(f"✅ PDF extraído com {result['extractor']}: {len(result['content'])} caracteres")
+                return result['content']
+            
+            logger.error(f"❌ Falha na extração de PDF: {url}")
+            return None
+        
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"❌ Erro ao processar PDF {url}: {str(e)}")
             return None
+        finally:
+            # Descarta os arquivos temporários
+            try:
+                pdf_file.close()
+                if temp_path:
+                    os.unlink(temp_path)
+            except Exception:
+                pass
+    
+    def extract_pdf_text(self, pdf_source, url: str, time_budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Texto de um PDF (caminho ou arquivo aberto) com PDFPlumber e, em falha,
+        PyPDF2. Sem efeitos colaterais: roda na thread atual ou no pool.
+        Com `time_budget`, a leitura para no fim do prazo (fica o texto já lido).
+        """
+        deadline = Deadline(time_budget)
+        result = {'content': None, 'extractor': None, 'attempts': []}
+        strategies = []
+        # Tenta PDFPlumber primeiro (melhor para PDFs complexos)
+        if HAS_PDFPLUMBER:
+            strategies.append(('pdf_pdfplumber', self._extract_pdf_with_pdfplumber))
+        # Fallback para PyPDF2
+        if HAS_PYPDF2:
+            strategies.append(('pdf_pypdf2', self._extract_pdf_with_pypdf2))
+        
+        for extractor_name, extractor_func in strategies:
+            if deadline.expired():
+                break
+            start = time.time()
+            if hasattr(pdf_source, 'seek'):
+                pdf_source.seek(0)
+            content = extractor_func(pdf_source, deadline)
+            valid = bool(content and len(content) > 100)
+            result['attempts'].append({'extractor': extractor_name, 'valid': valid, 'elapsed': time.time() - start})
+            if valid:
+                result.update(content=content, extractor=extractor_name)
+                break
+        
+        return result
+    
+    def _finish_pdf_extraction(self, url: str, content: str) -> str:
+        """Registra e armazena uma extração de PDF bem-sucedida"""
+        extraction_cache.put(url, content, extractor="pdf_specialized")
+        # Salva extração de PDF bem-sucedida
+        salvar_etapa("extracao_pdf", {
+            "url": url,
+            "content_length": len(content),
+            "extractor": "pdf_specialized"
+        }, categoria="pesquisa_web")
+        self.stats['global']['total_successes'] += 1
+        self._update_global_stats()
+        return content
+    
+    def _collect_pdf_text(self, pages, deadline: Optional[Deadline] = None) -> str:
+        """
+        Texto página a página, até EXTRACTOR_MAX_PDF_PAGES páginas ou até
+        haver texto suficiente para max_content_length (o resto seria truncado)
+        """
+        parts = []
+        total = 0
+        for index, page in enumerate(pages):
+            if index >= self.max_pdf_pages:
+                logger.info(f"📄 Limite de {self.max_pdf_pages} páginas de PDF atingido")
+                break
+            if deadline is not None and deadline.expired():
+                logger.warning(f"⏰ Prazo esgotado após {index} páginas de PDF")
+                break
+            page_text = page.extract_text()
+            # Libera o cache de objetos da página (pdfplumber)
+            if hasattr(page, 'close'):
+                page.close()
+            if page_text:
+                parts.append(page_text)
+                total += len(page_text)
+                if total >= self.max_content_length:
+                    logger.info(f"📄 Texto suficiente após {index + 1} páginas de PDF")
+                    break
+        return "\n".join(parts)
     
-    def _extract_pdf_with_pdfplumber(self, pdf_path: str) -> Optional[str]:
-        """Extrai texto usando PDFPlumber"""
+    def _extract_pdf_with_pdfplumber(self, pdf_source, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Extrai texto usando PDFPlumber (caminho ou arquivo aberto)"""
         try:
             import pdfplumber
             
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            with pdfplumber.open(pdf_source) as pdf:
+                text = self._collect_pdf_text(pdf.pages, deadline)
             
             return self._clean_content(text) if text else None
             
@@ -325,18 +738,16 @@ class RobustContentExtractor:
             logger.error(f"Erro PDFPlumber: {e}")
             return None
     
-    def _extract_pdf_with_pypdf2(self, pdf_path: str) -> Optional[str]:
-        """Extrai texto usando PyPDF2"""
+    def _extract_pdf_with_pypdf2(self, pdf_source, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Extrai texto usando PyPDF2 (caminho ou arquivo aberto)"""
         try:
             import PyPDF2
             
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            if isinstance(pdf_source, str):
+                with open(pdf_source, 'rb') as file:
+                    text = self._collect_pdf_text(PyPDF2.PdfReader(file).pages, deadline)
+            else:
+                text = self._collect_pdf_text(PyPDF2.PdfReader(pdf_source).pages, deadline)
             
             return self._clean_content(text) if text else None
             
@@ -344,8 +755,9 @@ class RobustContentExtractor:
             logger.error(f"Erro PyPDF2: {e}")
             return None
     
-    def _is_dynamic_page(self, html: str) -> bool:
+    def _is_dynamic_page(self, document: ParsedDocument) -> bool:
         """Verifica se é página dinâmica (JavaScript-heavy)"""
+        html = document.html
         if not html:
             return False
         
@@ -361,25 +773,19 @@ class RobustContentExtractor:
         js_indicators = sum(1 for indicator in dynamic_indicators if indicator in html_lower)
         
         # Se tem muitos indicadores JS e pouco conteúdo de texto
-        text_content = BeautifulSoup(html, 'html.parser').get_text() if HAS_BEAUTIFULSOUP else html
+        text_content = document.text(skip=DEFAULT_SKIP) if document.available else html
         text_ratio = len(text_content.strip()) / len(html) if html else 0
         
         return js_indicators > 3 and text_ratio < 0.1
     
-    def _extract_dynamic_content(self, html: str, url: str) -> Optional[str]:
+    def _extract_dynamic_content(self, document: ParsedDocument, url: str) -> Optional[str]:
         """Extração especializada para conteúdo dinâmico"""
         
-        if not HAS_BEAUTIFULSOUP:
+        if not document.available:
             return None
         
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove scripts e elementos dinâmicos
-            for element in soup(['script', 'style', 'noscript', 'iframe']):
-                element.decompose()
-            
-            # Busca por elementos com conteúdo pré-renderizado
+            # Busca por elementos com conteúdo pré-renderizado (sem scripts e elementos dinâmicos)
             content_selectors = [
                 '[data-content]', '[data-text]', '.content-loaded',
                 '.server-rendered', '.static-content', '.preloaded',
@@ -391,12 +797,11 @@ class RobustContentExtractor:
             
             for selector in content_selectors:
                 try:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        text = element.get_text(strip=True)
+                    for element in document.select(selector, skip=DYNAMIC_SKIP):
+                        text = document.text(element, skip=DYNAMIC_SKIP, strip=True)
                         if len(text) > 50:  # Conteúdo substancial
                             extracted_content.append(text)
-                except:
+                except Exception:
                     continue
             
             if extracted_content:
@@ -404,28 +809,22 @@ class RobustContentExtractor:
                 return self._clean_content(combined)
             
             # Fallback: extrai todo texto disponível
-            all_text = soup.get_text()
+            all_text = document.text(skip=DYNAMIC_SKIP)
             return self._clean_content(all_text) if len(all_text) > 100 else None
             
         except Exception as e:
             logger.error(f"Erro na extração dinâmica: {e}")
             return None
     
-    def _aggressive_fallback_extraction(self, html: str, url: str) -> Optional[str]:
+    def _aggressive_fallback_extraction(self, document: ParsedDocument, url: str) -> Optional[str]:
         """Extração agressiva como último recurso"""
         
-        if not HAS_BEAUTIFULSOUP:
+        if not document.available:
             return None
         
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove apenas elementos críticos
-            for element in soup(['script', 'style']):
-                element.decompose()
-            
-            # Coleta todo texto disponível
-            all_text = soup.get_text()
+            # Coleta todo texto disponível (sem scripts e estilos)
+            all_text = document.text(skip=DEFAULT_SKIP)
             
             # Filtra linhas com conteúdo significativo
             lines = all_text.split('\n')
@@ -450,55 +849,221 @@ class RobustContentExtractor:
     
     def _fetch_html(self, url: str) -> Optional[str]:
         """Baixa conteúdo HTML da URL com retry"""
+        page = self._fetch_page(url)
+        return page.get('html') if page else None
+    
+    def _fetch_page(
+        self,
+        url: str,
+        extra_headers: Optional[Dict[str, str]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Baixa a página em streaming com retry, retornando HTML e validadores de cache.
+        
+        O tipo do conteúdo é identificado no primeiro bloco: PDFs retornam
+        {'pdf': arquivo} (limite EXTRACTOR_MAX_PDF_BYTES), outros binários são
+        abortados e o HTML é truncado em EXTRACTOR_MAX_HTML_BYTES.
+        Com cabeçalhos condicionais (If-None-Match/If-Modified-Since), um 304
+        retorna {'not_modified': True} sem corpo. Com `deadline`, timeouts e
+        novas tentativas respeitam o prazo (DeadlineExceeded ao esgotar).
+        Cada tentativa passa pelo balde 'web' do rate limiter, que espaça as
+        novas tentativas; um 429 bloqueia o balde pelo Retry-After.
+        """
         max_retries = 3
+        deadline = deadline or Deadline()
         
         for attempt in range(max_retries):
+            deadline.check('fetch')
             try:
-                response = self.session.get(
+                with rate_limiter.limit('web'), self.session.get(
                     url,
-                    timeout=self.timeout,
+                    timeout=deadline.timeout(cap=self.timeout),
                     verify=False,  # Para evitar problemas de SSL
-                    allow_redirects=True
-                )
-                
-                response.raise_for_status()
-                
-                # Detecta encoding
-                if response.encoding is None:
-                    response.encoding = 'utf-8'
-                
-                html = response.text
+                    allow_redirects=True,
+                    headers=extra_headers,
+                    stream=True
+                ) as response:
+                    
+                    if response.status_code == 304:
+                        return {'not_modified': True}
+                    
+                    if response.status_code == 429:
+                        retry_after = response.headers.get('Retry-After', '')
+                        rate_limiter.penalize('web', float(retry_after) if retry_after.isdigit() else 10.0)
+                    
+                    response.raise_for_status()
+                    
+                    validators = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'not_modified': False
+                    }
+                    
+                    chunks = response.iter_content(chunk_size=self.download_chunk_size)
+                    first_chunk = next(chunks, b'')
+                    content_kind = self._sniff_content_type(first_chunk, response.headers.get('Content-Type', ''))
+                    
+                    if content_kind == 'other':
+                        self.download_stats['aborted_non_html'] += 1
+                        logger.warning(f"⚠️ Conteúdo não HTML/PDF ({response.headers.get('Content-Type', 'desconhecido')}), download abortado: {url}")
+                        return None
+                    
+                    if content_kind == 'pdf':
+                        declared = int(response.headers.get('Content-Length') or 0)
+                        if declared > self.max_pdf_bytes:
+                            self.download_stats['aborted_oversized_pdf'] += 1
+                            logger.warning(f"⚠️ PDF grande demais ({declared} bytes), download abortado: {url}")
+                            return None
+                        
+                        pdf_file = tempfile.SpooledTemporaryFile(max_size=2 * 1024 * 1024, suffix='.pdf')
+                        if self._read_capped(first_chunk, chunks, pdf_file, self.max_pdf_bytes, deadline=deadline) is None:
+                            # PDF cortado não é legível: descarta
+                            pdf_file.close()
+                            self.download_stats['aborted_oversized_pdf'] += 1
+                            logger.warning(f"⚠️ PDF excede {self.max_pdf_bytes} bytes, download abortado: {url}")
+                            return None
+                        
+                        if not self._is_pdf_url(url):
+                            self.download_stats['sniffed_pdf'] += 1
+                            logger.info(f"📄 PDF identificado pelo conteúdo: {url}")
+                        return {'pdf': pdf_file, **validators}
+                    
+                    buffer = io.BytesIO()
+                    truncated = self._read_capped(first_chunk, chunks, buffer, self.max_html_bytes, truncate=True, deadline=deadline)
+                    if truncated:
+                        self.download_stats['truncated'] += 1
+                        logger.warning(f"⚠️ HTML truncado em {self.max_html_bytes} bytes: {url}")
+                    
+                    # Detecta encoding
+                    encoding = response.encoding or 'utf-8'
+                    try:
+                        html = buffer.getvalue().decode(encoding, errors='replace')
+                    except LookupError:
+                        html = buffer.getvalue().decode('utf-8', errors='replace')
                 
                 if len(html) < 500:
                     logger.warning(f"⚠️ HTML muito pequeno (tentativa {attempt + 1}): {len(html)} caracteres")
-                    if attempt < max_retries - 1:
-                        time.sleep(2)  # Aguarda antes de tentar novamente
+                    if attempt < max_retries - 1 and self._can_retry(deadline):
                         continue
                 
-                return html
+                return {'html': html, **validators}
                 
+            except DeadlineExceeded:
+                raise
             except requests.exceptions.Timeout:
                 logger.warning(f"⏰ Timeout na tentativa {attempt + 1} para {url}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 + random.uniform(0, 2))  # Delay aleatório
+                deadline.check('fetch')
+                if attempt < max_retries - 1 and self._can_retry(deadline):
                     continue
             except Exception as e:
                 logger.error(f"❌ Erro ao baixar {url} (tentativa {attempt + 1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 + random.uniform(0, 2))  # Delay aleatório
+                if attempt < max_retries - 1 and self._can_retry(deadline):
                     continue
+            break
         
         return None
     
-    def _extract_with_trafilatura(self, html: str, url: str) -> Optional[str]:
+    @staticmethod
+    def _can_retry(deadline: Deadline) -> bool:
+        """Há prazo para tentar de novo?"""
+        remaining = deadline.remaining()
+        return remaining is None or remaining > 1
+    
+    @staticmethod
+    def _sniff_content_type(first_chunk: bytes, content_type: str) -> str:
+        """Classifica o corpo como 'html', 'pdf' ou 'other' pelo primeiro bloco e pelo Content-Type"""
+        head = first_chunk[:1024].lstrip()
+        content_type = (content_type or '').lower()
+        
+        if head.startswith(b'%PDF') or 'application/pdf' in content_type:
+            return 'pdf'
+        
+        lowered = head.lower()
+        if any(marker in lowered for marker in (b'<!doctype', b'<html', b'<head', b'<body', b'<?xml', b'<div', b'<p')):
+            return 'html'
+        
+        # Assinaturas de imagens, compactados e mídia
+        binary_signatures = (b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'PK\x03\x04', b'\x1f\x8b', b'RIFF', b'\x00\x00\x00')
+        if head.startswith(binary_signatures):
+            return 'other'
+        
+        if content_type.startswith(('image/', 'audio/', 'video/', 'font/')) or any(
+            binary in content_type for binary in ('zip', 'octet-stream', 'msword', 'officedocument', 'excel')
+        ):
+            return 'other'
+        
+        # Sem marcadores: aceita como texto se não houver bytes nulos
+        return 'other' if b'\x00' in head else 'html'
+    
+    def _read_capped(
+        self,
+        first_chunk: bytes,
+        chunks,
+        sink,
+        max_bytes: int,
+        truncate: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[bool]:
+        """
+        Copia o corpo para `sink` até max_bytes (e até 2x o timeout no total,
+        dentro do prazo recebido). Retorna se houve truncamento; sem
+        `truncate`, estourar o limite retorna None.
+        """
+        deadline = Deadline.within(self.timeout * 2, parent=deadline)
+        written = 0
+        for chunk in itertools.chain((first_chunk,), chunks):
+            if written + len(chunk) > max_bytes:
+                if not truncate:
+                    return None
+                sink.write(chunk[:max_bytes - written])
+                return True
+            sink.write(chunk)
+            written += len(chunk)
+            if deadline.expired():
+                if not truncate:
+                    return None
+                logger.warning("⏰ Download excedeu o tempo total - usando o conteúdo recebido")
+                return True
+        return False
+    
+    def _get_conditional_headers(self, cached: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        """Monta cabeçalhos de revalidação a partir de uma entrada do cache"""
+        if not cached:
+            return None
+        
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        
+        return headers or None
+    
+    def _store_in_cache(self, url: str, content: str, html: str, extractor: str, page: Optional[Dict[str, Any]]):
+        """Armazena a extração vencedora no cache persistente"""
+        page = page or {}
+        extraction_cache.put(
+            url,
+            content,
+            html=html,
+            extractor=extractor,
+            etag=page.get('etag'),
+            last_modified=page.get('last_modified')
+        )
+    
+    def _extract_with_trafilatura(self, document: ParsedDocument, url: str) -> Optional[str]:
         """Extrai com Trafilatura (prioridade 1) com configurações aprimoradas"""
         if not HAS_TRAFILATURA:
             return None
         
         try:
+            # Trafilatura modifica a árvore: recebe uma cópia em vez de refazer o parse
+            tree = document.copy_tree()
+            
             # Configurações mais agressivas para trafilatura
             content = trafilatura.extract(
-                html, 
+                tree if tree is not None else document.html,
                 include_comments=False,
                 include_tables=True,
                 include_formatting=False,
@@ -518,21 +1083,25 @@ class RobustContentExtractor:
             logger.error(f"Erro Trafilatura: {e}")
             return None
     
-    def _extract_with_readability(self, html: str, url: str) -> Optional[str]:
+    def _extract_with_readability(self, document: ParsedDocument, url: str) -> Optional[str]:
         """Extrai com Readability (prioridade 2) com configurações aprimoradas"""
         if not HAS_READABILITY:
             return None
         
         try:
+            # Readability limpa uma cópia da árvore recebida (lxml Cleaner), sem novo parse
             # Configurações mais inclusivas
-            doc = Document(html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
-            content = doc.summary()
+            doc = Document(
+                document.tree if document.available else document.html,
+                positive_keywords=['content', 'article', 'post', 'text', 'main']
+            )
+            content = doc.summary(html_partial=True)
             
             if content:
                 # Remove tags HTML
-                if HAS_BEAUTIFULSOUP:
-                    soup = BeautifulSoup(content, 'html.parser')
-                    content = soup.get_text()
+                summary = ParsedDocument(content, url)
+                if summary.available:
+                    content = summary.text(skip=())
                 else:
                     # Remove tags manualmente
                     content = re.sub(r'<[^>]+>', '', content)
@@ -546,14 +1115,15 @@ class RobustContentExtractor:
             logger.error(f"Erro Readability: {e}")
             return None
     
-    def _extract_with_newspaper(self, html: str, url: str) -> Optional[str]:
+    def _extract_with_newspaper(self, document: ParsedDocument, url: str) -> Optional[str]:
         """Extrai com Newspaper3k (prioridade 3) com configurações aprimoradas"""
         if not HAS_NEWSPAPER:
             return None
         
         try:
+            # Newspaper não aceita árvore pronta: faz o próprio parse do HTML
             article = Article(url)
-            article.set_html(html)
+            article.set_html(document.html)
             article.parse()
             
             content = article.text
@@ -567,28 +1137,25 @@ class RobustContentExtractor:
             logger.error(f"Erro Newspaper: {e}")
             return None
     
-    def _extract_with_beautifulsoup(self, html: str, url: str) -> Optional[str]:
-        """Extrai com BeautifulSoup (fallback final) com estratégia aprimorada"""
-        if not HAS_BEAUTIFULSOUP:
+    def _extract_with_beautifulsoup(self, document: ParsedDocument, url: str) -> Optional[str]:
+        """
+        Extração por estrutura da página (fallback final) com estratégia em camadas.
+        Mantém o nome 'beautifulsoup' nas estatísticas, mas usa a árvore lxml compartilhada.
+        """
+        if not document.available:
             return None
         
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove scripts e styles
-            for script in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form']):
-                script.decompose()
-            
-            # Estratégia em camadas para encontrar conteúdo
+            # Estratégia em camadas para encontrar conteúdo (sem scripts, menus e rodapés)
             content_strategies = [
                 # Estratégia 1: Elementos semânticos
-                lambda: self._extract_semantic_content(soup),
+                lambda: self._extract_semantic_content(document),
                 # Estratégia 2: Elementos por classe/ID
-                lambda: self._extract_by_selectors(soup),
+                lambda: self._extract_by_selectors(document),
                 # Estratégia 3: Maior bloco de texto
-                lambda: self._extract_largest_text_block(soup),
+                lambda: self._extract_largest_text_block(document),
                 # Estratégia 4: Todo o body
-                lambda: self._extract_full_body(soup)
+                lambda: self._extract_full_body(document)
             ]
             
             for strategy in content_strategies:
@@ -596,23 +1163,23 @@ class RobustContentExtractor:
                     content = strategy()
                     if content and len(content) > 100:
                         return self._clean_content(content)
-                except:
+                except Exception:
                     continue
             
             return None
             
         except Exception as e:
-            logger.error(f"Erro BeautifulSoup: {e}")
+            logger.error(f"Erro na extração estrutural: {e}")
             return None
     
-    def _extract_semantic_content(self, soup) -> Optional[str]:
+    def _extract_semantic_content(self, document: ParsedDocument) -> Optional[str]:
         """Extrai usando elementos semânticos HTML5"""
-        semantic_elements = soup.find_all(['article', 'main', 'section'])
+        semantic_elements = document.find_all(['article', 'main', 'section'], skip=LAYOUT_SKIP)
         
         if semantic_elements:
             content_parts = []
             for element in semantic_elements:
-                text = element.get_text()
+                text = document.text(element, skip=LAYOUT_SKIP)
                 if len(text) > 50:
                     content_parts.append(text)
             
@@ -621,7 +1188,7 @@ class RobustContentExtractor:
         
         return None
     
-    def _extract_by_selectors(self, soup) -> Optional[str]:
+    def _extract_by_selectors(self, document: ParsedDocument) -> Optional[str]:
         """Extrai usando seletores CSS comuns"""
         content_selectors = [
             '.content', '#content', '.post', '.article',
@@ -632,43 +1199,39 @@ class RobustContentExtractor:
         
         for selector in content_selectors:
             try:
-                elements = soup.select(selector)
+                elements = document.select(selector, skip=LAYOUT_SKIP)
                 if elements:
                     content_parts = []
                     for element in elements:
-                        text = element.get_text()
+                        text = document.text(element, skip=LAYOUT_SKIP)
                         if len(text) > 50:
                             content_parts.append(text)
                     
                     if content_parts:
                         return '\n\n'.join(content_parts)
-            except:
+            except Exception:
                 continue
         
         return None
     
-    def _extract_largest_text_block(self, soup) -> Optional[str]:
+    def _extract_largest_text_block(self, document: ParsedDocument) -> Optional[str]:
         """Encontra e extrai o maior bloco de texto"""
-        all_divs = soup.find_all(['div', 'section', 'article'])
+        all_divs = document.find_all(['div', 'section', 'article'], skip=LAYOUT_SKIP)
         
         largest_text = ""
         largest_size = 0
         
         for div in all_divs:
-            text = div.get_text()
+            text = document.text(div, skip=LAYOUT_SKIP)
             if len(text) > largest_size:
                 largest_size = len(text)
                 largest_text = text
         
         return largest_text if largest_size > 100 else None
     
-    def _extract_full_body(self, soup) -> Optional[str]:
+    def _extract_full_body(self, document: ParsedDocument) -> Optional[str]:
         """Extrai todo o conteúdo do body como último recurso"""
-        body = soup.find('body')
-        if body:
-            return body.get_text()
-        else:
-            return soup.get_text()
+        return document.text(document.body(), skip=LAYOUT_SKIP)
     
     def _clean_content(self, content: str) -> str:
         """Limpa e normaliza o conteúdo extraído com melhorias"""
@@ -800,8 +1363,8 @@ class RobustContentExtractor:
                     stats['reason'] = 'Biblioteca readability-lxml não instalada'
                 elif extractor_name == 'newspaper' and not HAS_NEWSPAPER:
                     stats['reason'] = 'Biblioteca newspaper3k não instalada'
-                elif extractor_name == 'beautifulsoup' and not HAS_BEAUTIFULSOUP:
-                    stats['reason'] = 'Biblioteca beautifulsoup4 não instalada'
+                elif extractor_name == 'beautifulsoup' and not HAS_LXML:
+                    stats['reason'] = 'Biblioteca lxml não instalada'
                 elif extractor_name == 'pdf_pypdf2' and not HAS_PYPDF2:
                     stats['reason'] = 'Biblioteca PyPDF2 não instalada'
                 elif extractor_name == 'pdf_pdfplumber' and not HAS_PDFPLUMBER:
@@ -810,7 +1373,22 @@ class RobustContentExtractor:
     def get_extractor_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas dos extratores"""
         self._update_global_stats()
-        return self.stats.copy()
+        stats = self.stats.copy()
+        stats['cache'] = extraction_cache.get_stats()
+        stats['extraction_pool'] = extraction_pool.get_stats()
+        stats['url_resolver'] = url_resolver.get_stats()
+        stats['downloads'] = {
+            **self.download_stats,
+            'max_html_bytes': self.max_html_bytes,
+            'max_pdf_bytes': self.max_pdf_bytes,
+            'max_pdf_pages': self.max_pdf_pages
+        }
+        stats['domain_learning'] = {
+            **extractor_learning.get_stats(),
+            'race_mode': self.race_mode,
+            'race_stats': self.race_stats
+        }
+        return stats
     
     def reset_extractor_stats(self, extractor_name: Optional[str] = None):
         """Reset estatísticas dos extratores"""
@@ -836,14 +1414,17 @@ class RobustContentExtractor:
                 'total_failures': 0,
                 'success_rate': 0.0
             }
+            extraction_cache.reset_stats()
             logger.info("🔄 Reset estatísticas de todos os extratores")
     
     def batch_extract(self, urls: List[str], max_workers: int = 5) -> Dict[str, Optional[str]]:
         """Extrai conteúdo de múltiplas URLs em paralelo"""
         results = {}
+        # Redirects de todo o lote resolvidos em paralelo antes (ficam em cache)
+        url_resolver.resolve_many(urls)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(self.extract_content, url): url for url in urls}
+            future_to_url = {executor.submit(contextvars.copy_context().run, self.extract_content, url): url for url in urls}
             
             for future in as_completed(future_to_url):
                 url = future_to_url[future]
@@ -902,6 +1483,7 @@ class RobustContentExtractor:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        extraction_cache.clear()
         logger.info("🧹 Cache de extração limpo")
 
 # Instância global
@@ -5,12 +5,18 @@ ARQV30 Enhanced v2.0 - Safe Content Extraction
 Extração segura de conteúdo com validação rigorosa
 """
 
+import os
 import logging
+import threading
+import contextvars
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from typing import Optional, Dict, Any, Tuple, List  # Added List import
 from services.robust_content_extractor import robust_content_extractor
 from services.content_quality_validator import content_quality_validator
 from services.url_resolver import url_resolver
+from services.deadline import Deadline, DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +27,38 @@ class SafeContentExtractor:
         """Inicializa o extrator seguro"""
         self.min_content_length = 500
         self.min_quality_score = 60.0
-        self.max_extraction_time = 30  # segundos
+        self.max_extraction_time = float(os.getenv('SAFE_EXTRACT_URL_TIMEOUT', '30'))  # segundos por URL
+        self.batch_timeout = float(os.getenv('SAFE_EXTRACT_BATCH_TIMEOUT', '120'))  # segundos por lote
+        
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'extractions': 0,
+            'successes': 0,
+            'timeouts': 0,
+            'timeouts_by_stage': {},
+            'batch_runs': 0,
+            'batch_deadline_hits': 0,
+            'partial_urls': 0
+        }
+        self.recent_timeouts = deque(maxlen=50)
         
         logger.info("Safe Content Extractor inicializado")
     
-    def safe_extract_content(self, url: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def safe_extract_content(
+        self,
+        url: str,
+        context: Dict[str, Any] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """
         Extrai conteúdo de forma segura com validação completa
         
+        O prazo por URL (max_extraction_time), limitado pelo `deadline` do
+        chamador (ex.: o do lote), vale para resolução, download e processamento.
+        
         Returns:
             Dict com 'success', 'content', 'metadata', 'validation', 'error'
+            (e 'timed_out'/'timeout_stage' quando o prazo se esgota)
         """
         
         result = {
@@ -43,6 +71,9 @@ class SafeContentExtractor:
             'timestamp': time.time()
         }
         
+        original_url = url
+        url_deadline = Deadline.within(self.max_extraction_time, parent=deadline)
+        
         try:
             start_time = time.time()
             
@@ -53,7 +84,8 @@ class SafeContentExtractor:
                 return result
             
             # 2. Resolve redirecionamentos
-            resolved_url = url_resolver.resolve_redirect_url(url)
+            resolved_url = url_resolver.resolve_redirect_url(url, timeout=url_deadline.timeout(cap=url_resolver.timeout))
+            url_deadline.check('resolve')
             if resolved_url != url:
                 logger.info(f"🔄 URL resolvida: {url} -> {resolved_url}")
                 result['metadata']['resolved_url'] = resolved_url
@@ -65,9 +97,9 @@ class SafeContentExtractor:
                 logger.error(f"❌ {result['error']}")
                 return result
             
-            # 4. Extrai conteúdo com timeout
+            # 4. Extrai conteúdo dentro do prazo
             extraction_start = time.time()
-            content = self._extract_with_timeout(url)
+            content = self._extract_with_timeout(url, url_deadline)
             extraction_time = time.time() - extraction_start
             
             result['metadata']['extraction_time'] = extraction_time
@@ -110,11 +142,33 @@ class SafeContentExtractor:
             logger.info(f"✅ Extração segura bem-sucedida: {len(content)} chars, qualidade {validation['score']:.1f}%")
             return result
             
+        except DeadlineExceeded as e:
+            result['error'] = f"Timeout na extração (etapa {e.stage}): {str(e)}"
+            result['timed_out'] = True
+            result['timeout_stage'] = e.stage
+            result['metadata']['total_time'] = time.time() - start_time
+            self._record_timeout(original_url, e.stage)
+            logger.error(f"⏰ {result['error']} para {url}")
+            return result
+            
         except Exception as e:
             result['error'] = f"Erro na extração: {str(e)}"
             result['metadata']['total_time'] = time.time() - start_time if 'start_time' in locals() else 0
             logger.error(f"❌ {result['error']} para {url}")
             return result
+        
+        finally:
+            with self._stats_lock:
+                self.stats['extractions'] += 1
+                if result['success']:
+                    self.stats['successes'] += 1
+    
+    def _record_timeout(self, url: str, stage: str):
+        """Registra uma URL que esgotou o prazo (métricas de timeout)"""
+        with self._stats_lock:
+            self.stats['timeouts'] += 1
+            self.stats['timeouts_by_stage'][stage] = self.stats['timeouts_by_stage'].get(stage, 0) + 1
+            self.recent_timeouts.append({'url': url, 'stage': stage, 'timestamp': time.time()})
     
     def _validate_url(self, url: str) -> bool:
         """Valida se a URL é válida"""
@@ -136,75 +190,101 @@ class SafeContentExtractor:
         
         return True
     
-    def _extract_with_timeout(self, url: str) -> Optional[str]:
-        """Extrai conteúdo com timeout"""
-        import signal
-        
-        def timeout_handler(signum, frame):
-            raise TimeoutError("Extração excedeu tempo limite")
-        
-        # Configura timeout (apenas em sistemas Unix)
-        try:
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(self.max_extraction_time)
-            
-            content = robust_content_extractor.extract_content(url)
-            
-            signal.alarm(0)  # Cancela timeout
-            return content
-            
-        except AttributeError:
-            # Sistema Windows - sem timeout por signal
-            return robust_content_extractor.extract_content(url)
-        except TimeoutError:
-            logger.error(f"⏰ Timeout na extração de {url}")
-            return None
-        except Exception as e:
-            signal.alarm(0)  # Cancela timeout em caso de erro
-            raise e
+    def _extract_with_timeout(self, url: str, deadline: Deadline) -> Optional[str]:
+        """
+        Extrai conteúdo dentro do prazo: download e tentativas respeitam o tempo
+        restante e o processamento no pool de extração é encerrado ao estourá-lo
+        (funciona em qualquer thread, ao contrário de signal.alarm).
+        Levanta DeadlineExceeded com a etapa em que o prazo acabou.
+        """
+        return robust_content_extractor.extract_content(url, deadline=deadline, raise_on_timeout=True)
     
     def batch_safe_extract(
         self, 
         urls: List[str], 
         context: Dict[str, Any] = None,
-        max_workers: int = 3
+        max_workers: int = 3,
+        timeout: Optional[float] = None
     ) -> Dict[str, Dict[str, Any]]:
-        """Extrai conteúdo de múltiplas URLs de forma segura"""
+        """
+        Extrai conteúdo de múltiplas URLs de forma segura
         
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        O lote tem prazo próprio (`timeout`, padrão batch_timeout) e cada URL
+        herda o menor entre o seu prazo e o do lote. Ao fim do prazo, retorna os
+        resultados parciais; URLs pendentes voltam com timeout_stage='batch'.
+        """
         
         results = {}
+        batch_deadline = Deadline.within(self.batch_timeout if timeout is None else timeout)
+        
+        # Redirects de todo o lote resolvidos em paralelo antes (ficam em cache)
+        url_resolver.resolve_many(urls, timeout=batch_deadline.timeout(cap=url_resolver.timeout))
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Sem `with`: ao estourar o prazo não esperamos as threads pendentes
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
             future_to_url = {
-                executor.submit(self.safe_extract_content, url, context): url 
+                executor.submit(contextvars.copy_context().run, self.safe_extract_content, url, context, batch_deadline): url 
                 for url in urls
             }
             
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    result = future.result()
-                    results[url] = result
-                except Exception as e:
+            try:
+                for future in as_completed(future_to_url, timeout=batch_deadline.remaining()):
+                    url = future_to_url[future]
+                    try:
+                        result = future.result()
+                        results[url] = result
+                    except Exception as e:
+                        results[url] = {
+                            'success': False,
+                            'error': f"Erro na extração paralela: {str(e)}",
+                            'url': url,
+                            'timestamp': time.time()
+                        }
+            except FuturesTimeoutError:
+                pending = [(future, url) for future, url in future_to_url.items() if url not in results]
+                logger.warning(f"⏰ Prazo do lote esgotado: {len(pending)} URLs sem resultado")
+                with self._stats_lock:
+                    self.stats['batch_deadline_hits'] += 1
+                    self.stats['partial_urls'] += len(pending)
+                for future, url in pending:
+                    # Extrações em andamento registram o próprio timeout ao encerrar
+                    if not future.running():
+                        self._record_timeout(url, 'batch')
                     results[url] = {
                         'success': False,
-                        'error': f"Erro na extração paralela: {str(e)}",
+                        'error': "Prazo do lote esgotado antes da extração",
+                        'timed_out': True,
+                        'timeout_stage': 'batch',
                         'url': url,
                         'timestamp': time.time()
                     }
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        with self._stats_lock:
+            self.stats['batch_runs'] += 1
         
         # Estatísticas do lote
         successful = sum(1 for result in results.values() if result['success'])
         total = len(results)
         
-        logger.info(f"📊 Extração em lote: {successful}/{total} sucessos ({successful/total*100:.1f}%)")
+        logger.info(f"📊 Extração em lote: {successful}/{total} sucessos ({successful/max(total, 1)*100:.1f}%)")
         
         return results
     
     def get_extraction_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas de extração"""
-        return robust_content_extractor.get_extractor_stats()
+        stats = robust_content_extractor.get_extractor_stats()
+        with self._stats_lock:
+            stats['safe_extraction'] = {
+                **self.stats,
+                'timeouts_by_stage': dict(self.stats['timeouts_by_stage']),
+                'recent_timeouts': list(self.recent_timeouts),
+                'url_timeout': self.max_extraction_time,
+                'batch_timeout': self.batch_timeout
+            }
+        return stats
 
 # Instância global
 safe_content_extractor = SafeContentExtractor()
@@ -8,11 +8,8 @@ Gerenciador inteligente de múltiplos serviços de busca com fallback automátic
 import os
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any
-from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
-import json
+from services.async_search_engine import async_search_engine
 
 logger = logging.getLogger(__name__)
 
@@ -51,15 +48,6 @@ class SearchManager:
             }
         }
         
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive'
-        }
-        
         self.initialize_providers()
         logger.info(f"Search Manager inicializado com {len([p for p in self.providers.values() if p['available']])} provedores disponíveis")
     
@@ -132,168 +120,34 @@ class SearchManager:
     
     def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': self.providers['google']['api_key'],
-                'cx': self.providers['google']['cse_id'],
-                'q': query,
-                'num': min(max_results, 10),
-                'lr': 'lang_pt',
-                'gl': 'br',
-                'safe': 'off',
-                'dateRestrict': 'm6'
-            }
-            
-            response = requests.get(url, params=params, headers=self.headers, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                
-                for item in data.get('items', []):
-                    results.append({
-                        'title': item.get('title', ''),
-                        'url': item.get('link', ''),
-                        'snippet': item.get('snippet', ''),
-                        'source': 'google'
-                    })
-                
-                logger.info(f"✅ Google Search: {len(results)} resultados")
-                return results
-            else:
-                raise Exception(f"Google API retornou status {response.status_code}")
-                
-        except Exception as e:
-            if "quota" in str(e).lower() or "limit" in str(e).lower():
-                logger.warning(f"⚠️ Google Search atingiu limite: {str(e)}")
-                self.providers['google']['rate_limit_reset'] = time.time() + 3600
-            raise e
+        return self._search_provider('google', query, max_results)
     
     def _search_serper(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Serper API"""
-        try:
-            url = "https://google.serper.dev/search"
-            headers = {
-                **self.headers,
-                'X-API-KEY': self.providers['serper']['api_key'],
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                'q': query,
-                'gl': 'br',
-                'hl': 'pt',
-                'num': max_results
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                
-                for item in data.get('organic', []):
-                    results.append({
-                        'title': item.get('title', ''),
-                        'url': item.get('link', ''),
-                        'snippet': item.get('snippet', ''),
-                        'source': 'serper'
-                    })
-                
-                logger.info(f"✅ Serper Search: {len(results)} resultados")
-                return results
-            else:
-                raise Exception(f"Serper API retornou status {response.status_code}")
-                
-        except Exception as e:
-            if "quota" in str(e).lower() or "limit" in str(e).lower():
-                logger.warning(f"⚠️ Serper atingiu limite: {str(e)}")
-                self.providers['serper']['rate_limit_reset'] = time.time() + 3600
-            raise e
+        return self._search_provider('serper', query, max_results)
     
     def _search_bing(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Bing (scraping)"""
-        try:
-            search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
-            
-            response = requests.get(search_url, headers=self.headers, timeout=15)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_items = soup.find_all('li', class_='b_algo')
-                
-                for item in result_items[:max_results]:
-                    title_elem = item.find('h2')
-                    if title_elem:
-                        link_elem = title_elem.find('a')
-                        if link_elem:
-                            title = title_elem.get_text(strip=True)
-                            url = link_elem.get('href', '')
-                            
-                            snippet_elem = item.find('p')
-                            snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                            
-                            if url and title and url.startswith('http'):
-                                results.append({
-                                    'title': title,
-                                    'url': url,
-                                    'snippet': snippet,
-                                    'source': 'bing'
-                                })
-                
-                logger.info(f"✅ Bing Search: {len(results)} resultados")
-                return results
-            else:
-                raise Exception(f"Bing retornou status {response.status_code}")
-                
-        except Exception as e:
-            raise e
+        return self._search_provider('bing', query, max_results)
     
     def _search_duckduckgo(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando DuckDuckGo (scraping)"""
+        return self._search_provider('duckduckgo', query, max_results)
+    
+    def _search_provider(self, provider_name: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Busca em um provedor pelo motor assíncrono compartilhado"""
         try:
-            search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
-            
-            response = requests.get(search_url, headers=self.headers, timeout=15)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_divs = soup.find_all('div', class_='result')
-                
-                for div in result_divs[:max_results]:
-                    title_elem = div.find('a', class_='result__a')
-                    snippet_elem = div.find('a', class_='result__snippet')
-                    
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        url = title_elem.get('href', '')
-                        snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                        
-                        if url and title and url.startswith('http'):
-                            results.append({
-                                'title': title,
-                                'url': url,
-                                'snippet': snippet,
-                                'source': 'duckduckgo'
-                            })
-                
-                logger.info(f"✅ DuckDuckGo Search: {len(results)} resultados")
-                return results
-            else:
-                if response.status_code == 202:
-                    logger.warning(f"⚠️ DuckDuckGo retornou status 202")
-                    return [] # Retorna lista vazia para 202, indicando que a busca não foi concluída
-                else:
-                    raise Exception(f"DuckDuckGo retornou status {response.status_code}")
-                
+            return async_search_engine.search_provider(provider_name, query, max_results)
         except Exception as e:
+            self._check_rate_limit(provider_name, str(e))
             raise e
     
+    def _check_rate_limit(self, provider_name: str, error: str):
+        """Marca provedor com cota esgotada"""
+        if "quota" in error.lower() or "limit" in error.lower() or "429" in error:
+            logger.warning(f"⚠️ {provider_name} atingiu limite: {error}")
+            self.providers[provider_name]['rate_limit_reset'] = time.time() + 3600
+    
     def _try_fallback_search(self, query: str, max_results: int, exclude: List[str] = None) -> List[Dict[str, Any]]:
         """Tenta usar provedor de fallback para busca"""
         exclude = exclude or []
@@ -329,47 +183,22 @@ class SearchManager:
     
     def multi_search(self, query: str, max_results_per_provider: int = 5) -> List[Dict[str, Any]]:
         """Realiza busca em múltiplos provedores simultaneamente"""
-        all_results = []
-        
-        for provider_name in ['google', 'serper', 'bing', 'duckduckgo']:
-            if not self.providers[provider_name]['available']:
-                continue
-                
-            if self.providers[provider_name]['error_count'] >= 3:
-                continue
-            
-            try:
-                logger.info(f"🔍 Buscando em {provider_name}...")
-                
-                if provider_name == 'google':
-                    results = self._search_google(query, max_results_per_provider)
-                elif provider_name == 'serper':
-                    results = self._search_serper(query, max_results_per_provider)
-                elif provider_name == 'bing':
-                    results = self._search_bing(query, max_results_per_provider)
-                elif provider_name == 'duckduckgo':
-                    results = self._search_duckduckgo(query, max_results_per_provider)
-                else:
-                    continue
-                
-                all_results.extend(results)
-                time.sleep(1)  # Rate limiting
-                
-            except Exception as e:
-                logger.warning(f"⚠️ Erro em {provider_name}: {str(e)}")
-                self.providers[provider_name]['error_count'] += 1
-                continue
+        providers = [
+            name for name in ['google', 'serper', 'bing', 'duckduckgo']
+            if self.providers[name]['available'] and self.providers[name]['error_count'] < 3
+        ]
         
-        # Remove duplicatas baseado na URL
-        seen_urls = set()
-        unique_results = []
+        logger.info(f"🔍 Buscando em paralelo: {', '.join(providers)}")
+        unique_results, report = async_search_engine.search_with_report(
+            query, providers=providers, max_results_per_provider=max_results_per_provider
+        )
         
-        for result in all_results:
-            if result['url'] not in seen_urls:
-                seen_urls.add(result['url'])
-                unique_results.append(result)
+        for provider_name, info in report.items():
+            if info.get('error'):
+                self.providers[provider_name]['error_count'] += 1
+                self._check_rate_limit(provider_name, info['error'])
         
-        logger.info(f"✅ Multi-search: {len(unique_results)} resultados únicos de {len(all_results)} totais")
+        logger.info(f"✅ Multi-search: {len(unique_results)} resultados únicos")
         return unique_results
     
     def get_provider_status(self) -> Dict[str, Any]:
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Session Index
+Índice persistente das etapas salvas por sessão (etapa -> offset do registro e status)
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable
+
+logger = logging.getLogger(__name__)
+
+class SessionIndex:
+    """Índice SQLite que evita varrer relatorios_intermediarios para recuperar uma sessão"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Inicializa o índice de sessões"""
+        self.db_path = Path(db_path or os.getenv('SESSION_INDEX_PATH', 'relatorios_intermediarios/indice_sessoes.db'))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+        try:
+            self._open()
+            logger.info(f"🗂️ Session Index inicializado em {self.db_path}")
+        except Exception as e:
+            logger.error(f"❌ Erro ao inicializar índice de sessões: {e}")
+
+    def _open(self):
+        """Abre (ou cria) o banco SQLite do índice"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn_pid = os.getpid()
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS registros (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                etapa TEXT NOT NULL,
+                status TEXT,
+                timestamp REAL,
+                categoria TEXT,
+                tamanho_dados INTEGER,
+                arquivo TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                comprimento INTEGER NOT NULL,
+                UNIQUE(arquivo, offset)
+            );
+            CREATE TABLE IF NOT EXISTS journals (
+                arquivo TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                indexado_ate INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                categoria TEXT,
+                registrado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sessoes_legado (
+                session_id TEXT PRIMARY KEY,
+                verificado_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_registros_sessao_etapa ON registros(session_id, etapa);
+            CREATE INDEX IF NOT EXISTS idx_arquivos_sessao ON arquivos(session_id);
+        ''')
+        self._conn.commit()
+
+    def _db(self) -> sqlite3.Connection:
+        """Conexão do processo atual (reabre após fork)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._open()
+        return self._conn
+
+    def registrar_registros(
+        self,
+        session_id: str,
+        arquivo: str,
+        registros: Iterable[Dict[str, Any]],
+        indexado_ate: Optional[int] = None
+    ):
+        """
+        Registra registros gravados em um arquivo da sessão.
+
+        Cada registro traz etapa, status, timestamp, categoria, tamanho_dados,
+        offset e comprimento; offset -1 indica um arquivo JSON inteiro
+        (formato de um arquivo por etapa). Registros repetidos são ignorados.
+        """
+        with self._lock:
+            conn = self._db()
+            conn.executemany(
+                'INSERT OR IGNORE INTO registros '
+                '(session_id, etapa, status, timestamp, categoria, tamanho_dados, arquivo, offset, comprimento) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        session_id,
+                        registro.get('etapa', 'unknown'),
+                        registro.get('status'),
+                        registro.get('timestamp'),
+                        registro.get('categoria'),
+                        registro.get('tamanho_dados', 0),
+                        arquivo,
+                        registro['offset'],
+                        registro['comprimento']
+                    )
+                    for registro in registros
+                ]
+            )
+            if indexado_ate is not None:
+                conn.execute(
+                    'INSERT INTO journals (arquivo, session_id, indexado_ate) VALUES (?, ?, ?) '
+                    'ON CONFLICT(arquivo) DO UPDATE SET indexado_ate = MAX(indexado_ate, excluded.indexado_ate)',
+                    (arquivo, session_id, indexado_ate)
+                )
+            conn.commit()
+
+    def indexado_ate(self, arquivo: str) -> int:
+        """Byte do journal até o qual os registros já estão indexados"""
+        with self._lock:
+            row = self._db().execute('SELECT indexado_ate FROM journals WHERE arquivo = ?', (arquivo,)).fetchone()
+        return row[0] if row else 0
+
+    def truncar_journal(self, arquivo: str, tamanho: int):
+        """Descarta registros além do fim real do journal (perdidos antes do fsync)"""
+        with self._lock:
+            conn = self._db()
+            conn.execute('DELETE FROM registros WHERE arquivo = ? AND offset >= ?', (arquivo, tamanho))
+            conn.execute('UPDATE journals SET indexado_ate = ? WHERE arquivo = ?', (tamanho, arquivo))
+            conn.commit()
+
+    def listar_registros(self, session_id: str) -> List[Dict[str, Any]]:
+        """Todos os registros da sessão, na ordem em que foram salvos"""
+        with self._lock:
+            rows = self._db().execute(
+                'SELECT etapa, status, timestamp, categoria, tamanho_dados, arquivo, offset, comprimento '
+                'FROM registros WHERE session_id = ? ORDER BY timestamp, id',
+                (session_id,)
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def ultimo_registro(self, session_id: str, etapa: str, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Registro mais recente da etapa (opcionalmente filtrando por status)"""
+        query = (
+            'SELECT etapa, status, timestamp, categoria, tamanho_dados, arquivo, offset, comprimento '
+            'FROM registros WHERE session_id = ? AND etapa = ?'
+        )
+        params: List[Any] = [session_id, etapa]
+        if status is not None:
+            query += ' AND status = ?'
+            params.append(status)
+        query += ' ORDER BY timestamp DESC, id DESC LIMIT 1'
+
+        with self._lock:
+            row = self._db().execute(query, params).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def registrar_arquivo(self, session_id: str, caminho: str, categoria: Optional[str] = None):
+        """Associa um arquivo gerado (journal, relatório, backup) à sessão"""
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                'INSERT OR IGNORE INTO arquivos (caminho, session_id, categoria, registrado_em) VALUES (?, ?, ?, ?)',
+                (caminho, session_id, categoria, time.time())
+            )
+            conn.commit()
+
+    def listar_arquivos(self, session_id: str) -> List[Dict[str, Any]]:
+        """Arquivos associados à sessão"""
+        with self._lock:
+            rows = self._db().execute(
+                'SELECT caminho, categoria FROM arquivos WHERE session_id = ? ORDER BY registrado_em',
+                (session_id,)
+            ).fetchall()
+        return [{'caminho': caminho, 'categoria': categoria} for caminho, categoria in rows]
+
+    def legado_verificado(self, session_id: str) -> bool:
+        """Indica se os arquivos legados da sessão já foram indexados"""
+        with self._lock:
+            row = self._db().execute('SELECT 1 FROM sessoes_legado WHERE session_id = ?', (session_id,)).fetchone()
+        return row is not None
+
+    def marcar_legado_verificado(self, session_id: str):
+        """Marca a sessão como já indexada a partir dos arquivos legados"""
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                'INSERT OR REPLACE INTO sessoes_legado (session_id, verificado_em) VALUES (?, ?)',
+                (session_id, time.time())
+            )
+            conn.commit()
+
+    def remover_sessao(self, session_id: str):
+        """Remove todas as entradas de uma sessão"""
+        with self._lock:
+            conn = self._db()
+            for tabela in ('registros', 'journals', 'arquivos', 'sessoes_legado'):
+                conn.execute(f'DELETE FROM {tabela} WHERE session_id = ?', (session_id,))
+            conn.commit()
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict[str, Any]:
+        etapa, status, timestamp, categoria, tamanho_dados, arquivo, offset, comprimento = row
+        return {
+            'etapa': etapa,
+            'status': status,
+            'timestamp': timestamp,
+            'categoria': categoria,
+            'tamanho_dados': tamanho_dados,
+            'arquivo': arquivo,
+            'offset': offset,
+            'comprimento': comprimento
+        }
+
+# Instância global
+session_index = SessionIndex()
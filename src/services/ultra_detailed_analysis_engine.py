@@ -10,29 +10,39 @@ import random
 import os
 import logging
 import json
+import contextvars
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from services.ai_manager import ai_manager
+from services.context_packer import context_packer
 from services.production_search_manager import production_search_manager
 from services.robust_content_extractor import robust_content_extractor
 from services.content_quality_validator import content_quality_validator
+from services.concurrent_research_stage import concurrent_research_stage
+from services.deadline import Deadline
+from services.content_dedup import content_dedup
+from services.incremental_analysis import incremental_analysis
 from services.mental_drivers_architect import mental_drivers_architect
 from services.visual_proofs_generator import visual_proofs_generator
 from services.anti_objection_system import anti_objection_system
 from services.pre_pitch_architect import pre_pitch_architect
 from services.future_prediction_engine import future_prediction_engine
 from services.enhanced_trends_service import enhanced_trends_service
-from services.resilient_component_executor import resilient_executor
+from services.component_orchestrator import ComponentOrchestrator
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
 
 logger = logging.getLogger(__name__)
 
+# Estado de dependências da análise em execução no contexto atual (um por job)
+_estado_dependencias: contextvars.ContextVar = contextvars.ContextVar('estado_dependencias', default=None)
+
 class ComponentDependencyManager:
     """Gerenciador de dependências entre componentes"""
     
     def __init__(self):
         self.dependencies = {
-            'avatar_ultra_detalhado': [],  # Sem dependências
+            'pesquisa_web_massiva': [],  # Sem dependências
+            'avatar_ultra_detalhado': ['pesquisa_web_massiva'],
             'drivers_mentais_customizados': ['avatar_ultra_detalhado'],
             'provas_visuais_sugeridas': ['avatar_ultra_detalhado'],
             'sistema_anti_objecao': ['avatar_ultra_detalhado'],
@@ -40,6 +50,17 @@ class ComponentDependencyManager:
             'predicoes_futuro_completas': ['pesquisa_web_massiva'],
         }
         
+        # Campos do formulário lidos por cada componente (impressão digital da análise incremental)
+        self.input_fields = {
+            'pesquisa_web_massiva': ['segmento', 'produto', 'publico'],
+            'avatar_ultra_detalhado': ['segmento', 'produto', 'publico', 'preco', 'objetivo_receita', 'orcamento_marketing'],
+            'drivers_mentais_customizados': ['segmento', 'produto'],
+            'provas_visuais_sugeridas': ['segmento', 'produto'],
+            'sistema_anti_objecao': ['segmento'],
+            'pre_pitch_invisivel': ['segmento', 'produto', 'publico'],
+            'predicoes_futuro_completas': ['segmento'],
+        }
+        
         self.component_status = {}
     
     def can_execute_component(self, component_name: str) -> bool:
@@ -96,30 +117,43 @@ class UltraDetailedAnalysisEngine:
         self.min_content_threshold = 5000   # Reduzido para ser mais realista
         self.min_sources_threshold = 3      # Reduzido para ser mais realista
         self.quality_threshold = 70.0       # Reduzido para ser mais realista
-        self.dependency_manager = ComponentDependencyManager()
+        self._dependency_manager_padrao = ComponentDependencyManager()
 
         logger.info("🚀 Ultra Detailed Analysis Engine CORRIGIDO inicializado")
 
+    @property
+    def dependency_manager(self) -> ComponentDependencyManager:
+        """Estado de dependências da análise do contexto atual (análises simultâneas não se misturam)"""
+        return _estado_dependencias.get() or self._dependency_manager_padrao
+
     def generate_gigantic_analysis(
         self, 
         data: Dict[str, Any],
         session_id: Optional[str] = None,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        checkpoint: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Gera análise GIGANTE ultra-detalhada - FALHA SE DADOS INSUFICIENTES"""
+        """
+        Gera análise GIGANTE ultra-detalhada - FALHA SE DADOS INSUFICIENTES
+        
+        `checkpoint` ({componente: saída}, ver load_checkpoint) retoma uma
+        análise: esses componentes não são executados de novo.
+        """
 
         start_time = time.time()
         logger.info(f"🚀 INICIANDO ANÁLISE GIGANTE CORRIGIDA para {data.get('segmento')}")
 
         # Inicia sessão de salvamento automático
         session_id = session_id or auto_save_manager.iniciar_sessao()
+        _estado_dependencias.set(ComponentDependencyManager())
         
         # Salva dados de entrada imediatamente
         salvar_etapa("analise_iniciada", {
             "input_data": data,
             "session_id": session_id,
-            "start_time": start_time
-        }, categoria="analise_completa")
+            "start_time": start_time,
+            "retomada": bool(checkpoint)
+        }, categoria="analise_completa", session_id=session_id)
         
         if progress_callback:
             progress_callback(1, "🔍 Validando dados de entrada...")
@@ -128,26 +162,60 @@ class UltraDetailedAnalysisEngine:
         validation_result = self._validate_input_data(data)
         if not validation_result['valid']:
             error_msg = f"DADOS INSUFICIENTES: {validation_result['message']}"
-            salvar_erro("validacao_entrada", ValueError(error_msg), contexto=data)
+            salvar_erro("validacao_entrada", ValueError(error_msg), contexto=data, session_id=session_id)
             raise Exception(error_msg)
 
         try:
-            # Registra componentes no executor resiliente
-            self._register_resilient_components()
+            # Modo incremental: componentes com as mesmas entradas reaproveitam a saída anterior
+            reuse = data.get('incremental')
+            if isinstance(reuse, str):
+                reuse = reuse.lower() == 'true'
+            incremental_run = incremental_analysis.start_run(reuse, self.dependency_manager.input_fields)
+            
+            # Registra componentes no orquestrador (um por análise)
+            orchestrator = ComponentOrchestrator()
+            checkpoint = checkpoint or {}
+            self._register_resilient_components(orchestrator, incremental_run, checkpoint)
+            
+            componentes_fallback = set()
             
-            # Executa pipeline resiliente
-            resultado_pipeline = resilient_executor.executar_pipeline_resiliente(
-                data, session_id, progress_callback
+            def _on_result(component_name: str, result: Any, used_fallback: bool = False):
+                # Saídas restauradas do checkpoint já estão salvas na sessão
+                if component_name in checkpoint:
+                    self.dependency_manager.mark_component_status(component_name, True, data=result)
+                    return
+                self._save_component_result(component_name, result, session_id)
+                # Checkpoints de fallback não contam como concluídos na retomada
+                if used_fallback:
+                    componentes_fallback.add(component_name)
+                salvar_etapa(
+                    "componentes_fallback", sorted(componentes_fallback),
+                    categoria="analise_completa", session_id=session_id
+                )
+            
+            # Executa componentes em paralelo respeitando as dependências
+            execution_report = orchestrator.execute_components(
+                data, progress_callback, result_callback=_on_result
             )
+            incremental_run.record_results(execution_report, session_id)
+            resultado_pipeline = self._build_pipeline_result(execution_report, session_id)
+            resultado_pipeline['processamento']['incremental'] = incremental_run.get_report()
+            if checkpoint:
+                resultado_pipeline['processamento']['retomada'] = {
+                    'componentes_restaurados': sorted(checkpoint),
+                    'componentes_reexecutados': [
+                        name for name in self.dependency_manager.dependencies if name not in checkpoint
+                    ]
+                }
             
             # Salva resultado do pipeline
-            salvar_etapa("pipeline_resultado", resultado_pipeline, categoria="analise_completa")
+            salvar_etapa("pipeline_resultado", resultado_pipeline, categoria="analise_completa", session_id=session_id)
             
             # Consolida análise final
             final_analysis = self._build_final_analysis_from_pipeline(resultado_pipeline, data)
             
             # Salva análise final
-            salvar_etapa("analise_final", final_analysis, categoria="analise_completa")
+            salvar_etapa("analise_final", final_analysis, categoria="analise_completa", session_id=session_id)
             
             end_time = time.time()
             processing_time = end_time - start_time
@@ -173,7 +241,7 @@ class UltraDetailedAnalysisEngine:
             
         except Exception as e:
             logger.error(f"❌ FALHA CRÍTICA na análise GIGANTE: {str(e)}")
-            salvar_erro("analise_gigante_falha", e, contexto=data)
+            salvar_erro("analise_gigante_falha", e, contexto=data, session_id=session_id)
             
             # Tenta recuperar dados salvos para não perder tudo
             try:
@@ -187,71 +255,86 @@ class UltraDetailedAnalysisEngine:
             # Falha final
             raise Exception(f"ANÁLISE FALHOU: {str(e)}. Dados intermediários foram salvos em {session_id}")
     
-    def _register_resilient_components(self):
-        """Registra componentes no executor resiliente"""
-        
-        # Pesquisa web
-        resilient_executor.registrar_componente(
-            'pesquisa_web_massiva',
-            self._execute_massive_real_research,
-            fallback=self._fallback_research,
-            obrigatorio=True,
-            timeout=300
-        )
-        
-        # Avatar
-        resilient_executor.registrar_componente(
-            'avatar_ultra_detalhado',
-            self._execute_ai_analysis,
-            fallback=self._fallback_avatar,
-            obrigatorio=True,
-            timeout=180
-        )
+    def _register_resilient_components(
+        self,
+        orchestrator: ComponentOrchestrator,
+        incremental_run=None,
+        checkpoint: Optional[Dict[str, Any]] = None
+    ):
+        """Registra componentes no orquestrador com dependências, timeouts e fallbacks"""
         
-        # Drivers mentais
-        resilient_executor.registrar_componente(
-            'drivers_mentais_customizados',
-            self._execute_mental_drivers,
-            fallback=mental_drivers_architect._generate_fallback_drivers_system,
-            obrigatorio=False,
-            timeout=120
-        )
+        components = [
+            # (nome, executor, fallback, obrigatório, timeout)
+            ('pesquisa_web_massiva', self._execute_massive_real_research, self._fallback_research, True, 300),
+            ('avatar_ultra_detalhado', self._execute_ai_analysis, self._fallback_avatar, True, 180),
+            ('drivers_mentais_customizados', self._execute_mental_drivers, mental_drivers_architect._generate_fallback_drivers_system, False, 120),
+            ('provas_visuais_sugeridas', self._execute_visual_proofs, self._fallback_visual_proofs, False, 120),
+            ('sistema_anti_objecao', self._execute_anti_objection, anti_objection_system._generate_fallback_anti_objection_system, False, 120),
+            ('pre_pitch_invisivel', self._execute_pre_pitch, pre_pitch_architect._generate_fallback_pre_pitch_system, False, 120),
+            ('predicoes_futuro_completas', self._execute_future_predictions, self._fallback_future_predictions, False, 120)
+        ]
         
-        # Provas visuais
-        resilient_executor.registrar_componente(
-            'provas_visuais_sugeridas',
-            self._execute_visual_proofs,
-            fallback=self._fallback_visual_proofs,
-            obrigatorio=False,
-            timeout=120
+        for name, executor, fallback, obrigatorio, timeout in components:
+            dependencies = self.dependency_manager.dependencies.get(name, [])
+            if checkpoint and name in checkpoint:
+                # Componente concluído na execução anterior: devolve a saída salva
+                executor = lambda execution_data, output=checkpoint[name]: output
+            elif incremental_run is not None:
+                executor = incremental_run.wrap(name, executor, dependencies)
+            orchestrator.register_component(
+                name,
+                executor,
+                dependencies=dependencies,
+                required=obrigatorio,
+                timeout=timeout,
+                fallback=fallback
+            )
+    
+    def _save_component_result(self, component_name: str, result: Any, session_id: Optional[str] = None):
+        """Salva o resultado de cada componente assim que ele termina"""
+        categorias = {
+            'pesquisa_web_massiva': 'pesquisa_web',
+            'avatar_ultra_detalhado': 'avatar',
+            'drivers_mentais_customizados': 'drivers_mentais',
+            'provas_visuais_sugeridas': 'provas_visuais',
+            'sistema_anti_objecao': 'anti_objecao',
+            'pre_pitch_invisivel': 'pre_pitch'
+        }
+        salvar_etapa(
+            component_name, result,
+            categoria=categorias.get(component_name, 'analise_completa'),
+            session_id=session_id
         )
+        self.dependency_manager.mark_component_status(component_name, True, data=result)
+    
+    def _build_pipeline_result(self, execution_report: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        """Converte o relatório do orquestrador no formato de resultado do pipeline"""
         
-        # Sistema anti-objeção
-        resilient_executor.registrar_componente(
-            'sistema_anti_objecao',
-            self._execute_anti_objection,
-            fallback=anti_objection_system._generate_fallback_anti_objection_system,
-            obrigatorio=False,
-            timeout=120
-        )
+        for component_name, error in execution_report['failed_components'].items():
+            self.dependency_manager.mark_component_status(component_name, False, error=error)
         
-        # Pré-pitch
-        resilient_executor.registrar_componente(
-            'pre_pitch_invisivel',
-            self._execute_pre_pitch,
-            fallback=pre_pitch_architect._generate_fallback_pre_pitch_system,
-            obrigatorio=False,
-            timeout=120
-        )
+        critical_path = execution_report.get('critical_path', {})
+        fallback_components = [
+            name for name, info in critical_path.get('components', {}).items() if info.get('used_fallback')
+        ]
         
-        # Predições futuras
-        resilient_executor.registrar_componente(
-            'predicoes_futuro_completas',
-            self._execute_future_predictions,
-            fallback=self._fallback_future_predictions,
-            obrigatorio=False,
-            timeout=120
-        )
+        return {
+            'session_id': session_id,
+            'analysis_id': session_id,
+            'dados_gerados': execution_report['successful_components'],
+            'componentes_sucesso': list(execution_report['successful_components'].keys()),
+            'componentes_falha': list(execution_report['failed_components'].keys()),
+            'processamento': {
+                'modo': 'paralelo_por_dependencias',
+                'componentes_com_fallback': fallback_components,
+                'erros': execution_report['failed_components'],
+                'caminho_critico': critical_path
+            },
+            'estatisticas': {
+                **execution_report['execution_stats'],
+                'detalhes_componentes': execution_report.get('component_details', {})
+            }
+        }
     
     def _execute_massive_real_research(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Wrapper para pesquisa massiva"""
@@ -370,6 +453,60 @@ class UltraDetailedAnalysisEngine:
         
         return final_analysis
     
+    def load_checkpoint(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Estado salvo de uma análise para retomada: dados de entrada e saídas
+        dos componentes concluídos. Saídas de fallback (registradas pelo
+        orquestrador em "componentes_fallback" ou marcadas com fallback_mode)
+        não contam como concluídas e são executadas de novo, assim como tudo
+        que depende (transitivamente) de um componente reexecutado. None se a
+        sessão não existe.
+        """
+        
+        entrada = (
+            auto_save_manager.recuperar_etapa("analise_iniciada", session_id) or
+            auto_save_manager.recuperar_etapa("requisicao_analise", session_id)
+        )
+        input_data = ((entrada or {}).get('dados') or {}).get('input_data')
+        if not input_data:
+            return None
+        
+        registro_fallback = auto_save_manager.recuperar_etapa("componentes_fallback", session_id)
+        componentes_fallback = set((registro_fallback or {}).get('dados') or [])
+        
+        componentes = {}
+        for component_name in self.dependency_manager.dependencies:
+            if component_name in componentes_fallback:
+                continue
+            etapa = auto_save_manager.recuperar_etapa(component_name, session_id)
+            dados = etapa.get('dados') if etapa else None
+            if dados is None or self._is_fallback_output(dados):
+                continue
+            componentes[component_name] = dados
+        
+        # Saídas calculadas sobre um componente que será refeito ficam obsoletas
+        orchestrator = ComponentOrchestrator()
+        self._register_resilient_components(orchestrator)
+        reexecutados = [name for name in self.dependency_manager.dependencies if name not in componentes]
+        for component_name in orchestrator.dependents_of(reexecutados):
+            componentes.pop(component_name, None)
+        
+        return {
+            'session_id': session_id,
+            'input_data': input_data,
+            'componentes': componentes,
+            'pendentes': [name for name in self.dependency_manager.dependencies if name not in componentes]
+        }
+    
+    @staticmethod
+    def _is_fallback_output(dados: Any) -> bool:
+        """Saída gerada por fallback (marcada com fallback_mode)"""
+        if isinstance(dados, dict):
+            return bool(dados.get('fallback_mode'))
+        if isinstance(dados, list):
+            return any(isinstance(item, dict) and item.get('fallback_mode') for item in dados)
+        return False
+    
     def _recuperar_dados_salvos(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Recupera dados salvos de uma sessão"""
         
@@ -410,78 +547,81 @@ class UltraDetailedAnalysisEngine:
         # Salva queries geradas
         salvar_etapa("queries_geradas", {"queries": queries}, categoria="pesquisa_web")
 
-        all_results = []
-        extracted_content = []
-        total_content_length = 0
-        successful_extractions = 0
+        # URLs e conteúdos quase idênticos (nesta execução e nas recentes do segmento)
+        dedup_run = content_dedup.start_run(data.get('segmento'))
+        # Prazo do estágio também vale para as extrações: ao encerrar o estágio,
+        # downloads em andamento param em vez de gravar na sessão já concluída
+        research_deadline = Deadline.within(concurrent_research_stage.deadline_seconds)
 
-        for i, query in enumerate(queries):
+        def _search(query: str) -> List[Dict[str, Any]]:
+            # Busca com múltiplos provedores
             try:
-                # Busca com múltiplos provedores
-                search_results = production_search_manager.search_with_fallback(query, max_results=10)
-
-                if not search_results:
-                    logger.warning(f"⚠️ Query '{query}' retornou 0 resultados")
-                    continue
-
-                all_results.extend(search_results)
-
-                # Extrai conteúdo das URLs encontradas
-                logger.info(f"📄 Extraindo conteúdo de {len(search_results)} URLs...")
-
-                for result in search_results[:8]:  # Limita para performance
-                    try:
-                        content = robust_content_extractor.extract_content(result['url'])
-                        
-                        if content:
-                            # Valida qualidade do conteúdo
-                            validation = content_quality_validator.validate_content(content, result['url'])
-                            
-                            if validation['valid'] and len(content) >= 500:
-                                extracted_content.append({
-                                    'url': result['url'],
-                                    'title': result.get('title', 'Sem título'),
-                                    'content': content[:3000],  # Limita tamanho
-                                    'snippet': result.get('snippet', ''),
-                                    'quality_score': validation['score'],
-                                    'source': result.get('source', 'unknown')
-                                })
-                                total_content_length += len(content)
-                                successful_extractions += 1
-                                
-                                # Salva cada extração bem-sucedida
-                                salvar_etapa(f"conteudo_extraido_{i}_{len(extracted_content)}", {
-                                    "url": result['url'],
-                                    "title": result.get('title'),
-                                    "content_length": len(content),
-                                    "quality_score": validation['score']
-                                }, categoria="pesquisa_web")
-                                
-                                logger.info(f"✅ Conteúdo extraído e validado: {len(content)} chars, qualidade {validation['score']:.1f}%")
-                            else:
-                                logger.warning(f"⚠️ Conteúdo rejeitado por baixa qualidade: {validation['reason']}")
-                        else:
-                            logger.warning(f"⚠️ Nenhum conteúdo extraído de {result['url']}")
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao extrair {result['url']}: {str(e)}")
-                        salvar_erro("extracao_url", e, contexto={"url": result['url']})
-                        continue
-
-                time.sleep(1)  # Rate limiting
-
+                return production_search_manager.search_with_fallback(query, max_results=10)
             except Exception as e:
                 logger.error(f"❌ Erro na query '{query}': {str(e)}")
                 salvar_erro("query_busca", e, contexto={"query": query})
-                continue
+                return []
 
-        # Remove duplicatas por URL
-        unique_content = []
-        seen_urls = set()
-        for content_item in extracted_content:
-            if content_item['url'] not in seen_urls:
-                seen_urls.add(content_item['url'])
-                unique_content.append(content_item)
+        def _extract(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            try:
+                content = robust_content_extractor.extract_content(result['url'], deadline=research_deadline)
+
+                if research_deadline.expired():
+                    return None
+                if not content:
+                    logger.warning(f"⚠️ Nenhum conteúdo extraído de {result['url']}")
+                    return None
+
+                # Valida qualidade do conteúdo
+                validation = content_quality_validator.validate_content(content, result['url'])
+
+                if not (validation['valid'] and len(content) >= 500):
+                    logger.warning(f"⚠️ Conteúdo rejeitado por baixa qualidade: {validation['reason']}")
+                    return None
+
+                # Cópias sindicadas sob outra URL não entram no contexto da IA
+                if dedup_run.check_content(result['url'], content):
+                    return None
+
+                logger.info(f"✅ Conteúdo extraído e validado: {len(content)} chars, qualidade {validation['score']:.1f}%")
+                return {
+                    'url': result['url'],
+                    'title': result.get('title', 'Sem título'),
+                    'content': content[:3000],  # Limita tamanho
+                    'snippet': result.get('snippet', ''),
+                    'quality_score': validation['score'],
+                    'source': result.get('source', 'unknown'),
+                    'content_length': len(content)
+                }
+
+            except Exception as e:
+                logger.error(f"❌ Erro ao extrair {result['url']}: {str(e)}")
+                if not research_deadline.expired():
+                    salvar_erro("extracao_url", e, contexto={"url": result['url']})
+                return None
+
+        def _on_extracted(index: int, item: Dict[str, Any]):
+            # Salva cada extração bem-sucedida
+            salvar_etapa(f"conteudo_extraido_{index}", {
+                "url": item['url'],
+                "title": item.get('title'),
+                "content_length": item['content_length'],
+                "quality_score": item['quality_score']
+            }, categoria="pesquisa_web")
+
+        # Busca e extração em paralelo, limitadas por domínio e com prazo
+        # abaixo do timeout do componente (retorna resultados parciais)
+        logger.info(f"📄 Executando {len(queries)} queries com extração concorrente...")
+        stage_result = concurrent_research_stage.run(
+            queries, _search, _extract, on_extracted=_on_extracted, dedup=dedup_run,
+            deadline=research_deadline
+        )
+        stage_result['stats']['dedup'] = dedup_run.get_stats()
+
+        all_results = stage_result['search_results']
+        unique_content = stage_result['extracted_content']
+        successful_extractions = len(unique_content)
+        total_content_length = sum(item.pop('content_length', 0) for item in unique_content)
 
         research_data = {
             'queries_executed': queries,
@@ -496,12 +636,15 @@ class UltraDetailedAnalysisEngine:
             'quality_metrics': {
                 'avg_quality_score': sum(item['quality_score'] for item in unique_content) / len(unique_content) if unique_content else 0,
                 'extraction_success_rate': (successful_extractions / len(all_results)) * 100 if all_results else 0
-            }
+            },
+            'execution_stats': stage_result['stats']
         }
         
         # Salva dados de pesquisa consolidados
         salvar_etapa("pesquisa_consolidada", research_data, categoria="pesquisa_web")
 
+        if stage_result['stats']['partial']:
+            logger.warning(f"⏰ Pesquisa massiva parcial: prazo de {stage_result['stats']['deadline_seconds']:.0f}s atingido")
         logger.info(f"✅ Pesquisa massiva: {len(unique_content)} páginas válidas, {total_content_length:,} caracteres")
         return research_data
 
@@ -551,53 +694,69 @@ class UltraDetailedAnalysisEngine:
         """Executa análise com IA REAL - FALHA SE IA NÃO RESPONDER"""
 
         # Prepara contexto de pesquisa REAL
-        search_context = self._prepare_search_context(research_data)
+        search_context = self._prepare_search_context(research_data, data)
 
         # Constrói prompt ULTRA-DETALHADO
         prompt = self._build_gigantic_analysis_prompt(data, search_context)
 
         logger.info("🤖 Executando análise com IA REAL...")
 
-        # Executa com AI Manager (sistema de fallback automático)
-        ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192)
+        # Com a sessão, cada seção do JSON vai para o progresso (SSE) durante a geração
+        session_id = data.get('session_id') or auto_save_manager.session_id
+        
+        # Executa com AI Manager (fallback automático; hedge conforme AI_HEDGING_ENABLED)
+        ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192, session_id=session_id)
 
         if not ai_response:
             raise Exception("IA NÃO RESPONDEU: Nenhum provedor de IA disponível ou funcionando")
 
         # Processa resposta da IA
-        processed_analysis = self._process_ai_response_strict(ai_response, data)
+        try:
+            processed_analysis = self._process_ai_response_strict(ai_response, data)
+        except Exception as e:
+            # Resposta rejeitada sai do cache; nova tentativa gera outra resposta
+            logger.warning(f"⚠️ Resposta da IA rejeitada ({e}) - gerando novamente sem cache")
+            ai_manager.invalidate_cached_response(prompt, max_tokens=8192)
+            ai_response = ai_manager.generate_analysis(prompt, max_tokens=8192, use_cache=False, session_id=session_id)
+            if not ai_response:
+                raise
+            processed_analysis = self._process_ai_response_strict(ai_response, data)
 
         return processed_analysis
 
-    def _prepare_search_context(self, research_data: Dict[str, Any]) -> str:
-        """Prepara contexto de pesquisa para IA"""
+    def _prepare_search_context(self, research_data: Dict[str, Any], data: Optional[Dict[str, Any]] = None) -> str:
+        """Prepara contexto de pesquisa para IA dentro do orçamento de tokens do provedor"""
 
         extracted_content = research_data.get('extracted_content', [])
 
         if not extracted_content:
             raise Exception("NENHUM CONTEÚDO EXTRAÍDO: Pesquisa web falhou completamente")
 
-        # Combina conteúdo das páginas mais relevantes
-        context = "PESQUISA WEB MASSIVA REAL EXECUTADA:\n\n"
-
-        # Ordena por qualidade
-        sorted_content = sorted(extracted_content, key=lambda x: x.get('quality_score', 0), reverse=True)
+        data = data or {}
+        query = ' '.join(str(data.get(field) or '') for field in ('segmento', 'produto', 'publico'))
 
-        for i, content_item in enumerate(sorted_content[:10], 1):  # Top 10 páginas por qualidade
-            context += f"--- FONTE REAL {i}: {content_item['title']} ---\n"
-            context += f"URL: {content_item['url']}\n"
-            context += f"Qualidade: {content_item.get('quality_score', 0):.1f}%\n"
-            context += f"Conteúdo: {content_item['content'][:2000]}\n\n"
+        # Prompt fixo (sem contexto) também ocupa a janela do modelo
+        prompt_tokens = context_packer.estimate_tokens(self._build_gigantic_analysis_prompt(data, ''))
+        token_budget = ai_manager.get_context_budget(max_output_tokens=8192, prompt_tokens=prompt_tokens)
 
         # Adiciona estatísticas da pesquisa
-        context += f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
-        context += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
-        context += f"Total de resultados encontrados: {research_data.get('total_results', 0)}\n"
-        context += f"Páginas únicas analisadas: {research_data.get('unique_sources', 0)}\n"
-        context += f"Extrações bem-sucedidas: {research_data.get('successful_extractions', 0)}\n"
-        context += f"Total de caracteres extraídos: {research_data.get('total_content_length', 0):,}\n"
-        context += f"Qualidade média do conteúdo: {research_data.get('quality_metrics', {}).get('avg_quality_score', 0):.1f}%\n"
-        context += f"Garantia de dados reais: 100%\n"
+        footer = f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
+        footer += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
+        footer += f"Total de resultados encontrados: {research_data.get('total_results', 0)}\n"
+        footer += f"Páginas únicas analisadas: {research_data.get('unique_sources', 0)}\n"
+        footer += f"Extrações bem-sucedidas: {research_data.get('successful_extractions', 0)}\n"
+        footer += f"Total de caracteres extraídos: {research_data.get('total_content_length', 0):,}\n"
+        footer += f"Qualidade média do conteúdo: {research_data.get('quality_metrics', {}).get('avg_quality_score', 0):.1f}%\n"
+        footer += f"Garantia de dados reais: 100%\n"
+
+        # Trechos mais relevantes para segmento/produto, sem duplicatas entre fontes
+        context, _ = context_packer.build_context(
+            extracted_content,
+            query,
+            token_budget,
+            header="PESQUISA WEB MASSIVA REAL EXECUTADA:\n\n",
+            footer=footer
+        )
 
         return context
 
@@ -800,7 +959,8 @@ Se não houver dados suficientes para uma seção, omita a seção completamente
                 "Meu caso é diferente, isso pode não funcionar",
                 "Já tentei outras coisas e não deram certo",
                 "Preciso de mais garantias de que funciona"
-            ]
+            ],
+            "fallback_mode": True
         }
 
     def _contains_simulated_data(self, analysis: Dict[str, Any]) -> bool:
@@ -3,17 +3,99 @@
 """
 ARQV30 Enhanced v2.0 - URL Filter Manager
 Filtro inteligente de URLs para evitar conteúdo irrelevante
+(regras compiladas: trie de sufixos de domínio, regex única de padrões e
+busca multi-padrão de palavras, com recarga a quente)
 """
 
+import os
+import json
 import time
 import random
 import logging
 import re
-from typing import List, Set, Dict, Any, Optional
+import threading
+from typing import List, Set, Dict, Any, Optional, Iterable
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+class DomainSuffixTrie:
+    """Trie de rótulos de domínio invertidos: bloqueia o domínio e seus subdomínios"""
+
+    _END = ''
+
+    def __init__(self, domains: Iterable[str]):
+        self.root: Dict[str, Any] = {}
+        for domain in domains:
+            node = self.root
+            for label in reversed(domain.lower().strip('.').split('.')):
+                node = node.setdefault(label, {})
+            node[self._END] = domain
+
+    def match(self, domain: str) -> Optional[str]:
+        """Regra que cobre o domínio (ele mesmo ou um sufixo), ou None"""
+        node = self.root
+        for label in reversed(domain.split('.')):
+            node = node.get(label)
+            if node is None:
+                return None
+            if self._END in node:
+                return node[self._END]
+        return None
+
+class MultiPatternMatcher:
+    """
+    Busca de várias palavras (substrings) em uma única passada de regex.
+
+    O lookahead encontra, em cada posição, a palavra mais longa; as palavras
+    que são prefixo dela também ocorrem ali e são incluídas, o que dá o mesmo
+    resultado de `palavra in texto` para cada palavra.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        words = sorted({w.lower() for w in words if w}, key=len, reverse=True)
+        self.regex = re.compile(
+            '(?=(' + '|'.join(re.escape(w) for w in words) + '))'
+        ) if words else None
+        self.prefixes = {w: [p for p in words if p != w and w.startswith(p)] for w in words}
+
+    def find(self, text: str) -> Set[str]:
+        """Palavras contidas no texto (já em minúsculas)"""
+        found: Set[str] = set()
+        if self.regex is None or not text:
+            return found
+        for longest in set(self.regex.findall(text)):
+            found.add(longest)
+            found.update(self.prefixes[longest])
+        return found
+
+class CompiledURLRules:
+    """Regras de filtro compiladas (imutáveis; substituídas inteiras na recarga)"""
+
+    def __init__(
+        self,
+        dominios_bloqueados: Iterable[str],
+        padroes_bloqueados: List[str],
+        palavras_irrelevantes: Iterable[str],
+        dominios_preferenciais: Iterable[str],
+        palavras_qualidade: Iterable[str]
+    ):
+        self.blocked_domains = DomainSuffixTrie(dominios_bloqueados)
+        self.preferred_domains = DomainSuffixTrie(dominios_preferenciais)
+        self.patterns = list(padroes_bloqueados)
+        self.pattern_regex = re.compile(
+            '|'.join(f'(?P<p{i}>{padrao})' for i, padrao in enumerate(self.patterns))
+        ) if self.patterns else None
+        self.irrelevant_words = MultiPatternMatcher(palavras_irrelevantes)
+        self.quality_words = MultiPatternMatcher(palavras_qualidade)
+
+    def blocked_pattern(self, url_completa: str) -> Optional[str]:
+        """Padrão bloqueado encontrado em path?query, ou None"""
+        if self.pattern_regex is None:
+            return None
+        match = self.pattern_regex.search(url_completa)
+        return self.patterns[int(match.lastgroup[1:])] if match else None
+
 class URLFilterManager:
     """Gerenciador de filtros de URL para evitar conteúdo irrelevante"""
     
@@ -92,6 +174,14 @@ class URLFilterManager:
             'trabalhe conosco', 'vagas', 'careers', 'jobs'
         }
         
+        # Palavras-chave de qualidade (bonus de prioridade)
+        self.palavras_qualidade = [
+            'análise', 'mercado', 'tendência', 'oportunidade', 'estratégia',
+            'crescimento', 'inovação', 'dados', 'pesquisa', 'relatório',
+            'estudo', 'insights', 'business', 'negócios', 'empresa',
+            'startup', 'investimento', 'tecnologia', 'digital'
+        ]
+        
         # Domínios preferenciais (conteúdo de qualidade)
         self.dominios_preferenciais = {
             "g1.globo.com",
@@ -122,10 +212,94 @@ class URLFilterManager:
             'preferenciais': 0
         }
         
+        # Regras externas (JSON) com recarga a quente: chaves presentes substituem as padrão
+        self.rules_path = os.getenv('URL_FILTER_RULES_PATH', '')
+        self.reload_interval = float(os.getenv('URL_FILTER_RELOAD_INTERVAL', '5'))
+        self._rules_mtime: Optional[float] = None
+        self._next_reload_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._defaults = {
+            'dominios_bloqueados': set(self.dominios_bloqueados),
+            'padroes_bloqueados': list(self.padroes_bloqueados),
+            'palavras_irrelevantes': set(self.palavras_irrelevantes),
+            'dominios_preferenciais': set(self.dominios_preferenciais),
+            'palavras_qualidade': list(self.palavras_qualidade)
+        }
+        self._rules = self._compile_rules()
+        self._check_reload(force=True)
+        
         logger.info(f"🔍 URL Filter Manager inicializado com {len(self.dominios_bloqueados)} domínios bloqueados")
     
+    def _compile_rules(self) -> CompiledURLRules:
+        """Compila as regras atuais (trie, regex combinada e buscadores de palavras)"""
+        return CompiledURLRules(
+            self.dominios_bloqueados,
+            self.padroes_bloqueados,
+            self.palavras_irrelevantes,
+            self.dominios_preferenciais,
+            self.palavras_qualidade
+        )
+    
+    def _check_reload(self, force: bool = False):
+        """Recarrega o arquivo de regras se ele mudou (verificação a cada reload_interval)"""
+        if not self.rules_path:
+            return
+        now = time.time()
+        if not force and now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self.reload_interval
+        try:
+            mtime = os.path.getmtime(self.rules_path)
+        except OSError:
+            return
+        if mtime != self._rules_mtime:
+            self.recarregar_regras()
+    
+    def recarregar_regras(self) -> bool:
+        """Relê o arquivo de regras (URL_FILTER_RULES_PATH) e recompila o filtro"""
+        if not self.rules_path:
+            return False
+        with self._reload_lock:
+            mtime = self._rules_mtime
+            try:
+                mtime = os.path.getmtime(self.rules_path)
+                with open(self.rules_path, 'r', encoding='utf-8') as f:
+                    rules = json.load(f)
+                
+                values = {key: rules.get(key, default) for key, default in self._defaults.items()}
+                padroes = list(values['padroes_bloqueados'])
+                for padrao in padroes:
+                    re.compile(padrao)  # Rejeita o arquivo inteiro se houver regex inválida
+                
+                self.dominios_bloqueados = {d.lower().replace('www.', '') for d in values['dominios_bloqueados']}
+                self.padroes_bloqueados = padroes
+                self.palavras_irrelevantes = set(values['palavras_irrelevantes'])
+                self.dominios_preferenciais = {d.lower().replace('www.', '') for d in values['dominios_preferenciais']}
+                self.palavras_qualidade = list(values['palavras_qualidade'])
+                self._rules = self._compile_rules()
+                self._rules_mtime = mtime
+                logger.info(f"🔄 Regras de filtro recarregadas de {self.rules_path}")
+                return True
+            except Exception as e:
+                # Mantém as regras anteriores; tenta de novo só quando o arquivo mudar
+                self._rules_mtime = mtime
+                logger.error(f"❌ Erro ao recarregar regras de filtro ({self.rules_path}): {e}")
+                return False
+    
     def filtrar_url(self, url: str, titulo: str = "", snippet: str = "") -> Dict[str, Any]:
         """Filtra URL e retorna resultado detalhado"""
+        self._check_reload()
+        return self._filtrar(self._rules, url, titulo, snippet)
+    
+    def _filtrar(
+        self,
+        rules: CompiledURLRules,
+        url: str,
+        titulo: str = "",
+        snippet: str = "",
+        domain_cache: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Filtra uma URL com um conjunto de regras compiladas"""
         
         self.stats['total_analisadas'] += 1
         
@@ -146,8 +320,17 @@ class URLFilterManager:
             # Remove www. para comparação
             domain_clean = domain.replace('www.', '')
             
-            # 1. Verifica domínios bloqueados
-            if domain_clean in self.dominios_bloqueados:
+            # 1. Verifica domínios bloqueados (inclui subdomínios); lotes reaproveitam a consulta
+            if domain_cache is not None and domain_clean in domain_cache:
+                bloqueio_dominio, preferencial = domain_cache[domain_clean]
+            else:
+                host = domain_clean.split(':')[0]
+                bloqueio_dominio = rules.blocked_domains.match(host)
+                preferencial = rules.preferred_domains.match(host) is not None
+                if domain_cache is not None:
+                    domain_cache[domain_clean] = (bloqueio_dominio, preferencial)
+            
+            if bloqueio_dominio:
                 self.stats['bloqueadas_dominio'] += 1
                 logger.debug(f"⏭️ URL bloqueada (domínio): {url}")
                 return {
@@ -157,26 +340,22 @@ class URLFilterManager:
                     'prioridade': 0
                 }
             
-            # 2. Verifica padrões bloqueados na URL
+            # 2. Verifica padrões bloqueados na URL (uma regex combinada)
             url_completa = f"{path}?{query}".lower()
-            for padrao in self.padroes_bloqueados:
-                if re.search(padrao, url_completa):
-                    self.stats['bloqueadas_padrao'] += 1
-                    logger.debug(f"⏭️ URL bloqueada (padrão): {url}")
-                    return {
-                        'aprovada': False,
-                        'motivo': f'Padrão bloqueado: {padrao}',
-                        'categoria': 'padrao_bloqueado',
-                        'prioridade': 0
-                    }
+            padrao = rules.blocked_pattern(url_completa)
+            if padrao:
+                self.stats['bloqueadas_padrao'] += 1
+                logger.debug(f"⏭️ URL bloqueada (padrão): {url}")
+                return {
+                    'aprovada': False,
+                    'motivo': f'Padrão bloqueado: {padrao}',
+                    'categoria': 'padrao_bloqueado',
+                    'prioridade': 0
+                }
             
-            # 3. Verifica palavras irrelevantes no título/snippet
+            # 3. Verifica palavras irrelevantes no título/snippet (busca multi-padrão)
             texto_completo = f"{titulo} {snippet}".lower()
-            palavras_encontradas = []
-            
-            for palavra in self.palavras_irrelevantes:
-                if palavra in texto_completo:
-                    palavras_encontradas.append(palavra)
+            palavras_encontradas = sorted(rules.irrelevant_words.find(texto_completo))
             
             if len(palavras_encontradas) >= 2:  # 2+ palavras irrelevantes
                 self.stats['bloqueadas_palavra'] += 1
@@ -189,12 +368,12 @@ class URLFilterManager:
                 }
             
             # 4. Calcula prioridade
-            prioridade = self._calcular_prioridade_url(domain_clean, titulo, snippet)
+            prioridade = self._calcular_prioridade_url(domain_clean, titulo, snippet, rules, preferencial)
             
             # 5. URL aprovada
             self.stats['aprovadas'] += 1
             
-            if domain_clean in self.dominios_preferenciais:
+            if preferencial:
                 self.stats['preferenciais'] += 1
                 categoria = 'preferencial'
             else:
@@ -219,18 +398,32 @@ class URLFilterManager:
                 'prioridade': 0
             }
     
+    def filtrar_lote(self, urls_com_metadata: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Filtra um lote com um único conjunto de regras: a verificação de
+        recarga é feita uma vez e a consulta de domínio é reaproveitada entre
+        resultados do mesmo domínio. Retorna o resultado de cada item, na ordem.
+        """
+        self._check_reload()
+        rules = self._rules
+        domain_cache: Dict[str, Any] = {}
+        return [
+            self._filtrar(
+                rules,
+                item.get('url', ''),
+                item.get('title', '') or '',
+                item.get('snippet', '') or '',
+                domain_cache
+            )
+            for item in urls_com_metadata
+        ]
+    
     def filtrar_lista_urls(self, urls_com_metadata: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Filtra lista de URLs com metadata"""
         
         urls_aprovadas = []
         
-        for item in urls_com_metadata:
-            url = item.get('url', '')
-            titulo = item.get('title', '')
-            snippet = item.get('snippet', '')
-            
-            filtro_resultado = self.filtrar_url(url, titulo, snippet)
-            
+        for item, filtro_resultado in zip(urls_com_metadata, self.filtrar_lote(urls_com_metadata)):
             if filtro_resultado['aprovada']:
                 # Adiciona informações do filtro ao item
                 item['filtro'] = filtro_resultado
@@ -243,31 +436,31 @@ class URLFilterManager:
         
         return urls_aprovadas
     
-    def _calcular_prioridade_url(self, domain: str, titulo: str, snippet: str) -> float:
+    def _calcular_prioridade_url(
+        self,
+        domain: str,
+        titulo: str,
+        snippet: str,
+        rules: Optional[CompiledURLRules] = None,
+        preferencial: Optional[bool] = None
+    ) -> float:
         """Calcula prioridade da URL baseada em qualidade"""
         
+        rules = rules or self._rules
         prioridade = 1.0  # Base
         
         # Bonus por domínio preferencial
-        if domain in self.dominios_preferenciais:
+        if preferencial is None:
+            preferencial = rules.preferred_domains.match(domain.split(':')[0]) is not None
+        if preferencial:
             prioridade += 3.0
         
-        # Bonus por palavras-chave de qualidade no título
-        palavras_qualidade = [
-            'análise', 'mercado', 'tendência', 'oportunidade', 'estratégia',
-            'crescimento', 'inovação', 'dados', 'pesquisa', 'relatório',
-            'estudo', 'insights', 'business', 'negócios', 'empresa',
-            'startup', 'investimento', 'tecnologia', 'digital'
-        ]
-        
         titulo_lower = titulo.lower()
         snippet_lower = snippet.lower()
         
-        for palavra in palavras_qualidade:
-            if palavra in titulo_lower:
-                prioridade += 0.5
-            if palavra in snippet_lower:
-                prioridade += 0.3
+        # Bonus por palavras-chave de qualidade no título e no snippet
+        prioridade += 0.5 * len(rules.quality_words.find(titulo_lower))
+        prioridade += 0.3 * len(rules.quality_words.find(snippet_lower))
         
         # Bonus por ano atual
         if '2024' in titulo or '2024' in snippet:
@@ -288,6 +481,7 @@ class URLFilterManager:
     def adicionar_dominio_bloqueado(self, domain: str):
         """Adiciona domínio à lista de bloqueados"""
         self.dominios_bloqueados.add(domain.lower().replace('www.', ''))
+        self._rules = self._compile_rules()
         logger.info(f"🚫 Domínio adicionado à lista de bloqueados: {domain}")
     
     def remover_dominio_bloqueado(self, domain: str):
@@ -295,6 +489,7 @@ class URLFilterManager:
         domain_clean = domain.lower().replace('www.', '')
         if domain_clean in self.dominios_bloqueados:
             self.dominios_bloqueados.remove(domain_clean)
+            self._rules = self._compile_rules()
             logger.info(f"✅ Domínio removido da lista de bloqueados: {domain}")
     
     def get_stats(self) -> Dict[str, Any]:
@@ -317,7 +512,9 @@ class URLFilterManager:
             **self.stats,
             **stats_percentuais,
             'dominios_bloqueados_count': len(self.dominios_bloqueados),
-            'dominios_preferenciais_count': len(self.dominios_preferenciais)
+            'dominios_preferenciais_count': len(self.dominios_preferenciais),
+            'padroes_bloqueados_count': len(self.padroes_bloqueados),
+            'regras_arquivo': self.rules_path or None
         }
     
     def reset_stats(self):
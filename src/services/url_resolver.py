@@ -2,19 +2,33 @@
 # -*- coding: utf-8 -*-
 """
 ARQV30 Enhanced v2.0 - URL Resolver CORRIGIDO
-Resolve URLs de redirecionamento e encurtadores com decodificação robusta
+Resolve URLs de redirecionamento e encurtadores com decodificação robusta,
+canonicalização (sem parâmetros de rastreamento) e cache de resoluções
 """
 
 import os
+import time
 import logging
 import base64
+import threading
 import requests
 import json
-from urllib.parse import parse_qs, urlparse, unquote
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse, urlunparse, unquote
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Parâmetros de rastreamento removidos na canonicalização
+TRACKING_PARAMS = {
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'ref_url', 'spm', 'vero_id', 'oly_enc_id'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
 class URLResolver:
     """Resolvedor robusto de URLs de redirecionamento"""
     
@@ -25,49 +39,225 @@ class URLResolver:
         })
         self.timeout = 10
         
-    def resolve_redirect_url(self, url: str) -> str:
+        # Cache (memória, LRU com TTL) dos redirects resolvidos pela rede
+        self.cache_size = int(os.getenv('URL_RESOLVER_CACHE_SIZE', '5000'))
+        self.cache_ttl = float(os.getenv('URL_RESOLVER_CACHE_TTL', str(24 * 3600)))
+        self.max_workers = int(os.getenv('URL_RESOLVER_MAX_WORKERS', '8'))
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'resolutions': 0,
+            'offline': 0,
+            'cache_hits': 0,
+            'network': 0,
+            'evictions': 0
+        }
+    
+    def canonicalize(self, url: str) -> str:
         """
-        Resolve URLs de redirecionamento do Bing, Google e encurtadores.
+        URL canônica sem rede: desembrulha links do Bing/Google, normaliza
+        esquema, host e porta, remove parâmetros de rastreamento, fragmento
+        e barra final. URLs não-HTTP são retornadas como estão.
+        
+        Serve apenas como chave (deduplicação e caches): o servidor pode
+        diferenciar barra final, maiúsculas ou parâmetros, então a requisição
+        usa a URL original ou resolvida (ver resolve_redirect_url).
         """
+        if not url:
+            return url
+        url = self.unwrap(url)
+        
         try:
-            original_url = url
-            
-            # Bing: URLs com u=a1aHR0c...
-            if "bing.com/ck/a" in url and "u=a1" in url:
-                logger.info(f"🔄 Resolvendo URL do Bing: {url[:100]}...")
-                resolved = self._resolve_bing_url(url)
-                if resolved and resolved != url and resolved.startswith('http'):
-                    logger.info(f"✅ URL Bing resolvida: {resolved}")
-                    return resolved
+            parsed = urlparse(url)
+        except ValueError:
+            return url
+        scheme = parsed.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parsed.netloc:
+            return url
+        
+        # Só o host é case-insensitive: usuário e senha ficam como estão
+        userinfo, at, host = parsed.netloc.rpartition('@')
+        host = host.lower()
+        if host.endswith(':' + DEFAULT_PORTS[scheme]):
+            host = host.rsplit(':', 1)[0]
+        netloc = userinfo + at + host
+        
+        path = parsed.path or '/'
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+        
+        # Filtra os pares brutos (sem re-codificar os demais parâmetros)
+        query = '&'.join(
+            pair for pair in parsed.query.split('&')
+            if pair and not self._is_tracking_param(unquote(pair.split('=', 1)[0]).lower())
+        )
+        return urlunparse((scheme, netloc, path, parsed.params, query, ''))
+    
+    @staticmethod
+    def _is_tracking_param(key: str) -> bool:
+        return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+    
+    def canonical_key(self, url: str) -> str:
+        """Chave de deduplicação: URL canônica sem esquema e sem 'www.'"""
+        canonical = self.canonicalize(url)
+        parsed = urlparse(canonical)
+        if not parsed.netloc:
+            return canonical
+        host = parsed.netloc[4:] if parsed.netloc.startswith('www.') else parsed.netloc
+        return host + canonical.split(parsed.netloc, 1)[1]
+    
+    def unwrap(self, url: str) -> str:
+        """URL de destino de links do Bing/Google decodificáveis sem rede (ou a própria URL)"""
+        url = url.strip()
+        return self._decode_wrapper(url) or url
+    
+    def _decode_wrapper(self, url: str) -> Optional[str]:
+        """Destino de links do Bing (ck/a) e do Google (/url?q=) decodificado sem rede"""
+        if "bing.com/ck/a" in url and "u=a1" in url:
+            return self._decode_bing_url(url)
+        if "/url?q=" in url or "google." in url and "url?q=" in url:
+            return self._decode_google_url(url)
+        return None
+    
+    def _needs_network(self, url: str) -> bool:
+        """Links embrulhados não decodificáveis e encurtadores exigem seguir redirects"""
+        return (
+            ("bing.com/ck/a" in url and "u=a1" in url) or
+            "/url?q=" in url or ("google." in url and "url?q=" in url) or
+            self._is_short_url(url)
+        )
+    
+    def _cache_get(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is None:
+                return None
+            resolved, expires_at = entry
+            if expires_at < time.time():
+                del self._cache[url]
+                return None
+            self._cache.move_to_end(url)
+            self.stats['cache_hits'] += 1
+            return resolved
+    
+    def _cache_set(self, url: str, resolved: str):
+        with self._lock:
+            self._cache[url] = (resolved, time.time() + self.cache_ttl)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.stats['evictions'] += 1
+        
+    def resolve_redirect_url(self, url: str, timeout: Optional[float] = None) -> str:
+        """
+        Resolve URLs de redirecionamento do Bing, Google e encurtadores e
+        retorna a URL de destino para a requisição (não canonicalizada).
+        Links decodificáveis não usam a rede; redirects seguidos pela rede
+        ficam em cache (TTL) pela URL canônica.
+        `timeout` limita as requisições de rede (padrão: self.timeout).
+        """
+        try:
+            self.stats['resolutions'] += 1
+            target = self.unwrap(url)
+            if not self._needs_network(target):
+                if target != url.strip():
+                    self.stats['offline'] += 1
+                    logger.debug(f"🔗 URL desembrulhada: {url[:100]} -> {target}")
+                return target
             
-            # Google: URLs com /url?q=
-            elif "/url?q=" in url or "google." in url and "url?q=" in url:
-                logger.info(f"🔄 Resolvendo URL do Google: {url[:100]}...")
-                resolved = self._resolve_google_url(url)
-                if resolved and resolved != url and resolved.startswith('http'):
-                    logger.info(f"✅ URL Google resolvida: {resolved}")
-                    return resolved
+            canonical = self.canonicalize(target)
+            cached = self._cache_get(canonical)
+            if cached:
+                logger.debug(f"💾 Redirect em cache: {target[:100]} -> {cached}")
+                return cached
             
-            # Encurtadores conhecidos
-            elif self._is_short_url(url):
-                logger.info(f"🔄 Resolvendo URL encurtada: {url}")
-                resolved = self._resolve_short_url(url)
-                if resolved and resolved != url and resolved.startswith('http'):
-                    logger.info(f"✅ URL encurtada resolvida: {resolved}")
-                    return resolved
+            self.stats['network'] += 1
+            resolved = self._resolve_network(target, timeout)
+            if resolved and resolved != target and resolved.startswith('http'):
+                self._cache_set(canonical, resolved)
+                return resolved
             
-            # URL já está limpa
-            return url
+            # Sem redirect conhecido: mantém a URL
+            return target
             
         except Exception as e:
             logger.error(f"❌ Erro ao resolver URL {url}: {str(e)}")
             return url  # Retorna a original se falhar
     
-    def _resolve_bing_url(self, url: str) -> str:
-        """Resolve URLs específicas do Bing com decodificação Base64 dupla"""
+    def _resolve_network(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Segue o redirect de links do Bing, do Google ou de encurtadores"""
+        # Bing: URLs com u=a1aHR0c...
+        if "bing.com/ck/a" in url and "u=a1" in url:
+            logger.info(f"🔄 Resolvendo URL do Bing: {url[:100]}...")
+            resolved = self._resolve_bing_url(url, timeout)
+            if resolved and resolved != url and resolved.startswith('http'):
+                logger.info(f"✅ URL Bing resolvida: {resolved}")
+                return resolved
+        
+        # Google: URLs com /url?q=
+        elif "/url?q=" in url or "google." in url and "url?q=" in url:
+            logger.info(f"🔄 Resolvendo URL do Google: {url[:100]}...")
+            resolved = self._resolve_google_url(url, timeout)
+            if resolved and resolved != url and resolved.startswith('http'):
+                logger.info(f"✅ URL Google resolvida: {resolved}")
+                return resolved
+        
+        # Encurtadores conhecidos
+        elif self._is_short_url(url):
+            logger.info(f"🔄 Resolvendo URL encurtada: {url}")
+            resolved = self._resolve_short_url(url, timeout)
+            if resolved and resolved != url and resolved.startswith('http'):
+                logger.info(f"✅ URL encurtada resolvida: {resolved}")
+                return resolved
+        
+        return None
+    
+    def resolve_many(
+        self,
+        urls: List[str],
+        timeout: Optional[float] = None,
+        max_workers: Optional[int] = None
+    ) -> Dict[str, str]:
+        """
+        Resolve várias URLs: decodificação e cache primeiro, e só as que exigem
+        rede em paralelo (URLs com a mesma forma canônica uma única vez).
+        Retorna {url original: url resolvida}. Os lotes de extração chamam
+        antes de distribuir as URLs, deixando os redirects já em cache.
+        """
+        resolved: Dict[str, str] = {}
+        network: Dict[str, List[str]] = {}
+        targets: Dict[str, str] = {}
+        for url in urls:
+            if url in resolved or not url:
+                continue
+            target = self.unwrap(url)
+            canonical = self.canonicalize(target)
+            if self._needs_network(target) and self._cache_get(canonical) is None:
+                network.setdefault(canonical, []).append(url)
+                targets.setdefault(canonical, target)
+            else:
+                resolved[url] = self.resolve_redirect_url(url, timeout)
+        
+        if network:
+            workers = max(1, min(max_workers or self.max_workers, len(network)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                keys = list(network)
+                for canonical, final_url in zip(keys, executor.map(
+                    lambda key: self.resolve_redirect_url(targets[key], timeout), keys
+                )):
+                    for url in network[canonical]:
+                        resolved[url] = final_url
+        
+        return resolved
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Contadores de resolução e ocupação do cache"""
+        with self._lock:
+            return {**self.stats, 'cache_entries': len(self._cache), 'cache_ttl': self.cache_ttl}
+    
+    def _decode_bing_url(self, url: str) -> Optional[str]:
+        """Decodifica o destino de links do Bing (Base64, simples ou dupla) sem rede"""
         try:
-            logger.debug(f"🔍 Resolvendo URL do Bing: {url}")
-            
             # Extrai parâmetro u=a1...
             if "u=a1" in url:
                 # Formato: u=a1aHR0c...
@@ -107,12 +297,12 @@ class URLResolver:
                         final_url = second_decode.decode('utf-8', errors='ignore')
                         
                         if final_url.startswith('http'):
-                            logger.info(f"✅ URL Bing decodificada (dupla): {final_url}")
+                            logger.debug(f"✅ URL Bing decodificada (dupla): {final_url}")
                             return final_url
                     
                     elif first_decode_str.startswith('http'):
                         # Primeira decodificação já é suficiente
-                        logger.info(f"✅ URL Bing decodificada (simples): {first_decode_str}")
+                        logger.debug(f"✅ URL Bing decodificada (simples): {first_decode_str}")
                         return first_decode_str
                     
                 except Exception as decode_error:
@@ -124,35 +314,55 @@ class URLResolver:
                         decoded = base64.b64decode(clean_encoded + '==')
                         decoded_str = decoded.decode('utf-8', errors='ignore')
                         if decoded_str.startswith('http'):
-                            logger.info(f"✅ URL Bing decodificada (alternativa): {decoded_str}")
+                            logger.debug(f"✅ URL Bing decodificada (alternativa): {decoded_str}")
                             return decoded_str
                     except:
                         pass
             
+        except Exception as e:
+            logger.error(f"❌ Erro ao decodificar Bing URL: {e}")
+        return None
+    
+    def _resolve_bing_url(self, url: str, timeout: Optional[float] = None) -> str:
+        """Resolve URLs específicas do Bing com decodificação Base64 dupla"""
+        try:
+            logger.debug(f"🔍 Resolvendo URL do Bing: {url}")
+            decoded = self._decode_bing_url(url)
+            if decoded:
+                return decoded
+            
             # Método alternativo: follow redirects
-            return self._follow_redirects(url)
+            return self._follow_redirects(url, timeout=timeout)
             
         except Exception as e:
             logger.error(f"❌ Erro ao resolver Bing URL: {e}")
             return url
     
-    def _resolve_google_url(self, url: str) -> str:
-        """Resolve URLs do Google"""
+    def _decode_google_url(self, url: str) -> Optional[str]:
+        """Extrai o destino (parâmetro q) de links /url?q= do Google sem rede"""
         try:
-            parsed = urlparse(url)
-            
             if "url?q=" in url:
                 # Extrai parâmetro q
-                query_params = parse_qs(parsed.query)
+                query_params = parse_qs(urlparse(url).query)
                 q_param = query_params.get('q')
                 if q_param:
                     decoded_url = unquote(q_param[0])
                     if decoded_url.startswith('http'):
-                        logger.info(f"✅ URL Google decodificada: {decoded_url}")
+                        logger.debug(f"✅ URL Google decodificada: {decoded_url}")
                         return decoded_url
+        except Exception as e:
+            logger.error(f"❌ Erro ao decodificar Google URL: {e}")
+        return None
+    
+    def _resolve_google_url(self, url: str, timeout: Optional[float] = None) -> str:
+        """Resolve URLs do Google"""
+        try:
+            decoded = self._decode_google_url(url)
+            if decoded:
+                return decoded
             
             # Follow redirects se não conseguir extrair
-            return self._follow_redirects(url)
+            return self._follow_redirects(url, timeout=timeout)
             
         except Exception as e:
             logger.error(f"❌ Erro ao resolver Google URL: {e}")
@@ -164,19 +374,20 @@ class URLResolver:
             'bit.ly', 'tinyurl.com', 'goo.gl', 't.co', 'short.link',
             'ow.ly', 'buff.ly', 'tiny.cc', 'is.gd', 'v.gd'
         ]
-        return any(domain in url for domain in short_domains)
+        host = urlparse(url).netloc.lower().split(':')[0]
+        return any(host == domain or host.endswith('.' + domain) for domain in short_domains)
     
-    def _resolve_short_url(self, url: str) -> str:
+    def _resolve_short_url(self, url: str, timeout: Optional[float] = None) -> str:
         """Resolve URLs encurtadas seguindo redirects"""
-        return self._follow_redirects(url)
+        return self._follow_redirects(url, timeout=timeout)
     
-    def _follow_redirects(self, url: str, max_redirects: int = 5) -> str:
+    def _follow_redirects(self, url: str, max_redirects: int = 5, timeout: Optional[float] = None) -> str:
         """Segue redirects até a URL final"""
         try:
             response = self.session.head(
                 url, 
                 allow_redirects=True, 
-                timeout=self.timeout,
+                timeout=timeout if timeout is not None else self.timeout,
                 verify=False  # Para evitar problemas de SSL
             )
             
@@ -197,4 +408,8 @@ url_resolver = URLResolver()
 # Função de conveniência
 def resolve_url(url: str) -> str:
     """Função de conveniência para resolver URLs"""
-    return url_resolver.resolve_redirect_url(url)
\ No newline at end of file
+    return url_resolver.resolve_redirect_url(url)
+
+def canonicalize_url(url: str) -> str:
+    """Função de conveniência para canonicalizar URLs (sem rede)"""
+    return url_resolver.canonicalize(url)
\ No newline at end of file
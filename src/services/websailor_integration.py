@@ -10,12 +10,15 @@ import logging
 import time
 import requests
 from typing import Dict, List, Optional, Any
-from urllib.parse import quote_plus, urljoin
+from urllib.parse import urljoin
 import json
 import re
 from datetime import datetime
 from bs4 import BeautifulSoup
 import random
+from services.async_search_engine import async_search_engine
+from services.rate_limiter import rate_limiter
+from services.relevance_engine import relevance_engine
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +28,9 @@ class WebSailorAgent:
     def __init__(self):
         """Inicializa agente WebSailor REAL"""
         self.enabled = os.getenv("WEBSAILOR_ENABLED", "true").lower() == "true"
-        self.google_search_key = os.getenv("GOOGLE_SEARCH_KEY")
         self.jina_api_key = os.getenv("JINA_API_KEY")
-        self.google_cse_id = os.getenv("GOOGLE_CSE_ID")
         
         # URLs das APIs
-        self.google_search_url = "https://www.googleapis.com/customsearch/v1"
         self.jina_reader_url = "https://r.jina.ai/"
         
         # Headers REAIS para requisições
@@ -71,39 +71,40 @@ class WebSailorAgent:
             
             all_page_contents = []
             
-            # 1. BUSCA REAL MÚLTIPLA
-            search_engines = [
-                self._google_search_real,
-                self._bing_search_real,
-                self._duckduckgo_search_real,
-                self._yahoo_search_real
-            ]
+            # 1. BUSCA REAL MÚLTIPLA (todos os buscadores em paralelo)
+            search_results = async_search_engine.search(
+                query,
+                providers=['google', 'bing', 'duckduckgo', 'yahoo'],
+                max_results_per_provider=max_pages,
+                provider_queries={'google': self._enhance_search_query_real(query)},
+                date_sorted=True
+            )
+            
+            results_per_engine = {}
+            for result in search_results:
+                results_per_engine.setdefault(result['source'], []).append(result)
             
-            for search_engine in search_engines:
-                try:
-                    results = search_engine(query, max_pages)
-                    if results:
-                        logger.info(f"✅ {search_engine.__name__}: {len(results)} resultados REAIS")
-                        
-                        # Extrai conteúdo REAL de cada página
-                        for result in results[:10]:  # Top 10 por engine
+            for engine_name, results in results_per_engine.items():
+                logger.info(f"✅ {engine_name}: {len(results)} resultados REAIS")
+                
+                # Extrai conteúdo REAL de cada página
+                for result in results[:10]:  # Top 10 por engine
+                    try:
+                        with rate_limiter.limit('web'):
                             content = self._extract_real_page_content(result["url"])
-                            if content and len(content) > 100:  # Só conteúdo substancial
-                                all_page_contents.append({
-                                    "url": result["url"],
-                                    "title": result["title"],
-                                    "content": content,
-                                    "relevance_score": self._calculate_real_relevance(content, query, context),
-                                    "source_type": "real_search",
-                                    "search_engine": search_engine.__name__
-                                })
-                                
-                                # Delay para não sobrecarregar
-                                time.sleep(0.5)
-                    
-                except Exception as e:
-                    logger.warning(f"Erro em {search_engine.__name__}: {str(e)}")
-                    continue
+                        if content and len(content) > 100:  # Só conteúdo substancial
+                            all_page_contents.append({
+                                "url": result["url"],
+                                "title": result["title"],
+                                "content": content,
+                                "relevance_score": self._calculate_real_relevance(content, query, context),
+                                "source_type": "real_search",
+                                "search_engine": f"{engine_name}_real"
+                            })
+
+                    except Exception as e:
+                        logger.warning(f"Erro ao extrair {result['url']}: {str(e)}")
+                        continue
             
             # 2. PESQUISA EM PROFUNDIDADE REAL
             if depth > 1 and all_page_contents:
@@ -113,7 +114,8 @@ class WebSailorAgent:
                 for page in top_pages:
                     internal_links = self._extract_real_internal_links(page["url"], page["content"])
                     for link in internal_links[:3]:  # Top 3 links internos
-                        internal_content = self._extract_real_page_content(link)
+                        with rate_limiter.limit('web'):
+                            internal_content = self._extract_real_page_content(link)
                         if internal_content and len(internal_content) > 100:
                             all_page_contents.append({
                                 "url": link,
@@ -123,7 +125,6 @@ class WebSailorAgent:
                                 "source_type": "internal_link",
                                 "parent_url": page["url"]
                             })
-                            time.sleep(0.3)
             
             # 3. PESQUISA DE QUERIES RELACIONADAS REAIS
             if aggressive_mode:
@@ -132,9 +133,16 @@ class WebSailorAgent:
                 
                 for related_query in related_queries[:3]:
                     try:
-                        related_results = self._google_search_real(related_query, 5)
+                        related_results = async_search_engine.search(
+                            related_query,
+                            providers=['google'],
+                            max_results_per_provider=5,
+                            provider_queries={'google': self._enhance_search_query_real(related_query)},
+                            date_sorted=True
+                        )
                         for result in related_results:
-                            content = self._extract_real_page_content(result["url"])
+                            with rate_limiter.limit('web'):
+                                content = self._extract_real_page_content(result["url"])
                             if content and len(content) > 100:
                                 all_page_contents.append({
                                     "url": result["url"],
@@ -144,7 +152,6 @@ class WebSailorAgent:
                                     "source_type": "related_query",
                                     "original_query": related_query
                                 })
-                                time.sleep(0.4)
                     except Exception as e:
                         logger.warning(f"Erro em query relacionada '{related_query}': {str(e)}")
                         continue
@@ -166,189 +173,6 @@ class WebSailorAgent:
             logger.error(f"❌ ERRO CRÍTICO na pesquisa real: {str(e)}", exc_info=True)
             return self._generate_emergency_real_research(query, context)
     
-    def _google_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando Google Custom Search API"""
-        
-        if not self.google_search_key or not self.google_cse_id:
-            logger.warning("Google Search API não configurada")
-            return []
-        
-        try:
-            enhanced_query = self._enhance_search_query_real(query)
-            
-            params = {
-                "key": self.google_search_key,
-                "cx": self.google_cse_id,
-                "q": enhanced_query,
-                "num": min(max_results, 10),
-                "lr": "lang_pt",
-                "gl": "br",
-                "safe": "off",
-                "dateRestrict": "m6",  # Últimos 6 meses
-                "sort": "date"
-            }
-            
-            response = requests.get(
-                self.google_search_url,
-                params=params,
-                headers=self.headers,
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                
-                for item in data.get("items", []):
-                    results.append({
-                        "title": item.get("title", ""),
-                        "url": item.get("link", ""),
-                        "snippet": item.get("snippet", ""),
-                        "source": "google_real"
-                    })
-                
-                logger.info(f"🔍 Google Search REAL: {len(results)} resultados")
-                return results
-            else:
-                logger.warning(f"Google Search falhou: {response.status_code}")
-                return []
-                
-        except Exception as e:
-            logger.error(f"Erro no Google Search REAL: {str(e)}")
-            return []
-    
-    def _bing_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando Bing"""
-        
-        try:
-            # Bing search via scraping
-            search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br"
-            
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                # Extrai resultados do Bing
-                result_items = soup.find_all('li', class_='b_algo')
-                
-                for item in result_items[:max_results]:
-                    title_elem = item.find('h2')
-                    if title_elem:
-                        link_elem = title_elem.find('a')
-                        if link_elem:
-                            title = title_elem.get_text(strip=True)
-                            url = link_elem.get('href', '')
-                            
-                            snippet_elem = item.find('p')
-                            snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                            
-                            if url and title:
-                                results.append({
-                                    "title": title,
-                                    "url": url,
-                                    "snippet": snippet,
-                                    "source": "bing_real"
-                                })
-                
-                logger.info(f"🔍 Bing Search REAL: {len(results)} resultados")
-                return results
-                
-        except Exception as e:
-            logger.error(f"Erro no Bing Search REAL: {str(e)}")
-            return []
-    
-    def _duckduckgo_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando DuckDuckGo"""
-        
-        try:
-            search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
-            
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_divs = soup.find_all('div', class_='result')
-                
-                for div in result_divs[:max_results]:
-                    title_elem = div.find('a', class_='result__a')
-                    snippet_elem = div.find('a', class_='result__snippet')
-                    
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        url = title_elem.get('href', '')
-                        snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                        
-                        if url and title and url.startswith('http'):
-                            results.append({
-                                "title": title,
-                                "url": url,
-                                "snippet": snippet,
-                                "source": "duckduckgo_real"
-                            })
-                
-                logger.info(f"🔍 DuckDuckGo Search REAL: {len(results)} resultados")
-                return results
-                
-        except Exception as e:
-            logger.error(f"Erro no DuckDuckGo Search REAL: {str(e)}")
-            return []
-    
-    def _yahoo_search_real(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Busca REAL usando Yahoo"""
-        
-        try:
-            search_url = f"https://br.search.yahoo.com/search?p={quote_plus(query)}"
-            
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_items = soup.find_all('div', class_='Sr')
-                
-                for item in result_items[:max_results]:
-                    title_elem = item.find('h3')
-                    if title_elem:
-                        link_elem = title_elem.find('a')
-                        if link_elem:
-                            title = title_elem.get_text(strip=True)
-                            url = link_elem.get('href', '')
-                            
-                            snippet_elem = item.find('span', class_='fz-ms')
-                            snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                            
-                            if url and title and url.startswith('http'):
-                                results.append({
-                                    "title": title,
-                                    "url": url,
-                                    "snippet": snippet,
-                                    "source": "yahoo_real"
-                                })
-                
-                logger.info(f"🔍 Yahoo Search REAL: {len(results)} resultados")
-                return results
-                
-        except Exception as e:
-            logger.error(f"Erro no Yahoo Search REAL: {str(e)}")
-            return []
-    
     def _extract_real_page_content(self, url: str) -> Optional[str]:
         """Extrai conteúdo REAL de uma página web"""
         
@@ -483,63 +307,7 @@ class WebSailorAgent:
     ) -> float:
         """Calcula score de relevância REAL do conteúdo"""
         
-        if not content or len(content) < 50:
-            return 0.0
-        
-        content_lower = content.lower()
-        query_lower = query.lower()
-        
-        score = 0.0
-        
-        # Score baseado na query (peso maior)
-        query_words = [w for w in query_lower.split() if len(w) > 2]
-        for word in query_words:
-            occurrences = content_lower.count(word)
-            score += occurrences * 2.0  # Peso aumentado
-        
-        # Score baseado no contexto
-        context_terms = []
-        
-        if context.get("segmento"):
-            context_terms.append(str(context["segmento"]).lower())
-        
-        if context.get("produto"):
-            context_terms.append(str(context["produto"]).lower())
-        
-        if context.get("publico"):
-            context_terms.append(str(context["publico"]).lower())
-        
-        for term in context_terms:
-            if term and len(term) > 2:
-                occurrences = content_lower.count(term)
-                score += occurrences * 1.5
-        
-        # Bonus para termos de mercado específicos
-        market_terms = [
-            "mercado", "análise", "tendência", "oportunidade", "estratégia", 
-            "marketing", "concorrência", "público", "crescimento", "demanda", 
-            "inovação", "tecnologia", "brasil", "brasileiro", "2024", "2025",
-            "dados", "estatística", "pesquisa", "relatório", "estudo"
-        ]
-        
-        for term in market_terms:
-            occurrences = content_lower.count(term)
-            score += occurrences * 0.5
-        
-        # Bonus por densidade de informação
-        word_count = len(content.split())
-        if word_count > 500:
-            score += 2.0
-        
-        # Bonus por presença de números/percentuais
-        import re
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        score += len(numbers) * 0.3
-        
-        # Normaliza score baseado no tamanho do conteúdo
-        normalized_score = score / (len(content) / 1000 + 1)
-        
-        return min(normalized_score, 100.0)
+        return relevance_engine.score_content(content, query, context, profile='websailor')
     
     def _enhance_search_query_real(self, query: str) -> str:
         """Melhora a query de busca para pesquisa REAL de mercado"""
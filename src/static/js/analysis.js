@@ -5,6 +5,8 @@ class AnalysisManager {
         this.currentAnalysis = null;
         this.sessionId = this.generateSessionId();
         this.progressInterval = null;
+        this.progressSource = null;
+        this.lastProgressEventId = null;
         this.init();
     }
 
@@ -117,7 +119,7 @@ class AnalysisManager {
             this.showProgressSection();
             this.startProgressTracking();
 
-            const response = await fetch('/api/analyze', {
+            let response = await fetch('/api/analyze', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -125,7 +127,12 @@ class AnalysisManager {
                 body: JSON.stringify(formData)
             });
 
-            const result = await response.json();
+            let result = await response.json();
+
+            // Análise enfileirada: aguarda o job terminar no servidor
+            if (response.status === 202 && result.job_id) {
+                ({ response, result } = await this.waitForAnalysisJob(result.result_url));
+            }
 
             if (response.ok && result) {
                 this.currentAnalysis = result;
@@ -145,6 +152,20 @@ class AnalysisManager {
         }
     }
 
+    async waitForAnalysisJob(resultUrl, maxWaitMs = 60 * 60 * 1000) {
+        // O progresso chega pelo SSE; aqui só verificamos se o resultado ficou pronto
+        const deadline = Date.now() + maxWaitMs;
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, 5000));
+
+            const response = await fetch(resultUrl);
+            if (response.status !== 202) {
+                return { response, result: await response.json() };
+            }
+        }
+        throw new Error('Tempo limite excedido aguardando o resultado da análise');
+    }
+
     collectFormData() {
         const form = document.getElementById('analysisForm');
         const formData = new FormData(form);
@@ -196,42 +217,91 @@ class AnalysisManager {
             analyzeBtn.innerHTML = '<i class="fas fa-magic"></i> <span>Gerar Análise Ultra-Detalhada</span>';
         }
 
+        this.stopProgressTracking();
+    }
+
+    startProgressTracking() {
+        this.stopProgressTracking();
+        this.lastProgressEventId = null;
+
+        if (!window.EventSource) {
+            this.startProgressPolling();
+            return;
+        }
+
+        // Atualizações reais do servidor via Server-Sent Events
+        this.progressSource = new EventSource(`/api/stream_progress/${encodeURIComponent(this.sessionId)}`);
+
+        const handleProgress = (event) => {
+            if (event.lastEventId) {
+                this.lastProgressEventId = event.lastEventId;
+            }
+            this.applyProgressUpdate(JSON.parse(event.data));
+        };
+
+        this.progressSource.addEventListener('status', handleProgress);
+        this.progressSource.addEventListener('progress', handleProgress);
+        this.progressSource.addEventListener('section', handleProgress);
+        this.progressSource.addEventListener('complete', () => this.stopProgressTracking());
+        this.progressSource.onerror = () => {
+            // O navegador reconecta sozinho (Last-Event-ID); polling só se a conexão foi encerrada
+            if (this.progressSource && this.progressSource.readyState === EventSource.CLOSED) {
+                this.progressSource = null;
+                this.startProgressPolling();
+            }
+        };
+    }
+
+    startProgressPolling() {
+        this.progressInterval = setInterval(async () => {
+            try {
+                const since = this.lastProgressEventId ? `?since=${encodeURIComponent(this.lastProgressEventId)}` : '';
+                const response = await fetch(`/api/poll_updates/${encodeURIComponent(this.sessionId)}${since}`);
+                if (!response.ok) return;
+
+                const result = await response.json();
+                (result.updates || []).forEach(update => this.applyProgressUpdate(update));
+                if (result.last_event_id) {
+                    this.lastProgressEventId = result.last_event_id;
+                }
+            } catch (error) {
+                console.warn('Erro ao consultar progresso:', error);
+            }
+        }, 3000);
+    }
+
+    stopProgressTracking() {
+        if (this.progressSource) {
+            this.progressSource.close();
+            this.progressSource = null;
+        }
+
         if (this.progressInterval) {
             clearInterval(this.progressInterval);
             this.progressInterval = null;
         }
     }
 
-    startProgressTracking() {
-        let progress = 0;
-        let step = 0;
-        const steps = [
-            "🔍 Coletando dados do formulário",
-            "📊 Processando anexos inteligentes", 
-            "🌐 Realizando pesquisa profunda massiva",
-            "🧠 Analisando com múltiplas IAs",
-            "👤 Criando avatar arqueológico completo",
-            "🧠 Gerando drivers mentais customizados",
-            "🎭 Desenvolvendo provas visuais instantâneas",
-            "🛡️ Construindo sistema anti-objeção",
-            "🎯 Arquitetando pré-pitch invisível",
-            "⚔️ Mapeando concorrência profunda",
-            "📈 Calculando métricas e projeções",
-            "🔮 Predizendo futuro do mercado",
-            "✨ Consolidando insights exclusivos"
-        ];
-
-        this.progressInterval = setInterval(() => {
-            if (progress < 95) {
-                progress += Math.random() * 3;
-                step = Math.min(Math.floor(progress / 8), steps.length - 1);
-                
-                this.updateProgress(progress, step, steps[step]);
+    applyProgressUpdate(update) {
+        if (update.event === 'section') {
+            // Seção da análise pronta (streaming): só atualiza a mensagem
+            const currentStep = document.getElementById('currentStep');
+            if (currentStep && update.current_message) {
+                currentStep.textContent = update.current_message;
             }
-        }, 2000);
+            return;
+        }
+
+        const stepIndex = Math.max(0, Math.min((update.current_step || 0) - 1, 12));
+        this.updateProgress(
+            update.percentage || 0,
+            stepIndex,
+            update.current_message || '',
+            update.estimated_remaining
+        );
     }
 
-    updateProgress(percentage, stepIndex, stepMessage) {
+    updateProgress(percentage, stepIndex, stepMessage, remainingSeconds) {
         const progressFill = document.querySelector('.progress-fill');
         const currentStep = document.getElementById('currentStep');
         const stepCounter = document.getElementById('stepCounter');
@@ -250,7 +320,9 @@ class AnalysisManager {
         }
 
         if (estimatedTime) {
-            const remaining = Math.max(0, Math.floor((100 - percentage) / 2));
+            const remaining = remainingSeconds !== undefined
+                ? Math.max(0, Math.floor(remainingSeconds))
+                : Math.max(0, Math.floor((100 - percentage) / 2));
             const minutes = Math.floor(remaining / 60);
             const seconds = remaining % 60;
             estimatedTime.textContent = `${minutes}:${seconds.toString().padStart(2, '0')}`;
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste de Confiabilidade do Pipeline
+Valida a fila de análises, o journal do auto save, prazos e pool de extração
+e a retomada de análises a partir de checkpoints
+"""
+
+import sys
+import os
+import json
+import time
+import uuid
+import logging
+import tempfile
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+# Bancos, journals e relatórios dos testes ficam em um diretório temporário
+WORKDIR = tempfile.mkdtemp(prefix='arqv30_testes_')
+os.chdir(WORKDIR)
+os.environ.setdefault('SESSION_INDEX_PATH', os.path.join(WORKDIR, 'indice_sessoes.db'))
+os.environ.setdefault('EXTRACTION_CACHE_DIR', os.path.join(WORKDIR, 'cache_extracao'))
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+def _nova_fila(**limites):
+    """Fila de análises em banco próprio, com despacho manual (sem thread)"""
+    from services.analysis_job_queue import AnalysisJobQueue
+
+    os.environ['ANALYSIS_JOB_DB'] = os.path.join(WORKDIR, f'jobs_{uuid.uuid4().hex}.db')
+    fila = AnalysisJobQueue()
+    fila._ensure_dispatcher = lambda: None
+    for nome, valor in limites.items():
+        setattr(fila, nome, valor)
+    return fila
+
+def _alterar_job(fila, job_id: str, **campos):
+    """Simula a passagem do tempo alterando colunas do job"""
+    with fila._lock:
+        for coluna, valor in campos.items():
+            fila._db().execute(f'UPDATE jobs SET {coluna} = ? WHERE job_id = ?', (valor, job_id))
+
+def test_job_queue_requeue_and_lease():
+    """Job de worker interrompido volta para o fim da fila e não expira pela submissão antiga"""
+
+    print("=" * 60)
+    print("🧵 TESTE DA FILA DE ANÁLISES (LEASE E REENFILEIRAMENTO)")
+    print("=" * 60)
+
+    fila = _nova_fila(max_concurrent=1, lease_seconds=60, max_attempts=2, max_wait_seconds=900)
+    fila.set_runner(lambda payload: ({'ok': payload['n']}, 200))
+
+    primeiro = fila.submit({'n': 1})['job_id']
+    segundo = fila.submit({'n': 2})['job_id']
+    assert fila.get_job(primeiro)['queue_position'] == 1
+    assert fila.get_job(segundo)['queue_position'] == 2
+
+    job = fila._claim_next()
+    assert job['job_id'] == primeiro
+    assert fila._claim_next() is None, "limite global de concorrência ignorado"
+    print("✅ Job mais antigo reivindicado; limite global respeitado")
+
+    # Worker morreu (reciclagem do gunicorn): heartbeat para de ser renovado
+    _alterar_job(fila, primeiro, heartbeat_at=time.time() - 120, submitted_at=time.time() - 3600)
+    fila._maintain()
+    estado = fila.get_job(primeiro)
+    assert estado['status'] == 'queued'
+    assert estado['started_at'] is None
+    assert estado['attempts'] == 1
+    assert estado['queue_position'] == 2, "job reenfileirado deveria ir para o fim da fila"
+    print("✅ Lease expirado: job voltou para o fim da fila")
+
+    # Submetido há 1h, mas a espera conta a partir da reentrada na fila
+    fila._maintain()
+    assert fila.get_job(primeiro)['status'] == 'queued', "job reenfileirado expirou"
+    print("✅ Job reenfileirado não expira pela submissão original")
+
+    job = fila._claim_next()
+    assert job['job_id'] == segundo
+    fila._run_job(job)
+    assert fila.get_result(segundo) == ({'ok': 2}, 200)
+
+    job = fila._claim_next()
+    assert job['job_id'] == primeiro
+    _alterar_job(fila, primeiro, heartbeat_at=time.time() - 120)
+    fila._maintain()
+    estado = fila.get_job(primeiro)
+    assert estado['status'] == 'failed' and estado['attempts'] == 2
+    resultado, http_status = fila.get_result(primeiro)
+    assert http_status == 500 and 'error' in resultado
+    print("✅ Segunda interrupção: job falha com HTTP 500 após o máximo de tentativas")
+    return True
+
+def test_job_queue_expiry_and_depth():
+    """Fila cheia recusa novos jobs; espera acima do limite expira com HTTP 503"""
+
+    print("\n" + "=" * 60)
+    print("⏰ TESTE DA FILA DE ANÁLISES (EXPIRAÇÃO E PROFUNDIDADE)")
+    print("=" * 60)
+
+    from services.analysis_job_queue import QueueFullError
+
+    fila = _nova_fila(max_queue_depth=2, max_wait_seconds=60)
+    antigo = fila.submit({'n': 1})['job_id']
+    fila.submit({'n': 2})
+    try:
+        fila.submit({'n': 3})
+        raise AssertionError("fila cheia aceitou um novo job")
+    except QueueFullError:
+        print("✅ Fila cheia recusou o terceiro job")
+
+    _alterar_job(fila, antigo, queued_at=time.time() - 120)
+    fila._maintain()
+    assert fila.get_job(antigo)['status'] == 'expired'
+    resultado, http_status = fila.get_result(antigo)
+    assert http_status == 503 and 'error' in resultado
+    assert fila.get_stats()['queued'] == 1
+    print("✅ Job com espera acima do limite expirou com HTTP 503")
+    return True
+
+def test_journal_flush_and_offsets():
+    """flush() grava tudo; offsets do índice apontam para as linhas do journal"""
+
+    print("\n" + "=" * 60)
+    print("💾 TESTE DO JOURNAL (FLUSH E OFFSETS)")
+    print("=" * 60)
+
+    from services.auto_save_manager import auto_save_manager
+    from services.session_index import session_index
+
+    sessao = f"teste_journal_{uuid.uuid4().hex[:8]}"
+    for i in range(5):
+        # Texto com acentos: offsets são em bytes, não em caracteres
+        auto_save_manager.salvar_etapa("etapa_teste", {'i': i, 'texto': 'ação ' * i}, session_id=sessao)
+    auto_save_manager.salvar_etapa("outra_etapa", [1, 2, 3], session_id=sessao)
+    assert auto_save_manager.flush(timeout=10), "flush não concluiu"
+
+    journal = auto_save_manager._journal_path(sessao)
+    registros = session_index.listar_registros(sessao)
+    assert len(registros) == 6
+    with open(journal, 'rb') as f:
+        conteudo = f.read()
+    for entrada in registros:
+        linha = conteudo[entrada['offset']:entrada['offset'] + entrada['comprimento']]
+        assert json.loads(linha)['etapa'] == entrada['etapa']
+        assert conteudo[entrada['offset'] + entrada['comprimento']:][:1] == b'\n'
+    assert session_index.indexado_ate(str(journal)) == len(conteudo)
+    assert auto_save_manager.recuperar_etapa("etapa_teste", sessao)['dados']['i'] == 4
+    print("✅ Offsets do índice apontam exatamente para cada registro")
+
+    # Queda entre a escrita e o índice, com a última linha truncada
+    perdida = json.dumps({'etapa': 'sem_indice', 'status': 'sucesso', 'timestamp': time.time(), 'dados': {'ok': True}})
+    with open(journal, 'ab') as f:
+        f.write(perdida.encode('utf-8') + b'\n' + b'{"etapa": "trunc')
+    etapas = auto_save_manager.listar_etapas_salvas(sessao)
+    assert 'sem_indice' in etapas and len(etapas['etapa_teste']) == 5
+    assert not any(nome.startswith('trunc') for nome in etapas)
+    print("✅ Registro sem índice reindexado; linha truncada ignorada")
+
+    # Queda antes do fsync: o arquivo ficou menor que o índice
+    offset_perdido = etapas['sem_indice'][0]['offset']
+    with open(journal, 'r+b') as f:
+        f.truncate(offset_perdido)
+    etapas = auto_save_manager.listar_etapas_salvas(sessao)
+    assert 'sem_indice' not in etapas and 'outra_etapa' in etapas
+    print("✅ Registros além do fim do journal descartados do índice")
+    return True
+
+def test_deadline_propagation():
+    """Prazo filho é limitado pelo pai; check() levanta DeadlineExceeded com a etapa"""
+
+    print("\n" + "=" * 60)
+    print("⏳ TESTE DOS PRAZOS (DEADLINE)")
+    print("=" * 60)
+
+    from services.deadline import Deadline, DeadlineExceeded
+
+    sem_prazo = Deadline()
+    assert sem_prazo.remaining() is None and not sem_prazo.expired()
+    assert sem_prazo.timeout(5) == 5
+
+    lote = Deadline.within(0.3)
+    url = Deadline.within(10, parent=lote)
+    assert url.remaining() <= 0.3, "prazo da URL ultrapassa o do lote"
+    assert url.timeout(cap=10) <= 0.3
+    assert Deadline.within(0.1, parent=lote).remaining() <= 0.1
+    assert Deadline(parent=lote).expires_at == lote.expires_at
+
+    time.sleep(0.35)
+    assert lote.expired() and url.expired()
+    assert url.timeout(cap=10) == 0.1, "timeout mínimo não aplicado"
+    try:
+        url.check('fetch')
+        raise AssertionError("check() não levantou com o prazo esgotado")
+    except DeadlineExceeded as e:
+        assert e.stage == 'fetch' and isinstance(e, TimeoutError)
+    print("✅ Prazos filhos limitados pelo lote e etapa informada no erro")
+    return True
+
+def test_extraction_pool_timeouts():
+    """Prazo conta do início da execução: fila só cancela, execução longa reinicia o pool"""
+
+    print("\n" + "=" * 60)
+    print("⚙️ TESTE DO POOL DE EXTRAÇÃO (TIMEOUTS)")
+    print("=" * 60)
+
+    from services.extraction_pool import ExtractionPool, ExtractionTimeout
+    from services.deadline import DeadlineExceeded
+
+    os.environ['EXTRACTION_POOL_WORKERS'] = '1'
+    pool = ExtractionPool()
+    try:
+        assert pool.run(pow, 2, 10, timeout=30) == 1024
+        print("✅ Tarefa executada no processo do pool")
+
+        # Um processo: a segunda tarefa espera a primeira terminar
+        longa = pool.submit(time.sleep, 1.0)
+        na_fila = pool.submit(pow, 3, 2)
+        try:
+            pool.wait(na_fila, timeout=0.3)
+            raise AssertionError("tarefa na fila não respeitou o prazo")
+        except ExtractionTimeout as e:
+            assert isinstance(e, DeadlineExceeded)
+        assert pool.stats['restarts'] == 0, "tarefa que não começou reiniciou o pool"
+        assert pool.wait(longa, timeout=10) is None
+        print("✅ Espera na fila não conta como execução nem reinicia o pool")
+
+        travada = pool.submit(time.sleep, 30)
+        inicio = time.time()
+        try:
+            pool.wait(travada, timeout=0.5)
+            raise AssertionError("tarefa acima do prazo não foi interrompida")
+        except ExtractionTimeout:
+            pass
+        assert time.time() - inicio < 5
+        assert pool.stats['timeouts'] == 1 and pool.stats['restarts'] == 1
+        assert pool.run(pow, 2, 5, timeout=30) == 32
+        print("✅ Tarefa travada reiniciou o pool, que voltou a atender")
+    finally:
+        pool.shutdown()
+        os.environ.pop('EXTRACTION_POOL_WORKERS', None)
+    return True
+
+def test_checkpoint_resume():
+    """Retomada ignora saídas de fallback e refaz tudo que depende de um componente refeito"""
+
+    print("\n" + "=" * 60)
+    print("🔁 TESTE DA RETOMADA POR CHECKPOINT")
+    print("=" * 60)
+
+    from services.auto_save_manager import salvar_etapa
+    from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine as engine
+
+    sessao = f"teste_checkpoint_{uuid.uuid4().hex[:8]}"
+    assert engine.load_checkpoint(sessao) is None
+
+    entrada = {'segmento': 'Educação online', 'produto': 'Curso'}
+    salvar_etapa("analise_iniciada", {'input_data': entrada}, session_id=sessao)
+    for componente in engine.dependency_manager.dependencies:
+        salvar_etapa(componente, {'componente': componente}, session_id=sessao)
+    # Fallback registrado pelo orquestrador e saída marcada com fallback_mode
+    salvar_etapa("componentes_fallback", ['drivers_mentais_customizados'], session_id=sessao)
+    salvar_etapa("predicoes_futuro_completas", {'fallback_mode': True}, session_id=sessao)
+
+    checkpoint = engine.load_checkpoint(sessao)
+    assert checkpoint['input_data'] == entrada
+    assert sorted(checkpoint['componentes']) == [
+        'avatar_ultra_detalhado', 'pesquisa_web_massiva',
+        'provas_visuais_sugeridas', 'sistema_anti_objecao'
+    ]
+    # pre_pitch depende dos drivers, que serão refeitos
+    assert sorted(checkpoint['pendentes']) == [
+        'drivers_mentais_customizados', 'pre_pitch_invisivel', 'predicoes_futuro_completas'
+    ]
+    assert checkpoint['componentes']['avatar_ultra_detalhado'] == {'componente': 'avatar_ultra_detalhado'}
+    print("✅ Fallbacks e seus dependentes ficam pendentes; o restante é restaurado")
+    return True
+
+def run_pipeline_reliability_test():
+    """Executa todos os testes de confiabilidade do pipeline"""
+
+    print("🚀 INICIANDO TESTE DE CONFIABILIDADE DO PIPELINE")
+    print("=" * 80)
+
+    tests = [
+        ("Fila: lease e reenfileiramento", test_job_queue_requeue_and_lease),
+        ("Fila: expiração e profundidade", test_job_queue_expiry_and_depth),
+        ("Journal: flush e offsets", test_journal_flush_and_offsets),
+        ("Prazos (Deadline)", test_deadline_propagation),
+        ("Pool de extração: timeouts", test_extraction_pool_timeouts),
+        ("Retomada por checkpoint", test_checkpoint_resume)
+    ]
+
+    results = []
+    for test_name, test_func in tests:
+        print(f"\n🧪 Executando: {test_name}")
+        start_time = time.time()
+        try:
+            result = test_func()
+        except Exception as e:
+            print(f"❌ {test_name}: {type(e).__name__}: {e}")
+            result = False
+        results.append((test_name, result, time.time() - start_time))
+
+    print("\n" + "=" * 80)
+    print("🏁 RELATÓRIO FINAL")
+    print("=" * 80)
+    for test_name, result, exec_time in results:
+        status = "✅ PASSOU" if result else "❌ FALHOU"
+        print(f"{test_name:.<45} {status} ({exec_time:.2f}s)")
+
+    passed = sum(1 for _, result, _ in results if result)
+    print(f"\nTotal: {passed}/{len(results)} testes")
+    return passed == len(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if run_pipeline_reliability_test() else 1)